@@ -70,8 +70,17 @@ from .core.knowledge_builder import (
 from .core.plugin_meta import build_plugin_metadata
 from .core.plugin_runtime import build_plugin_runtime
 from .core.qzone_startup import refresh_qzone_cookie_on_available_bot
+from .core.group_relation_edges import flush_pending_relation_edges, run_relation_edge_flusher
+from .core.token_ledger import configure_token_ledger, flush_pending_token_usage, run_token_ledger_flusher
+from .core.provider_health import flush_provider_health, load_persisted_stats, run_provider_health_flusher
 from .core.runtime_state import close_shared_http_client
+from .core.loop_watchdog import configure_loop_watchdog, run_loop_watchdog
+from .core.memory_footprint import configure_memory_footprint, run_memory_footprint_sampler
 from .core.runtime_performance import sample_event_loop_lag
+from .core.reply_turn_trace import flush_pending as flush_pending_reply_stages
+from .core.span_trace import configure_span_trace
+from .core.http_clients import configure_http_clients
+from .core.token_counter import load_token_counter
 from .core.runtime_task_supervisor import runtime_task_supervisor
 from .core.ai_routes import (
     build_routed_tool_caller,
@@ -254,6 +263,18 @@ async def _init_personification_runtime() -> None:
 
     runtime_task_supervisor.configure(logger=logger)
     runtime_task_supervisor.start("runtime.event_loop_lag", sample_event_loop_lag)
+    configure_loop_watchdog(plugin_config)
+    runtime_task_supervisor.start("runtime.loop_watchdog", run_loop_watchdog)
+    configure_memory_footprint(plugin_config, logger=logger)
+    runtime_task_supervisor.start("runtime.memory_footprint", run_memory_footprint_sampler)
+    runtime_task_supervisor.start("runtime.relation_edge_flush", run_relation_edge_flusher)
+    configure_token_ledger(plugin_config)
+    configure_span_trace(plugin_config)
+    configure_http_clients(plugin_config)
+    await load_token_counter(plugin_config, logger=logger)
+    runtime_task_supervisor.start("runtime.token_ledger_flush", run_token_ledger_flusher)
+    await asyncio.to_thread(load_persisted_stats)
+    runtime_task_supervisor.start("runtime.provider_health_flush", run_provider_health_flusher)
     runtime_bundle = build_plugin_runtime(
         plugin_config=plugin_config,
         superusers=superusers,
@@ -769,6 +790,22 @@ async def _close_personification_runtime() -> None:
         _sticker_labeler_observer.join()
         _sticker_labeler_observer = None
     await runtime_task_supervisor.shutdown(timeout=5.0)
+    try:
+        await asyncio.to_thread(flush_pending_relation_edges)
+    except Exception as exc:
+        logger.warning(f"[relation_edges] shutdown flush failed: {exc}")
+    try:
+        await asyncio.to_thread(flush_pending_token_usage)
+    except Exception as exc:
+        logger.warning(f"[token_ledger] shutdown flush failed: {exc}")
+    try:
+        await asyncio.to_thread(flush_provider_health)
+    except Exception as exc:
+        logger.warning(f"[provider_health] shutdown flush failed: {exc}")
+    try:
+        await asyncio.to_thread(flush_pending_reply_stages)
+    except Exception as exc:
+        logger.warning(f"[reply_turn_trace] shutdown flush failed: {exc}")
     from .core.qzone_auth import qzone_login_manager
 
     await qzone_login_manager.shutdown()
@@ -9,6 +9,7 @@ from ..query_rewriter import ContextualQueryRewrite
 from ..tool_registry import ToolRegistry
 from ...core.error_utils import log_exception
 from ...core.metrics import record_counter, record_timing
+from ...core.span_trace import traced
 from ...core.time_ctx import get_configured_now
 from .constants import MAX_LOOKUP_QUERY_VARIANTS
 from .fallbacks import (
@@ -76,6 +77,7 @@ def _tool_timeout_result(tool_name: str) -> str:
     return "工具调用失败：超时"
 
 
+@traced("agent.tool", attr_keys=("tool_name",))
 async def _execute_tool_with_retries(
     *,
     registry: ToolRegistry,
@@ -361,7 +361,7 @@ def _render_tool_metadata(tools: list[dict[str, Any]] | None) -> str:
     return "\n".join(lines) if lines else "无"
 
 
-async def plan_turn_with_llm(
+def build_turn_plan_messages(
     text: str,
     *,
     is_group: bool = False,
@@ -370,7 +370,6 @@ async def plan_turn_with_llm(
     has_images: bool = False,
     message_target: str = "",
     qzone_event_type: str = "",
-    tool_caller: Any = None,
     recent_context: str = "",
     relationship_hint: str = "",
     repeat_clusters: list[dict[str, Any]] | None = None,
@@ -379,7 +378,7 @@ async def plan_turn_with_llm(
     available_tools: list[dict[str, Any]] | None = None,
     group_knowledge_hint: str = "",
     media_grounding: str = "",
-) -> TurnPlan:
+) -> list[dict[str, Any]]:
     fallback = metadata_fallback_turn_plan(
         is_group=is_group,
         is_random_chat=is_random_chat,
@@ -389,9 +388,6 @@ async def plan_turn_with_llm(
         qzone_event_type=qzone_event_type,
     )
     normalized = normalize_plan_text(text)
-    if not normalized or tool_caller is None:
-        return fallback
-
     repeat_lines: list[str] = []
     for cluster in list(repeat_clusters or [])[:3]:
         plain = str(cluster.get("text", "") or "").strip()
@@ -481,12 +477,60 @@ async def plan_turn_with_llm(
         f"ambiguity={fallback.ambiguity_level}"
         + (f"\n{group_knowledge_hint}" if group_knowledge_hint else "")
     )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content},
+    ]
+
+
+async def plan_turn_with_llm(
+    text: str,
+    *,
+    is_group: bool = False,
+    is_random_chat: bool = False,
+    is_direct_mention: bool = False,
+    has_images: bool = False,
+    message_target: str = "",
+    qzone_event_type: str = "",
+    tool_caller: Any = None,
+    recent_context: str = "",
+    relationship_hint: str = "",
+    repeat_clusters: list[dict[str, Any]] | None = None,
+    current_inner_state: str = "",
+    current_emotion_state: str = "",
+    available_tools: list[dict[str, Any]] | None = None,
+    group_knowledge_hint: str = "",
+    media_grounding: str = "",
+) -> TurnPlan:
+    fallback = metadata_fallback_turn_plan(
+        is_group=is_group,
+        is_random_chat=is_random_chat,
+        is_direct_mention=is_direct_mention,
+        has_images=has_images,
+        message_target=message_target,
+        qzone_event_type=qzone_event_type,
+    )
+    if not normalize_plan_text(text) or tool_caller is None:
+        return fallback
     try:
         response = await tool_caller.chat_with_tools(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content},
-            ],
+            messages=build_turn_plan_messages(
+                text,
+                is_group=is_group,
+                is_random_chat=is_random_chat,
+                is_direct_mention=is_direct_mention,
+                has_images=has_images,
+                message_target=message_target,
+                qzone_event_type=qzone_event_type,
+                recent_context=recent_context,
+                relationship_hint=relationship_hint,
+                repeat_clusters=repeat_clusters,
+                current_inner_state=current_inner_state,
+                current_emotion_state=current_emotion_state,
+                available_tools=available_tools,
+                group_knowledge_hint=group_knowledge_hint,
+                media_grounding=media_grounding,
+            ),
             tools=[],
             use_builtin_search=False,
         )
@@ -634,6 +678,7 @@ __all__ = [
     "SpeechAct",
     "TurnPlan",
     "apply_group_no_question_turn_policy",
+    "build_turn_plan_messages",
     "default_speech_act",
     "extract_json_payload",
     "metadata_fallback_turn_plan",
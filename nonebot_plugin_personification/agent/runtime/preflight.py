@@ -0,0 +1,197 @@
+"""回合预判合并调用：一次 LLM 往返同时给出语义帧与 TurnPlan。
+
+两者的输入几乎完全相同，影子观测时原本要串行两次往返。合并输出后按 slice 解析，
+某个 slice 缺失或解析失败时返回 None，由调用方退回对应的单独调用。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from ...core.chat_intent import (
+    TurnSemanticFrame,
+    build_turn_semantic_frame_messages,
+    finalize_turn_semantic_frame,
+    normalize_intent_text,
+    parse_turn_semantic_frame_payload,
+)
+from ...core.llm_singleflight import PURPOSE_TURN_PREFLIGHT, coalesced_chat
+from .planner import (
+    TurnPlan,
+    apply_group_no_question_turn_policy,
+    build_turn_plan_messages,
+    extract_json_payload,
+    parse_turn_plan_payload,
+)
+
+
+@dataclass
+class TurnPreflight:
+    semantic_frame: TurnSemanticFrame | None = None
+    turn_plan: TurnPlan | None = None
+
+    @property
+    def complete(self) -> bool:
+        return self.semantic_frame is not None and self.turn_plan is not None
+
+
+def build_turn_preflight_messages(
+    text: str,
+    *,
+    is_group: bool = False,
+    is_random_chat: bool = False,
+    is_direct_mention: bool = False,
+    has_images: bool = False,
+    message_target: str = "",
+    plan_message_target: str | None = None,
+    qzone_event_type: str = "",
+    recent_context: str = "",
+    relationship_hint: str = "",
+    repeat_clusters: list[dict[str, Any]] | None = None,
+    current_inner_state: str = "",
+    current_emotion_state: str = "",
+    available_tools: list[dict[str, Any]] | None = None,
+    group_knowledge_hint: str = "",
+    media_grounding: str = "",
+) -> list[dict[str, Any]]:
+    frame_messages = build_turn_semantic_frame_messages(
+        text,
+        is_group=is_group,
+        is_random_chat=is_random_chat,
+        is_direct_mention=is_direct_mention,
+        message_target=message_target,
+        recent_context=recent_context,
+        relationship_hint=relationship_hint,
+        repeat_clusters=repeat_clusters,
+        current_inner_state=current_inner_state,
+        current_emotion_state=current_emotion_state,
+        media_grounding=media_grounding,
+    )
+    plan_messages = build_turn_plan_messages(
+        text,
+        is_group=is_group,
+        is_random_chat=is_random_chat,
+        is_direct_mention=is_direct_mention,
+        has_images=has_images,
+        message_target=message_target if plan_message_target is None else plan_message_target,
+        qzone_event_type=qzone_event_type,
+        recent_context=recent_context,
+        relationship_hint=relationship_hint,
+        repeat_clusters=repeat_clusters,
+        current_inner_state=current_inner_state,
+        current_emotion_state=current_emotion_state,
+        available_tools=available_tools,
+        group_knowledge_hint=group_knowledge_hint,
+        media_grounding=media_grounding,
+    )
+    system_prompt = (
+        "本轮要在一次输出里同时完成两项判断：语义与情绪判别（semantic_frame）和回合规划（turn_plan）。"
+        "输出严格 JSON，不要 markdown，不要解释，顶层结构固定为"
+        '{"semantic_frame":{...},"turn_plan":{...}}，'
+        "两个对象分别遵循下方对应小节的 JSON 结构与判别要求，互相独立判断，不要因为另一部分的结论而改写。\n"
+        f"## semantic_frame\n{frame_messages[0]['content']}\n"
+        f"## turn_plan\n{plan_messages[0]['content']}"
+    )
+    # TurnPlan 的用户信息是语义帧的超集，只补上语义帧自己的 fallback 行
+    frame_fallback_line = str(frame_messages[1]["content"]).rsplit("\n", 1)[-1]
+    user_content = f"{plan_messages[1]['content']}\n语义帧{frame_fallback_line}"
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content},
+    ]
+
+
+def parse_turn_preflight_payload(
+    payload: Any,
+    *,
+    is_group: bool = False,
+    is_random_chat: bool = False,
+    is_direct_mention: bool = False,
+    message_target: str = "",
+) -> TurnPreflight:
+    if not isinstance(payload, dict):
+        return TurnPreflight()
+    frame = parse_turn_semantic_frame_payload(payload.get("semantic_frame"))
+    if frame is not None:
+        frame = finalize_turn_semantic_frame(
+            frame,
+            is_group=is_group,
+            is_random_chat=is_random_chat,
+            is_direct_mention=is_direct_mention,
+            message_target=message_target,
+        )
+    plan = parse_turn_plan_payload(payload.get("turn_plan"))
+    if plan is not None:
+        plan = apply_group_no_question_turn_policy(
+            plan,
+            is_group=is_group,
+            is_direct_mention=is_direct_mention,
+        )
+    return TurnPreflight(semantic_frame=frame, turn_plan=plan)
+
+
+async def preflight_turn_with_llm(
+    text: str,
+    *,
+    is_group: bool = False,
+    is_random_chat: bool = False,
+    is_direct_mention: bool = False,
+    has_images: bool = False,
+    message_target: str = "",
+    plan_message_target: str | None = None,
+    qzone_event_type: str = "",
+    tool_caller: Any = None,
+    recent_context: str = "",
+    relationship_hint: str = "",
+    repeat_clusters: list[dict[str, Any]] | None = None,
+    current_inner_state: str = "",
+    current_emotion_state: str = "",
+    available_tools: list[dict[str, Any]] | None = None,
+    group_knowledge_hint: str = "",
+    media_grounding: str = "",
+) -> TurnPreflight:
+    if not normalize_intent_text(text) or tool_caller is None:
+        return TurnPreflight()
+    try:
+        messages = build_turn_preflight_messages(
+            text,
+            is_group=is_group,
+            is_random_chat=is_random_chat,
+            is_direct_mention=is_direct_mention,
+            has_images=has_images,
+            message_target=message_target,
+            plan_message_target=plan_message_target,
+            qzone_event_type=qzone_event_type,
+            recent_context=recent_context,
+            relationship_hint=relationship_hint,
+            repeat_clusters=repeat_clusters,
+            current_inner_state=current_inner_state,
+            current_emotion_state=current_emotion_state,
+            available_tools=available_tools,
+            group_knowledge_hint=group_knowledge_hint,
+            media_grounding=media_grounding,
+        )
+        response = await coalesced_chat(
+            tool_caller,
+            messages,
+            lambda: tool_caller.chat_with_tools(messages=messages, tools=[], use_builtin_search=False),
+            purpose=PURPOSE_TURN_PREFLIGHT,
+        )
+        return parse_turn_preflight_payload(
+            extract_json_payload(str(getattr(response, "content", "") or "")),
+            is_group=is_group,
+            is_random_chat=is_random_chat,
+            is_direct_mention=is_direct_mention,
+            message_target=message_target,
+        )
+    except Exception:
+        return TurnPreflight()
+
+
+__all__ = [
+    "TurnPreflight",
+    "build_turn_preflight_messages",
+    "parse_turn_preflight_payload",
+    "preflight_turn_with_llm",
+]
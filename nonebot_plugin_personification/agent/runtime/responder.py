@@ -106,10 +106,15 @@ def with_persona_responder_instruction(
         reply_length_hint=reply_length_hint,
     )
     copied = [dict(item) for item in list(messages or [])]
-    if copied and copied[0].get("role") == "system":
-        copied[0]["content"] = f"{copied[0].get('content', '')}\n\n{instruction}"
+    leading = 0
+    while leading < len(copied) and copied[leading].get("role") == "system":
+        leading += 1
+    # 首条 system 是逐字节稳定的静态前缀（前缀缓存键 / cache_control 断点都按它算），
+    # 每轮变化的指令只能拼到后面的易变 system 上，或者紧跟前缀另起一条
+    if leading > 1:
+        copied[leading - 1]["content"] = f"{copied[leading - 1].get('content', '')}\n\n{instruction}"
     else:
-        copied.insert(0, {"role": "system", "content": instruction})
+        copied.insert(leading, {"role": "system", "content": instruction})
     return copied
 
 
@@ -110,6 +110,12 @@ class Config(BaseModel):
     personification_provider_dynamic_priority_enabled: bool = True
     # 样本数 < min_samples 时仍用配置的 base priority，避免冷启动 fluke
     personification_provider_health_min_samples: int = 3
+    # 对冲请求：逗号分隔的 purpose（如 reply）；主 provider 超过其 p90 延迟仍无结果时提前拉起下一候选
+    personification_hedge_purposes: str = ""
+    # 对冲预算：额外请求数占可对冲请求数的上限比例
+    personification_hedge_budget_ratio: float = 0.1
+    # 单个 provider 的并发请求上限（AIMD 自适应收缩/增长的天花板）；0 = 不限流
+    personification_provider_concurrency_max: int = 8
     # ──────────── Social Intelligence（主动社交框架）────────────
     # 总开关：默认关闭，配置好场景后再打开避免上线就乱发
     personification_social_intelligence_enabled: bool = False
@@ -152,6 +158,7 @@ class Config(BaseModel):
     personification_response_review_model_role: str = "review"
     personification_turn_planner_enabled: bool = False
     personification_turn_planner_shadow_enabled: bool = False
+    personification_turn_preflight_enabled: bool = False
     personification_semantic_frame_timeout: float = 8.0
     personification_evidence_synthesizer_enabled: bool = False
     personification_cross_verify_enabled: bool = False
@@ -168,6 +175,11 @@ class Config(BaseModel):
     personification_quota_openai_monthly_tokens: int = 0
     personification_quota_gemini_cli_monthly_tokens: int = 0
     personification_quota_codex_monthly_tokens: int = 0
+    # token 账本内存聚合：落库周期（秒）与未落库调用上限（0=每次调用同步写，崩溃不丢账）
+    personification_token_ledger_flush_seconds: float = 5.0
+    personification_token_ledger_max_unflushed_calls: int = 200
+    personification_token_ledger_raw_retention_days: int = 180
+    personification_token_ledger_hourly_retention_days: int = 7
     personification_group_style_autobuild_enabled: bool = True
     personification_group_style_interval_hours: int = 12
     personification_group_style_daily_limit: int = 2
@@ -220,6 +232,8 @@ class Config(BaseModel):
     personification_health_probe_dir: str = ""
     personification_max_output_chars: int = 0
     personification_max_segment_chars: int = 0
+    # 基础模型流式生成时提前发送已封口的第一段；只在无审阅/改写/语音/媒体的轮次生效。
+    personification_reply_streaming_enabled: bool = False
     personification_skills_path: Optional[str] = None
     personification_skill_sources: Optional[Union[str, List[Any]]] = None
     personification_skill_remote_enabled: bool = False
@@ -475,6 +489,8 @@ class Config(BaseModel):
     personification_compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD
     # 压缩后保留的最近原始消息条数
     personification_compress_keep_recent: int = DEFAULT_COMPRESS_KEEP_RECENT
+    # 上下文 token 预算用的计数器：auto（装了 tiktoken 用真实 BPE，否则近似）/ heuristic / tiktoken
+    personification_context_tokenizer: str = "auto"
     # 私聊送入主模型的最近消息条数上限，越大越容易延续长对话，但也更耗 token
     personification_private_history_turns: int = DEFAULT_PRIVATE_HISTORY_TURNS
     # 消息过期时间（小时），超过此时间的消息不再作为上下文，设为 0 禁用
@@ -591,6 +607,20 @@ class Config(BaseModel):
     personification_webui_log_max_entries: int = 10000
     personification_webui_log_capture_level: str = "INFO"
     personification_turn_trace_enabled: bool = True
+    # OpenMetrics `/personification/metrics` 抓取端点；不走 WebUI 登录，默认关闭
+    personification_metrics_endpoint_enabled: bool = False
+    personification_metrics_endpoint_token: str = ""
+    # 回复轮次 span 树采样率（0~1），采样的轮次保存在内存环形缓冲里供性能页瀑布图/Chrome trace 导出
+    personification_span_trace_sample_rate: float = 0.25
+    # 事件循环阻塞看门狗阈值（毫秒）：循环超过该时长未响应即抓取循环线程栈，0 关闭
+    personification_loop_block_threshold_ms: float = 250.0
+    # 缓存内存台账：后台估算登记缓存近似大小的间隔（秒，0 关闭）与单个缓存的默认预算（MB，0 不告警）
+    personification_memory_footprint_interval_seconds: float = 300.0
+    personification_cache_memory_budget_mb: float = 32.0
+    # 共享 HTTP 客户端：有 h2 时启用 HTTP/2；单 host 同时在途请求上限（0 不限）；空闲长连接保活秒数
+    personification_http2_enabled: bool = True
+    personification_http_per_host_limit: int = 16
+    personification_http_keepalive_expiry: float = 30.0
     # 功能体检"实际交互测试"的目标：测试群号 / 测试私聊用户 QQ（任填其一即可）
     personification_webui_test_group_id: str = ""
     personification_webui_test_user_id: str = ""
@@ -29,7 +29,7 @@ from .proactive_store import (
 )
 from .prompt_loader import load_prompt
 from .plugin_meta import build_plugin_metadata
-from .metrics import format_metrics_snapshot, record_counter, record_timing, snapshot_metrics
+from .metrics import format_metrics_snapshot, record_counter, record_timing, set_gauge, snapshot_metrics
 from .provider_router import (
     call_ai_api,
     get_configured_api_providers,
@@ -147,6 +147,7 @@ __all__ = [
     "record_counter",
     "record_timing",
     "save_managed_env_config",
+    "set_gauge",
     "should_avoid_interrupting",
     "snapshot_metrics",
     "update_private_interaction_time",
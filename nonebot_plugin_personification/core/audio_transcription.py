@@ -10,6 +10,8 @@ from urllib.parse import urlsplit
 
 import httpx
 
+from .http_clients import shared_http_client
+
 
 _DASHSCOPE_SUBMIT_URL = "https://dashscope.aliyuncs.com/api/v1/services/audio/asr/transcription"
 _QWEN_AUDIO_MODEL = "qwen-audio-3.0-asr-flash-filetrans"
@@ -390,7 +392,7 @@ async def transcribe_audio_file(
     try:
         timeout_seconds = float(settings["timeout"])
         timeout = httpx.Timeout(timeout_seconds, connect=min(15.0, timeout_seconds))
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=False, trust_env=False) as client:
+        async with shared_http_client(timeout=timeout, follow_redirects=False, trust_env=False) as client:
             if protocol == "dashscope_async_url":
                 text, segments, confidence, task_id = await _call_dashscope_async(
                     client=client,
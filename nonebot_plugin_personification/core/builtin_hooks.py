@@ -13,6 +13,7 @@ from .group_member_aliases import render_group_alias_context
 from .group_relations import summarize_group_relationships
 from .message_relations import extract_event_message_id, extract_reply_message_id
 from .prompt_hooks import HookContext, register_prompt_hook
+from .runtime_performance import register_cache_reporter
 
 
 _FRIEND_IDS_CACHE: Dict[str, tuple[float, set[str]]] = {}
@@ -672,3 +673,6 @@ def register_all_builtin_hooks() -> None:
     register_prompt_hook("friend_request", _friend_request_hook, priority=50, phase="message")
     register_prompt_hook("pending_topic_extract", _pending_topic_extract_hook, priority=55, phase="message")
     _REGISTERED = True
+
+
+register_cache_reporter("hook_friend_ids", footprint=lambda: _FRIEND_IDS_CACHE)
@@ -6,6 +6,7 @@ from collections.abc import Mapping
 from dataclasses import dataclass, field
 from typing import Any, Literal
 
+from .llm_singleflight import PURPOSE_TURN_SEMANTIC_FRAME, coalesced_chat
 from .reply_style_policy import build_context_continuity_policy_prompt
 from .sticker_semantics import (
     DEFAULT_STICKER_SEMANTIC_HINT,
@@ -218,7 +219,8 @@ def _parse_emotional_support(value: Any, *, legacy_needed: bool = False) -> Emot
     )
 
 
-def _parse_turn_semantic_frame_payload(payload: Any) -> TurnSemanticFrame | None:
+def parse_turn_semantic_frame_payload(payload: Any) -> TurnSemanticFrame | None:
+    """把语义帧 JSON（单独调用或合并预检返回的 semantic_frame 段）解析成 TurnSemanticFrame；不合法时返回 None。"""
     if not isinstance(payload, dict):
         return None
     chat_intent = str(payload.get("chat_intent", "") or "").strip()
@@ -280,6 +282,9 @@ def _parse_turn_semantic_frame_payload(payload: Any) -> TurnSemanticFrame | None
     )
 
 
+_parse_turn_semantic_frame_payload = parse_turn_semantic_frame_payload
+
+
 def _parse_scenario(value: Any) -> ConversationScenario:
     normalized = str(value or "normal").strip().lower()
     return normalized if normalized in _VALID_SCENARIOS else "normal"  # type: ignore[return-value]
@@ -319,29 +324,25 @@ def _extract_json_payload(raw: str) -> dict[str, Any] | None:
     return parsed if isinstance(parsed, dict) else None
 
 
-async def infer_turn_semantic_frame_with_llm(
+def build_turn_semantic_frame_messages(
     text: str,
     *,
     is_group: bool = False,
     is_random_chat: bool = False,
     is_direct_mention: bool = False,
     message_target: str = "",
-    tool_caller: Any = None,
     recent_context: str = "",
     relationship_hint: str = "",
     repeat_clusters: list[dict[str, Any]] | None = None,
     current_inner_state: str = "",
     current_emotion_state: str = "",
     media_grounding: str = "",
-) -> TurnSemanticFrame:
+) -> list[dict[str, Any]]:
     fallback = _metadata_fallback_turn_semantic_frame(
         is_group=is_group,
         is_random_chat=is_random_chat,
     )
     normalized = normalize_intent_text(text)
-    if not normalized or tool_caller is None:
-        return fallback
-
     repeat_lines: list[str] = []
     for cluster in list(repeat_clusters or [])[:3]:
         plain = str(cluster.get("text", "") or "").strip()
@@ -470,38 +471,94 @@ async def infer_turn_semantic_frame_with_llm(
         f"ambiguity={fallback.ambiguity_level}, silence={fallback.recommend_silence}, "
         f"user_attitude={fallback.user_attitude}, bot_emotion={fallback.bot_emotion}"
     )
+    return [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": user_content},
+    ]
+
+
+def finalize_turn_semantic_frame(
+    frame: TurnSemanticFrame,
+    *,
+    is_group: bool = False,
+    is_random_chat: bool = False,
+    is_direct_mention: bool = False,
+    message_target: str = "",
+) -> TurnSemanticFrame:
+    """低置信度群聊帧按消息指向收敛静默建议；单独判别和合并预判共用。"""
+    normalized_target = str(message_target or "").strip().lower()
+    directed = is_direct_mention or normalized_target in {"target_bot", "bot", "broadcast"}
+    undirected_random_target = normalized_target in {
+        "",
+        "target_unclear",
+        "target_others",
+        "target_external_plugin",
+        "uncertain",
+        "others",
+        "someone_else",
+        "external_plugin",
+    }
+    if is_group and frame.confidence < 0.4:
+        frame.ambiguity_level = "high"
+        if is_random_chat and not directed and undirected_random_target:
+            frame.recommend_silence = True
+        elif directed:
+            frame.recommend_silence = False
+    return frame
+
+
+async def infer_turn_semantic_frame_with_llm(
+    text: str,
+    *,
+    is_group: bool = False,
+    is_random_chat: bool = False,
+    is_direct_mention: bool = False,
+    message_target: str = "",
+    tool_caller: Any = None,
+    recent_context: str = "",
+    relationship_hint: str = "",
+    repeat_clusters: list[dict[str, Any]] | None = None,
+    current_inner_state: str = "",
+    current_emotion_state: str = "",
+    media_grounding: str = "",
+) -> TurnSemanticFrame:
+    fallback = _metadata_fallback_turn_semantic_frame(
+        is_group=is_group,
+        is_random_chat=is_random_chat,
+    )
+    if not normalize_intent_text(text) or tool_caller is None:
+        return fallback
     try:
-        response = await tool_caller.chat_with_tools(
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": user_content},
-            ],
-            tools=[],
-            use_builtin_search=False,
+        messages = build_turn_semantic_frame_messages(
+            text,
+            is_group=is_group,
+            is_random_chat=is_random_chat,
+            is_direct_mention=is_direct_mention,
+            message_target=message_target,
+            recent_context=recent_context,
+            relationship_hint=relationship_hint,
+            repeat_clusters=repeat_clusters,
+            current_inner_state=current_inner_state,
+            current_emotion_state=current_emotion_state,
+            media_grounding=media_grounding,
+        )
+        response = await coalesced_chat(
+            tool_caller,
+            messages,
+            lambda: tool_caller.chat_with_tools(messages=messages, tools=[], use_builtin_search=False),
+            purpose=PURPOSE_TURN_SEMANTIC_FRAME,
         )
         payload = _extract_json_payload(str(getattr(response, "content", "") or ""))
-        frame = _parse_turn_semantic_frame_payload(payload) if payload is not None else None
+        frame = parse_turn_semantic_frame_payload(payload) if payload is not None else None
         if frame is None:
             return fallback
-        normalized_target = str(message_target or "").strip().lower()
-        directed = is_direct_mention or normalized_target in {"target_bot", "bot", "broadcast"}
-        undirected_random_target = normalized_target in {
-            "",
-            "target_unclear",
-            "target_others",
-            "target_external_plugin",
-            "uncertain",
-            "others",
-            "someone_else",
-            "external_plugin",
-        }
-        if is_group and frame.confidence < 0.4:
-            frame.ambiguity_level = "high"
-            if is_random_chat and not directed and undirected_random_target:
-                frame.recommend_silence = True
-            elif directed:
-                frame.recommend_silence = False
-        return frame
+        return finalize_turn_semantic_frame(
+            frame,
+            is_group=is_group,
+            is_random_chat=is_random_chat,
+            is_direct_mention=is_direct_mention,
+            message_target=message_target,
+        )
     except Exception:
         return fallback
 
@@ -539,9 +596,12 @@ __all__ = [
     "IntentDecision",
     "PluginQuestionIntent",
     "TurnSemanticFrame",
+    "build_turn_semantic_frame_messages",
+    "finalize_turn_semantic_frame",
     "infer_intent_decision_with_llm",
     "infer_turn_semantic_frame_with_llm",
     "looks_like_explanatory_output",
     "metadata_fallback_turn_semantic_frame_for_session",
     "normalize_intent_text",
+    "parse_turn_semantic_frame_payload",
 ]
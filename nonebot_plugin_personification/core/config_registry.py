@@ -262,7 +262,7 @@ _GROUP_RULES: tuple[tuple[Callable[[str], bool], str], ...] = (
         "原生 MCP",
     ),
     (lambda k: k.startswith("response_review_"), "回复审阅"),
-    (lambda k: k.startswith("turn_planner_") or k == "evidence_synthesizer_enabled", "意图规划"),
+    (lambda k: k.startswith(("turn_planner_", "turn_preflight_")) or k == "evidence_synthesizer_enabled", "意图规划"),
     (
         lambda k: k.startswith("parallel_research_")
         or k.startswith("web_search_")
@@ -696,6 +696,18 @@ def _build_entries() -> list[ConfigEntry]:
             help_aliases=("turn_planner_shadow", "TurnPlan影子", "规划器观测"),
             parser=_bool_parser,
         ),
+        ConfigEntry(
+            key="turn_preflight_enabled",
+            field_name="personification_turn_preflight_enabled",
+            display_name="合并回合预判",
+            value_type="bool",
+            default=False,
+            scope=GLOBAL_SCOPE,
+            description="影子观测时把语义帧和 TurnPlan 合并成一次结构化 LLM 调用；某部分解析失败时退回单独调用。",
+            category="config",
+            help_aliases=("turn_preflight", "回合预判", "合并预判"),
+            parser=_bool_parser,
+        ),
         ConfigEntry(
             key="semantic_frame_timeout",
             field_name="personification_semantic_frame_timeout",
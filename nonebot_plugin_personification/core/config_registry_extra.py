@@ -57,6 +57,10 @@ EXTRA_CONFIG_SPECS: tuple[dict[str, Any], ...] = (
        "单条回复的最大字符数，超出截断；0 = 不限制。", group="核心开关", min=0),
     _s("personification_max_segment_chars", "int", 0, "分段字数上限",
        "回复分段发送时单段最大字符数；0 = 不限制。", group="核心开关", min=0),
+    _s("personification_reply_streaming_enabled", "bool", False, "流式首段提前发送",
+       "基础模型改走 SSE 流式生成，第一段（空行分隔）一封口就先发出，后文生成完再接着发；"
+       "开启回复审阅、TTS、图片/媒体轮次、接梗与随机插话时自动不生效。",
+       group="核心开关", advanced=True),
     _s("personification_data_dir", "str", "", "数据目录",
        "插件数据根目录；留空使用 localstore 默认路径。修改后需重启。",
        group="核心开关", hot=False, advanced=True),
@@ -131,6 +135,16 @@ EXTRA_CONFIG_SPECS: tuple[dict[str, Any], ...] = (
     _s("personification_include_thoughts", "bool", True, "返回思考过程",
        "请求 thinking 模型时是否要求返回思考摘要（仅影响日志观测，不影响回复内容）。",
        group="模型路由", advanced=True),
+    _s("personification_hedge_purposes", "str", "", "对冲请求用途",
+       "逗号分隔的 LLM 调用用途（如 reply）；主 provider 超过其近期 p90 延迟仍没有结果（流式时为首个字）时，"
+       "提前拉起下一个候选，先返回者胜出、另一路取消。留空 = 不对冲；* = 所有用途。",
+       group="模型路由", advanced=True, example="reply"),
+    _s("personification_hedge_budget_ratio", "float", 0.1, "对冲预算比例",
+       "对冲产生的额外请求占可对冲请求数的上限比例，用来封顶额外花费。", group="模型路由", advanced=True, min=0, max=1),
+    _s("personification_provider_concurrency_max", "int", 8, "单 Provider 并发上限",
+       "每个 provider 同时在途请求的上限；实际上限从一半起步，满载成功时逐步加 1，遇到 429 或超时减半，"
+       "超出的请求排队（用户回复优先于主动消息，主动消息优先于摘要/日记/知识构建）。0 = 不限流。",
+       group="模型路由", advanced=True, min=0, max=256),
 
     # ──────────── 遗留单模型配置（已被 API Provider 池取代） ────────────
     _s("personification_api_type", "str", "openai", "[遗留] 主模型 API 类型",
@@ -189,6 +203,12 @@ EXTRA_CONFIG_SPECS: tuple[dict[str, Any], ...] = (
     _s("personification_persona_responder_json_enabled", "bool", False, "画像 JSON 应答",
        "画像响应器是否使用 JSON 结构化输出（实验特性）。", group="画像", advanced=True),
 
+    # ──────────── 上下文压缩（补充） ────────────
+    _s("personification_context_tokenizer", "str", "auto", "上下文 token 计数器",
+       "压缩上下文时估算 token 用的计数器。auto：环境里装了 tiktoken 且本地已缓存词表时用真实 BPE，否则用按字 / 词 / 数字分段的近似计数，不会联网下载；"
+       "heuristic：始终用近似计数；tiktoken：强制真实 BPE，允许首次下载词表，启动时限时加载，超时或失败时退回近似计数。",
+       group="上下文压缩", advanced=True, choices=("auto", "heuristic", "tiktoken"), hot=False),
+
     # ──────────── 视觉理解 ────────────
     _s("personification_image_input_mode", "str", "auto", "图片输入模式",
        "auto=支持视觉时直传否则转摘要；direct=强制直传；summary=强制视觉摘要；disabled=忽略图片。",
@@ -722,6 +742,35 @@ EXTRA_CONFIG_SPECS: tuple[dict[str, Any], ...] = (
        choices=("DEBUG", "INFO", "WARNING", "ERROR"), advanced=True),
     _s("personification_turn_trace_enabled", "bool", True, "回合追踪",
        "记录拟人回复链路关键阶段，供功能体检和插件日志排查使用。", group="运维"),
+    _s("personification_metrics_endpoint_enabled", "bool", False, "OpenMetrics 抓取端点",
+       "开启后 /personification/metrics 以 OpenMetrics 文本导出计数器、gauge 与耗时直方图，供 Prometheus 抓取。",
+       group="运维", advanced=True,
+       risk="该端点不走 WebUI 登录；未设置抓取令牌时任何能访问 WebUI 端口的人都能读取运行指标。"),
+    _s("personification_metrics_endpoint_token", "str", "", "OpenMetrics 抓取令牌",
+       "非空时抓取请求须带 `Authorization: Bearer <令牌>`；留空表示不鉴权。", group="运维", advanced=True),
+    _s("personification_span_trace_sample_rate", "float", 0.25, "回复 span 采样率",
+       "按比例采样回复轮次，记录记忆召回、LLM 调用、工具执行、OneBot 发送等嵌套耗时；"
+       "最近 64 个采样轮次可在性能页查看瀑布图并导出 Chrome trace。0 表示关闭。",
+       group="运维", advanced=True, min=0, max=1),
+    _s("personification_loop_block_threshold_ms", "float", 250.0, "事件循环阻塞阈值（毫秒）",
+       "事件循环超过该时长没有响应时，看门狗线程抓取循环线程当前的 Python 栈，按相同栈聚合次数与累计阻塞时长，"
+       "在性能页列出最严重的阻塞点。0 表示关闭；改动在下次检查周期生效。",
+       group="运维", advanced=True, min=0),
+    _s("personification_memory_footprint_interval_seconds", "float", 300.0, "缓存内存估算间隔（秒）",
+       "后台按该间隔抽样估算各登记缓存的条目数与近似内存占用，结果显示在性能页；0 表示关闭后台估算，仍可在性能页手动刷新。",
+       group="运维", advanced=True, min=0),
+    _s("personification_cache_memory_budget_mb", "float", 32.0, "单个缓存内存预算（MB）",
+       "登记缓存的估算占用超过该值时记录一次告警（日志 + 性能页），回落后解除；个别缓存自带预算时以自带预算为准。0 表示不告警。",
+       group="运维", advanced=True, min=0),
+    _s("personification_http2_enabled", "bool", True, "共享 HTTP 客户端启用 HTTP/2",
+       "模型调用、联网搜索、QQ 空间等外呼共用进程级长连接客户端；环境里装了 h2 时与支持的服务端协商 HTTP/2，"
+       "没装时自动退回 HTTP/1.1。", group="运维", advanced=True, hot=False),
+    _s("personification_http_per_host_limit", "int", 16, "单 host 并发请求上限",
+       "共享 HTTP 客户端对同一 host 同时在途的请求数上限，超出的请求排队等待；排队次数与连接复用率显示在性能页缓存表。0 = 不限。",
+       group="运维", advanced=True, min=0, max=256, hot=False),
+    _s("personification_http_keepalive_expiry", "float", 30.0, "HTTP 长连接保活（秒）",
+       "共享 HTTP 客户端空闲连接保留多久再关闭；调大能让低频外呼也复用 TLS 连接。", group="运维", advanced=True, min=0, max=600,
+       hot=False),
     _s("personification_webui_test_group_id", "str", "", "体检测试群",
        "功能体检「实际交互测试」会向该群真实发一条消息，触发完整回复链路。", group="运维"),
     _s("personification_webui_test_user_id", "str", "", "体检测试私聊用户",
@@ -740,4 +789,17 @@ EXTRA_CONFIG_SPECS: tuple[dict[str, Any], ...] = (
        group="运维", advanced=True),
     _s("personification_git_mirror_prefix", "str", "", "Git 单镜像（兼容）",
        "单个镜像前缀（向后兼容）；非空时自动并入镜像列表末尾。", group="运维", advanced=True),
+    _s("personification_token_ledger_flush_seconds", "float", 5.0, "Token 账本落库周期（秒）",
+       "LLM 调用用量先在内存聚合，按该周期批量写入账本；关闭插件时会再刷一次。", group="运维",
+       advanced=True, min=0.5),
+    _s("personification_token_ledger_max_unflushed_calls", "int", 200, "Token 账本未落库上限",
+       "内存中未落库的调用数达到该值立即写入，即进程崩溃最多丢失的调用数；0 表示每次调用同步写。",
+       group="运维", advanced=True, min=0),
+    _s("personification_token_ledger_raw_retention_days", "int", 180, "Token 原始账本保留天数",
+       "按群/用户拆分的日账本保留天数，每日压缩时删除更早的行；0 表示永久保留。"
+       "总量、provider/模型/用途统计读汇总表，不受此影响。",
+       group="运维", advanced=True, min=0),
+    _s("personification_token_ledger_hourly_retention_days", "int", 7, "Token 小时账本保留天数",
+       "按群/用户拆分的小时账本保留天数，只用于 24h 窗口的按群明细。",
+       group="运维", advanced=True, min=2),
 )
@@ -1,6 +1,8 @@
 import re
 from typing import Any, Awaitable, Callable, Dict, Iterable, List, Set
 
+from .token_counter import count_chunks_tokens, count_tokens, truncate_to_token_budget
+
 _HISTORY_MARKER_PATTERNS = (
     r"\[发送了一张图片:[^\]]*\]",
     r"\[发送了一张图片\]",
@@ -229,30 +231,15 @@ def ensure_prompt_injection_guard(text: Any) -> str:
 
 
 def _estimate_chunk_tokens(text: str) -> int:
-    raw = str(text or "")
-    if not raw:
-        return 0
-    cjk_chars = sum(1 for ch in raw if "\u4e00" <= ch <= "\u9fff")
-    other_chars = max(0, len(raw) - cjk_chars)
-    return int(cjk_chars * 1.5 + other_chars / 4) + 1
+    return count_tokens(text)
 
 
 def _estimate_chunks_tokens(chunks: Iterable[str]) -> int:
-    return sum(_estimate_chunk_tokens(chunk) for chunk in chunks)
+    return count_chunks_tokens(chunks)
 
 
 def _truncate_text_to_token_budget(text: str, max_tokens: int) -> str:
-    if max_tokens <= 0:
-        return ""
-    chars: List[str] = []
-    used_tokens = 0
-    for ch in str(text or ""):
-        next_tokens = _estimate_chunk_tokens(ch)
-        if used_tokens + next_tokens > max_tokens:
-            break
-        chars.append(ch)
-        used_tokens += next_tokens
-    return "".join(chars).strip()
+    return truncate_to_token_budget(text, max_tokens)
 
 
 async def compress_context_if_needed(
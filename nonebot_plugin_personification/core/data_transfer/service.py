@@ -24,6 +24,8 @@ from ..avatar_relation_evidence import (
     AVATAR_RELATION_EVIDENCE_TAGS,
 )
 from ..db import connect_sync, get_db_path
+from ..group_message_buffer import group_message_buffer
+from ..group_relation_edges import flush_pending_relation_edges
 from ..paths import get_data_transfer_dir
 from .constants import (
     DATASETS, DEFAULT_DATASETS, EXCLUDED_CATEGORIES, FORMAT, GROUP_CONFIG_FIELDS,
@@ -533,6 +535,9 @@ class DataTransferService:
         try:
             values: dict[str, Any] = {}
             with self._conn() as conn:
+                if "group_relation_edges" in selected:
+                    flush_pending_relation_edges(conn, group_id=group_id)
+                    conn.commit()
                 for name in selected:
                     if name == "group_state":
                         value = self._group_state(conn, group_id)
@@ -1035,6 +1040,7 @@ class DataTransferService:
                 self._check_memory_conflicts(target_group_id, values.get("group_memories", []))
                 with self._conn() as conn:
                     conn.execute("BEGIN IMMEDIATE")
+                    flush_pending_relation_edges(conn, group_id=target_group_id)
                     self._check_row_conflicts(conn, target_group_id, values)
                     detail = self._write_scope_snapshot(conn, backup, target_group_id, values, mode)
                     conn.execute(
@@ -1051,6 +1057,7 @@ class DataTransferService:
                         else:
                             self._apply_rows(conn, name, target_group_id, data, mode)
                     conn.commit()
+                group_message_buffer.invalidate(target_group_id)
                 self._journal(journal_id, "applying_memory", detail)
                 self._apply_memory_scope(target_group_id, values, mode)
             self._journal(journal_id, "applied", detail)
@@ -1587,6 +1594,7 @@ class DataTransferService:
                     root.pop(group_id, None)
                 conn.execute("INSERT INTO kv_store(namespace,key,value,updated_at) VALUES(?,'__root__',?,?) ON CONFLICT(namespace,key) DO UPDATE SET value=excluded.value,updated_at=excluded.updated_at", (namespace, json.dumps(root, ensure_ascii=False), time.time()))
             conn.commit()
+        group_message_buffer.invalidate(group_id)
         self._restore_memory_snapshot(group_id, snapshot)
         self._journal(journal_id, "rolled_back", {"scope_only": True})
         return {"success": True, "journal_id": journal_id, "idempotent": False}
@@ -77,6 +77,24 @@ DDL_STATEMENTS = (
         ON group_messages(group_id, thread_id, timestamp)
     """,
     """
+    CREATE INDEX IF NOT EXISTS idx_group_messages_message_id
+        ON group_messages(group_id, message_id, timestamp)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS group_chat_meta (
+        group_id                        TEXT PRIMARY KEY,
+        style                           TEXT NOT NULL DEFAULT '',
+        topic_summary                   TEXT NOT NULL DEFAULT '',
+        topic_summary_at                REAL NOT NULL DEFAULT 0,
+        message_total_count             INTEGER NOT NULL DEFAULT 0,
+        last_message_at                 REAL NOT NULL DEFAULT 0,
+        last_auto_analyze_at            REAL NOT NULL DEFAULT 0,
+        last_auto_analyze_message_count INTEGER NOT NULL DEFAULT 0,
+        extra                           TEXT NOT NULL DEFAULT '{}',
+        updated_at                      REAL NOT NULL DEFAULT 0
+    )
+    """,
+    """
     CREATE TABLE IF NOT EXISTS conversation_threads (
         thread_id      TEXT PRIMARY KEY,
         group_id       TEXT NOT NULL,
@@ -289,6 +307,57 @@ DDL_STATEMENTS = (
         ON token_usage_hourly_ledger(group_id, bucket_hour)
     """,
     """
+    CREATE TABLE IF NOT EXISTS llm_usage_rollup_hourly (
+        bucket_hour TEXT NOT NULL,
+        bucket_day TEXT NOT NULL,
+        provider TEXT NOT NULL DEFAULT '',
+        model TEXT NOT NULL DEFAULT '',
+        purpose TEXT NOT NULL DEFAULT '',
+        prompt_tokens INTEGER NOT NULL DEFAULT 0,
+        completion_tokens INTEGER NOT NULL DEFAULT 0,
+        total_tokens INTEGER NOT NULL DEFAULT 0,
+        call_count INTEGER NOT NULL DEFAULT 0,
+        request_count INTEGER NOT NULL DEFAULT 0,
+        error_count INTEGER NOT NULL DEFAULT 0,
+        latency_sum_ms REAL NOT NULL DEFAULT 0,
+        latency_le_1s INTEGER NOT NULL DEFAULT 0,
+        latency_le_3s INTEGER NOT NULL DEFAULT 0,
+        latency_le_10s INTEGER NOT NULL DEFAULT 0,
+        latency_le_30s INTEGER NOT NULL DEFAULT 0,
+        latency_gt_30s INTEGER NOT NULL DEFAULT 0,
+        cached_prompt_tokens INTEGER NOT NULL DEFAULT 0,
+        hedge_count INTEGER NOT NULL DEFAULT 0,
+        hedge_wins INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (bucket_hour, provider, model, purpose)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS llm_usage_rollup_daily (
+        bucket_day TEXT NOT NULL,
+        provider TEXT NOT NULL DEFAULT '',
+        model TEXT NOT NULL DEFAULT '',
+        purpose TEXT NOT NULL DEFAULT '',
+        prompt_tokens INTEGER NOT NULL DEFAULT 0,
+        completion_tokens INTEGER NOT NULL DEFAULT 0,
+        total_tokens INTEGER NOT NULL DEFAULT 0,
+        call_count INTEGER NOT NULL DEFAULT 0,
+        request_count INTEGER NOT NULL DEFAULT 0,
+        error_count INTEGER NOT NULL DEFAULT 0,
+        latency_sum_ms REAL NOT NULL DEFAULT 0,
+        latency_le_1s INTEGER NOT NULL DEFAULT 0,
+        latency_le_3s INTEGER NOT NULL DEFAULT 0,
+        latency_le_10s INTEGER NOT NULL DEFAULT 0,
+        latency_le_30s INTEGER NOT NULL DEFAULT 0,
+        latency_gt_30s INTEGER NOT NULL DEFAULT 0,
+        cached_prompt_tokens INTEGER NOT NULL DEFAULT 0,
+        hedge_count INTEGER NOT NULL DEFAULT 0,
+        hedge_wins INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (bucket_day, provider, model, purpose)
+    )
+    """,
+    """
     CREATE TABLE IF NOT EXISTS group_style_snapshots (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         group_id TEXT NOT NULL,
@@ -411,6 +480,28 @@ DDL_STATEMENTS = (
         ON reply_turn_traces(session_type, group_id, user_id, ts DESC)
     """,
     """
+    CREATE TABLE IF NOT EXISTS reply_turn_stages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        trace_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        ts REAL NOT NULL,
+        key TEXT NOT NULL DEFAULT '',
+        label TEXT NOT NULL DEFAULT '',
+        status TEXT NOT NULL DEFAULT 'info',
+        detail TEXT NOT NULL DEFAULT '',
+        hint TEXT NOT NULL DEFAULT '',
+        elapsed_ms INTEGER DEFAULT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_reply_turn_stages_trace
+        ON reply_turn_stages(trace_id, seq)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_reply_turn_stages_ts
+        ON reply_turn_stages(ts)
+    """,
+    """
     CREATE TABLE IF NOT EXISTS proactive_diagnostics (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         ts REAL NOT NULL,
@@ -1043,6 +1134,28 @@ def _migrate_legacy_meme_senses(conn: sqlite3.Connection) -> None:
         )
 
 
+def _migrate_chat_history_meta(conn: sqlite3.Connection) -> None:
+    from .group_chat_meta import migrate_chat_meta_from_kv
+
+    migrate_chat_meta_from_kv(conn)
+
+
+def _migrate_token_usage_rollups(conn: sqlite3.Connection) -> None:
+    from .token_ledger import backfill_usage_rollups
+
+    backfill_usage_rollups(conn)
+
+
+def _ensure_usage_rollup_schema(conn: sqlite3.Connection) -> None:
+    for table in ("llm_usage_rollup_hourly", "llm_usage_rollup_daily"):
+        columns = _table_columns(conn, table)
+        if not columns:
+            continue
+        for column in ("cached_prompt_tokens", "hedge_count", "hedge_wins"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+
 def _ensure_meme_dictionary_schema(conn: sqlite3.Connection) -> None:
     columns = _table_columns(conn, "meme_dictionary")
     if columns and "managed_by" not in columns:
@@ -1060,11 +1173,14 @@ def init_db_sync(data_dir: str | Path) -> Path:
         _ensure_qzone_publish_schema(conn)
         _ensure_mcp_tool_policy_schema(conn)
         _ensure_meme_dictionary_schema(conn)
+        _ensure_usage_rollup_schema(conn)
         conn.commit()  # 让迁移立即可见，下面的 DDL CREATE INDEX 才能引用新列
         for ddl in DDL_STATEMENTS:
             conn.execute(ddl)
         _migrate_qzone_monthly_usage(conn)
         _migrate_legacy_meme_senses(conn)
+        _migrate_chat_history_meta(conn)
+        _migrate_token_usage_rollups(conn)
         conn.commit()
     return _db_path
 
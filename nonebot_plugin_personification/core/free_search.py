@@ -20,6 +20,8 @@ from urllib.parse import quote, urlparse
 
 import httpx
 
+from .http_clients import shared_http_client
+
 
 DEFAULT_SEARXNG_INSTANCES: tuple[str, ...] = (
     "https://searx.be",
@@ -119,7 +121,7 @@ async def _wikipedia_search_one(
         "formatversion": "2",
     }
     try:
-        async with httpx.AsyncClient(
+        async with shared_http_client(
             **_client_kwargs(timeout=8.0, proxy=proxy, headers=headers, follow_redirects=True)
         ) as client:
             resp = await client.get(base, params=search_params)
@@ -205,7 +207,7 @@ async def _probe_searxng_instance(
 ) -> bool:
     target = instance.rstrip("/") + "/"
     try:
-        async with httpx.AsyncClient(
+        async with shared_http_client(
             **_client_kwargs(timeout=timeout, proxy=proxy, follow_redirects=True)
         ) as client:
             resp = await client.head(target, headers={"User-Agent": _BROWSER_UA})
@@ -254,7 +256,7 @@ async def searxng_search(
         "categories": "general",
     }
     try:
-        async with httpx.AsyncClient(
+        async with shared_http_client(
             **_client_kwargs(timeout=10.0, proxy=proxy, follow_redirects=True)
         ) as client:
             resp = await client.get(
@@ -315,7 +317,7 @@ async def duckduckgo_search(
         return []
     instant: List[SearchResult] = []
     try:
-        async with httpx.AsyncClient(
+        async with shared_http_client(
             **_client_kwargs(timeout=10.0, proxy=proxy, follow_redirects=True)
         ) as client:
             # Instant Answer API
@@ -10,6 +10,7 @@ from dataclasses import dataclass, replace
 from typing import Any
 
 from .media_understanding import analyze_images_with_route_or_fallback
+from .runtime_performance import register_cache_reporter
 from .visual_capabilities import VISUAL_ROUTE_REPLY_PLAIN
 
 
@@ -404,6 +405,9 @@ def _log_warning(runtime: Any, message: str) -> None:
         pass
 
 
+register_cache_reporter("gif_summary_cache", footprint=lambda: _GIF_SUMMARY_CACHE)
+
+
 __all__ = [
     "GifSummaryResult",
     "get_gif_max_bytes",
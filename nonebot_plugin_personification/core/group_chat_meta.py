@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from typing import Any
+
+from .db import connect_sync
+
+
+# 已知字段走独立列，按列更新；其余历史键原样放进 extra，保证 load/save 往返不丢数据
+GROUP_CHAT_META_FIELDS: dict[str, type] = {
+    "style": str,
+    "topic_summary": str,
+    "topic_summary_at": float,
+    "message_total_count": int,
+    "last_message_at": float,
+    "last_auto_analyze_at": float,
+    "last_auto_analyze_message_count": int,
+}
+_LEGACY_NAMESPACE = "chat_history"
+_LEGACY_KEY = "__root__"
+
+
+def _coerce(field: str, value: Any) -> Any:
+    kind = GROUP_CHAT_META_FIELDS[field]
+    try:
+        return kind(value or 0) if kind is not str else str(value or "")
+    except (TypeError, ValueError):
+        return kind()
+
+
+def _row_to_meta(row: Any) -> dict[str, Any]:
+    try:
+        extra = json.loads(row["extra"] or "{}")
+    except Exception:
+        extra = {}
+    meta: dict[str, Any] = dict(extra) if isinstance(extra, dict) else {}
+    for field in GROUP_CHAT_META_FIELDS:
+        meta[field] = _coerce(field, row[field])
+    return meta
+
+
+def _split_meta(group_data: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+    columns = {field: _coerce(field, group_data.get(field)) for field in GROUP_CHAT_META_FIELDS}
+    extra = {
+        str(key): value
+        for key, value in group_data.items()
+        if key not in GROUP_CHAT_META_FIELDS and key != "messages"
+    }
+    return columns, extra
+
+
+def _insert_rows(conn: sqlite3.Connection, metadata: dict[str, Any], *, replace: bool) -> int:
+    now_ts = time.time()
+    names = list(GROUP_CHAT_META_FIELDS)
+    verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+    written = 0
+    for group_id, group_data in (metadata or {}).items():
+        if not str(group_id or "").strip() or not isinstance(group_data, dict):
+            continue
+        columns, extra = _split_meta(group_data)
+        conn.execute(
+            f"""
+            {verb} INTO group_chat_meta(group_id, {", ".join(names)}, extra, updated_at)
+            VALUES (?, {", ".join("?" for _ in names)}, ?, ?)
+            """,
+            (
+                str(group_id),
+                *(columns[name] for name in names),
+                json.dumps(extra, ensure_ascii=False),
+                now_ts,
+            ),
+        )
+        written += 1
+    return written
+
+
+def import_legacy_chat_meta(conn: sqlite3.Connection, metadata: dict[str, Any]) -> int:
+    """把旧版整块 JSON 元数据按群写入 group_chat_meta；已存在的群不覆盖。"""
+    return _insert_rows(conn, metadata, replace=False)
+
+
+def migrate_chat_meta_from_kv(conn: sqlite3.Connection) -> int:
+    """一次性把 kv_store 里的 chat_history 文档拆成行，成功后删除旧文档。"""
+    row = conn.execute(
+        "SELECT value FROM kv_store WHERE namespace=? AND key=?",
+        (_LEGACY_NAMESPACE, _LEGACY_KEY),
+    ).fetchone()
+    if row is None:
+        return 0
+    try:
+        metadata = json.loads(row["value"] or "{}")
+    except Exception:
+        metadata = {}
+    migrated = import_legacy_chat_meta(conn, metadata) if isinstance(metadata, dict) else 0
+    conn.execute(
+        "DELETE FROM kv_store WHERE namespace=? AND key=?",
+        (_LEGACY_NAMESPACE, _LEGACY_KEY),
+    )
+    return migrated
+
+
+def update_group_chat_meta(
+    group_id: str,
+    *,
+    conn: sqlite3.Connection | None = None,
+    **fields: Any,
+) -> None:
+    """按列 upsert 单个群的元数据；传入 conn 时复用调用方事务，不自行提交。"""
+    unknown = set(fields) - set(GROUP_CHAT_META_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown group chat meta fields: {sorted(unknown)}")
+    normalized = str(group_id or "")
+    if not normalized or not fields:
+        return
+    names = list(fields)
+    values = [_coerce(name, fields[name]) for name in names]
+    sql = f"""
+        INSERT INTO group_chat_meta(group_id, {", ".join(names)}, updated_at)
+        VALUES (?, {", ".join("?" for _ in names)}, ?)
+        ON CONFLICT(group_id) DO UPDATE SET
+            {", ".join(f"{name}=excluded.{name}" for name in names)},
+            updated_at=excluded.updated_at
+    """
+    params = (normalized, *values, time.time())
+    if conn is not None:
+        conn.execute(sql, params)
+        return
+    with connect_sync() as own_conn:
+        own_conn.execute(sql, params)
+        own_conn.commit()
+
+
+def claim_style_analysis(
+    group_id: str,
+    *,
+    total_message_count: int,
+    now_ts: float,
+    min_new_messages: int,
+    cooldown_seconds: float,
+) -> bool:
+    """判断并占用一次自动群风格分析；比较并更新在同一条 UPDATE 里完成。"""
+    normalized = str(group_id or "")
+    if not normalized:
+        return False
+    total = int(total_message_count)
+    with connect_sync() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO group_chat_meta(group_id, updated_at) VALUES (?, ?)",
+            (normalized, now_ts),
+        )
+        cursor = conn.execute(
+            """
+            UPDATE group_chat_meta
+            SET last_auto_analyze_at=?, last_auto_analyze_message_count=?, updated_at=?
+            WHERE group_id=?
+              AND (
+                last_auto_analyze_at <= 0
+                OR last_auto_analyze_message_count <= 0
+                OR (? - last_auto_analyze_message_count >= ? AND ? - last_auto_analyze_at >= ?)
+              )
+            """,
+            (now_ts, total, now_ts, normalized, total, int(min_new_messages), now_ts, float(cooldown_seconds)),
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+
+
+def load_group_chat_meta(group_id: str) -> dict[str, Any] | None:
+    with connect_sync() as conn:
+        row = conn.execute(
+            "SELECT * FROM group_chat_meta WHERE group_id=?",
+            (str(group_id or ""),),
+        ).fetchone()
+    return _row_to_meta(row) if row is not None else None
+
+
+def load_all_group_chat_meta(conn: sqlite3.Connection | None = None) -> dict[str, dict[str, Any]]:
+    """读取全部群的元数据；传入 conn 时复用调用方连接（需 sqlite3.Row 行工厂）。"""
+    sql = "SELECT * FROM group_chat_meta ORDER BY group_id"
+    if conn is not None:
+        rows = conn.execute(sql).fetchall()
+    else:
+        with connect_sync() as own_conn:
+            rows = own_conn.execute(sql).fetchall()
+    return {str(row["group_id"]): _row_to_meta(row) for row in rows}
+
+
+def replace_all_group_chat_meta(metadata: dict[str, Any]) -> None:
+    with connect_sync() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM group_chat_meta")
+        _insert_rows(conn, metadata, replace=True)
+        conn.commit()
+
+
+def clear_group_chat_meta() -> None:
+    with connect_sync() as conn:
+        conn.execute("DELETE FROM group_chat_meta")
+        conn.commit()
+
+
+__all__ = [
+    "GROUP_CHAT_META_FIELDS",
+    "claim_style_analysis",
+    "clear_group_chat_meta",
+    "import_legacy_chat_meta",
+    "load_all_group_chat_meta",
+    "load_group_chat_meta",
+    "migrate_chat_meta_from_kv",
+    "replace_all_group_chat_meta",
+    "update_group_chat_meta",
+]
@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from . import metrics
+from .db import connect_sync, get_db_path
+from .runtime_performance import register_cache_reporter
+
+
+GROUP_MESSAGE_COLUMNS = (
+    "id",
+    "group_id",
+    "user_id",
+    "nickname",
+    "content",
+    "image_count",
+    "visual_summary",
+    "is_bot",
+    "reply_to_msg_id",
+    "reply_to_user_id",
+    "mentioned_ids",
+    "is_at_bot",
+    "message_id",
+    "thread_id",
+    "source_kind",
+    "sender_role",
+    "timestamp",
+)
+_DEFAULT_PER_GROUP_LIMIT = 256
+_DEFAULT_MAX_GROUPS = 64
+_DEFAULT_MAX_TOTAL_CHARS = 4_000_000
+_DEFAULT_MESSAGE_ID_LIMIT = 4096
+
+
+def _row_sort_key(row: dict[str, Any]) -> tuple[float, int]:
+    return float(row.get("timestamp") or 0), int(row.get("id") or 0)
+
+
+def _row_chars(row: dict[str, Any]) -> int:
+    return len(str(row.get("content") or "")) + len(str(row.get("visual_summary") or "")) + 64
+
+
+class GroupMessageIdCache:
+    """Bounded ``(group_id, message_id)`` → row LRU for reply/quote lookups.
+
+    Holds the newest row per key, the same one the indexed SQL lookup would
+    pick. Entries come from inserts and from SQL fills; a fill carries the
+    write sequence observed before the query and is dropped if the group was
+    written or invalidated meanwhile.
+    """
+
+    def __init__(self, *, limit: int = _DEFAULT_MESSAGE_ID_LIMIT) -> None:
+        self.limit = max(1, int(limit))
+        self._rows: OrderedDict[tuple[str, str], dict[str, Any]] = OrderedDict()
+        self._evictions = 0
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _key(row: dict[str, Any]) -> tuple[str, str] | None:
+        group_id = str(row.get("group_id") or "")
+        message_id = str(row.get("message_id") or "").strip()
+        if not group_id or not message_id:
+            return None
+        return group_id, message_id
+
+    def get(self, group_id: str, message_id: str) -> dict[str, Any] | None:
+        row = self._rows.get((group_id, message_id))
+        if row is None:
+            self._misses += 1
+            return None
+        self._rows.move_to_end((group_id, message_id))
+        self._hits += 1
+        return dict(row)
+
+    def put(self, row: dict[str, Any]) -> None:
+        key = self._key(row)
+        if key is None:
+            return
+        existing = self._rows.get(key)
+        if existing is not None and _row_sort_key(existing) > _row_sort_key(row):
+            # 同一 message_id 重复入库时保留最新一行，与 SQL 的 ORDER BY timestamp DESC 一致
+            self._rows.move_to_end(key)
+            return
+        self._rows[key] = {name: row.get(name) for name in GROUP_MESSAGE_COLUMNS}
+        self._rows.move_to_end(key)
+        while len(self._rows) > self.limit:
+            self._rows.popitem(last=False)
+            self._evictions += 1
+
+    def discard_group(self, group_id: str) -> None:
+        for key in [key for key in self._rows if key[0] == group_id]:
+            self._rows.pop(key, None)
+
+    def clear(self) -> None:
+        self._rows.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._rows),
+            "limit": self.limit,
+            "evictions": self._evictions,
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+    def reset_counters(self) -> None:
+        self._evictions = 0
+        self._hits = 0
+        self._misses = 0
+
+
+@dataclass
+class _GroupRing:
+    # 按 (timestamp, id) 升序保存该群最新的一段连续消息；complete 表示已包含全部行
+    rows: list[dict[str, Any]] = field(default_factory=list)
+    keys: list[tuple[float, int]] = field(default_factory=list)
+    ids: set[int] = field(default_factory=set)
+    complete: bool = False
+    chars: int = 0
+
+
+class GroupMessageBuffer:
+    """Per-group ring buffer of the newest ``group_messages`` rows.
+
+    SQLite stays the source of truth: the ring is warmed from it on first
+    access, fed by ``record_group_msg`` after each commit, and answers a query
+    only when it can prove the result equals the SQL one. Otherwise callers get
+    ``None`` and fall back to SQL.
+    """
+
+    def __init__(
+        self,
+        *,
+        per_group_limit: int = _DEFAULT_PER_GROUP_LIMIT,
+        max_groups: int = _DEFAULT_MAX_GROUPS,
+        max_total_chars: int = _DEFAULT_MAX_TOTAL_CHARS,
+        message_id_limit: int = _DEFAULT_MESSAGE_ID_LIMIT,
+    ) -> None:
+        self.per_group_limit = max(1, int(per_group_limit))
+        self.max_groups = max(1, int(max_groups))
+        self.max_total_chars = max(1, int(max_total_chars))
+        self._lock = threading.RLock()
+        self._groups: OrderedDict[str, _GroupRing] = OrderedDict()
+        self._write_seq: dict[str, int] = {}
+        self._message_ids = GroupMessageIdCache(limit=message_id_limit)
+        self._db_path: Path | None = None
+        self._total_chars = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _check_db_locked(self) -> None:
+        current = get_db_path()
+        if self._db_path != current:
+            self._groups.clear()
+            self._write_seq.clear()
+            self._message_ids.clear()
+            self._total_chars = 0
+            self._db_path = current
+
+    def _drop_locked(self, group_id: str) -> None:
+        ring = self._groups.pop(group_id, None)
+        if ring is not None:
+            self._total_chars -= ring.chars
+
+    def _enforce_caps_locked(self) -> None:
+        while self._groups and (
+            len(self._groups) > self.max_groups or self._total_chars > self.max_total_chars
+        ):
+            group_id, _ring = next(iter(self._groups.items()))
+            self._drop_locked(group_id)
+            self._evictions += 1
+
+    def _insert_locked(self, ring: _GroupRing, row: dict[str, Any]) -> None:
+        row_id = int(row.get("id") or 0)
+        if row_id and row_id in ring.ids:
+            return
+        key = _row_sort_key(row)
+        if len(ring.rows) >= self.per_group_limit and ring.keys and key < ring.keys[0]:
+            # 比环里最旧的还旧：不影响"最新 N 条"，只是环不再覆盖全量
+            ring.complete = False
+            return
+        index = bisect.bisect_right(ring.keys, key)
+        ring.keys.insert(index, key)
+        ring.rows.insert(index, row)
+        ring.ids.add(row_id)
+        chars = _row_chars(row)
+        ring.chars += chars
+        self._total_chars += chars
+        while len(ring.rows) > self.per_group_limit:
+            dropped = ring.rows.pop(0)
+            ring.keys.pop(0)
+            ring.ids.discard(int(dropped.get("id") or 0))
+            dropped_chars = _row_chars(dropped)
+            ring.chars -= dropped_chars
+            self._total_chars -= dropped_chars
+            ring.complete = False
+
+    def _load_rows(self, group_id: str) -> list[dict[str, Any]]:
+        with connect_sync() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT {", ".join(GROUP_MESSAGE_COLUMNS)}
+                FROM group_messages
+                WHERE group_id=?
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+                """,
+                (group_id, self.per_group_limit),
+            ).fetchall()
+        return [{name: row[name] for name in GROUP_MESSAGE_COLUMNS} for row in rows]
+
+    def _ring(self, group_id: str) -> _GroupRing | None:
+        with self._lock:
+            self._check_db_locked()
+            ring = self._groups.get(group_id)
+            if ring is not None:
+                self._groups.move_to_end(group_id)
+                return ring
+            seq = self._write_seq.get(group_id, 0)
+        rows = self._load_rows(group_id)
+        with self._lock:
+            self._check_db_locked()
+            existing = self._groups.get(group_id)
+            if existing is not None:
+                return existing
+            if self._write_seq.get(group_id, 0) != seq:
+                # 预热期间有新写入或失效，本次结果可能漏行，交给 SQL
+                return None
+            ring = _GroupRing(complete=len(rows) < self.per_group_limit)
+            for row in reversed(rows):
+                self._insert_locked(ring, row)
+            self._groups[group_id] = ring
+            self._enforce_caps_locked()
+            metrics.record_counter("group_message_buffer_warm_total")
+            return self._groups.get(group_id)
+
+    def select(
+        self,
+        group_id: str,
+        *,
+        limit: int,
+        since: float | None = None,
+        predicate: Callable[[dict[str, Any]], bool] | None = None,
+    ) -> list[dict[str, Any]] | None:
+        """Return up to ``limit`` matching rows newest first, or ``None`` on a miss."""
+        normalized = str(group_id or "")
+        wanted = max(1, int(limit))
+        if not normalized or wanted > self.per_group_limit:
+            with self._lock:
+                self._misses += 1
+            return None
+        ring = self._ring(normalized)
+        with self._lock:
+            if ring is None or self._groups.get(normalized) is not ring:
+                self._misses += 1
+                return None
+            result: list[dict[str, Any]] = []
+            reached_since = False
+            for row in reversed(ring.rows):
+                if since is not None and float(row.get("timestamp") or 0) < since:
+                    reached_since = True
+                    break
+                if predicate is not None and not predicate(row):
+                    continue
+                result.append(dict(row))
+                if len(result) >= wanted:
+                    break
+            if len(result) < wanted and not reached_since and not ring.complete:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return result
+
+    def write_seq(self, group_id: str) -> int:
+        """Return the group's write sequence; pass it to ``remember_message`` after a SQL read."""
+        with self._lock:
+            self._check_db_locked()
+            return self._write_seq.get(str(group_id or ""), 0)
+
+    def lookup_message(self, group_id: str, message_id: str) -> dict[str, Any] | None:
+        """Return the newest row for ``(group_id, message_id)`` if cached."""
+        normalized_group = str(group_id or "")
+        normalized_message = str(message_id or "").strip()
+        if not normalized_group or not normalized_message:
+            return None
+        with self._lock:
+            self._check_db_locked()
+            return self._message_ids.get(normalized_group, normalized_message)
+
+    def remember_message(self, row: dict[str, Any], *, seq: int) -> None:
+        """Cache a row read from SQL unless the group changed since ``seq``."""
+        group_id = str(row.get("group_id") or "")
+        with self._lock:
+            self._check_db_locked()
+            if self._write_seq.get(group_id, 0) != seq:
+                return
+            self._message_ids.put(row)
+
+    def append(self, row: dict[str, Any]) -> None:
+        group_id = str(row.get("group_id") or "")
+        if not group_id:
+            return
+        with self._lock:
+            self._check_db_locked()
+            self._write_seq[group_id] = self._write_seq.get(group_id, 0) + 1
+            self._message_ids.put(row)
+            ring = self._groups.get(group_id)
+            if ring is None:
+                return
+            self._insert_locked(ring, {name: row.get(name) for name in GROUP_MESSAGE_COLUMNS})
+            self._enforce_caps_locked()
+
+    def invalidate(self, group_id: str = "") -> None:
+        normalized = str(group_id or "")
+        with self._lock:
+            if not normalized:
+                self._groups.clear()
+                self._write_seq.clear()
+                self._message_ids.clear()
+                self._total_chars = 0
+                return
+            self._write_seq[normalized] = self._write_seq.get(normalized, 0) + 1
+            self._message_ids.discard_group(normalized)
+            self._drop_locked(normalized)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": sum(len(ring.rows) for ring in self._groups.values()),
+                "groups": len(self._groups),
+                "limit": self.per_group_limit * self.max_groups,
+                "evictions": self._evictions,
+                "hits": self._hits,
+                "misses": self._misses,
+                "chars": self._total_chars,
+            }
+
+    def message_id_snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return self._message_ids.snapshot()
+
+    def reset_for_testing(self) -> None:
+        with self._lock:
+            self._groups.clear()
+            self._write_seq.clear()
+            self._message_ids.clear()
+            self._message_ids.reset_counters()
+            self._db_path = None
+            self._total_chars = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+
+group_message_buffer = GroupMessageBuffer()
+register_cache_reporter(
+    "group_message_buffer", group_message_buffer.snapshot, footprint=lambda: group_message_buffer._groups
+)
+register_cache_reporter("group_message_id_cache", group_message_buffer.message_id_snapshot)
+
+
+__all__ = [
+    "GROUP_MESSAGE_COLUMNS",
+    "GroupMessageBuffer",
+    "GroupMessageIdCache",
+    "group_message_buffer",
+]
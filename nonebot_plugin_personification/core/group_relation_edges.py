@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-import math
+import asyncio
+import threading
 import time
 from typing import Any
 
+from . import metrics
 from .db import connect_sync
+from .group_message_buffer import group_message_buffer
+from .runtime_performance import register_cache_reporter
 
 
 _EDGE_WEIGHTS = {
@@ -19,6 +23,26 @@ _EDGE_WEIGHTS = {
 _DECAY_HALF_LIFE_HOURS = 18.0
 # upsert 累加权重时按"上一次到现在的时间"做半衰，避免边随机增长，不衰减
 _INSERT_DECAY_HALF_LIFE_HOURS = 24.0 * 30  # 30 天
+# 边增量先在内存里按 (group, src, dst, kind) 聚合，定时批量落库；
+# 超过上限时由写消息的连接就地刷出，避免内存无界增长
+_FLUSH_INTERVAL_SECONDS = 5.0
+_MAX_PENDING_EDGES = 4096
+_PENDING_LOCK = threading.Lock()
+_PENDING_EDGES: dict[tuple[str, str, str, str], list[Any]] = {}
+_FLUSHED_TOTAL = 0
+_UPSERT_SQL = """
+    INSERT INTO group_relation_edges(
+        group_id, src_user_id, dst_user_id, edge_kind, weight, last_seen_at, sample_msg_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(group_id, src_user_id, dst_user_id, edge_kind)
+    DO UPDATE SET
+        weight = excluded.weight,
+        last_seen_at = MAX(group_relation_edges.last_seen_at, excluded.last_seen_at),
+        sample_msg_id = CASE
+            WHEN excluded.sample_msg_id != '' THEN excluded.sample_msg_id
+            ELSE group_relation_edges.sample_msg_id
+        END
+"""
 
 
 def _normalize_user_id(value: Any) -> str:
@@ -31,6 +55,36 @@ def _is_human_source(source_kind: Any, *, is_bot: bool) -> bool:
     return str(source_kind or "user").strip().lower() not in {"bot", "plugin", "plugin_command", "system"}
 
 
+def _normalize_edge_kind(value: Any) -> str:
+    return str(value or "").strip().lower() or "other"
+
+
+def _insert_decayed(weight: float, last_seen_at: float, *, now_ts: float) -> float:
+    age_seconds = max(0.0, float(now_ts) - float(last_seen_at or 0))
+    if age_seconds > 0 and weight > 0:
+        return float(weight) * 0.5 ** (age_seconds / (_INSERT_DECAY_HALF_LIFE_HOURS * 3600.0))
+    return float(weight)
+
+
+def _stored_weight_at(row: Any, now_ts: float) -> float:
+    if row is None:
+        return 0.0
+    try:
+        prev_w = float(row["weight"] or 0)
+        prev_ts = float(row["last_seen_at"] or 0)
+    except Exception:
+        prev_w, prev_ts = 0.0, 0.0
+    return _insert_decayed(prev_w, prev_ts, now_ts=now_ts)
+
+
+def _begin_write(conn: Any) -> None:
+    # 先拿写锁再读存量：消息连接上的溢出刷写和后台线程刷写可能同时落同一条边，
+    # 读在写事务外时双方读到同一个旧值，后提交的一方按旧值算出的 weight 会吞掉对方的增量。
+    # 调用方事务里已经写过（in_transaction）就已持有写锁，直接复用
+    if not getattr(conn, "in_transaction", True):
+        conn.execute("BEGIN IMMEDIATE")
+
+
 def upsert_group_relation_edge(
     conn: Any,
     *,
@@ -46,7 +100,8 @@ def upsert_group_relation_edge(
     dst = _normalize_user_id(dst_user_id)
     if not group_id or not src or not dst or src == dst:
         return
-    edge = str(edge_kind or "").strip().lower() or "other"
+    edge = _normalize_edge_kind(edge_kind)
+    _begin_write(conn)
     # 写入前对存量 weight 做一次时间衰减，避免边权重单向膨胀
     existing = conn.execute(
         """
@@ -56,34 +111,9 @@ def upsert_group_relation_edge(
         """,
         (str(group_id), src, dst, edge),
     ).fetchone()
-    decayed_existing = 0.0
-    if existing is not None:
-        try:
-            prev_w = float(existing["weight"] or 0)
-            prev_ts = float(existing["last_seen_at"] or 0)
-        except Exception:
-            prev_w, prev_ts = 0.0, 0.0
-        age_seconds = max(0.0, float(last_seen_at) - prev_ts)
-        if age_seconds > 0 and prev_w > 0:
-            decay_factor = 0.5 ** (age_seconds / (_INSERT_DECAY_HALF_LIFE_HOURS * 3600.0))
-            decayed_existing = prev_w * decay_factor
-        else:
-            decayed_existing = prev_w
-    new_weight = float(weight) + decayed_existing
+    new_weight = float(weight) + _stored_weight_at(existing, float(last_seen_at))
     conn.execute(
-        """
-        INSERT INTO group_relation_edges(
-            group_id, src_user_id, dst_user_id, edge_kind, weight, last_seen_at, sample_msg_id
-        ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(group_id, src_user_id, dst_user_id, edge_kind)
-        DO UPDATE SET
-            weight = excluded.weight,
-            last_seen_at = MAX(group_relation_edges.last_seen_at, excluded.last_seen_at),
-            sample_msg_id = CASE
-                WHEN excluded.sample_msg_id != '' THEN excluded.sample_msg_id
-                ELSE group_relation_edges.sample_msg_id
-            END
-        """,
+        _UPSERT_SQL,
         (
             str(group_id),
             src,
@@ -96,6 +126,238 @@ def upsert_group_relation_edge(
     )
 
 
+def queue_group_relation_edge(
+    *,
+    group_id: str,
+    src_user_id: str,
+    dst_user_id: str,
+    edge_kind: str,
+    weight: float,
+    last_seen_at: float,
+    sample_msg_id: str = "",
+) -> int:
+    """把一次边权重增量并入内存待写表，返回当前待写边数。
+
+    同一条边的多次增量按与 ``upsert_group_relation_edge`` 相同的半衰规则折叠，
+    落库时再与存量权重合并，结果与逐条 upsert 一致。
+    """
+    src = _normalize_user_id(src_user_id)
+    dst = _normalize_user_id(dst_user_id)
+    if not group_id or not src or not dst or src == dst:
+        with _PENDING_LOCK:
+            return len(_PENDING_EDGES)
+    key = (str(group_id), src, dst, _normalize_edge_kind(edge_kind))
+    ts = float(last_seen_at)
+    sample = str(sample_msg_id or "")
+    with _PENDING_LOCK:
+        pending = _PENDING_EDGES.get(key)
+        if pending is None:
+            _PENDING_EDGES[key] = [float(weight), ts, sample]
+        else:
+            pending[0] = float(weight) + _insert_decayed(pending[0], pending[1], now_ts=ts)
+            pending[1] = max(pending[1], ts)
+            if sample:
+                pending[2] = sample
+        return len(_PENDING_EDGES)
+
+
+def _take_pending(
+    group_id: str = "",
+) -> dict[tuple[str, str, str, str], list[Any]]:
+    normalized = str(group_id or "")
+    with _PENDING_LOCK:
+        if not normalized:
+            taken = dict(_PENDING_EDGES)
+            _PENDING_EDGES.clear()
+            return taken
+        keys = [key for key in _PENDING_EDGES if key[0] == normalized]
+        return {key: _PENDING_EDGES.pop(key) for key in keys}
+
+
+def _restore_pending(taken: dict[tuple[str, str, str, str], list[Any]]) -> None:
+    # 写库失败时把取出的增量放回去；期间新到的增量更晚，旧增量衰减到新时间点后叠加
+    with _PENDING_LOCK:
+        for key, (weight, ts, sample) in taken.items():
+            current = _PENDING_EDGES.get(key)
+            if current is None:
+                _PENDING_EDGES[key] = [weight, ts, sample]
+                continue
+            current[0] = current[0] + _insert_decayed(weight, ts, now_ts=current[1])
+            current[1] = max(current[1], ts)
+            if not current[2]:
+                current[2] = sample
+
+
+def _load_stored_edges(
+    conn: Any,
+    keys: list[tuple[str, str, str, str]],
+) -> dict[tuple[str, str, str, str], Any]:
+    sources_by_group: dict[str, set[str]] = {}
+    for group_id, src, _dst, _edge in keys:
+        sources_by_group.setdefault(group_id, set()).add(src)
+    stored: dict[tuple[str, str, str, str], Any] = {}
+    for group_id, sources in sources_by_group.items():
+        ordered = sorted(sources)
+        for start in range(0, len(ordered), 400):
+            chunk = ordered[start : start + 400]
+            rows = conn.execute(
+                f"""
+                SELECT src_user_id, dst_user_id, edge_kind, weight, last_seen_at, sample_msg_id
+                FROM group_relation_edges
+                WHERE group_id=? AND src_user_id IN ({",".join("?" for _ in chunk)})
+                """,
+                (group_id, *chunk),
+            ).fetchall()
+            for row in rows:
+                stored[(group_id, str(row["src_user_id"]), str(row["dst_user_id"]), str(row["edge_kind"]))] = row
+    return stored
+
+
+def _write_pending(conn: Any, taken: dict[tuple[str, str, str, str], list[Any]]) -> int:
+    _begin_write(conn)
+    stored = _load_stored_edges(conn, list(taken))
+    rows = []
+    for key, (weight, ts, sample) in taken.items():
+        rows.append(
+            (
+                *key,
+                float(weight) + _stored_weight_at(stored.get(key), ts),
+                float(ts),
+                str(sample or ""),
+            )
+        )
+    conn.executemany(_UPSERT_SQL, rows)
+    return len(rows)
+
+
+def flush_pending_relation_edges(conn: Any = None, *, group_id: str = "") -> int:
+    """把内存中的边增量批量写入 ``group_relation_edges``，返回写入边数。
+
+    传入 ``conn`` 时复用调用方事务且不提交；否则自建连接并提交。
+    """
+    global _FLUSHED_TOTAL
+    taken = _take_pending(group_id)
+    if not taken:
+        return 0
+    started_at = time.monotonic()
+    try:
+        if conn is not None:
+            written = _write_pending(conn, taken)
+        else:
+            with connect_sync() as own_conn:
+                written = _write_pending(own_conn, taken)
+                own_conn.commit()
+    except Exception:
+        _restore_pending(taken)
+        metrics.record_counter("relation_edge_flush_failed_total")
+        raise
+    with _PENDING_LOCK:
+        _FLUSHED_TOTAL += written
+    metrics.record_counter("relation_edge_flush_rows_total", written)
+    metrics.record_timing("relation_edge_flush", (time.monotonic() - started_at) * 1000.0)
+    return written
+
+
+def discard_pending_relation_edges(*, group_id: str = "", user_id: str = "") -> int:
+    normalized_group = str(group_id or "")
+    normalized_user = _normalize_user_id(user_id)
+    with _PENDING_LOCK:
+        keys = [
+            key
+            for key in _PENDING_EDGES
+            if (not normalized_group or key[0] == normalized_group)
+            and (not normalized_user or normalized_user in (key[1], key[2]))
+        ]
+        for key in keys:
+            _PENDING_EDGES.pop(key, None)
+    return len(keys)
+
+
+def pending_relation_edge_count() -> int:
+    with _PENDING_LOCK:
+        return len(_PENDING_EDGES)
+
+
+async def run_relation_edge_flusher(*, interval: float = _FLUSH_INTERVAL_SECONDS) -> None:
+    delay = max(0.5, float(interval or _FLUSH_INTERVAL_SECONDS))
+    while True:
+        await asyncio.sleep(delay)
+        if not pending_relation_edge_count():
+            continue
+        try:
+            await asyncio.to_thread(flush_pending_relation_edges)
+        except Exception:
+            # 增量已放回待写表，下个周期重试
+            continue
+
+
+def load_group_relation_edges(conn: Any, group_id: str, *, limit: int = 200) -> list[dict[str, Any]]:
+    """读取群关系边并合并尚未落库的增量，按 last_seen_at 倒序。"""
+    normalized = str(group_id or "")
+    row_limit = max(1, int(limit))
+    rows = conn.execute(
+        """
+        SELECT src_user_id, dst_user_id, edge_kind, weight, last_seen_at, sample_msg_id
+        FROM group_relation_edges
+        WHERE group_id=?
+        ORDER BY last_seen_at DESC
+        LIMIT ?
+        """,
+        (normalized, row_limit),
+    ).fetchall()
+    edges: dict[tuple[str, str, str, str], dict[str, Any]] = {}
+    for row in rows:
+        key = (normalized, str(row["src_user_id"]), str(row["dst_user_id"]), str(row["edge_kind"]))
+        edges[key] = {
+            "src_user_id": key[1],
+            "dst_user_id": key[2],
+            "edge_kind": key[3],
+            "weight": float(row["weight"] or 0),
+            "last_seen_at": float(row["last_seen_at"] or 0),
+            "sample_msg_id": str(row["sample_msg_id"] or ""),
+        }
+    with _PENDING_LOCK:
+        pending = {key: list(value) for key, value in _PENDING_EDGES.items() if key[0] == normalized}
+    if not pending:
+        return list(edges.values())
+    missing = [key for key in pending if key not in edges]
+    stored = _load_stored_edges(conn, missing) if missing else {}
+    for key, (weight, ts, sample) in pending.items():
+        base = edges.get(key)
+        if base is None and key in stored:
+            row = stored[key]
+            base = {
+                "weight": float(row["weight"] or 0),
+                "last_seen_at": float(row["last_seen_at"] or 0),
+                "sample_msg_id": str(row["sample_msg_id"] or ""),
+            }
+        merged_weight = float(weight)
+        merged_ts = float(ts)
+        merged_sample = str(sample or "")
+        if base is not None:
+            merged_weight += _insert_decayed(base["weight"], base["last_seen_at"], now_ts=ts)
+            merged_ts = max(merged_ts, base["last_seen_at"])
+            merged_sample = merged_sample or base["sample_msg_id"]
+        edges[key] = {
+            "src_user_id": key[1],
+            "dst_user_id": key[2],
+            "edge_kind": key[3],
+            "weight": merged_weight,
+            "last_seen_at": merged_ts,
+            "sample_msg_id": merged_sample,
+        }
+    ordered = sorted(edges.values(), key=lambda item: -item["last_seen_at"])
+    return ordered[:row_limit]
+
+
+def _pending_cache_snapshot() -> dict[str, Any]:
+    with _PENDING_LOCK:
+        return {"entries": len(_PENDING_EDGES), "limit": _MAX_PENDING_EDGES, "evictions": 0}
+
+
+register_cache_reporter("relation_edge_pending", _pending_cache_snapshot)
+
+
 def update_relation_edges_from_message(
     conn: Any,
     *,
@@ -118,8 +380,7 @@ def update_relation_edges_from_message(
 
     target = _normalize_user_id(reply_to_user_id)
     if target:
-        upsert_group_relation_edge(
-            conn,
+        queue_group_relation_edge(
             group_id=group_id,
             src_user_id=src,
             dst_user_id=target,
@@ -129,20 +390,21 @@ def update_relation_edges_from_message(
             sample_msg_id=message_id,
         )
     elif reply_to_msg_id:
-        row = conn.execute(
-            """
-            SELECT user_id
-            FROM group_messages
-            WHERE group_id=? AND message_id=?
-            ORDER BY timestamp DESC
-            LIMIT 1
-            """,
-            (str(group_id), str(reply_to_msg_id)),
-        ).fetchone()
+        row = group_message_buffer.lookup_message(str(group_id), str(reply_to_msg_id))
+        if row is None:
+            row = conn.execute(
+                """
+                SELECT user_id
+                FROM group_messages
+                WHERE group_id=? AND message_id=?
+                ORDER BY timestamp DESC
+                LIMIT 1
+                """,
+                (str(group_id), str(reply_to_msg_id)),
+            ).fetchone()
         referenced_user = _normalize_user_id(row["user_id"] if row and hasattr(row, "__getitem__") else "")
         if referenced_user:
-            upsert_group_relation_edge(
-                conn,
+            queue_group_relation_edge(
                 group_id=group_id,
                 src_user_id=src,
                 dst_user_id=referenced_user,
@@ -156,8 +418,7 @@ def update_relation_edges_from_message(
         dst = _normalize_user_id(mentioned)
         if not dst:
             continue
-        upsert_group_relation_edge(
-            conn,
+        queue_group_relation_edge(
             group_id=group_id,
             src_user_id=src,
             dst_user_id=dst,
@@ -180,8 +441,7 @@ def update_relation_edges_from_message(
     if previous:
         last_user = _normalize_user_id(previous[0]["user_id"] if hasattr(previous[0], "__getitem__") else "")
         if last_user:
-            upsert_group_relation_edge(
-                conn,
+            queue_group_relation_edge(
                 group_id=group_id,
                 src_user_id=src,
                 dst_user_id=last_user,
@@ -202,8 +462,7 @@ def update_relation_edges_from_message(
                     and other_content == normalized_content
                     and ts - other_ts <= 900
                 ):
-                    upsert_group_relation_edge(
-                        conn,
+                    queue_group_relation_edge(
                         group_id=group_id,
                         src_user_id=src,
                         dst_user_id=other_user,
@@ -212,8 +471,7 @@ def update_relation_edges_from_message(
                         last_seen_at=ts,
                         sample_msg_id=message_id,
                     )
-                    upsert_group_relation_edge(
-                        conn,
+                    queue_group_relation_edge(
                         group_id=group_id,
                         src_user_id=other_user,
                         dst_user_id=src,
@@ -247,8 +505,7 @@ def update_relation_edges_from_message(
             # 仅累计近 6 小时内同 thread 的共现
             if ts - other_ts > 6 * 3600:
                 continue
-            upsert_group_relation_edge(
-                conn,
+            queue_group_relation_edge(
                 group_id=group_id,
                 src_user_id=src,
                 dst_user_id=partner,
@@ -260,6 +517,9 @@ def update_relation_edges_from_message(
             if len(seen_partners) >= 5:
                 break
 
+    if pending_relation_edge_count() >= _MAX_PENDING_EDGES:
+        flush_pending_relation_edges(conn)
+
 
 def _decayed_weight(weight: float, last_seen_at: float, *, now_ts: float) -> float:
     age_seconds = max(0.0, now_ts - float(last_seen_at or 0))
@@ -281,16 +541,7 @@ def summarize_relation_edges(
         return ""
     now_ts = time.time()
     with connect_sync() as conn:
-        rows = conn.execute(
-            """
-            SELECT src_user_id, dst_user_id, edge_kind, weight, last_seen_at
-            FROM group_relation_edges
-            WHERE group_id=?
-            ORDER BY last_seen_at DESC
-            LIMIT 200
-            """,
-            (str(group_id),),
-        ).fetchall()
+        rows = load_group_relation_edges(conn, str(group_id), limit=200)
         if not rows:
             return ""
 
@@ -365,6 +616,12 @@ def summarize_relation_edges(
 
 
 __all__ = [
+    "discard_pending_relation_edges",
+    "flush_pending_relation_edges",
+    "load_group_relation_edges",
+    "pending_relation_edge_count",
+    "queue_group_relation_edge",
+    "run_relation_edge_flusher",
     "summarize_relation_edges",
     "update_relation_edges_from_message",
     "upsert_group_relation_edge",
@@ -0,0 +1,417 @@
+"""进程级共享 httpx 客户端注册表。
+
+按（事件循环, 代理, 证书校验, HTTP/2, 超时档位, 是否跟随重定向, 默认请求头）复用长连接客户端，
+替代各调用点每次 `async with httpx.AsyncClient(...)` 都重新握手 TCP + TLS 的写法。
+
+- 每个客户端外包一层传输：按 host 限制同时在途请求数，并借 httpcore 的 trace 钩子统计新建连接 / 复用连接
+- 共享客户端不保存响应里的 Set-Cookie，避免不同调用方之间串 cookie；需要 cookie 会话的流程（QQ 空间扫码登录）继续用私有客户端
+- DNS 固定到已校验 IP 的下载（safe_image_download / safe_media_download / MCP Registry）按 IP 建连池，
+  不同 SNI 会复用同一条 TLS 连接，同样不走这里
+- 空闲超时的客户端在没有在途请求时才关闭；插件卸载时统一关闭
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import importlib.util
+import threading
+import time
+import urllib.request
+import weakref
+from collections import OrderedDict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Any, AsyncIterator
+
+import httpx
+
+from .runtime_performance import register_cache_reporter
+
+DEFAULT_TIMEOUT = httpx.Timeout(5.0)
+_DEFAULT_MAX_CONNECTIONS = 100
+_DEFAULT_MAX_KEEPALIVE = 32
+_DEFAULT_PER_HOST_LIMIT = 16
+_DEFAULT_KEEPALIVE_EXPIRY = 30.0
+_IDLE_CLOSE_SECONDS = 300.0
+_MAX_CLIENTS = 32
+
+_LOCK = threading.RLock()
+_SETTINGS: dict[str, Any] = {
+    "http2": True,
+    "per_host_limit": _DEFAULT_PER_HOST_LIMIT,
+    "keepalive_expiry": _DEFAULT_KEEPALIVE_EXPIRY,
+}
+_STATS: dict[str, int] = {
+    "requests": 0,
+    "new_connections": 0,
+    "host_waits": 0,
+    "created": 0,
+    "evictions": 0,
+}
+_CLOSING: set[asyncio.Task[Any]] = set()
+
+
+class _RejectAllCookies(DefaultCookiePolicy):
+    def set_ok(self, cookie: Any, request: Any) -> bool:  # noqa: ARG002
+        return False
+
+
+def _h2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _count(name: str, value: int = 1) -> None:
+    with _LOCK:
+        _STATS[name] += value
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """流式响应读完 / 关闭时才归还 host 名额。"""
+
+    def __init__(self, inner: Any, release: Any) -> None:
+        self._inner = inner
+        self._release = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._inner:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._inner.aclose()
+        finally:
+            self._release()
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    def __init__(
+        self,
+        *,
+        proxy: str,
+        verify: Any,
+        trust_env: bool,
+        http2: bool,
+        limits: httpx.Limits,
+        per_host_limit: int,
+    ) -> None:
+        self._transport_kwargs = {"verify": verify, "trust_env": trust_env, "http2": http2, "limits": limits}
+        self._explicit_proxy = proxy
+        # 与 httpx 一致：环境代理在建客户端时读取一次
+        self._env_proxies = urllib.request.getproxies() if trust_env and not proxy else {}
+        self._inner: dict[str, httpx.AsyncHTTPTransport] = {}
+        self._per_host_limit = max(0, int(per_host_limit))
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+        self.in_flight = 0
+
+    def _route(self, url: httpx.URL) -> httpx.AsyncHTTPTransport:
+        proxy = self._explicit_proxy
+        if not proxy and self._env_proxies and not urllib.request.proxy_bypass(url.host):
+            proxy = self._env_proxies.get(url.scheme) or self._env_proxies.get("all") or ""
+        transport = self._inner.get(proxy)
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(proxy=proxy or None, **self._transport_kwargs)
+            self._inner[proxy] = transport
+        return transport
+
+    async def _acquire_host(self, url: httpx.URL) -> asyncio.Semaphore | None:
+        if not self._per_host_limit:
+            return None
+        key = f"{url.scheme}://{url.host}:{url.port or ''}"
+        slot = self._host_slots.get(key)
+        if slot is None:
+            slot = self._host_slots[key] = asyncio.Semaphore(self._per_host_limit)
+        if slot.locked():
+            _count("host_waits")
+        await slot.acquire()
+        return slot
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        upstream_trace = request.extensions.get("trace")
+
+        async def _trace(event_name: str, info: dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                _count("new_connections")
+            if upstream_trace is not None:
+                await upstream_trace(event_name, info)
+
+        request.extensions["trace"] = _trace
+        _count("requests")
+        slot = await self._acquire_host(request.url)
+        self.in_flight += 1
+        released = False
+
+        def _release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            self.in_flight -= 1
+            if slot is not None:
+                slot.release()
+
+        try:
+            response = await self._route(request.url).handle_async_request(request)
+        except BaseException:
+            _release()
+            raise
+        response.stream = _ReleasingStream(response.stream, _release)
+        return response
+
+    async def aclose(self) -> None:
+        transports = list(self._inner.values())
+        self._inner.clear()
+        for transport in transports:
+            with contextlib.suppress(Exception):
+                await transport.aclose()
+
+
+class _Entry:
+    __slots__ = ("client", "last_used", "loop_ref", "transport")
+
+    def __init__(self, client: Any, transport: _SharedTransport, loop: asyncio.AbstractEventLoop | None) -> None:
+        self.client = client
+        self.transport = transport
+        self.loop_ref = weakref.ref(loop) if loop is not None else None
+        self.last_used = time.monotonic()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop | None:
+        return self.loop_ref() if self.loop_ref is not None else None
+
+    @property
+    def dead(self) -> bool:
+        if bool(getattr(self.client, "is_closed", False)):
+            return True
+        if self.loop_ref is None:
+            return False
+        loop = self.loop
+        return loop is None or loop.is_closed()
+
+
+_CLIENTS: OrderedDict[tuple[Any, ...], _Entry] = OrderedDict()
+
+
+def configure_http_clients(plugin_config: Any) -> None:
+    """启动时读取 HTTP/2、单 host 并发与 keepalive 配置（三项均为重启生效）；
+    配置与当前不同时清空已建客户端，之后按新配置重建。
+    """
+
+    def _number(name: str, default: float, cast: Any) -> Any:
+        try:
+            return cast(getattr(plugin_config, name, default))
+        except (TypeError, ValueError):
+            return cast(default)
+
+    settings = {
+        "http2": bool(getattr(plugin_config, "personification_http2_enabled", True)),
+        "per_host_limit": max(0, _number("personification_http_per_host_limit", _DEFAULT_PER_HOST_LIMIT, int)),
+        "keepalive_expiry": max(
+            0.0, _number("personification_http_keepalive_expiry", _DEFAULT_KEEPALIVE_EXPIRY, float)
+        ),
+    }
+    with _LOCK:
+        changed = settings != _SETTINGS
+        _SETTINGS.update(settings)
+    if changed:
+        clear_http_clients()
+
+
+def _timeout_class(timeout: Any) -> httpx.Timeout:
+    if isinstance(timeout, httpx.Timeout):
+        return timeout
+    if timeout is None:
+        return httpx.Timeout(None)
+    return httpx.Timeout(float(timeout))
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _close_later(entry: _Entry) -> None:
+    loop = entry.loop or _running_loop()
+    if loop is None or loop.is_closed() or getattr(entry.client, "is_closed", False):
+        return
+    close = getattr(entry.client, "aclose", None)
+    if close is None:
+        return
+    try:
+        task = loop.create_task(close())
+    except RuntimeError:
+        return
+    _CLOSING.add(task)
+    task.add_done_callback(_CLOSING.discard)
+
+
+def _sweep(now: float, current_loop: asyncio.AbstractEventLoop | None) -> None:
+    for key, entry in list(_CLIENTS.items()):
+        if entry.dead:
+            # 所属事件循环已结束：连接随循环一起失效，只丢引用
+            _CLIENTS.pop(key, None)
+            continue
+        idle = now - entry.last_used > _IDLE_CLOSE_SECONDS
+        if idle and entry.transport.in_flight == 0 and entry.loop is current_loop:
+            _CLIENTS.pop(key, None)
+            _count("evictions")
+            _close_later(entry)
+    while len(_CLIENTS) > _MAX_CLIENTS:
+        victim_key = next((key for key, entry in _CLIENTS.items() if entry.transport.in_flight == 0), None)
+        if victim_key is None:
+            break
+        _count("evictions")
+        _close_later(_CLIENTS.pop(victim_key))
+
+
+def get_http_client(
+    *,
+    timeout: Any = DEFAULT_TIMEOUT,
+    proxy: str | None = "",
+    verify: Any = True,
+    follow_redirects: bool = False,
+    trust_env: bool = True,
+    headers: dict[str, str] | None = None,
+    http2: bool | None = None,
+) -> httpx.AsyncClient:
+    """取一个长生命周期的共享客户端；调用方不要关闭它，单次请求的超时 / 头部仍可按请求覆盖。"""
+    loop = _running_loop()
+    timeout_value = _timeout_class(timeout)
+    header_items = tuple(sorted((str(k).lower(), str(v)) for k, v in dict(headers or {}).items()))
+    now = time.monotonic()
+    with _LOCK:
+        use_http2 = bool(_SETTINGS["http2"] if http2 is None else http2) and _h2_available()
+        key = (
+            id(loop),
+            str(proxy or ""),
+            verify if isinstance(verify, (bool, str)) else id(verify),
+            use_http2,
+            (timeout_value.connect, timeout_value.read, timeout_value.write, timeout_value.pool),
+            bool(follow_redirects),
+            bool(trust_env),
+            header_items,
+        )
+        entry = _CLIENTS.get(key)
+        if entry is not None and (entry.dead or entry.loop is not loop):
+            _CLIENTS.pop(key, None)
+            entry = None
+        if entry is None:
+            _sweep(now, loop)
+            transport = _SharedTransport(
+                proxy=str(proxy or ""),
+                verify=verify,
+                trust_env=trust_env,
+                http2=use_http2,
+                limits=httpx.Limits(
+                    max_connections=_DEFAULT_MAX_CONNECTIONS,
+                    max_keepalive_connections=_DEFAULT_MAX_KEEPALIVE,
+                    keepalive_expiry=_SETTINGS["keepalive_expiry"],
+                ),
+                per_host_limit=_SETTINGS["per_host_limit"],
+            )
+            client_kwargs: dict[str, Any] = {
+                "timeout": timeout_value,
+                "follow_redirects": follow_redirects,
+                "headers": dict(headers or {}),
+                "cookies": CookieJar(policy=_RejectAllCookies()),
+                "transport": transport,
+            }
+            if not trust_env:
+                # 传入自定义 transport 后 httpx 不再读环境代理，由 _SharedTransport 按 trust_env 自行选路
+                client_kwargs["trust_env"] = False
+            if proxy:
+                # httpx 会为显式代理挂一条 all:// 路由；用同名 mount 覆盖回共享传输，限流与计数不被绕开
+                client_kwargs["proxy"] = proxy
+                client_kwargs["mounts"] = {"all://": transport}
+            client = httpx.AsyncClient(**client_kwargs)
+            entry = _Entry(client, transport, loop)
+            _CLIENTS[key] = entry
+            _count("created")
+        entry.last_used = now
+        _CLIENTS.move_to_end(key)
+        return entry.client
+
+
+@contextlib.asynccontextmanager
+async def shared_http_client(**kwargs: Any) -> AsyncIterator[httpx.AsyncClient]:
+    """`async with httpx.AsyncClient(...)` 的替换写法：退出时不关闭，连接留给下一位调用方。"""
+    yield get_http_client(**kwargs)
+
+
+def clear_http_clients() -> None:
+    """丢弃全部共享客户端（配置变更 / 测试隔离）；仍在当前循环里的客户端后台关闭。"""
+    with _LOCK:
+        entries = list(_CLIENTS.values())
+        _CLIENTS.clear()
+    for entry in entries:
+        if not entry.dead:
+            _close_later(entry)
+
+
+async def close_http_clients(*, logger: Any = None) -> None:
+    with _LOCK:
+        entries = list(_CLIENTS.values())
+        _CLIENTS.clear()
+    loop = _running_loop()
+    for entry in entries:
+        if entry.dead or entry.loop not in {None, loop}:
+            continue
+        try:
+            await entry.client.aclose()
+        except Exception as exc:
+            if logger is not None:
+                logger.warning(f"拟人插件：关闭共享 HTTP 客户端失败: {exc}")
+    pending = [task for task in list(_CLOSING) if task.get_loop() is loop]
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def http_clients_snapshot() -> dict[str, Any]:
+    with _LOCK:
+        stats = dict(_STATS)
+        settings = dict(_SETTINGS)
+    requests = stats["requests"]
+    new_connections = min(stats["new_connections"], requests)
+    return {
+        "entries": len(_CLIENTS),
+        "limit": _MAX_CLIENTS,
+        "evictions": stats["evictions"],
+        # 命中 = 复用已有连接的请求
+        "hits": requests - new_connections,
+        "misses": new_connections,
+        "requests": requests,
+        "new_connections": stats["new_connections"],
+        "host_waits": stats["host_waits"],
+        "clients_created": stats["created"],
+        "in_flight": sum(entry.transport.in_flight for entry in list(_CLIENTS.values())),
+        "http2": bool(settings["http2"]) and _h2_available(),
+        "per_host_limit": settings["per_host_limit"],
+    }
+
+
+def reset_for_testing() -> None:
+    clear_http_clients()
+    with _LOCK:
+        for name in _STATS:
+            _STATS[name] = 0
+        _SETTINGS.update(
+            http2=True,
+            per_host_limit=_DEFAULT_PER_HOST_LIMIT,
+            keepalive_expiry=_DEFAULT_KEEPALIVE_EXPIRY,
+        )
+
+
+register_cache_reporter("http_clients", http_clients_snapshot)
+
+
+__all__ = [
+    "DEFAULT_TIMEOUT",
+    "clear_http_clients",
+    "close_http_clients",
+    "configure_http_clients",
+    "get_http_client",
+    "http_clients_snapshot",
+    "reset_for_testing",
+    "shared_http_client",
+]
@@ -8,6 +8,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+from .runtime_performance import register_cache_reporter
+
 
 _CACHE_LOCK = threading.Lock()
 _CACHE_STATE: dict[str, dict[str, Any]] | None = None
@@ -181,3 +183,6 @@ async def clear_image_result_cache() -> int:
             return count
 
     return await asyncio.to_thread(_clear)
+
+
+register_cache_reporter("image_result_cache", footprint=lambda: _CACHE_STATE or {})
@@ -9,6 +9,7 @@ from typing import Any
 
 from ..agent.inner_state import get_personification_data_dir
 from .db import get_db_path
+from .group_chat_meta import load_all_group_chat_meta
 from .memory_store import MemoryStore, _connect, _json_loads
 
 
@@ -93,6 +94,11 @@ class LegacyMemoryMigrator:
                 migrated += count
                 target_groups.update(groups)
                 target_dbs.update(dbs)
+            if "group_chat_meta" in tables:
+                count, groups, dbs = self._migrate_legacy_sqlite_chat_meta(legacy_conn)
+                migrated += count
+                target_groups.update(groups)
+                target_dbs.update(dbs)
         finally:
             legacy_conn.close()
 
@@ -294,7 +300,8 @@ class LegacyMemoryMigrator:
         for row in rows:
             namespace = str(row["namespace"] or "").strip()
             payload = _json_loads(row["value"], {})
-            if namespace not in {"chat_history", "group_context"} or not isinstance(payload, dict):
+            # chat_history 文档在 init_db 时已拆进 group_chat_meta 表并删除，见 _migrate_legacy_sqlite_chat_meta
+            if namespace != "group_context" or not isinstance(payload, dict):
                 continue
             count, _, target_group, target_db = self._migrate_group_context_json(payload)
             migrated += count
@@ -303,6 +310,20 @@ class LegacyMemoryMigrator:
                 targets.add(target_db)
         return migrated, groups, targets
 
+    def _migrate_legacy_sqlite_chat_meta(
+        self,
+        conn: sqlite3.Connection,
+    ) -> tuple[int, set[str], set[str]]:
+        try:
+            payload = load_all_group_chat_meta(conn)
+        except Exception:
+            payload = {}
+        if not payload:
+            return 0, set(), set()
+        count, _, target_group, target_db = self._migrate_group_context_json(payload)
+        groups = {group for group in str(target_group or "").split(",") if group}
+        return count, groups, {target_db} if target_db else set()
+
     def _discover_json_files(self) -> list[Path]:
         roots = {
             get_personification_data_dir(self.memory_store.plugin_config),
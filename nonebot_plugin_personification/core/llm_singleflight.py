@@ -0,0 +1,265 @@
+"""辅助 LLM 调用的单飞合并 + 短 TTL 结果缓存。
+
+意图判定、记忆召回门控、用户策略分类、图片分类这类调用只取决于输入本身；
+突发消息、批量回复事件、重试和多 bot 部署会同时发出完全相同的请求。
+按 purpose 登记为可缓存后，相同（purpose, 模型, 归一化消息, 工具）的并发请求共享同一次在途调用，
+结果在 TTL 内直接复用。失败结果与空回复不缓存；所有等待方都离开时取消共享调用。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from .llm_stream import streaming_requested
+from .metrics import record_counter
+from .runtime_performance import register_cache_reporter
+
+PURPOSE_TURN_SEMANTIC_FRAME = "turn_semantic_frame"
+PURPOSE_TURN_PREFLIGHT = "turn_preflight"
+PURPOSE_MEMORY_RECALL_GATE = "memory_recall_gate"
+PURPOSE_POLICY_CLASSIFIER = "policy_classifier"
+PURPOSE_IMAGE_CLASSIFICATION = "image_classification"
+
+_CACHEABLE_PURPOSES: dict[str, float] = {
+    PURPOSE_TURN_SEMANTIC_FRAME: 30.0,
+    PURPOSE_TURN_PREFLIGHT: 30.0,
+    PURPOSE_MEMORY_RECALL_GATE: 30.0,
+    PURPOSE_POLICY_CLASSIFIER: 120.0,
+    PURPOSE_IMAGE_CLASSIFICATION: 600.0,
+}
+_CACHE_MAX_SIZE = 256
+
+_LOCK = threading.Lock()
+_RESULTS: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+
+class _Flight:
+    __slots__ = ("abandoned", "task", "waiters")
+
+    def __init__(self, task: asyncio.Task[Any]) -> None:
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+    @property
+    def joinable(self) -> bool:
+        return not self.abandoned and not self.task.done()
+
+
+_INFLIGHT: dict[str, _Flight] = {}
+_CALLER_TOKENS: weakref.WeakKeyDictionary[Any, int] = weakref.WeakKeyDictionary()
+_CALLER_SEQ = itertools.count(1)
+_STATS: dict[str, dict[str, int]] = {}
+_EVICTIONS = 0
+
+
+def register_cacheable_purpose(purpose: str, ttl_seconds: float) -> None:
+    name = str(purpose or "").strip()
+    if not name:
+        raise ValueError("purpose is required")
+    with _LOCK:
+        _CACHEABLE_PURPOSES[name] = max(0.0, float(ttl_seconds))
+
+
+def cacheable_ttl(purpose: str) -> float | None:
+    with _LOCK:
+        return _CACHEABLE_PURPOSES.get(str(purpose or "").strip())
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        # 路由标记只影响 provider 选择，不影响语义
+        return {str(k): _normalize(v) for k, v in value.items() if not str(k).startswith("_personification_")}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def request_key(
+    purpose: str,
+    model: str,
+    messages: Any,
+    tools: Any = None,
+    use_builtin_search: bool = False,
+) -> str:
+    payload = json.dumps(
+        [str(purpose or ""), str(model or ""), _normalize(messages), _normalize(tools or []), bool(use_builtin_search)],
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cacheable_result(value: Any) -> bool:
+    if value is None or bool(getattr(value, "vision_unavailable", False)):
+        return False
+    if hasattr(value, "content") or hasattr(value, "tool_calls"):
+        return bool(str(getattr(value, "content", "") or "").strip() or getattr(value, "tool_calls", None))
+    return bool(str(value).strip())
+
+
+def _count(purpose: str, outcome: str) -> None:
+    with _LOCK:
+        stats = _STATS.setdefault(purpose, {"hits": 0, "coalesced": 0, "misses": 0, "errors": 0})
+        stats[outcome] += 1
+    record_counter("llm_singleflight", purpose=purpose, outcome=outcome)
+
+
+def _cached(key: str, now: float) -> tuple[bool, Any]:
+    with _LOCK:
+        entry = _RESULTS.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= now:
+            _RESULTS.pop(key, None)
+            return False, None
+        _RESULTS.move_to_end(key)
+        return True, entry[1]
+
+
+def _remember(key: str, value: Any, ttl: float) -> None:
+    global _EVICTIONS
+    if ttl <= 0 or not _cacheable_result(value):
+        return
+    with _LOCK:
+        _RESULTS[key] = (time.monotonic() + ttl, value)
+        _RESULTS.move_to_end(key)
+        while len(_RESULTS) > _CACHE_MAX_SIZE:
+            _RESULTS.popitem(last=False)
+            _EVICTIONS += 1
+
+
+def _forget_flight(key: str, flight: _Flight) -> None:
+    if _INFLIGHT.get(key) is flight:
+        _INFLIGHT.pop(key, None)
+
+
+async def run_singleflight(
+    key: str,
+    purpose: str,
+    factory: Callable[[], Awaitable[Any]],
+    *,
+    ttl: float,
+) -> Any:
+    hit, value = _cached(key, time.monotonic())
+    if hit:
+        _count(purpose, "hits")
+        return value
+    flight = _INFLIGHT.get(key)
+    if flight is not None and flight.joinable:
+        _count(purpose, "coalesced")
+    else:
+        _count(purpose, "misses")
+
+        async def _lead() -> Any:
+            try:
+                result = await factory()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                _count(purpose, "errors")
+                raise
+            _remember(key, result, ttl)
+            return result
+
+        flight = _INFLIGHT[key] = _Flight(asyncio.create_task(_lead()))
+        flight.task.add_done_callback(lambda _task, key=key, flight=flight: _forget_flight(key, flight))
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters <= 0 and not flight.task.done():
+            # 最后一个等待方也走了（超时 / 被新消息取代）：没人要结果，取消上游请求
+            flight.abandoned = True
+            flight.task.cancel()
+
+
+def _caller_identity(caller: Any) -> str:
+    # 每个 caller 实例分配一个不复用的序号：id() 在对象回收后可能被新 caller 复用，缓存会串
+    try:
+        token = _CALLER_TOKENS.get(caller)
+        if token is None:
+            token = _CALLER_TOKENS[caller] = next(_CALLER_SEQ)
+    except TypeError:
+        token = f"id{id(caller)}"
+    return f"{type(caller).__name__}:{token}:{getattr(caller, 'model', '') or ''}"
+
+
+async def coalesced_chat(
+    caller: Any,
+    messages: list[dict[str, Any]],
+    call: Callable[[], Awaitable[Any]],
+    *,
+    purpose: str,
+) -> Any:
+    """对可缓存 purpose 合并相同 caller + messages 的无工具调用；call 是原始的 chat_with_tools 调用。"""
+    ttl = cacheable_ttl(purpose)
+    if ttl is None or streaming_requested():
+        return await call()
+    key = request_key(purpose, _caller_identity(caller), messages)
+    return await run_singleflight(key, purpose, call, ttl=ttl)
+
+
+def clear_singleflight_cache() -> None:
+    with _LOCK:
+        _RESULTS.clear()
+
+
+def singleflight_snapshot() -> dict[str, Any]:
+    with _LOCK:
+        stats = {name: dict(values) for name, values in _STATS.items()}
+        entries = len(_RESULTS)
+        evictions = _EVICTIONS
+    hits = sum(item["hits"] + item["coalesced"] for item in stats.values())
+    misses = sum(item["misses"] for item in stats.values())
+    return {
+        "entries": entries,
+        "limit": _CACHE_MAX_SIZE,
+        "evictions": evictions,
+        "hits": hits,
+        "misses": misses,
+        "in_flight": len(_INFLIGHT),
+        "purposes": stats,
+    }
+
+
+def reset_for_testing() -> None:
+    global _EVICTIONS
+    with _LOCK:
+        _RESULTS.clear()
+        _STATS.clear()
+        _EVICTIONS = 0
+    _INFLIGHT.clear()
+
+
+register_cache_reporter("llm_singleflight", singleflight_snapshot)
+
+
+__all__ = [
+    "PURPOSE_IMAGE_CLASSIFICATION",
+    "PURPOSE_MEMORY_RECALL_GATE",
+    "PURPOSE_POLICY_CLASSIFIER",
+    "PURPOSE_TURN_PREFLIGHT",
+    "PURPOSE_TURN_SEMANTIC_FRAME",
+    "cacheable_ttl",
+    "clear_singleflight_cache",
+    "coalesced_chat",
+    "register_cacheable_purpose",
+    "request_key",
+    "reset_for_testing",
+    "run_singleflight",
+    "singleflight_snapshot",
+]
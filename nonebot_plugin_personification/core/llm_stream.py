@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import sys
+from typing import Any, AsyncIterator, Iterator, Protocol
+
+
+# 流式文本增量的旁路通道：调用方用 stream_text_deltas(sink) 声明"这次调用想要增量"，
+# 支持 SSE 的 tool caller 看到 sink 后改走流式请求，边收边把文本片段推给 sink。
+# 没有 sink 时各 caller 维持原来的一次性请求，返回的 ToolCallerResponse 形状两种路径一致。
+
+
+class TextDeltaSink(Protocol):
+    def begin_attempt(self) -> None:
+        """一次新的流式请求开始（重试 / 切换 provider 时会再次调用）。"""
+
+    def feed(self, text: str) -> None:
+        """收到一段文本增量；在 caller 的协程里同步调用，不能阻塞。"""
+
+
+def _shared_sink_var() -> contextvars.ContextVar[TextDeltaSink | None]:
+    # 插件按 nonebot_plugin_personification 加载时，skillpack 仍以 plugin.personification.* 导入本模块，
+    # 同一文件会有两份模块对象；两边必须共用一个 ContextVar，caller 才看得到处理器设置的 sink
+    for name in ("plugin.personification.core.llm_stream", "nonebot_plugin_personification.core.llm_stream"):
+        module = sys.modules.get(name)
+        existing = getattr(module, "_SINK", None) if name != __name__ else None
+        if isinstance(existing, contextvars.ContextVar):
+            return existing
+    return contextvars.ContextVar("personification_llm_stream_sink", default=None)
+
+
+_SINK: contextvars.ContextVar[TextDeltaSink | None] = _shared_sink_var()
+
+
+@contextlib.contextmanager
+def stream_text_deltas(sink: TextDeltaSink) -> Iterator[TextDeltaSink]:
+    token = _SINK.set(sink)
+    try:
+        yield sink
+    finally:
+        _SINK.reset(token)
+
+
+@contextlib.contextmanager
+def detached_text_deltas() -> Iterator[None]:
+    """在此范围内的调用不再向外层 sink 推送增量，退回一次性请求。"""
+    token = _SINK.set(None)
+    try:
+        yield
+    finally:
+        _SINK.reset(token)
+
+
+def current_text_delta_sink() -> TextDeltaSink | None:
+    return _SINK.get()
+
+
+def streaming_requested() -> bool:
+    return _SINK.get() is not None
+
+
+def begin_stream_attempt() -> None:
+    sink = _SINK.get()
+    if sink is None:
+        return
+    try:
+        sink.begin_attempt()
+    except Exception:
+        pass
+
+
+def emit_text_delta(text: Any) -> None:
+    sink = _SINK.get()
+    if sink is None or not text:
+        return
+    try:
+        sink.feed(str(text))
+    except Exception:
+        pass
+
+
+async def iter_sse_events(lines: AsyncIterator[str]) -> AsyncIterator[tuple[str, str]]:
+    """把 SSE 文本行聚合成 (event, data) 事件；多行 data 以换行拼接，忽略注释行。"""
+    event = ""
+    data_lines: list[str] = []
+    async for raw_line in lines:
+        line = raw_line.rstrip("\r")
+        if not line:
+            if data_lines:
+                yield event, "\n".join(data_lines)
+            event = ""
+            data_lines = []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "event":
+            event = value
+        elif field == "data":
+            data_lines.append(value)
+    if data_lines:
+        yield event, "\n".join(data_lines)
+
+
+__all__ = [
+    "TextDeltaSink",
+    "begin_stream_attempt",
+    "current_text_delta_sink",
+    "detached_text_deltas",
+    "emit_text_delta",
+    "iter_sse_events",
+    "stream_text_deltas",
+    "streaming_requested",
+]
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any
+
+
+# 事件循环阻塞看门狗：循环里的心跳协程定期打卡，独立线程发现打卡超过阈值未更新时，
+# 用 sys._current_frames() 抓取循环线程此刻的 Python 栈。心跳恢复后按实际停顿时长入账，
+# 相同栈聚合计数与累计阻塞时间。
+_DEFAULT_THRESHOLD_MS = 250.0
+_MAX_STACK_DEPTH = 14
+_MAX_OFFENDERS = 50
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIP_PATH_PARTS = (f"{os.sep}asyncio{os.sep}", f"{os.sep}threading.py", f"{os.sep}selectors.py")
+
+_LOCK = threading.Lock()
+_CONFIG: Any = None
+_LOOP_THREAD_ID: int | None = None
+_BEAT_SEQ = 0
+_BEAT_DUE = 0.0
+# (心跳序号, 栈 key, 栈帧文本) —— 看门狗线程为某次停顿抓到的栈
+_CAPTURED: tuple[int, tuple[str, ...], list[str]] | None = None
+_OFFENDERS: dict[tuple[str, ...], dict[str, Any]] = {}
+_STALLS_TOTAL = 0
+_UNCAPTURED_TOTAL = 0
+
+
+def configure_loop_watchdog(plugin_config: Any) -> None:
+    # 持有配置对象本身：配置中心原地修改字段，阈值在下一个检查周期即生效
+    global _CONFIG
+    _CONFIG = plugin_config
+
+
+def _threshold_ms() -> float:
+    try:
+        value = float(getattr(_CONFIG, "personification_loop_block_threshold_ms", _DEFAULT_THRESHOLD_MS))
+    except (TypeError, ValueError):
+        value = _DEFAULT_THRESHOLD_MS
+    return max(0.0, value)
+
+
+def _short_path(filename: str) -> str:
+    path = os.path.abspath(filename)
+    if path.startswith(_PACKAGE_DIR + os.sep):
+        return os.path.relpath(path, os.path.dirname(_PACKAGE_DIR)).replace(os.sep, "/")
+    return os.path.basename(path)
+
+
+def _format_stack(frame: Any) -> list[str]:
+    lines: list[str] = []
+    for entry in traceback.extract_stack(frame):
+        if any(part in entry.filename for part in _SKIP_PATH_PARTS):
+            continue
+        lines.append(f"{_short_path(entry.filename)}:{entry.lineno} in {entry.name}")
+    return lines[-_MAX_STACK_DEPTH:]
+
+
+def _culprit(stack: list[str]) -> str:
+    # 优先报插件内最深的一帧；全部是第三方/标准库时报最深帧
+    for line in reversed(stack):
+        if line.startswith(os.path.basename(_PACKAGE_DIR) + "/") and "loop_watchdog.py" not in line:
+            return line
+    return stack[-1] if stack else "<unknown>"
+
+
+def _capture(beat_seq: int) -> None:
+    global _CAPTURED
+    thread_id = _LOOP_THREAD_ID
+    if thread_id is None:
+        return
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return
+    stack = _format_stack(frame)
+    with _LOCK:
+        if _BEAT_SEQ == beat_seq:
+            _CAPTURED = (beat_seq, tuple(stack), stack)
+
+
+def _watch(stop: threading.Event) -> None:
+    captured_seq = -1
+    while not stop.is_set():
+        threshold = _threshold_ms() / 1000.0
+        if threshold <= 0:
+            stop.wait(1.0)
+            continue
+        stop.wait(max(0.01, threshold / 4))
+        with _LOCK:
+            beat_seq, beat_due = _BEAT_SEQ, _BEAT_DUE
+        if beat_seq != captured_seq and beat_due and time.monotonic() - beat_due >= threshold:
+            captured_seq = beat_seq
+            _capture(beat_seq)
+
+
+def _record_stall(beat_seq: int, blocked_ms: float) -> None:
+    global _CAPTURED, _STALLS_TOTAL, _UNCAPTURED_TOTAL
+    with _LOCK:
+        captured = _CAPTURED if _CAPTURED is not None and _CAPTURED[0] == beat_seq else None
+        _CAPTURED = None
+        _STALLS_TOTAL += 1
+        if captured is None:
+            _UNCAPTURED_TOTAL += 1
+            return
+        _seq, key, stack = captured
+        entry = _OFFENDERS.get(key)
+        if entry is None:
+            if len(_OFFENDERS) >= _MAX_OFFENDERS:
+                smallest = min(_OFFENDERS, key=lambda item: _OFFENDERS[item]["total_ms"])
+                del _OFFENDERS[smallest]
+            entry = _OFFENDERS[key] = {
+                "culprit": _culprit(stack),
+                "stack": stack,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "last_at": 0.0,
+            }
+        entry["count"] += 1
+        entry["total_ms"] += blocked_ms
+        entry["max_ms"] = max(entry["max_ms"], blocked_ms)
+        entry["last_at"] = time.time()
+
+
+async def run_loop_watchdog() -> None:
+    """心跳协程，同时负责拉起和停止看门狗线程；由 runtime_task_supervisor 托管。"""
+    global _LOOP_THREAD_ID, _BEAT_SEQ, _BEAT_DUE
+    _LOOP_THREAD_ID = threading.get_ident()
+    stop = threading.Event()
+    watcher = threading.Thread(target=_watch, args=(stop,), name="personification-loop-watchdog", daemon=True)
+    watcher.start()
+    try:
+        while True:
+            threshold = _threshold_ms() / 1000.0
+            interval = min(0.1, threshold / 2) if threshold > 0 else 1.0
+            with _LOCK:
+                _BEAT_SEQ += 1
+                beat_seq = _BEAT_SEQ
+                _BEAT_DUE = due = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            overrun = time.monotonic() - due
+            if threshold > 0 and overrun >= threshold:
+                _record_stall(beat_seq, overrun * 1000.0)
+    finally:
+        stop.set()
+        with _LOCK:
+            _BEAT_DUE = 0.0
+
+
+def blocking_snapshot(*, limit: int = 10) -> dict[str, Any]:
+    with _LOCK:
+        offenders = [dict(entry, stack=list(entry["stack"])) for entry in _OFFENDERS.values()]
+        stalls, uncaptured = _STALLS_TOTAL, _UNCAPTURED_TOTAL
+    offenders.sort(key=lambda item: (-float(item["total_ms"]), -int(item["count"])))
+    return {
+        "threshold_ms": _threshold_ms(),
+        "stalls": stalls,
+        "uncaptured": uncaptured,
+        "offenders": [
+            {
+                **item,
+                "total_ms": round(float(item["total_ms"]), 1),
+                "max_ms": round(float(item["max_ms"]), 1),
+            }
+            for item in offenders[: max(1, int(limit or 10))]
+        ],
+    }
+
+
+def reset_for_testing() -> None:
+    global _CONFIG, _CAPTURED, _STALLS_TOTAL, _UNCAPTURED_TOTAL
+    with _LOCK:
+        _OFFENDERS.clear()
+        _CAPTURED = None
+        _STALLS_TOTAL = 0
+        _UNCAPTURED_TOTAL = 0
+    _CONFIG = None
+
+
+__all__ = [
+    "blocking_snapshot",
+    "configure_loop_watchdog",
+    "reset_for_testing",
+    "run_loop_watchdog",
+]
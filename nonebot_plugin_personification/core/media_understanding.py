@@ -15,6 +15,7 @@ import httpx
 from .ai_routes import resolve_video_fallback_provider
 from .audio_transcription import resolve_transcription_settings, transcribe_audio_file
 from .gemini_transport import raise_for_gemini_status, request_with_gemini_auth
+from .http_clients import shared_http_client
 from .image_input import is_image_input_unsupported_error, provider_supports_vision
 from .sensitive_data import sanitize_text
 from .media_refs import normalize_audio_ref, normalize_video_ref
@@ -869,7 +870,7 @@ async def _call_qwen_omni_media(
     if selected_model.startswith("qwen3-omni-flash"):
         payload["enable_thinking"] = False
     bounded_timeout = max(20.0, min(300.0, float(timeout or 180.0)))
-    async with httpx.AsyncClient(
+    async with shared_http_client(
         timeout=httpx.Timeout(bounded_timeout, connect=15.0),
         follow_redirects=False,
     ) as client:
@@ -980,7 +981,7 @@ async def _call_mimo_media(
         raise ValueError("mimo_media_missing")
     content.append({"type": "text", "text": str(prompt or "").strip() or "请分析这段音视频内容"})
     bounded_timeout = max(20.0, min(600.0, float(timeout or 300.0)))
-    async with httpx.AsyncClient(
+    async with shared_http_client(
         timeout=httpx.Timeout(bounded_timeout, connect=15.0),
         follow_redirects=False,
     ) as client:
@@ -1054,7 +1055,7 @@ async def _call_custom_video_url_media(
     content.append({"type": "text", "text": str(prompt or "").strip() or "请分析这段视频内容"})
     use_stream = bool(stream)
     bounded_timeout = max(20.0, min(900.0, float(timeout or 600.0)))
-    async with httpx.AsyncClient(
+    async with shared_http_client(
         timeout=httpx.Timeout(bounded_timeout, connect=15.0),
         follow_redirects=False,
     ) as client:
@@ -1307,7 +1308,7 @@ async def _call_gemini_media(
     for ref in image_refs:
         parts.append(_gemini_image_part(str(ref or "").strip()))
     endpoint = _gemini_endpoint(base_url, model or _GEMINI_DEFAULT_MODEL)
-    async with httpx.AsyncClient(
+    async with shared_http_client(
         timeout=httpx.Timeout(90.0, connect=15.0),
         follow_redirects=False,
     ) as client:
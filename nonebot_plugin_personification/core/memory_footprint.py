@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from . import metrics
+
+
+# 进程内缓存的内存台账：各模块用 runtime_performance.register_cache_reporter(..., footprint=...) 登记
+# 长寿命容器，后台周期性估算条目数与近似深度大小。
+# 估算按抽样外推（每层最多看 _SAMPLE_ITEMS 个子元素，单个缓存最多访问 _NODE_BUDGET 个对象），
+# 结果是数量级参考而不是精确值；超过预算时记一次告警，回落后解除。
+_DEFAULT_INTERVAL_SECONDS = 300.0
+_DEFAULT_BUDGET_MB = 32.0
+_SAMPLE_ITEMS = 32
+_MAX_DEPTH = 5
+_NODE_BUDGET = 4000
+_MAX_ALERTS = 20
+_TRACEMALLOC_FRAMES = 10
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None), range)
+# 不往里走的对象：模块、类、函数、协程/任务与锁等运行时对象，它们引用的是整个程序而不是缓存数据
+_OPAQUE_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CodeType,
+    types.FrameType,
+    types.CoroutineType,
+    types.GeneratorType,
+    asyncio.Future,
+    asyncio.AbstractEventLoop,
+    threading.Thread,
+    type(threading.Lock()),
+    type(threading.RLock()),
+)
+
+_LOCK = threading.Lock()
+_CONFIG: Any = None
+_LOGGER: Any = None
+_LAST: dict[str, dict[str, Any]] = {}
+_LAST_SAMPLED_AT = 0.0
+_LAST_SAMPLE_MS = 0.0
+_ALERTS: list[dict[str, Any]] = []
+_TRACE_BASELINE: tracemalloc.Snapshot | None = None
+_TRACE_BASELINE_AT = 0.0
+_TRACE_STARTED_HERE = False
+
+
+def configure_memory_footprint(plugin_config: Any, *, logger: Any = None) -> None:
+    # 持有配置对象本身：配置中心原地修改字段，间隔与默认预算在下一轮即生效
+    global _CONFIG, _LOGGER
+    _CONFIG = plugin_config
+    if logger is not None:
+        _LOGGER = logger
+
+
+def _config_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(getattr(_CONFIG, name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _registered_roots() -> list[tuple[str, Callable[[], Any], int | None]]:
+    # runtime_performance 的快照里引用本模块，登记表只能在调用时取
+    from .runtime_performance import cache_footprint_roots
+
+    return cache_footprint_roots()
+
+
+def _children(obj: Any) -> list[Any] | None:
+    # list(...) 在 C 层一次性拷贝，工作线程遍历时不会因事件循环线程同时改动容器而报错
+    if isinstance(obj, dict):
+        return [value for pair in list(obj.items()) for value in pair]
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return list(obj)
+    attrs = getattr(obj, "__dict__", None)
+    if isinstance(attrs, dict):
+        return [attrs]
+    slots = getattr(type(obj), "__slots__", None)
+    if slots:
+        names = (slots,) if isinstance(slots, str) else tuple(slots)
+        return [getattr(obj, slot) for slot in names if hasattr(obj, slot)]
+    return None
+
+
+class _Walker:
+    def __init__(self) -> None:
+        self.seen: set[int] = set()
+        self.nodes = 0
+
+    def size(self, obj: Any, depth: int) -> float:
+        if id(obj) in self.seen:
+            return 0.0
+        self.seen.add(id(obj))
+        self.nodes += 1
+        try:
+            shallow = float(sys.getsizeof(obj, 0))
+        except TypeError:
+            shallow = 0.0
+        if (
+            depth >= _MAX_DEPTH
+            or self.nodes >= _NODE_BUDGET
+            or isinstance(obj, _ATOMIC_TYPES)
+            or isinstance(obj, _OPAQUE_TYPES)
+        ):
+            return shallow
+        children = _children(obj)
+        if not children:
+            return shallow
+        if len(children) <= _SAMPLE_ITEMS:
+            return shallow + sum(self.size(child, depth + 1) for child in children)
+        # 等距抽样后按比例外推；dict 的 key/value 成对保留
+        step = len(children) / _SAMPLE_ITEMS
+        paired = isinstance(obj, dict)
+        picked: list[Any] = []
+        for index in range(_SAMPLE_ITEMS):
+            position = int(index * step)
+            if paired:
+                position -= position % 2
+                picked.extend(children[position:position + 2])
+            else:
+                picked.append(children[position])
+        sampled = sum(self.size(child, depth + 1) for child in picked)
+        return shallow + sampled * len(children) / max(1, len(picked))
+
+
+def estimate_deep_size(obj: Any) -> int:
+    """抽样估算 obj 及其引用对象的近似字节数。"""
+    return int(_Walker().size(obj, 0))
+
+
+def _entry_count(obj: Any) -> int | None:
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+def _measure(name: str, source: Callable[[], Any], budget: int | None) -> dict[str, Any]:
+    try:
+        target = source()
+        approx = estimate_deep_size(target)
+        entries = _entry_count(target)
+        error = ""
+    except Exception as exc:
+        approx, entries, error = 0, None, type(exc).__name__
+    if budget is None:
+        budget = int(_config_float("personification_cache_memory_budget_mb", _DEFAULT_BUDGET_MB) * 1024 * 1024)
+    return {
+        "name": name,
+        "entries": entries,
+        "approx_bytes": approx,
+        "budget_bytes": budget,
+        "over_budget": bool(budget and approx > budget),
+        "error": error,
+    }
+
+
+def sample_footprints() -> list[dict[str, Any]]:
+    """估算全部登记容器并更新台账；耗时与抽样规模相关，应放到线程池里跑。"""
+    global _LAST_SAMPLED_AT, _LAST_SAMPLE_MS
+    registry = _registered_roots()
+    started = time.perf_counter()
+    rows = [_measure(name, source, budget) for name, source, budget in registry]
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    now = time.time()
+    crossed: list[dict[str, Any]] = []
+    with _LOCK:
+        for row in rows:
+            previous = _LAST.get(row["name"])
+            row["growth_bytes"] = row["approx_bytes"] - int(previous["approx_bytes"]) if previous else 0
+            if row["over_budget"] and not (previous or {}).get("over_budget"):
+                alert = {
+                    "name": row["name"],
+                    "approx_bytes": row["approx_bytes"],
+                    "budget_bytes": row["budget_bytes"],
+                    "entries": row["entries"],
+                    "at": now,
+                }
+                _ALERTS.append(alert)
+                del _ALERTS[:-_MAX_ALERTS]
+                crossed.append(alert)
+            _LAST[row["name"]] = row
+        for stale in set(_LAST) - {row["name"] for row in rows}:
+            _LAST.pop(stale, None)
+        _LAST_SAMPLED_AT = now
+        _LAST_SAMPLE_MS = elapsed_ms
+    for row in rows:
+        metrics.set_gauge("cache_memory_approx_bytes", row["approx_bytes"], cache=row["name"])
+    for alert in crossed:
+        metrics.record_counter("cache_memory_budget_exceeded", cache=alert["name"])
+        if _LOGGER is not None:
+            _LOGGER.warning(
+                f"[memory] 缓存 {alert['name']} 估算占用 {alert['approx_bytes'] / 1048576:.1f} MB，"
+                f"超过预算 {alert['budget_bytes'] / 1048576:.1f} MB（{alert['entries']} 条）"
+            )
+    return rows
+
+
+async def run_memory_footprint_sampler() -> None:
+    """后台周期估算；由 runtime_task_supervisor 托管，间隔为 0 时只空转等待配置变化。"""
+    while True:
+        interval = _config_float("personification_memory_footprint_interval_seconds", _DEFAULT_INTERVAL_SECONDS)
+        if interval <= 0:
+            await asyncio.sleep(60.0)
+            continue
+        await asyncio.sleep(max(10.0, interval))
+        await asyncio.to_thread(sample_footprints)
+
+
+def tracemalloc_status() -> dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "tracing": tracing,
+        "started_here": _TRACE_STARTED_HERE,
+        "baseline_at": _TRACE_BASELINE_AT or None,
+        "traced_bytes": current,
+        "peak_bytes": peak,
+    }
+
+
+def _filtered_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        )
+    )
+
+
+def start_tracemalloc(*, frames: int = _TRACEMALLOC_FRAMES) -> dict[str, Any]:
+    """开启 tracemalloc 并记录基线；开启后每次分配都有额外开销，诊断完应及时关闭。"""
+    global _TRACE_BASELINE, _TRACE_BASELINE_AT, _TRACE_STARTED_HERE
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, min(25, int(frames or _TRACEMALLOC_FRAMES))))
+        _TRACE_STARTED_HERE = True
+    _TRACE_BASELINE = _filtered_snapshot()
+    _TRACE_BASELINE_AT = time.time()
+    return tracemalloc_status()
+
+
+def tracemalloc_diff(*, limit: int = 20, reset_baseline: bool = False) -> dict[str, Any]:
+    """与基线比较，按分配位置列出净增长最多的行；未开启时抛 RuntimeError。"""
+    global _TRACE_BASELINE, _TRACE_BASELINE_AT
+    if not tracemalloc.is_tracing() or _TRACE_BASELINE is None:
+        raise RuntimeError("tracemalloc is not running")
+    current = _filtered_snapshot()
+    stats = current.compare_to(_TRACE_BASELINE, "lineno")
+    baseline_at = _TRACE_BASELINE_AT
+    if reset_baseline:
+        _TRACE_BASELINE = current
+        _TRACE_BASELINE_AT = time.time()
+    top = [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}" if stat.traceback else "<unknown>",
+            "size_diff_bytes": stat.size_diff,
+            "size_bytes": stat.size,
+            "count_diff": stat.count_diff,
+            "count": stat.count,
+        }
+        for stat in stats[: max(1, min(100, int(limit or 20)))]
+    ]
+    return {
+        "baseline_at": baseline_at,
+        "compared_at": time.time(),
+        "total_diff_bytes": sum(stat.size_diff for stat in stats),
+        "top": top,
+        **{key: value for key, value in tracemalloc_status().items() if key != "baseline_at"},
+    }
+
+
+def stop_tracemalloc() -> dict[str, Any]:
+    """关闭由这里开启的 tracemalloc；外部（如 PYTHONTRACEMALLOC）开启的只丢弃基线。"""
+    global _TRACE_BASELINE, _TRACE_BASELINE_AT, _TRACE_STARTED_HERE
+    if _TRACE_STARTED_HERE and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _TRACE_STARTED_HERE = False
+    _TRACE_BASELINE = None
+    _TRACE_BASELINE_AT = 0.0
+    return tracemalloc_status()
+
+
+def footprint_snapshot() -> dict[str, Any]:
+    """返回最近一轮估算结果（不触发新估算），按估算大小倒序。"""
+    with _LOCK:
+        items = [dict(row) for row in _LAST.values()]
+        alerts = [dict(item) for item in _ALERTS]
+        sampled_at, sample_ms = _LAST_SAMPLED_AT, _LAST_SAMPLE_MS
+    registered = len(_registered_roots())
+    items.sort(key=lambda row: (-int(row["approx_bytes"]), row["name"]))
+    return {
+        "sampled_at": sampled_at or None,
+        "sample_ms": round(sample_ms, 1),
+        "registered": registered,
+        "total_approx_bytes": sum(int(row["approx_bytes"]) for row in items),
+        "items": items,
+        "alerts": list(reversed(alerts)),
+        "tracemalloc": tracemalloc_status(),
+    }
+
+
+def reset_for_testing() -> None:
+    global _CONFIG, _LOGGER, _LAST_SAMPLED_AT, _LAST_SAMPLE_MS
+    stop_tracemalloc()
+    with _LOCK:
+        _LAST.clear()
+        _ALERTS.clear()
+        _LAST_SAMPLED_AT = 0.0
+        _LAST_SAMPLE_MS = 0.0
+    _CONFIG = None
+    _LOGGER = None
+
+
+__all__ = [
+    "configure_memory_footprint",
+    "estimate_deep_size",
+    "footprint_snapshot",
+    "reset_for_testing",
+    "run_memory_footprint_sampler",
+    "sample_footprints",
+    "start_tracemalloc",
+    "stop_tracemalloc",
+    "tracemalloc_diff",
+    "tracemalloc_status",
+]
@@ -15,6 +15,7 @@ import re
 from typing import Any, Callable
 
 from .embedding_index import normalize_text, tokenize
+from .llm_singleflight import PURPOSE_MEMORY_RECALL_GATE, coalesced_chat
 
 
 _SOCIAL_SOURCE_KINDS = {"social_mcp_summary", "social_video_observation"}
@@ -171,7 +172,12 @@ async def _semantic_gate(
     ]
     try:
         response = await asyncio.wait_for(
-            tool_caller.chat_with_tools(messages=messages, tools=[], use_builtin_search=False),
+            coalesced_chat(
+                tool_caller,
+                messages,
+                lambda: tool_caller.chat_with_tools(messages=messages, tools=[], use_builtin_search=False),
+                purpose=PURPOSE_MEMORY_RECALL_GATE,
+            ),
             timeout=max(0.1, float(timeout_seconds or 1.5)),
         )
     except asyncio.TimeoutError:
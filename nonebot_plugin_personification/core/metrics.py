@@ -1,112 +1,273 @@
 from __future__ import annotations
 
+import re
 import threading
-from collections import defaultdict, deque
+from bisect import bisect_left
+from collections import defaultdict
 from contextlib import contextmanager
-from math import ceil
 from typing import Any, Iterator
 
 
 _LOCK = threading.RLock()
 _MAX_SERIES = 256
-_MAX_TIMING_SAMPLES = 128
+_MAX_DROPPED_NAMES = 64
 _COUNTER_OVERFLOW_KEY = "metrics_overflow{kind=counter}"
 _TIMING_OVERFLOW_KEY = "metrics_overflow{kind=timing}"
+_GAUGE_OVERFLOW_KEY = "metrics_overflow{kind=gauge}"
+_OVERFLOW_KEYS = {
+    "counter": _COUNTER_OVERFLOW_KEY,
+    "timing": _TIMING_OVERFLOW_KEY,
+    "gauge": _GAUGE_OVERFLOW_KEY,
+}
+# 对数线性分桶（毫秒）：每个数量级 1/1.5/2/3/5/7.5 六档，覆盖 1ms~12.5min，超出落 +Inf。
+# 所有耗时序列共用同一组边界，计数可直接相加合并，分位数误差不超过相邻两档之差。
+HISTOGRAM_BOUNDS_MS: tuple[float, ...] = tuple(
+    float(multiplier * 10**exponent)
+    for exponent in range(0, 6)
+    for multiplier in (1, 1.5, 2, 3, 5, 7.5)
+)
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+_METRIC_PREFIX = "personification_"
+
+_Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """固定边界直方图；counts[i] 为落在 (bounds[i-1], bounds[i]] 的样本数，末位为 +Inf。"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(HISTOGRAM_BOUNDS_MS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "Histogram") -> None:
+        for index, value in enumerate(other.counts):
+            self.counts[index] += value
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """桶内线性插值估算分位数，与 Prometheus histogram_quantile 一致；不超过观测最大值。"""
+        if self.count <= 0:
+            return 0.0
+        rank = max(0.0, min(1.0, float(q))) * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count <= 0 or cumulative + bucket_count < rank:
+                cumulative += bucket_count
+                continue
+            lower = HISTOGRAM_BOUNDS_MS[index - 1] if index > 0 else 0.0
+            upper = HISTOGRAM_BOUNDS_MS[index] if index < len(HISTOGRAM_BOUNDS_MS) else self.max
+            estimate = lower + (upper - lower) * ((rank - cumulative) / bucket_count)
+            return min(estimate, self.max)
+        return self.max
+
+    def copy(self) -> "Histogram":
+        clone = Histogram()
+        clone.merge(self)
+        return clone
+
+
 _COUNTERS: dict[str, int] = defaultdict(int)
-_TIMINGS: dict[str, dict[str, Any]] = {}
+_TIMINGS: dict[str, Histogram] = {}
+_GAUGES: dict[str, float] = {}
+_SERIES_META: dict[str, tuple[str, _Labels]] = {}
+_DROPPED: dict[str, int] = defaultdict(int)
 _OVERFLOW_TOTAL = 0
 
 
-def _metric_key(name: str, labels: dict[str, Any] | None = None) -> str:
-    metric_name = str(name or "").strip() or "unnamed_metric"
+def _normalize_labels(labels: dict[str, Any] | None) -> _Labels:
     payload = dict(labels or {})
-    if not payload:
-        return metric_name
-    suffix = ",".join(
-        f"{str(key).strip()}={str(payload[key]).strip()}"
+    return tuple(
+        (str(key).strip(), str(payload[key]).strip())
         for key in sorted(payload)
         if str(key).strip()
     )
-    return f"{metric_name}{{{suffix}}}" if suffix else metric_name
 
 
-def _bounded_key(key: str, *, kind: str) -> str:
+def _metric_key(name: str, labels: dict[str, Any] | None = None) -> str:
+    metric_name = str(name or "").strip() or "unnamed_metric"
+    normalized = _normalize_labels(labels)
+    if not normalized:
+        return metric_name
+    suffix = ",".join(f"{key}={value}" for key, value in normalized)
+    return f"{metric_name}{{{suffix}}}"
+
+
+def _bounded_key(name: str, labels: dict[str, Any] | None, *, kind: str) -> str:
     global _OVERFLOW_TOTAL
-    own = _COUNTERS if kind == "counter" else _TIMINGS
+    metric_name = str(name or "").strip() or "unnamed_metric"
+    key = _metric_key(metric_name, labels)
+    own = _COUNTERS if kind == "counter" else _TIMINGS if kind == "timing" else _GAUGES
     if key in own:
         return key
     # Reserve one overflow bucket for each metric kind so the total never
     # exceeds the documented process-wide limit.
-    regular_limit = _MAX_SERIES - 2
-    if len(_COUNTERS) + len(_TIMINGS) < regular_limit:
+    regular_limit = _MAX_SERIES - len(_OVERFLOW_KEYS)
+    if len(_COUNTERS) + len(_TIMINGS) + len(_GAUGES) < regular_limit:
+        _SERIES_META[key] = (metric_name, _normalize_labels(labels))
         return key
     _OVERFLOW_TOTAL += 1
-    return _COUNTER_OVERFLOW_KEY if kind == "counter" else _TIMING_OVERFLOW_KEY
-
-
-def _new_timing_bucket() -> dict[str, Any]:
-    return {
-        "count": 0.0,
-        "total_ms": 0.0,
-        "max_ms": 0.0,
-        "samples": deque(maxlen=_MAX_TIMING_SAMPLES),
-    }
-
-
-def _percentile(values: list[float], percentile: float) -> float:
-    if not values:
-        return 0.0
-    ordered = sorted(values)
-    index = max(0, min(len(ordered) - 1, ceil(percentile * len(ordered)) - 1))
-    return float(ordered[index])
+    if metric_name in _DROPPED or len(_DROPPED) < _MAX_DROPPED_NAMES:
+        _DROPPED[metric_name] += 1
+    overflow_key = _OVERFLOW_KEYS[kind]
+    _SERIES_META.setdefault(overflow_key, ("metrics_overflow", (("kind", kind),)))
+    return overflow_key
 
 
 def record_counter(name: str, amount: int = 1, **labels: Any) -> None:
     with _LOCK:
-        key = _bounded_key(_metric_key(name, labels), kind="counter")
+        key = _bounded_key(name, labels, kind="counter")
         _COUNTERS[key] += int(amount or 0)
 
 
 def record_timing(name: str, duration_ms: float, **labels: Any) -> None:
     value = max(0.0, float(duration_ms or 0.0))
     with _LOCK:
-        key = _bounded_key(_metric_key(name, labels), kind="timing")
-        bucket = _TIMINGS.setdefault(key, _new_timing_bucket())
-        bucket["count"] += 1.0
-        bucket["total_ms"] += value
-        bucket["max_ms"] = max(bucket["max_ms"], value)
-        bucket["samples"].append(value)
+        key = _bounded_key(name, labels, kind="timing")
+        histogram = _TIMINGS.get(key)
+        if histogram is None:
+            histogram = _TIMINGS[key] = Histogram()
+        histogram.observe(value)
+
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    with _LOCK:
+        key = _bounded_key(name, labels, kind="gauge")
+        _GAUGES[key] = float(value or 0.0)
 
 
 def snapshot_metrics() -> dict[str, Any]:
     with _LOCK:
         counters = [{"name": key, "value": int(value)} for key, value in _COUNTERS.items()]
+        gauges = [{"name": key, "value": float(value)} for key, value in _GAUGES.items()]
         timings = []
-        for key, bucket in _TIMINGS.items():
-            count = float(bucket.get("count", 0.0) or 0.0)
-            total_ms = float(bucket.get("total_ms", 0.0) or 0.0)
-            samples = [float(value) for value in bucket.get("samples", ())]
+        for key, histogram in _TIMINGS.items():
+            count = histogram.count
             timings.append(
                 {
                     "name": key,
-                    "count": int(count),
-                    "total_ms": round(total_ms, 2),
-                    "avg_ms": round(total_ms / count, 2) if count > 0 else 0.0,
-                    "max_ms": round(float(bucket.get("max_ms", 0.0) or 0.0), 2),
-                    "recent_count": len(samples),
-                    "recent_max_ms": round(max(samples), 2) if samples else 0.0,
-                    "p50_ms": round(_percentile(samples, 0.50), 2),
-                    "p95_ms": round(_percentile(samples, 0.95), 2),
+                    "count": count,
+                    "total_ms": round(histogram.total, 2),
+                    "avg_ms": round(histogram.total / count, 2) if count > 0 else 0.0,
+                    "max_ms": round(histogram.max, 2),
+                    "p50_ms": round(histogram.quantile(0.50), 2),
+                    "p95_ms": round(histogram.quantile(0.95), 2),
+                    "p99_ms": round(histogram.quantile(0.99), 2),
                 }
             )
         series = {
             "limit": _MAX_SERIES,
-            "used": len(_COUNTERS) + len(_TIMINGS),
+            "used": len(_COUNTERS) + len(_TIMINGS) + len(_GAUGES),
             "overflow_total": _OVERFLOW_TOTAL,
+            "dropped": dict(sorted(_DROPPED.items())),
         }
     counters.sort(key=lambda item: (-int(item["value"]), str(item["name"])))
     timings.sort(key=lambda item: (-float(item["total_ms"]), str(item["name"])))
-    return {"counters": counters, "timings": timings, "series": series}
+    gauges.sort(key=lambda item: str(item["name"]))
+    return {"counters": counters, "timings": timings, "gauges": gauges, "series": series}
+
+
+def _family_name(name: str, suffix: str = "") -> str:
+    cleaned = re.sub(r"[^a-zA-Z0-9_:]", "_", str(name or ""))
+    return f"{_METRIC_PREFIX}{cleaned}{suffix}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: _Labels, *extra: tuple[str, str]) -> str:
+    pairs = [
+        (re.sub(r"[^a-zA-Z0-9_]", "_", key) or "_", value)
+        for key, value in (*labels, *extra)
+    ]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+_SAMPLE_SUFFIXES = {"counter": ("_total",), "gauge": ("",), "histogram": ("_bucket", "_count", "_sum")}
+
+
+def render_openmetrics() -> str:
+    """按 OpenMetrics 文本格式导出全部序列；耗时按 Prometheus 惯例换算成秒。"""
+    with _LOCK:
+        meta = dict(_SERIES_META)
+        counters = dict(_COUNTERS)
+        gauges = dict(_GAUGES)
+        timings = {key: histogram.copy() for key, histogram in _TIMINGS.items()}
+        dropped = dict(_DROPPED)
+
+    families: dict[str, tuple[str, list[str]]] = {}
+    # 族名与各族的样本名（counter 的 *_total、histogram 的 *_bucket 等）共用一个命名空间
+    taken: set[str] = set()
+
+    def _family(name: str, kind: str, unit: str = "") -> tuple[str, list[str]]:
+        entry = families.get(name)
+        if entry is not None and entry[0] == kind:
+            return name, entry[1]
+        suffixes = _SAMPLE_SUFFIXES[kind]
+        if name in taken or any(f"{name}{suffix}" in taken for suffix in suffixes):
+            # 与其它类型的族撞名：后出现的一族加上类型后缀
+            name = f"{name}_{kind}"
+            entry = families.get(name)
+            if entry is not None:
+                return name, entry[1]
+        header = [f"# TYPE {name} {kind}"]
+        if unit:
+            header.append(f"# UNIT {name} {unit}")
+        families[name] = (kind, header)
+        taken.add(name)
+        taken.update(f"{name}{suffix}" for suffix in suffixes)
+        return name, header
+
+    for key in sorted(counters):
+        name, labels = meta.get(key, (key, ()))
+        # 计数器按惯例已命名为 *_total 的，族名去掉后缀，导出时不会变成 *_total_total
+        family, lines = _family(_family_name(re.sub(r"_total$", "", name)), "counter")
+        lines.append(f"{family}_total{_format_labels(labels)} {counters[key]}")
+    for key in sorted(gauges):
+        name, labels = meta.get(key, (key, ()))
+        family, lines = _family(_family_name(name), "gauge")
+        lines.append(f"{family}{_format_labels(labels)} {_format_value(gauges[key])}")
+    for key in sorted(timings):
+        name, labels = meta.get(key, (key, ()))
+        family, lines = _family(_family_name(name, "_seconds"), "histogram", "seconds")
+        histogram = timings[key]
+        cumulative = 0
+        for bound, bucket_count in zip(HISTOGRAM_BOUNDS_MS, histogram.counts):
+            cumulative += bucket_count
+            lines.append(
+                f"{family}_bucket{_format_labels(labels, ('le', repr(bound / 1000.0)))} {cumulative}"
+            )
+        lines.append(f"{family}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+        lines.append(f"{family}_count{_format_labels(labels)} {histogram.count}")
+        lines.append(f"{family}_sum{_format_labels(labels)} {_format_value(histogram.total / 1000.0)}")
+    if dropped:
+        family, lines = _family(_family_name("metrics_dropped_samples"), "counter")
+        for name in sorted(dropped):
+            lines.append(f"{family}_total{_format_labels((('metric', name),))} {dropped[name]}")
+
+    out: list[str] = []
+    for _kind, lines in families.values():
+        out.extend(lines)
+    out.append("# EOF")
+    return "\n".join(out) + "\n"
 
 
 def format_metrics_snapshot(*, top_n: int = 8) -> str:
@@ -116,7 +277,7 @@ def format_metrics_snapshot(*, top_n: int = 8) -> str:
         for item in list(snapshot["counters"])[: max(1, int(top_n or 1))]
     ]
     timing_lines = [
-        f"- {item['name']}: count={item['count']} avg={item['avg_ms']}ms max={item['max_ms']}ms"
+        f"- {item['name']}: count={item['count']} avg={item['avg_ms']}ms p95={item['p95_ms']}ms max={item['max_ms']}ms"
         for item in list(snapshot["timings"])[: max(1, int(top_n or 1))]
     ]
     lines = ["运行时指标"]
@@ -132,6 +293,9 @@ def reset_metrics() -> None:
     with _LOCK:
         _COUNTERS.clear()
         _TIMINGS.clear()
+        _GAUGES.clear()
+        _SERIES_META.clear()
+        _DROPPED.clear()
         _OVERFLOW_TOTAL = 0
 
 
@@ -147,10 +311,15 @@ def timed_metric(name: str, **labels: Any) -> Iterator[None]:
 
 
 __all__ = [
+    "HISTOGRAM_BOUNDS_MS",
+    "Histogram",
+    "OPENMETRICS_CONTENT_TYPE",
     "format_metrics_snapshot",
     "record_counter",
     "record_timing",
+    "render_openmetrics",
     "reset_metrics",
+    "set_gauge",
     "snapshot_metrics",
     "timed_metric",
 ]
@@ -7,6 +7,7 @@ from pathlib import Path
 from typing import Any
 
 from .db import connect_sync, get_db_path
+from .group_chat_meta import import_legacy_chat_meta
 
 
 _MIGRATION_NAMESPACE = "__migration__"
@@ -141,7 +142,7 @@ def _migrate_chat_history(conn: Any, data_dir: Path) -> None:
                     float(msg.get("time", time.time()) or time.time()),
                 ),
             )
-    _kv_set(conn, "chat_history", metadata)
+    import_legacy_chat_meta(conn, metadata)
 
 
 def _migrate_session_histories(conn: Any, data_dir: Path) -> None:
@@ -15,23 +15,28 @@ import time
 from collections import OrderedDict
 from typing import Any, Iterable
 
+from .runtime_performance import register_cache_reporter
 from .user_profile_meta import build_user_profile_meta
 
 _DEFAULT_TTL_SECONDS = 1800  # 30 分钟
 _FAILURE_TTL_SECONDS = 15
 _GROUP_MEMBER_SUCCESS_TTL_SECONDS = 5 * 60
+_MESSAGE_TTL_SECONDS = 10 * 60
 _MAX_ENTRIES = 500
 
 _user_cache: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
 _user_profile_cache: "OrderedDict[str, tuple[float, dict[str, Any]]]" = OrderedDict()
 _group_cache: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
 _group_member_cache: "OrderedDict[str, tuple[float, tuple[bool, dict[str, Any]]]]" = OrderedDict()
+_message_cache: "OrderedDict[str, tuple[float, dict[str, Any] | None]]" = OrderedDict()
 _user_lock = asyncio.Lock()
 _group_lock = asyncio.Lock()
 _group_member_lock = asyncio.Lock()
+_message_lock = asyncio.Lock()
 _user_profile_inflight: dict[str, asyncio.Task[tuple[dict[str, Any], bool]]] = {}
 _group_inflight: dict[str, asyncio.Task[tuple[str, bool]]] = {}
 _group_member_inflight: dict[str, asyncio.Task[tuple[dict[str, Any], bool]]] = {}
+_message_inflight: dict[str, asyncio.Task[dict[str, Any] | None]] = {}
 
 
 def _scoped_key(bot: Any, value: str) -> str:
@@ -358,21 +363,94 @@ async def get_group_member_info(
     return dict(info) if success else None
 
 
+async def get_onebot_message(
+    bot: Any,
+    message_id: str | int,
+    *,
+    timeout_seconds: float = 15.0,
+) -> dict[str, Any] | None:
+    """按 message_id 调 `get_msg`，返回消息 payload；失败或超时返回 None。
+
+    引用消息内容不会变，成功结果缓存 10 分钟；并发的同一 message_id 共享一次
+    协议请求，单个调用方超时不会取消共享请求。
+    """
+    message_key = str(message_id or "").strip()
+    if bot is None or not message_key:
+        return None
+    key = _scoped_key(bot, message_key)
+    async with _message_lock:
+        item = _message_cache.get(key)
+        if item is not None and time.time() < item[0]:
+            _message_cache.move_to_end(key)
+            return dict(item[1]) if item[1] is not None else None
+
+    numeric_id = _numeric_onebot_id(message_key)
+    request_id: str | int = numeric_id if numeric_id is not None else message_key
+
+    async def fetch() -> dict[str, Any] | None:
+        try:
+            raw = await _call_onebot_api(bot, "get_msg", message_id=request_id)
+        except Exception:
+            return None
+        if isinstance(raw, dict):
+            data = raw.get("data")
+            if isinstance(data, dict) and data.get("message") is not None:
+                raw = data
+            return dict(raw)
+        return None
+
+    async with _message_lock:
+        task = _message_inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fetch())
+            _message_inflight[key] = task
+    try:
+        payload = await asyncio.wait_for(
+            asyncio.shield(task),
+            timeout=max(1.0, float(timeout_seconds or 15.0)),
+        )
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        if task.done():
+            async with _message_lock:
+                if _message_inflight.get(key) is task:
+                    _message_inflight.pop(key, None)
+    async with _message_lock:
+        _set_cached(
+            _message_cache,
+            key,
+            dict(payload) if payload is not None else None,
+            _MESSAGE_TTL_SECONDS if payload is not None else _FAILURE_TTL_SECONDS,
+        )
+    return dict(payload) if payload is not None else None
+
+
 def _clear_caches_for_testing() -> None:
     """仅供测试使用，清空两层缓存。"""
     _user_cache.clear()
     _user_profile_cache.clear()
     _group_cache.clear()
     _group_member_cache.clear()
+    _message_cache.clear()
     _user_profile_inflight.clear()
     _group_inflight.clear()
     _group_member_inflight.clear()
+    _message_inflight.clear()
+
+
+register_cache_reporter("onebot_user_cache", footprint=lambda: _user_cache)
+register_cache_reporter("onebot_user_profile_cache", footprint=lambda: _user_profile_cache)
+register_cache_reporter("onebot_group_cache", footprint=lambda: _group_cache)
+register_cache_reporter("onebot_group_member_cache", footprint=lambda: _group_member_cache)
+register_cache_reporter("onebot_message_cache", footprint=lambda: _message_cache)
 
 
 __all__ = [
     "get_group_member_info",
     "get_group_name",
     "get_group_name_map",
+    "get_onebot_message",
     "get_user_nickname",
     "get_user_profile",
 ]
@@ -5,6 +5,7 @@ import json
 from dataclasses import dataclass
 from typing import Any
 
+from .llm_singleflight import PURPOSE_POLICY_CLASSIFIER, coalesced_chat
 from .user_policy import (
     POLICY_CLASSIFIER_VERSION,
     PolicyAssessment,
@@ -92,7 +93,12 @@ class PolicyClassifier:
         ]
         try:
             response = await asyncio.wait_for(
-                self.caller.chat_with_tools(messages, [], False),
+                coalesced_chat(
+                    self.caller,
+                    messages,
+                    lambda: self.caller.chat_with_tools(messages, [], False),
+                    purpose=PURPOSE_POLICY_CLASSIFIER,
+                ),
                 timeout=self.timeout,
             )
         except asyncio.CancelledError:
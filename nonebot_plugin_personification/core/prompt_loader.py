@@ -7,6 +7,7 @@ from typing import Any, Callable, Dict, Optional, Union
 import yaml
 
 from .context_policy import ensure_prompt_injection_guard
+from .runtime_performance import register_cache_reporter
 
 
 AGENT_GUIDANCE_TEMPLATE = """=== 轻量工具约束（对用户不可见）===
@@ -261,3 +262,6 @@ def pick_ack_phrase(
     if not phrases:
         return ""
     return random.choice(phrases)
+
+
+register_cache_reporter("prompt_yaml_cache", footprint=lambda: _YAML_CACHE)
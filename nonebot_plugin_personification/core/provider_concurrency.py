@@ -0,0 +1,216 @@
+"""按 provider 的自适应并发上限（AIMD）：成功时加性增长，429 / 超时时乘性收缩。
+
+超出上限的请求按 purpose 分档排队：用户回复最先放行，主动消息其次，
+摘要、日记、知识构建等后台任务垫底；同档内先到先得。
+事后冷却（_mark_provider_failure）仍然保留，这里只负责在撞上限流之前先把突发压平。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Any
+
+from .metrics import record_counter, record_timing
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PROACTIVE = 1
+PRIORITY_BACKGROUND = 2
+_PRIORITY_LABELS = ("interactive", "proactive", "background")
+_PROACTIVE_PREFIXES = ("proactive", "inner_state_chat", "qzone")
+_BACKGROUND_PREFIXES = (
+    "memory_summarizer",
+    "inner_state_diary",
+    "diary",
+    "group_knowledge",
+    "group_style",
+    "group_schedule",
+    "user_persona",
+    "persona_template",
+)
+
+_DEFAULT_MAX_LIMIT = 8
+_DECREASE_FACTOR = 0.5
+# 同一波突发的多个 429 只收缩一次
+_DECREASE_COOLDOWN_SECONDS = 2.0
+_BACKOFF_ERROR_KINDS = frozenset({"rate_limit", "timeout"})
+
+_SEQ = itertools.count()
+
+
+def purpose_priority(purpose: str) -> int:
+    """未知 / 空 purpose 按交互请求处理，宁可多占名额也不把用户回复排到后台任务后面。"""
+    value = str(purpose or "").strip()
+    if value.startswith(_BACKGROUND_PREFIXES):
+        return PRIORITY_BACKGROUND
+    if value.startswith(_PROACTIVE_PREFIXES):
+        return PRIORITY_PROACTIVE
+    return PRIORITY_INTERACTIVE
+
+
+def concurrency_max(plugin_config: Any) -> int:
+    try:
+        value = int(getattr(plugin_config, "personification_provider_concurrency_max", _DEFAULT_MAX_LIMIT))
+    except (TypeError, ValueError):
+        value = _DEFAULT_MAX_LIMIT
+    return max(0, value)
+
+
+class _AdaptiveLimit:
+    def __init__(self, name: str, max_limit: int) -> None:
+        self.name = name
+        self.max_limit = max_limit
+        # 从上限的一半起步，先让流量证明 provider 吃得下
+        self.limit = float(max(1, math.ceil(max_limit / 2)))
+        self.in_flight = 0
+        self.waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self.acquired = 0
+        self.queued_total = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.decreases = 0
+        self.last_decrease_at = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return max(1, int(self.limit))
+
+    def set_max(self, max_limit: int) -> None:
+        if max_limit == self.max_limit:
+            return
+        self.max_limit = max_limit
+        self.limit = min(self.limit, float(max_limit))
+        self.wake()
+
+    def wake(self) -> None:
+        while self.waiters and self.in_flight < self.capacity:
+            _priority, _seq, future = heapq.heappop(self.waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def increase(self) -> None:
+        # 每个"满载窗口"（约 limit 次成功）加 1
+        if self.limit < self.max_limit:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    def decrease(self, now: float) -> None:
+        if now - self.last_decrease_at < _DECREASE_COOLDOWN_SECONDS:
+            return
+        self.limit = max(1.0, self.limit * _DECREASE_FACTOR)
+        self.decreases += 1
+        self.last_decrease_at = now
+        record_counter("provider_concurrency", outcome="decrease", provider=self.name)
+
+    def queued_by_priority(self) -> dict[str, int]:
+        counts = dict.fromkeys(_PRIORITY_LABELS, 0)
+        for priority, _seq, future in self.waiters:
+            if not future.done():
+                counts[_PRIORITY_LABELS[priority]] += 1
+        return counts
+
+
+_STATES: dict[str, _AdaptiveLimit] = {}
+
+
+class ProviderLease:
+    """一次 provider 调用占用的并发名额；调用结束后必须 release 一次。"""
+
+    __slots__ = ("_state", "_saturated", "_released", "wait_ms")
+
+    def __init__(self, state: _AdaptiveLimit | None, *, saturated: bool = False, wait_ms: float = 0.0) -> None:
+        self._state = state
+        self._saturated = saturated
+        self._released = False
+        self.wait_ms = wait_ms
+
+    def release(self, *, success: bool, error_kind: str = "") -> None:
+        state = self._state
+        if state is None or self._released:
+            return
+        self._released = True
+        state.in_flight = max(0, state.in_flight - 1)
+        if error_kind in _BACKOFF_ERROR_KINDS:
+            state.decrease(time.monotonic())
+        elif success and self._saturated:
+            # 只有真正顶到上限时的成功才说明还有余量，空闲时的成功不抬上限
+            state.increase()
+        state.wake()
+
+
+async def acquire(provider_name: str, plugin_config: Any, *, purpose: str = "") -> ProviderLease:
+    name = str(provider_name or "").strip()
+    max_limit = concurrency_max(plugin_config)
+    if not name or max_limit <= 0:
+        return ProviderLease(None)
+    state = _STATES.get(name)
+    if state is None:
+        state = _STATES[name] = _AdaptiveLimit(name, max_limit)
+    state.set_max(max_limit)
+
+    priority = purpose_priority(purpose)
+    started = time.monotonic()
+    future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+    heapq.heappush(state.waiters, (priority, next(_SEQ), future))
+    state.wake()
+    queued = not future.done()
+    if queued:
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 名额已经分到手但调用方被取消：还回去给下一个等待者
+                state.in_flight = max(0, state.in_flight - 1)
+                state.wake()
+            raise
+    wait_ms = (time.monotonic() - started) * 1000.0 if queued else 0.0
+    state.acquired += 1
+    if queued:
+        state.queued_total += 1
+        state.wait_ms_total += wait_ms
+        state.wait_ms_max = max(state.wait_ms_max, wait_ms)
+        record_timing("provider_queue_wait_ms", wait_ms, provider=name, priority=_PRIORITY_LABELS[priority])
+    return ProviderLease(state, saturated=state.in_flight >= state.capacity, wait_ms=wait_ms)
+
+
+def concurrency_snapshot() -> list[dict[str, Any]]:
+    items: list[dict[str, Any]] = []
+    for name, state in sorted(_STATES.items()):
+        queued = state.queued_by_priority()
+        items.append(
+            {
+                "provider": name,
+                "limit": round(state.limit, 2),
+                "max_limit": state.max_limit,
+                "in_flight": state.in_flight,
+                "queued": sum(queued.values()),
+                "queued_by_priority": queued,
+                "acquired": state.acquired,
+                "queued_total": state.queued_total,
+                "avg_wait_ms": round(state.wait_ms_total / state.queued_total, 2) if state.queued_total else 0.0,
+                "max_wait_ms": round(state.wait_ms_max, 2),
+                "decreases": state.decreases,
+            }
+        )
+    return items
+
+
+def reset_for_testing() -> None:
+    _STATES.clear()
+
+
+__all__ = [
+    "PRIORITY_BACKGROUND",
+    "PRIORITY_INTERACTIVE",
+    "PRIORITY_PROACTIVE",
+    "ProviderLease",
+    "acquire",
+    "concurrency_max",
+    "concurrency_snapshot",
+    "purpose_priority",
+    "reset_for_testing",
+]
@@ -2,7 +2,10 @@
 
 数据流：
 - `_call_provider_once` 每次真实请求 finally 调 `record_request_result`，
-  把 (latency_ms, success, error_kind) 累计到 SQLite provider_health_stats 表。
+  把 (latency_ms, success, error_kind) 累计到进程内的 per-provider 状态；
+  只持有该 provider 自己的锁，不做任何 I/O。
+- 状态只在启动时（线程里）从 SQLite provider_health_stats 表载入一次，热路径只读写内存；
+  后台任务定期把变更过的 provider 批量写回，关闭插件时再写一次。
 - avg_latency_ms 用 EMA（α=0.3）平滑，避免单次极端值剧烈影响排序。
 - `get_provider_candidates` 排序时调 `compute_effective_priority`：
     effective = base_priority + latency_penalty + failure_penalty
@@ -14,22 +17,117 @@
 """
 from __future__ import annotations
 
+import asyncio
 import threading
 import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Any
 
-from .db import connect_sync
+from .db import connect_sync, get_db_path
 
 # EMA 平滑系数：α=0.3 让新样本权重 30%，老平均权重 70%
 _EMA_ALPHA = 0.3
 
-# stats 写入并发：sqlite WAL 已经足够，但加进程内锁防止
-# record_request_result 在不同 asyncio worker 同时跑时引发 OperationalError
+# 只保护 provider 表本身（新增/删除/载入）；单个 provider 的累计走各自的锁
 _STATS_LOCK = threading.Lock()
+_FLUSH_INTERVAL_SECONDS = 30.0
+# 分位数只看最近成功请求的原始延迟；不落库，重启后重新积累
+_RECENT_LATENCY_SAMPLES = 64
 
 # 错误分类：仅用于诊断，不影响排序
 _ERROR_KINDS = {"timeout", "rate_limit", "5xx", "4xx", "connect", "vision_unavailable", "other"}
 
+_COLUMNS = (
+    "provider_name",
+    "sample_count",
+    "success_count",
+    "failure_count",
+    "avg_latency_ms",
+    "last_request_at",
+    "last_success_at",
+    "last_failure_at",
+    "last_error_kind",
+    "last_seen_at",
+)
+
+
+@dataclass
+class _ProviderHealth:
+    provider_name: str
+    sample_count: int = 0
+    success_count: int = 0
+    failure_count: int = 0
+    avg_latency_ms: float = 0.0
+    last_request_at: float = 0.0
+    last_success_at: float = 0.0
+    last_failure_at: float = 0.0
+    last_error_kind: str = ""
+    last_seen_at: float = 0.0
+    # version 每次变更 +1；落库时只有 version 没变才清 dirty，避免覆盖期间的新样本
+    version: int = 0
+    persisted_version: int = 0
+    recent_latencies: deque = field(
+        default_factory=lambda: deque(maxlen=_RECENT_LATENCY_SAMPLES), repr=False, compare=False
+    )
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in _COLUMNS}
+
+
+_STATES: dict[str, _ProviderHealth] = {}
+_LOADED_PATH: Path | None = None
+
+
+def _read_persisted_states(path: Path) -> dict[str, _ProviderHealth]:
+    try:
+        with connect_sync(path) as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM provider_health_stats"
+            ).fetchall()
+    except Exception:
+        return {}
+    states: dict[str, _ProviderHealth] = {}
+    for row in rows:
+        data = _row_to_dict(row)
+        if data and data["provider_name"]:
+            states[data["provider_name"]] = _ProviderHealth(**data)
+    return states
+
+
+def load_persisted_stats() -> int:
+    """从 SQLite 载入健康状态，返回载入的 provider 数；同步读库，调用方放到线程里跑。
+
+    数据库路径变了时先把旧库上没落盘的变更写回旧库，再换成新库的状态；
+    载入期间新记的样本（仍是脏状态）保留，不被库里的旧值覆盖。
+    """
+    global _LOADED_PATH
+    current = get_db_path()
+    previous = _LOADED_PATH
+    if previous is not None and previous != current:
+        _write_pending(previous)
+    loaded = _read_persisted_states(current)
+    with _STATS_LOCK:
+        for name, state in list(_STATES.items()):
+            if state.version == state.persisted_version:
+                _STATES.pop(name, None)
+        for name, state in loaded.items():
+            _STATES.setdefault(name, state)
+        _LOADED_PATH = current
+    return len(loaded)
+
+
+def _state(name: str, *, create: bool) -> _ProviderHealth | None:
+    # 热路径只碰内存；持久化状态由启动时的 load_persisted_stats 载入
+    with _STATS_LOCK:
+        state = _STATES.get(name)
+        if state is None and create:
+            state = _ProviderHealth(provider_name=name)
+            _STATES[name] = state
+        return state
+
 
 def classify_error(exc: Exception | str) -> str:
     """把异常归类成有限的 kind 标签。"""
@@ -65,123 +163,133 @@ def record_request_result(
     success: bool,
     error_kind: str = "",
 ) -> None:
-    """记一次真实请求结果到 SQLite。失败安全（异常吞掉不影响主流程）。"""
+    """记一次真实请求结果到内存状态。失败安全（异常吞掉不影响主流程）。"""
     name = str(provider_name or "").strip()
     if not name:
         return
     lat = max(0.0, float(latency_ms or 0))
     now = time.time()
     try:
-        with _STATS_LOCK, connect_sync() as conn:
-            row = conn.execute(
-                """
-                SELECT sample_count, success_count, failure_count, avg_latency_ms
-                FROM provider_health_stats
-                WHERE provider_name = ?
-                """,
-                (name,),
-            ).fetchone()
-            if row is None:
-                # 首次：直接落库（不用 EMA，让首样本就是平均）
-                conn.execute(
-                    """
-                    INSERT INTO provider_health_stats(
-                        provider_name, sample_count, success_count, failure_count,
-                        avg_latency_ms, last_request_at, last_success_at, last_failure_at,
-                        last_error_kind, last_seen_at
-                    ) VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        name,
-                        1 if success else 0,
-                        0 if success else 1,
-                        lat,
-                        now,
-                        now if success else None,
-                        None if success else now,
-                        str(error_kind or "")[:32],
-                        now,
-                    ),
-                )
+        state = _state(name, create=True)
+        assert state is not None
+        with state.lock:
+            state.sample_count += 1
+            if success:
+                state.success_count += 1
+                state.last_success_at = now
+                state.recent_latencies.append(lat)
             else:
-                sample_count = int(row["sample_count"] or 0) + 1
-                success_count = int(row["success_count"] or 0) + (1 if success else 0)
-                failure_count = int(row["failure_count"] or 0) + (0 if success else 1)
-                # EMA：avg = α·new + (1-α)·old；老值为 0 时把 new 当起点
-                old_avg = float(row["avg_latency_ms"] or 0)
-                new_avg = lat if old_avg <= 0 else _EMA_ALPHA * lat + (1 - _EMA_ALPHA) * old_avg
-                conn.execute(
-                    """
-                    UPDATE provider_health_stats SET
-                        sample_count = ?,
-                        success_count = ?,
-                        failure_count = ?,
-                        avg_latency_ms = ?,
-                        last_request_at = ?,
-                        last_success_at = COALESCE(?, last_success_at),
-                        last_failure_at = COALESCE(?, last_failure_at),
-                        last_error_kind = ?,
-                        last_seen_at = ?
-                    WHERE provider_name = ?
-                    """,
-                    (
-                        sample_count,
-                        success_count,
-                        failure_count,
-                        new_avg,
-                        now,
-                        now if success else None,
-                        None if success else now,
-                        str(error_kind or "")[:32],
-                        now,
-                        name,
-                    ),
-                )
-            conn.commit()
+                state.failure_count += 1
+                state.last_failure_at = now
+            # EMA：avg = α·new + (1-α)·old；首样本或老值为 0 时把 new 当起点
+            old_avg = state.avg_latency_ms
+            state.avg_latency_ms = lat if old_avg <= 0 else _EMA_ALPHA * lat + (1 - _EMA_ALPHA) * old_avg
+            state.last_request_at = now
+            state.last_error_kind = str(error_kind or "")[:32]
+            state.last_seen_at = now
+            state.version += 1
     except Exception:
-        # provider 调用本身已经够脆弱，stats 写失败绝不影响主流程
+        # provider 调用本身已经够脆弱，stats 记账失败绝不影响主流程
         return
 
 
+def _write_pending(path: Path | None) -> int:
+    with _STATS_LOCK:
+        states = list(_STATES.values())
+    pending: list[tuple[_ProviderHealth, int, dict[str, Any]]] = []
+    for state in states:
+        with state.lock:
+            if state.version != state.persisted_version:
+                pending.append((state, state.version, state.as_dict()))
+    if not pending:
+        return 0
+    with connect_sync(path) as conn:
+        conn.executemany(
+            f"""
+            INSERT INTO provider_health_stats({", ".join(_COLUMNS)})
+            VALUES ({", ".join("?" for _ in _COLUMNS)})
+            ON CONFLICT(provider_name) DO UPDATE SET
+                {", ".join(f"{name}=excluded.{name}" for name in _COLUMNS[1:])}
+            """,
+            [
+                tuple(
+                    (data[name] or None) if name in {"last_request_at", "last_success_at", "last_failure_at"} else data[name]
+                    for name in _COLUMNS
+                )
+                for _state_obj, _version, data in pending
+            ],
+        )
+        conn.commit()
+    for state, version, _data in pending:
+        with state.lock:
+            state.persisted_version = max(state.persisted_version, version)
+    return len(pending)
+
+
+def flush_provider_health() -> int:
+    """把有变更的 provider 状态批量写回它们所属的 SQLite，返回写入条数。
+
+    数据库路径切换后，先把积累的变更写回旧库，再载入新库的状态。
+    """
+    loaded_path = _LOADED_PATH
+    written = _write_pending(loaded_path)
+    if loaded_path is not None and loaded_path != get_db_path():
+        load_persisted_stats()
+    return written
+
+
+async def run_provider_health_flusher(*, interval: float = _FLUSH_INTERVAL_SECONDS) -> None:
+    delay = max(1.0, float(interval or _FLUSH_INTERVAL_SECONDS))
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            await asyncio.to_thread(flush_provider_health)
+        except Exception:
+            # 内存状态仍是脏的，下个周期重试
+            continue
+
+
 def get_stats(provider_name: str) -> dict[str, Any] | None:
     name = str(provider_name or "").strip()
     if not name:
         return None
     try:
-        with connect_sync() as conn:
-            row = conn.execute(
-                """
-                SELECT provider_name, sample_count, success_count, failure_count,
-                       avg_latency_ms, last_request_at, last_success_at, last_failure_at,
-                       last_error_kind, last_seen_at
-                FROM provider_health_stats
-                WHERE provider_name = ?
-                """,
-                (name,),
-            ).fetchone()
+        state = _state(name, create=False)
     except Exception:
         return None
-    return _row_to_dict(row)
+    if state is None:
+        return None
+    with state.lock:
+        return state.as_dict()
+
+
+def latency_quantile(provider_name: str, quantile: float, *, min_samples: int = 5) -> float | None:
+    """最近成功请求延迟（毫秒）的分位数；样本不足时返回 None。"""
+    name = str(provider_name or "").strip()
+    try:
+        state = _state(name, create=False) if name else None
+    except Exception:
+        return None
+    if state is None:
+        return None
+    with state.lock:
+        samples = sorted(state.recent_latencies)
+    if not samples or len(samples) < max(1, int(min_samples)):
+        return None
+    q = min(1.0, max(0.0, float(quantile)))
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
 
 
 def get_all_stats() -> dict[str, dict[str, Any]]:
     try:
-        with connect_sync() as conn:
-            rows = conn.execute(
-                """
-                SELECT provider_name, sample_count, success_count, failure_count,
-                       avg_latency_ms, last_request_at, last_success_at, last_failure_at,
-                       last_error_kind, last_seen_at
-                FROM provider_health_stats
-                """
-            ).fetchall()
+        with _STATS_LOCK:
+            states = list(_STATES.values())
     except Exception:
         return {}
     out: dict[str, dict[str, Any]] = {}
-    for row in rows:
-        d = _row_to_dict(row)
-        if d:
-            out[d["provider_name"]] = d
+    for state in states:
+        with state.lock:
+            out[state.provider_name] = state.as_dict()
     return out
 
 
@@ -207,12 +315,14 @@ def reset_stats(provider_name: str) -> bool:
     if not name:
         return False
     try:
-        with _STATS_LOCK, connect_sync() as conn:
-            cur = conn.execute(
-                "DELETE FROM provider_health_stats WHERE provider_name = ?", (name,)
-            )
-            conn.commit()
-            return int(cur.rowcount or 0) > 0
+        with _STATS_LOCK:
+            removed = _STATES.pop(name, None) is not None
+            with connect_sync() as conn:
+                cur = conn.execute(
+                    "DELETE FROM provider_health_stats WHERE provider_name = ?", (name,)
+                )
+                conn.commit()
+            return removed or int(cur.rowcount or 0) > 0
     except Exception:
         return False
 
@@ -221,13 +331,17 @@ def prune_old_stats(*, max_age_days: int = 30) -> int:
     """删除 max_age_days 天没出现的 provider；返回删除条数。"""
     cutoff = time.time() - max(1, int(max_age_days or 30)) * 86400
     try:
-        with _STATS_LOCK, connect_sync() as conn:
-            cur = conn.execute(
-                "DELETE FROM provider_health_stats WHERE last_seen_at < ?",
-                (cutoff,),
-            )
-            conn.commit()
-            return int(cur.rowcount or 0)
+        with _STATS_LOCK:
+            stale = [name for name, state in _STATES.items() if state.last_seen_at < cutoff]
+            for name in stale:
+                _STATES.pop(name, None)
+            with connect_sync() as conn:
+                cur = conn.execute(
+                    "DELETE FROM provider_health_stats WHERE last_seen_at < ?",
+                    (cutoff,),
+                )
+                conn.commit()
+            return max(len(stale), int(cur.rowcount or 0))
     except Exception:
         return 0
 
@@ -293,9 +407,13 @@ def compute_cooldown_seconds(failures: int, *, is_rate_limit: bool = False, retr
 
 __all__ = [
     "classify_error",
+    "flush_provider_health",
+    "load_persisted_stats",
     "record_request_result",
+    "run_provider_health_flusher",
     "get_stats",
     "get_all_stats",
+    "latency_quantile",
     "reset_stats",
     "prune_old_stats",
     "compute_effective_priority",
@@ -0,0 +1,130 @@
+"""延迟敏感 purpose 的对冲请求：主 provider 迟迟没有结果时提前拉起后续候选，先成功者胜出。
+
+- 按 purpose 白名单开启（personification_hedge_purposes），默认不对冲；
+- 对冲延迟取主 provider 最近成功请求的 p90 延迟，样本不足时用保守默认值；
+- 流式调用里主 provider 已吐出首个增量就视为"有响应"，不再对冲；
+- 全局预算：每个可对冲请求积累 budget_ratio 个令牌，每次对冲消耗一个，长期额外请求占比不超过该比例。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any
+
+from . import provider_health
+from .llm_stream import TextDeltaSink
+from .metrics import record_counter
+
+_DEFAULT_DELAY_MS = 8000.0
+_MIN_DELAY_MS = 1500.0
+_MAX_DELAY_MS = 30000.0
+_DELAY_QUANTILE = 0.9
+_DELAY_MIN_SAMPLES = 5
+# 预算桶上限：允许短时间内连续对冲的次数
+_BUDGET_BURST = 2.0
+
+_LOCK = threading.Lock()
+_BUDGET_TOKENS = 1.0
+_STATS = {"eligible": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0}
+
+
+def hedge_purposes(plugin_config: Any) -> frozenset[str]:
+    raw = getattr(plugin_config, "personification_hedge_purposes", "") or ""
+    items = raw.split(",") if isinstance(raw, str) else list(raw)
+    return frozenset(str(item).strip() for item in items if str(item).strip())
+
+
+def hedging_enabled_for(plugin_config: Any, purpose: str) -> bool:
+    purposes = hedge_purposes(plugin_config)
+    return bool(purposes) and ("*" in purposes or str(purpose or "") in purposes)
+
+
+def hedge_budget_ratio(plugin_config: Any) -> float:
+    try:
+        ratio = float(getattr(plugin_config, "personification_hedge_budget_ratio", 0.1))
+    except (TypeError, ValueError):
+        ratio = 0.1
+    return min(1.0, max(0.0, ratio))
+
+
+def hedge_delay_seconds(provider_name: str) -> float:
+    p90 = provider_health.latency_quantile(provider_name, _DELAY_QUANTILE, min_samples=_DELAY_MIN_SAMPLES)
+    delay_ms = _DEFAULT_DELAY_MS if p90 is None else min(_MAX_DELAY_MS, max(_MIN_DELAY_MS, p90))
+    return delay_ms / 1000.0
+
+
+def note_hedgeable_request(plugin_config: Any) -> None:
+    global _BUDGET_TOKENS
+    ratio = hedge_budget_ratio(plugin_config)
+    with _LOCK:
+        _STATS["eligible"] += 1
+        _BUDGET_TOKENS = min(_BUDGET_BURST, _BUDGET_TOKENS + ratio)
+
+
+def try_acquire_hedge() -> bool:
+    global _BUDGET_TOKENS
+    with _LOCK:
+        allowed = _BUDGET_TOKENS >= 1.0
+        if allowed:
+            _BUDGET_TOKENS -= 1.0
+        _STATS["hedged" if allowed else "budget_denied"] += 1
+    record_counter("provider_hedge", outcome="launched" if allowed else "budget_denied")
+    return allowed
+
+
+def note_hedge_result(*, hedge_won: bool) -> None:
+    if hedge_won:
+        with _LOCK:
+            _STATS["hedge_wins"] += 1
+    record_counter("provider_hedge", outcome="hedge_won" if hedge_won else "primary_won")
+
+
+def hedge_snapshot() -> dict[str, Any]:
+    with _LOCK:
+        return {**_STATS, "budget_tokens": round(_BUDGET_TOKENS, 3)}
+
+
+def reset_for_testing(*, tokens: float = 1.0) -> None:
+    global _BUDGET_TOKENS
+    with _LOCK:
+        _BUDGET_TOKENS = float(tokens)
+        for key in _STATS:
+            _STATS[key] = 0
+
+
+class HedgeGateSink:
+    """包在主 provider 外层的 sink：记录首个增量；对冲发起后静音，避免两路文本混进同一个下游。"""
+
+    def __init__(self, downstream: TextDeltaSink | None) -> None:
+        self._downstream = downstream
+        self._muted = False
+        self.first_delta = asyncio.Event()
+
+    def mute(self) -> None:
+        self._muted = True
+
+    def begin_attempt(self) -> None:
+        if self._downstream is not None and not self._muted:
+            self._downstream.begin_attempt()
+
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        self.first_delta.set()
+        if self._downstream is not None and not self._muted:
+            self._downstream.feed(text)
+
+
+__all__ = [
+    "HedgeGateSink",
+    "hedge_budget_ratio",
+    "hedge_delay_seconds",
+    "hedge_purposes",
+    "hedge_snapshot",
+    "hedging_enabled_for",
+    "note_hedge_result",
+    "note_hedgeable_request",
+    "reset_for_testing",
+    "try_acquire_hedge",
+]
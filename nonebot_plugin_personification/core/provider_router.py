@@ -4,11 +4,18 @@ import asyncio
 import json
 import threading
 import time
+import weakref
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional
 
-from .llm_context import use_single_attempt_retry_policy
+from . import llm_singleflight, provider_concurrency, provider_hedge
+from .llm_context import current_llm_context, use_single_attempt_retry_policy
+from .llm_stream import current_text_delta_sink, detached_text_deltas, stream_text_deltas
+from .metrics import record_timing
+from .runtime_performance import register_cache_reporter
 from .message_parts import normalize_message_parts
 from .safety_filter import build_safe_reframe_messages, detect_route_safety_issue
+from .span_trace import span
 from .visual_capabilities import error_indicates_vision_unavailable, heuristic_supports_vision
 
 
@@ -23,6 +30,13 @@ _DEFAULT_PROVIDER_TIMEOUT_SECONDS = 200.0
 _DEFAULT_PROVIDER_MAX_ATTEMPTS = 5
 _MAX_PROVIDER_ATTEMPTS = 10
 _RETRYABLE_HTTP_STATUSES = {408, 409, 425, 429}
+# caller 实例跨轮复用：键为 (caller 类, 构造参数)，API 池配置一改参数就变，旧实例自然失配后被 LRU 淘汰
+_CALLER_CACHE_MAX_SIZE = 32
+_CALLER_CACHE: "OrderedDict[tuple[Any, ...], Any]" = OrderedDict()
+_CALLER_CACHE_LOCK = threading.Lock()
+_CALLER_CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+# 已完成过至少一次请求的实例；首次请求含鉴权、项目解析、建连等预热开销，延迟单独统计
+_WARM_CALLERS: "weakref.WeakSet[Any]" = weakref.WeakSet()
 _CANONICAL_PROVIDER_CODES = {
     "provider_auth_failed",
     "provider_call_failed",
@@ -656,17 +670,17 @@ def _get_thinking_mode(plugin_config: Any) -> str:
     return value.strip().lower()
 
 
-def _build_provider_caller(provider: Dict[str, Any], plugin_config: Any):
+def _provider_caller_spec(provider: Dict[str, Any], plugin_config: Any) -> tuple[Any, Dict[str, Any]]:
     tool_impl = _tool_caller_impl()
     if provider["api_type"] == "openai_codex":
-        return tool_impl.OpenAICodexToolCaller(
+        return tool_impl.OpenAICodexToolCaller, dict(
             model=provider["model"],
             auth_path=str(provider.get("auth_path", "") or "").strip(),
             timeout=_provider_timeout(provider),
             proxy=str(provider.get("proxy", "") or "").strip(),
         )
     if provider["api_type"] == "gemini_cli":
-        return tool_impl.GeminiCliToolCaller(
+        return tool_impl.GeminiCliToolCaller, dict(
             model=provider["model"] or "auto-gemini-3",
             auth_path=str(provider.get("auth_path", "") or "").strip(),
             project=str(provider.get("project", "") or "").strip(),
@@ -682,7 +696,7 @@ def _build_provider_caller(provider: Dict[str, Any], plugin_config: Any):
             explicit_proxy = str(
                 getattr(plugin_config, "personification_antigravity_cli_proxy", "") or ""
             ).strip()
-        return tool_impl.AntigravityCliToolCaller(
+        return tool_impl.AntigravityCliToolCaller, dict(
             model=provider["model"] or "auto-gemini-3",
             auth_path=str(provider.get("auth_path", "") or "").strip(),
             project=str(provider.get("project", "") or "").strip(),
@@ -691,7 +705,7 @@ def _build_provider_caller(provider: Dict[str, Any], plugin_config: Any):
             proxy=explicit_proxy,
         )
     if provider["api_type"] == "claude_code":
-        return tool_impl.ClaudeCodeToolCaller(
+        return tool_impl.ClaudeCodeToolCaller, dict(
             model=provider["model"] or "claude-opus-4-7",
             auth_path=str(provider.get("auth_path", "") or "").strip(),
             thinking_mode=_get_thinking_mode(plugin_config),
@@ -710,17 +724,17 @@ def _build_provider_caller(provider: Dict[str, Any], plugin_config: Any):
         "thinking_mode": thinking_mode,
     }
     if provider["api_type"] == "gemini":
-        return tool_impl.GeminiToolCaller(
+        return tool_impl.GeminiToolCaller, dict(
             **common_kwargs,
             timeout=_provider_timeout(provider),
             auth_mode=str(provider.get("gemini_auth_mode", "auto") or "auto"),
         )
     if provider["api_type"] == "anthropic":
-        return tool_impl.AnthropicToolCaller(
+        return tool_impl.AnthropicToolCaller, dict(
             **common_kwargs,
             timeout=_provider_timeout(provider),
         )
-    return tool_impl.OpenAIToolCaller(
+    return tool_impl.OpenAIToolCaller, dict(
         **common_kwargs,
         timeout=_provider_timeout(provider),
         supports_reasoning=supports_reasoning,
@@ -728,6 +742,58 @@ def _build_provider_caller(provider: Dict[str, Any], plugin_config: Any):
     )
 
 
+def _build_provider_caller(provider: Dict[str, Any], plugin_config: Any):
+    """按构造参数复用 caller，协商出的能力（reasoning 支持、项目 id、优先模型等）因此能跨轮保留。"""
+    caller_cls, kwargs = _provider_caller_spec(provider, plugin_config)
+    try:
+        key: tuple[Any, ...] | None = (caller_cls, tuple(sorted(kwargs.items())))
+        hash(key)
+    except TypeError:
+        key = None
+    if key is not None:
+        with _CALLER_CACHE_LOCK:
+            cached = _CALLER_CACHE.get(key)
+            if cached is not None:
+                _CALLER_CACHE.move_to_end(key)
+                _CALLER_CACHE_STATS["hits"] += 1
+                return cached
+    started = time.perf_counter()
+    caller = caller_cls(**kwargs)
+    record_timing(
+        "provider_caller_build_ms",
+        (time.perf_counter() - started) * 1000.0,
+        api_type=str(provider.get("api_type", "") or ""),
+    )
+    if key is None:
+        return caller
+    with _CALLER_CACHE_LOCK:
+        _CALLER_CACHE_STATS["misses"] += 1
+        # 并发未命中时以先写入的为准，保证同一配置只有一个实例在累积状态
+        caller = _CALLER_CACHE.setdefault(key, caller)
+        _CALLER_CACHE.move_to_end(key)
+        while len(_CALLER_CACHE) > _CALLER_CACHE_MAX_SIZE:
+            _CALLER_CACHE.popitem(last=False)
+            _CALLER_CACHE_STATS["evictions"] += 1
+    return caller
+
+
+def clear_provider_caller_cache() -> None:
+    with _CALLER_CACHE_LOCK:
+        _CALLER_CACHE.clear()
+
+
+def provider_caller_cache_snapshot() -> Dict[str, Any]:
+    with _CALLER_CACHE_LOCK:
+        return {
+            "entries": len(_CALLER_CACHE),
+            "limit": _CALLER_CACHE_MAX_SIZE,
+            **_CALLER_CACHE_STATS,
+        }
+
+
+register_cache_reporter("provider_callers", provider_caller_cache_snapshot)
+
+
 def _should_use_builtin_search(provider: Dict[str, Any], use_builtin_search: bool) -> bool:
     if not use_builtin_search:
         return False
@@ -744,6 +810,43 @@ def _should_use_builtin_search(provider: Dict[str, Any], use_builtin_search: boo
     return bool(provider.get("supports_native_search", True))
 
 
+def _record_provider_outcome(
+    provider: Dict[str, Any],
+    caller: Any,
+    *,
+    caller_warm: bool,
+    latency_ms: float,
+    success: bool,
+    error_kind: str,
+    model: str,
+    purpose: str,
+) -> None:
+    try:
+        from . import provider_health
+
+        record_timing(
+            "provider_call_ms",
+            latency_ms,
+            api_type=str(provider.get("api_type", "") or ""),
+            caller="warm" if caller_warm else "cold",
+        )
+        try:
+            _WARM_CALLERS.add(caller)
+        except TypeError:
+            pass
+        provider_health.record_request_result(
+            provider_name=str(provider.get("name", "") or ""),
+            latency_ms=latency_ms,
+            success=success,
+            error_kind=error_kind,
+        )
+        from . import token_ledger as _ledger
+
+        _ledger.record_llm_outcome(model=model, latency_ms=latency_ms, success=success, purpose=purpose)
+    except Exception:
+        pass
+
+
 async def _call_provider_once(
     provider: Dict[str, Any],
     messages: List[Dict[str, Any]],
@@ -753,15 +856,35 @@ async def _call_provider_once(
     use_builtin_search: bool = False,
 ) -> ToolCallerResponse:
     caller = _build_provider_caller(provider, plugin_config)
+    try:
+        caller_warm = caller in _WARM_CALLERS
+    except TypeError:
+        caller_warm = False
+    purpose = str(current_llm_context().get("purpose", "") or "")
+    # 延迟/成败和 token 记账落同一行汇总：两边用同一个 model（provider 改名后以 model_used 为准）和 purpose
+    ledger_model = str(provider.get("model", "") or "")
+    ledger_purpose = purpose or "ai_route"
+    # 排队时间不算进 provider 延迟，先拿到并发名额再开始计时
+    lease = await provider_concurrency.acquire(str(provider.get("name", "") or ""), plugin_config, purpose=purpose)
     start_ts = time.monotonic()
     success = False
+    cancelled = False
     error_kind = ""
     try:
-        response = await caller.chat_with_tools(
-            messages=messages,
-            tools=list(tools or []),
-            use_builtin_search=_should_use_builtin_search(provider, use_builtin_search),
-        )
+        with span(
+            "llm.provider",
+            provider=str(provider.get("name", "") or ""),
+            model=str(provider.get("model", "") or ""),
+            purpose=purpose,
+            tools=len(tools or []),
+            queue_wait_ms=round(lease.wait_ms, 1),
+        ):
+            response = await caller.chat_with_tools(
+                messages=messages,
+                tools=list(tools or []),
+                use_builtin_search=_should_use_builtin_search(provider, use_builtin_search),
+            )
+        ledger_model = str(getattr(response, "model_used", "") or ledger_model)
         # vision_unavailable 算业务失败（影响 success_rate），让后续真正能识图的
         # provider 自然排前面；error_kind 标 vision_unavailable 便于诊断
         safety_issue = detect_route_safety_issue(response)
@@ -770,6 +893,10 @@ async def _call_provider_once(
             error_kind = "safety_block"
         elif not success:
             error_kind = "vision_unavailable"
+    except asyncio.CancelledError:
+        # 对冲落败 / 回复被新消息取代：不是 provider 的错，不计入健康度与延迟统计
+        cancelled = True
+        raise
     except Exception as exc:
         try:
             from . import provider_health
@@ -779,18 +906,18 @@ async def _call_provider_once(
             error_kind = "other"
         raise
     finally:
-        try:
-            from . import provider_health
-
-            latency_ms = (time.monotonic() - start_ts) * 1000.0
-            provider_health.record_request_result(
-                provider_name=str(provider.get("name", "") or ""),
-                latency_ms=latency_ms,
+        lease.release(success=success, error_kind="" if cancelled else error_kind)
+        if not cancelled:
+            _record_provider_outcome(
+                provider,
+                caller,
+                caller_warm=caller_warm,
+                latency_ms=(time.monotonic() - start_ts) * 1000.0,
                 success=success,
                 error_kind=error_kind,
+                model=ledger_model,
+                purpose=ledger_purpose,
             )
-        except Exception:
-            pass
     # 中央 token 拦截：所有走 call_ai_api → _call_provider_once 的调用统一在这里
     # 记账，覆盖 user_persona / group_style / group_knowledge / proactive / qzone /
     # inner_state / review / intent / planner / vision 等所有非-runner 路径。
@@ -803,12 +930,13 @@ async def _call_provider_once(
 
             ctx = _llm_ctx.current_llm_context()
             _ledger.record_llm_call(
-                model=str(getattr(response, "model_used", "") or provider.get("model", "") or ""),
+                model=ledger_model,
                 prompt_tokens=int(usage.get("prompt_tokens", 0) or 0),
                 completion_tokens=int(usage.get("completion_tokens", 0) or 0),
                 group_id=str(ctx.get("group_id", "") or ""),
                 user_id=str(ctx.get("user_id", "") or ""),
-                purpose=str(ctx.get("purpose", "") or "ai_route"),
+                purpose=ledger_purpose,
+                cached_tokens=int(usage.get("cached_tokens", 0) or 0),
             )
     except Exception:
         pass
@@ -1218,6 +1346,112 @@ async def _try_provider_chain(
     return None, errors, route_attempts, saw_vision_unavailable
 
 
+_ChainResult = tuple[Any, List[str], List[Dict[str, Any]], bool]
+
+
+def _merge_chain_results(*results: _ChainResult) -> _ChainResult:
+    response = next((item[0] for item in results if item[0] is not None), None)
+    errors = [error for item in results for error in item[1]]
+    attempts = [attempt for item in results for attempt in item[2]]
+    return response, errors, attempts, any(item[3] for item in results)
+
+
+async def _try_provider_chain_hedged(
+    providers: List[Dict[str, Any]],
+    *,
+    messages: List[Dict[str, Any]],
+    plugin_config: Any,
+    logger: Any,
+    tools: Optional[List[Dict[str, Any]]] = None,
+    use_builtin_search: bool = False,
+) -> _ChainResult:
+    """对开启对冲的 purpose：主 provider 超过对冲延迟仍无结果（流式时为无首个增量）时，
+    提前拉起其余候选链，先拿到有效响应的一方胜出，另一方取消；未开启时等同顺序链路。"""
+    chain_kwargs = dict(
+        messages=messages,
+        plugin_config=plugin_config,
+        logger=logger,
+        tools=tools,
+        use_builtin_search=use_builtin_search,
+    )
+    purpose = str(current_llm_context().get("purpose", "") or "")
+    if len(providers) < 2 or not provider_hedge.hedging_enabled_for(plugin_config, purpose):
+        return await _try_provider_chain(providers, **chain_kwargs)
+
+    primary, rest = providers[:1], providers[1:]
+    provider_hedge.note_hedgeable_request(plugin_config)
+    downstream = current_text_delta_sink()
+    gate = provider_hedge.HedgeGateSink(downstream) if downstream is not None else None
+
+    async def _run_primary() -> _ChainResult:
+        if gate is None:
+            return await _try_provider_chain(primary, **chain_kwargs)
+        with stream_text_deltas(gate):
+            return await _try_provider_chain(primary, **chain_kwargs)
+
+    async def _run_hedge() -> _ChainResult:
+        # 对冲链路不接流式 sink：两路文本不能混进同一个首段提前发送
+        with detached_text_deltas():
+            return await _try_provider_chain(rest, **chain_kwargs)
+
+    primary_task = asyncio.create_task(_run_primary())
+    hedge_task: asyncio.Task[_ChainResult] | None = None
+    first_delta_task = asyncio.create_task(gate.first_delta.wait()) if gate is not None else None
+    try:
+        waiters = {primary_task} | ({first_delta_task} if first_delta_task is not None else set())
+        await asyncio.wait(
+            waiters,
+            timeout=provider_hedge.hedge_delay_seconds(str(primary[0].get("name", "") or "")),
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        responded = primary_task.done() or (gate is not None and gate.first_delta.is_set())
+        if responded or not provider_hedge.try_acquire_hedge():
+            primary_result = await primary_task
+            if primary_result[0] is not None:
+                return primary_result
+            return _merge_chain_results(primary_result, await _try_provider_chain(rest, **chain_kwargs))
+
+        if gate is not None:
+            gate.mute()
+        logger.info(
+            f"personification: hedging slow provider={primary[0]['name']} purpose={purpose or '-'} "
+            f"with {rest[0]['name']}"
+        )
+        hedge_task = asyncio.create_task(_run_hedge())
+        pending: set[asyncio.Task[_ChainResult]] = {primary_task, hedge_task}
+        finished: dict[asyncio.Task[_ChainResult], _ChainResult] = {}
+        winner: asyncio.Task[_ChainResult] | None = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                finished[task] = task.result()
+                if winner is None and finished[task][0] is not None:
+                    winner = task
+        hedge_won = winner is hedge_task
+        provider_hedge.note_hedge_result(hedge_won=hedge_won)
+        try:
+            from . import token_ledger as _ledger
+
+            _ledger.record_llm_hedge(
+                model=str(primary[0].get("model", "") or ""),
+                hedge_won=hedge_won,
+                purpose=purpose or "ai_route",
+            )
+        except Exception:
+            pass
+        ordered = [finished[task] for task in (primary_task, hedge_task) if task in finished]
+        merged = _merge_chain_results(*ordered)
+        if winner is not None:
+            return (finished[winner][0], *merged[1:])
+        return merged
+    finally:
+        for task in (first_delta_task, primary_task, hedge_task):
+            if task is not None and not task.done():
+                task.cancel()
+        leftovers = [task for task in (first_delta_task, primary_task, hedge_task) if task is not None]
+        await asyncio.gather(*leftovers, return_exceptions=True)
+
+
 async def call_ai_api(
     messages: List[Dict[str, Any]],
     *,
@@ -1226,6 +1460,36 @@ async def call_ai_api(
     tools: Optional[List[Dict[str, Any]]] = None,
     use_builtin_search: bool = False,
     model_override: str = "",
+) -> ToolCallerResponse:
+    """登记为可缓存的 purpose 先走单飞合并 + 短 TTL 缓存，其余直接走 provider 链路。"""
+    route_kwargs = dict(
+        plugin_config=plugin_config,
+        logger=logger,
+        tools=tools,
+        use_builtin_search=use_builtin_search,
+        model_override=model_override,
+    )
+    purpose = str(current_llm_context().get("purpose", "") or "")
+    ttl = llm_singleflight.cacheable_ttl(purpose) if purpose else None
+    if ttl is None or current_text_delta_sink() is not None:
+        return await _call_ai_api_routed(messages, **route_kwargs)
+    key = llm_singleflight.request_key(purpose, model_override, messages, tools, use_builtin_search)
+    return await llm_singleflight.run_singleflight(
+        key,
+        purpose,
+        lambda: _call_ai_api_routed(messages, **route_kwargs),
+        ttl=ttl,
+    )
+
+
+async def _call_ai_api_routed(
+    messages: List[Dict[str, Any]],
+    *,
+    plugin_config: Any,
+    logger: Any,
+    tools: Optional[List[Dict[str, Any]]] = None,
+    use_builtin_search: bool = False,
+    model_override: str = "",
 ) -> ToolCallerResponse:
     providers = [
         _override_provider_model(provider, model_override)
@@ -1236,7 +1500,7 @@ async def call_ai_api(
     saw_vision_unavailable = False
 
     if providers:
-        response, primary_errors, primary_attempts, primary_saw_vision_unavailable = await _try_provider_chain(
+        response, primary_errors, primary_attempts, primary_saw_vision_unavailable = await _try_provider_chain_hedged(
             providers,
             messages=messages,
             plugin_config=plugin_config,
@@ -15,6 +15,7 @@ from typing import Any, Awaitable, Callable
 import httpx
 
 from .config_manager import _restrict_sensitive_file_permissions
+from .http_clients import shared_http_client
 
 
 _AUTH_STATE_LOCK = threading.Lock()
@@ -325,7 +326,7 @@ async def _probe_qzone_cookie(cookie: str, qq: str, p_skey: str) -> tuple[bool,
         "format": "jsonp",
     }
     try:
-        async with httpx.AsyncClient(timeout=12.0, follow_redirects=False) as client:
+        async with shared_http_client(timeout=12.0, follow_redirects=False) as client:
             response = await client.get(url, params=params, headers=_qzone_headers(ctx, referer_uin=qq))
     except Exception:
         return False, "probe_failed"
@@ -1163,7 +1164,7 @@ class QzoneSocialService:
         }
         headers = _qzone_headers(ctx, referer_uin=target)
         try:
-            async with httpx.AsyncClient(timeout=12.0) as client:
+            async with shared_http_client(timeout=12.0) as client:
                 resp = await client.get(url, params=params, headers=headers)
         except Exception as exc:
             _set_qzone_capability(
@@ -1237,7 +1238,7 @@ class QzoneSocialService:
         headers = _qzone_headers(ctx, referer_uin=owner)
         headers["Content-Type"] = "application/x-www-form-urlencoded"
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with shared_http_client(timeout=10.0) as client:
                 resp = await client.post(url, params={"g_tk": str(ctx["g_tk"])}, data=data, headers=headers)
         except Exception as exc:
             return False, f"点赞失败：{exc}"
@@ -1319,7 +1320,7 @@ class QzoneSocialService:
         last_msg = ""
         for attempt_index, (url, data) in enumerate(attempts):
             try:
-                async with httpx.AsyncClient(timeout=10.0) as client:
+                async with shared_http_client(timeout=10.0) as client:
                     resp = await client.post(url, params={"g_tk": str(ctx["g_tk"])}, data=data, headers=headers)
             except Exception as exc:
                 return QzoneWriteResult(
@@ -1425,7 +1426,7 @@ class QzoneSocialService:
                 f"feedId={feed_id} commentId={comment_id} replyUin={reply_uin}"
             )
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with shared_http_client(timeout=10.0) as client:
                 resp = await client.post(url, params={"g_tk": str(ctx["g_tk"])}, data=base_data, headers=headers)
         except Exception as exc:
             self.logger.warning(f"[qzone] 子评论回复请求失败: {exc}")
@@ -1539,7 +1540,7 @@ class QzoneSocialService:
         headers = _qzone_headers(ctx, referer_uin=owner)
         headers["Content-Type"] = "application/x-www-form-urlencoded"
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with shared_http_client(timeout=10.0) as client:
                 resp = await client.post(url, params={"g_tk": str(ctx["g_tk"])}, data=data, headers=headers)
         except Exception as exc:
             return False, f"评论失败：{exc}"
@@ -1700,7 +1701,7 @@ async def _upload_qzone_image(
         "Origin": "https://user.qzone.qq.com",
     }
     try:
-        async with httpx.AsyncClient(timeout=20.0, follow_redirects=False) as client:
+        async with shared_http_client(timeout=20.0, follow_redirects=False) as client:
             resp = await client.post(url, data=data, headers=headers)
     except Exception as exc:
         raise QzoneImageUploadError(
@@ -1971,7 +1972,7 @@ def build_qzone_services(
                 "Origin": "https://user.qzone.qq.com",
             }
 
-            async with httpx.AsyncClient(timeout=10.0, follow_redirects=False) as client:
+            async with shared_http_client(timeout=10.0, follow_redirects=False) as client:
                 post_started = True
                 resp = await client.post(
                     url,
@@ -199,11 +199,18 @@ def build_reply_style_policy_prompt(
     lines.append(build_observer_posture_policy_prompt())
     lines.append(build_empty_evidence_output_policy_prompt())
     lines.append(build_media_understanding_output_policy_prompt())
-    if has_visual_context and photo_like:
-        lines.append("- 本轮有真实照片线索时，也只把它当作内部语境，最终不要主动输出画面说明。")
+    photo_note = build_photo_context_style_note(has_visual_context=has_visual_context, photo_like=photo_like)
+    if photo_note:
+        lines.append(photo_note)
     return "\n".join(lines)
 
 
+def build_photo_context_style_note(*, has_visual_context: bool = False, photo_like: bool = False) -> str:
+    if has_visual_context and photo_like:
+        return "- 本轮有真实照片线索时，也只把它当作内部语境，最终不要主动输出画面说明。"
+    return ""
+
+
 def build_speech_act_policy_prompt(
     *,
     speech_act: str = "",
@@ -293,6 +300,7 @@ __all__ = [
     "build_media_understanding_output_policy_prompt",
     "build_plugin_interaction_policy_prompt",
     "build_observer_posture_policy_prompt",
+    "build_photo_context_style_note",
     "build_reply_style_policy_prompt",
     "build_speech_act_policy_prompt",
 ]
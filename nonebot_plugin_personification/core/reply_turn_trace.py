@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import contextvars
+import itertools
 import json
+import queue
 import re
+import threading
 import time
 import uuid
+from pathlib import Path
 from typing import Any
 
-from .db import connect_sync
+from .db import connect_sync, get_db_path
 from .plugin_runtime_logs import sanitize_text
 
 
@@ -20,6 +24,26 @@ _SIGNAL_KEY_RE = re.compile(
     r"(?:^|\s)(action|speech_act|output|intent|ambiguity|tool|budget|suggested_steps|actual_steps|suggested_seconds|actual_seconds|topic_thread|topic_speaker|reply_to_bot|bot_in_thread|parallel_threads|participants|reason|source|flags|revision|chars|address_mode|quote|at|target|query|finish)=([^\s]+)"
 )
 
+# 阶段按行写入 reply_turn_stages：事件循环线程只入队，后台写线程批量提交。
+# 尚未落盘的阶段同时留在 _PENDING 里，读取时按 seq 与库内行合并，保证读到自己刚写的阶段。
+_STAGE_QUEUE_MAXSIZE = 4096
+_STAGE_BATCH_SIZE = 200
+_STAGE_READ_LIMIT = 80
+_PRUNE_BATCH_SIZE = 500
+_STAGE_QUEUE: queue.Queue[Any] = queue.Queue(maxsize=_STAGE_QUEUE_MAXSIZE)
+_STAGE_SEQ = itertools.count(time.time_ns())
+_PENDING: dict[str, list[dict[str, Any]]] = {}
+_PENDING_LOCK = threading.Lock()
+_WRITER_LOCK = threading.Lock()
+_WRITER_THREAD: threading.Thread | None = None
+_DROPPED_STAGES = 0
+_LAST_PRUNE_AT = 0.0
+
+
+class _FlushRequest:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
 
 def new_trace_id() -> str:
     return uuid.uuid4().hex[:16]
@@ -45,20 +69,6 @@ def _safe_json(value: Any, *, limit: int = 8000) -> str:
     return payload[:limit]
 
 
-def _load_stages(conn: Any, trace_id: str) -> list[dict[str, Any]]:
-    row = conn.execute(
-        "SELECT stages FROM reply_turn_traces WHERE trace_id=?",
-        (trace_id,),
-    ).fetchone()
-    if not row:
-        return []
-    try:
-        loaded = json.loads(row["stages"] or "[]")
-    except Exception:
-        loaded = []
-    return loaded if isinstance(loaded, list) else []
-
-
 def start_trace(
     *,
     trace_id: str = "",
@@ -126,25 +136,142 @@ def record_stage(
             stage["elapsed_ms"] = max(0, int(elapsed_ms))
         except (TypeError, ValueError):
             pass
+    stage["seq"] = next(_STAGE_SEQ)
     try:
-        with connect_sync() as conn:
-            stages = _load_stages(conn, trace)
-            stages.append(stage)
-            if len(stages) > 80:
-                stages = stages[-80:]
-            conn.execute(
-                """
-                UPDATE reply_turn_traces
-                SET ts=?, stages=?
-                WHERE trace_id=?
-                """,
-                (time.time(), _safe_json(stages), trace),
-            )
-            conn.commit()
+        _enqueue_stage(get_db_path(), trace, stage)
     except Exception:
         pass
 
 
+def _enqueue_stage(db_path: Path, trace_id: str, stage: dict[str, Any]) -> None:
+    global _DROPPED_STAGES
+    with _PENDING_LOCK:
+        _PENDING.setdefault(trace_id, []).append(stage)
+    try:
+        _ensure_writer()
+        _STAGE_QUEUE.put_nowait((db_path, trace_id, stage))
+    except Exception:
+        _forget_pending([(trace_id, stage)])
+        with _PENDING_LOCK:
+            _DROPPED_STAGES += 1
+
+
+def _forget_pending(items: list[tuple[str, dict[str, Any]]]) -> None:
+    written: dict[str, set[int]] = {}
+    for trace_id, stage in items:
+        written.setdefault(trace_id, set()).add(int(stage["seq"]))
+    with _PENDING_LOCK:
+        for trace_id, seqs in written.items():
+            remaining = [stage for stage in _PENDING.get(trace_id, []) if int(stage["seq"]) not in seqs]
+            if remaining:
+                _PENDING[trace_id] = remaining
+            else:
+                _PENDING.pop(trace_id, None)
+
+
+def _ensure_writer() -> None:
+    global _WRITER_THREAD
+    with _WRITER_LOCK:
+        if _WRITER_THREAD is not None and _WRITER_THREAD.is_alive():
+            return
+        _WRITER_THREAD = threading.Thread(
+            target=_writer_loop,
+            name="personification-trace-writer",
+            daemon=True,
+        )
+        _WRITER_THREAD.start()
+
+
+def _write_stage_batch(db_path: Path, entries: list[tuple[str, dict[str, Any]]]) -> None:
+    latest: dict[str, float] = {}
+    for trace_id, stage in entries:
+        latest[trace_id] = max(latest.get(trace_id, 0.0), float(stage["ts"]))
+    with connect_sync(db_path) as conn:
+        conn.executemany(
+            """
+            INSERT INTO reply_turn_stages(
+                trace_id, seq, ts, key, label, status, detail, hint, elapsed_ms
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    trace_id,
+                    int(stage["seq"]),
+                    float(stage["ts"]),
+                    stage["key"],
+                    stage["label"],
+                    stage["status"],
+                    stage["detail"],
+                    stage["hint"],
+                    stage.get("elapsed_ms"),
+                )
+                for trace_id, stage in entries
+            ],
+        )
+        # 阶段写入即视为该轮次有活动，agent 状态页据此判断运行中/陈旧
+        conn.executemany(
+            "UPDATE reply_turn_traces SET ts=MAX(ts, ?) WHERE trace_id=?",
+            [(ts, trace_id) for trace_id, ts in latest.items()],
+        )
+        conn.commit()
+
+
+def _writer_loop() -> None:
+    global _DROPPED_STAGES
+    while True:
+        first = _STAGE_QUEUE.get()
+        items = [first]
+        while len(items) < _STAGE_BATCH_SIZE:
+            try:
+                items.append(_STAGE_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+
+        by_path: dict[Path, list[tuple[str, dict[str, Any]]]] = {}
+        for item in items:
+            if isinstance(item, _FlushRequest):
+                continue
+            db_path, trace_id, stage = item
+            by_path.setdefault(db_path, []).append((trace_id, stage))
+        for db_path, entries in by_path.items():
+            try:
+                _write_stage_batch(db_path, entries)
+            except Exception:
+                with _PENDING_LOCK:
+                    _DROPPED_STAGES += len(entries)
+            _forget_pending(entries)
+        if by_path:
+            maybe_prune()
+
+        for item in items:
+            _STAGE_QUEUE.task_done()
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+
+
+def flush_pending(*, timeout: float = 3.0) -> bool:
+    """阻塞等待已入队的阶段落盘；只应在线程池或关闭流程里调用。"""
+    _ensure_writer()
+    request = _FlushRequest()
+    try:
+        _STAGE_QUEUE.put(request, timeout=max(0.1, float(timeout)))
+    except queue.Full:
+        return False
+    return request.done.wait(timeout=max(0.1, float(timeout)))
+
+
+def writer_status() -> dict[str, Any]:
+    with _PENDING_LOCK:
+        dropped = _DROPPED_STAGES
+    return {
+        "pending": _STAGE_QUEUE.qsize(),
+        "dropped": dropped,
+        "capacity": _STAGE_QUEUE_MAXSIZE,
+        "alive": bool(_WRITER_THREAD is not None and _WRITER_THREAD.is_alive()),
+    }
+
+
 def finish_trace(
     *,
     trace_id: str = "",
@@ -190,9 +317,10 @@ def get_trace(trace_id: str) -> dict[str, Any] | None:
             """,
             (trace,),
         ).fetchone()
-    if not row:
-        return None
-    return _row_to_dict(row)
+        if not row:
+            return None
+        stages = _load_stage_rows(conn, [trace])
+    return _row_to_dict(row, stages.get(trace))
 
 
 def query_recent(
@@ -226,7 +354,48 @@ def query_recent(
             """,
             tuple(params),
         ).fetchall()
-    return [_row_to_dict(row) for row in rows]
+        stages = _load_stage_rows(conn, [str(row["trace_id"] or "") for row in rows])
+    return [_row_to_dict(row, stages.get(str(row["trace_id"] or ""))) for row in rows]
+
+
+def _load_stage_rows(conn: Any, trace_ids: list[str]) -> dict[str, list[dict[str, Any]]]:
+    """一次索引查询取出多条轮次的阶段，并合并尚未落盘的阶段；每轮只保留最近 80 条。"""
+    wanted = [trace_id for trace_id in dict.fromkeys(trace_ids) if trace_id]
+    if not wanted:
+        return {}
+    # 先取待写快照再查库：写线程先提交后移出待写，这个顺序保证两边至少有一处能看到
+    with _PENDING_LOCK:
+        pending = {trace_id: list(_PENDING.get(trace_id, ())) for trace_id in wanted}
+    merged: dict[str, dict[int, dict[str, Any]]] = {}
+    rows = conn.execute(
+        f"""
+        SELECT trace_id, seq, ts, key, label, status, detail, hint, elapsed_ms
+        FROM reply_turn_stages
+        WHERE trace_id IN ({", ".join("?" for _ in wanted)})
+        ORDER BY trace_id, seq
+        """,
+        tuple(wanted),
+    ).fetchall()
+    for row in rows:
+        stage = {
+            "ts": float(row["ts"] or 0),
+            "key": str(row["key"] or ""),
+            "label": str(row["label"] or ""),
+            "status": str(row["status"] or "info"),
+            "detail": str(row["detail"] or ""),
+            "hint": str(row["hint"] or ""),
+        }
+        if row["elapsed_ms"] is not None:
+            stage["elapsed_ms"] = int(row["elapsed_ms"])
+        merged.setdefault(str(row["trace_id"]), {})[int(row["seq"])] = stage
+    for trace_id, stages in pending.items():
+        for stage in stages:
+            item = {key: value for key, value in stage.items() if key != "seq"}
+            merged.setdefault(trace_id, {}).setdefault(int(stage["seq"]), item)
+    return {
+        trace_id: [by_seq[seq] for seq in sorted(by_seq)][-_STAGE_READ_LIMIT:]
+        for trace_id, by_seq in merged.items()
+    }
 
 
 def _stage_category(stage: dict[str, Any]) -> str:
@@ -454,39 +623,95 @@ def build_process_view(trace: dict[str, Any] | None, *, logs: list[dict[str, Any
     }
 
 
+def _delete_in_batches(conn: Any, select_ids_sql: str, params: tuple[Any, ...], table: str, key: str) -> int:
+    deleted = 0
+    while True:
+        cursor = conn.execute(
+            f"DELETE FROM {table} WHERE {key} IN ({select_ids_sql} LIMIT ?)",
+            (*params, _PRUNE_BATCH_SIZE),
+        )
+        conn.commit()
+        count = int(cursor.rowcount or 0)
+        deleted += count
+        if count < _PRUNE_BATCH_SIZE:
+            return deleted
+
+
 def prune_old_entries(*, retention_days: int = 7, max_entries: int = 2000) -> int:
+    """按保留天数与条数清理轮次与阶段；分批删除，每批单独提交，避免长时间占用写锁。"""
     cutoff = time.time() - max(1, int(retention_days or 7)) * 86400
     max_keep = max(100, int(max_entries or 2000))
     deleted = 0
     with connect_sync() as conn:
-        cursor = conn.execute("DELETE FROM reply_turn_traces WHERE ts < ?", (cutoff,))
-        deleted += int(cursor.rowcount or 0)
-        cursor = conn.execute(
-            """
-            DELETE FROM reply_turn_traces
-            WHERE trace_id NOT IN (
-                SELECT trace_id FROM reply_turn_traces ORDER BY ts DESC LIMIT ?
+        deleted += _delete_in_batches(
+            conn,
+            "SELECT trace_id FROM reply_turn_traces WHERE ts < ?",
+            (cutoff,),
+            "reply_turn_traces",
+            "trace_id",
+        )
+        row = conn.execute(
+            "SELECT ts FROM reply_turn_traces ORDER BY ts DESC LIMIT 1 OFFSET ?",
+            (max_keep - 1,),
+        ).fetchone()
+        if row is not None:
+            deleted += _delete_in_batches(
+                conn,
+                "SELECT trace_id FROM reply_turn_traces WHERE ts < ?",
+                (float(row["ts"]),),
+                "reply_turn_traces",
+                "trace_id",
             )
+        deleted += _delete_in_batches(
+            conn,
+            "SELECT id FROM reply_turn_stages WHERE ts < ?",
+            (cutoff,),
+            "reply_turn_stages",
+            "id",
+        )
+        # 轮次已被清理的残留阶段
+        deleted += _delete_in_batches(
+            conn,
+            """
+            SELECT s.id FROM reply_turn_stages AS s
+            LEFT JOIN reply_turn_traces AS t ON t.trace_id = s.trace_id
+            WHERE t.trace_id IS NULL AND s.ts < ?
             """,
-            (max_keep,),
+            (time.time() - 3600,),
+            "reply_turn_stages",
+            "id",
         )
-        deleted += int(cursor.rowcount or 0)
-        conn.commit()
     return deleted
 
 
-def _row_to_dict(row: Any) -> dict[str, Any]:
+def maybe_prune(*, force: bool = False) -> int:
+    global _LAST_PRUNE_AT
+    now = time.time()
+    if not force and _LAST_PRUNE_AT and now - _LAST_PRUNE_AT < 86400:
+        return 0
+    _LAST_PRUNE_AT = now
     try:
-        stages = json.loads(row["stages"] or "[]")
+        return prune_old_entries()
     except Exception:
-        stages = []
+        return 0
+
+
+def _row_to_dict(row: Any, stage_rows: list[dict[str, Any]] | None = None) -> dict[str, Any]:
+    if stage_rows:
+        stages: Any = stage_rows
+    else:
+        # 旧版本把阶段整块存在 stages 列里，升级前的轮次仍从这里读
+        try:
+            stages = json.loads(row["stages"] or "[]")
+        except Exception:
+            stages = []
     try:
         detail = json.loads(row["detail"] or "{}")
     except Exception:
         detail = {}
     return {
         "trace_id": str(row["trace_id"] or ""),
-        "ts": float(row["ts"] or 0),
+        "ts": max(float(row["ts"] or 0), float(stage_rows[-1]["ts"]) if stage_rows else 0.0),
         "session_type": str(row["session_type"] or ""),
         "group_id": str(row["group_id"] or ""),
         "user_id": str(row["user_id"] or ""),
@@ -500,13 +725,16 @@ def _row_to_dict(row: Any) -> dict[str, Any]:
 __all__ = [
     "current_trace_id",
     "finish_trace",
+    "flush_pending",
     "get_trace",
     "build_process_view",
     "new_trace_id",
+    "maybe_prune",
     "prune_old_entries",
     "query_recent",
     "record_stage",
     "reset_current_trace_id",
     "set_current_trace_id",
     "start_trace",
+    "writer_status",
 ]
@@ -0,0 +1,226 @@
+"""Agent 多步循环里的 provider 请求增量渲染。
+
+一个 agent 回合里每一步、每次 provider 回退都会把完整消息列表重新转换成线格式并序列化成 JSON：
+人设 / 历史 / base64 图片这些前缀每步都不变，真正新增的只有最近一两条工具结果。
+这里按"单条源消息"记住渲染结果和它序列化后的 JSON 片段，下一步只渲染新追加的消息：
+
+- 键是消息各字段值的对象身份（调用方常做 `dict(message)` 浅拷贝，值对象不变）；命中时再与缓存里的
+  结构快照做一次相等比较，原地改过的消息不会拿到旧结果。快照共享原字符串对象，比较走身份短路，
+  大段 base64 不会被逐字节扫描
+- `render_messages` 返回 `RenderedItems`（就是 list），`encode_json_body` 遇到它时直接拼接缓存的片段，
+  其余字段照常 `json.dumps`；列表被调用方改过（增删 / 替换条目）时自动退回整段序列化
+- 渲染结果在缓存内共享，调用方不要原地修改返回的条目
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable
+
+from .metrics import record_counter, record_timing
+from .runtime_performance import register_cache_reporter
+
+_CACHE_MAX_SIZE = 512
+# 缓存里渲染结果 + JSON 片段的字符总量上限；图片消息一条就是几百 KB
+_CACHE_MAX_CHARS = 64 * 1024 * 1024
+
+_LOCK = threading.Lock()
+_STATS: dict[str, dict[str, float]] = {}
+_EVICTIONS = 0
+_CACHED_CHARS = 0
+
+
+def _dumps(value: Any) -> bytes:
+    # 与 httpx 的 json= 编码参数一致，换成预序列化后线上字节不变
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def _text_size(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_text_size(item) for item in value.values()) + len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_text_size(item) for item in value) + len(value)
+    return 1
+
+
+class _Segment:
+    __slots__ = ("snapshot", "items", "size", "_fragment")
+
+    def __init__(self, snapshot: Any, items: list[dict[str, Any]]) -> None:
+        self.snapshot = snapshot
+        self.items = items
+        # 片段按需生成，和渲染结果差不多大，预先算进容量
+        self.size = _text_size(items) * 2
+        self._fragment: bytes | None = None
+
+    def fragment(self) -> bytes:
+        if self._fragment is None:
+            self._fragment = b",".join(_dumps(item) for item in self.items)
+        return self._fragment
+
+
+_SEGMENTS: OrderedDict[tuple[Any, ...], _Segment] = OrderedDict()
+
+
+class RenderedItems(list):
+    """渲染后的线格式条目，附带每条源消息对应的已序列化片段。"""
+
+    __slots__ = ("_segments", "_layout")
+
+    def __init__(self, segments: list[_Segment]) -> None:
+        super().__init__(item for segment in segments for item in segment.items)
+        self._segments = segments
+        self._layout = tuple(id(item) for item in self)
+
+    def serialized(self) -> bytes | None:
+        """条目未被改动时返回拼好的 JSON 数组（UTF-8），否则返回 None。"""
+        if len(self) != len(self._layout) or any(id(item) != expected for item, expected in zip(self, self._layout)):
+            return None
+        # 片段直接存 UTF-8 字节：拼接只是内存拷贝，不必把整段 base64 重新编码一遍
+        return b"[" + b",".join(fragment for segment in self._segments if (fragment := segment.fragment())) + b"]"
+
+
+def _message_key(protocol: str, message: dict[str, Any]) -> tuple[Any, ...]:
+    return (protocol, *((key, id(value)) for key, value in message.items()))
+
+
+def _store(key: tuple[Any, ...], segment: _Segment) -> None:
+    global _EVICTIONS, _CACHED_CHARS
+    with _LOCK:
+        previous = _SEGMENTS.pop(key, None)
+        if previous is not None:
+            _CACHED_CHARS -= previous.size
+        _SEGMENTS[key] = segment
+        _CACHED_CHARS += segment.size
+        while _SEGMENTS and (len(_SEGMENTS) > _CACHE_MAX_SIZE or _CACHED_CHARS > _CACHE_MAX_CHARS):
+            _, evicted = _SEGMENTS.popitem(last=False)
+            _CACHED_CHARS -= evicted.size
+            _EVICTIONS += 1
+
+
+def _lookup(key: tuple[Any, ...], message: dict[str, Any]) -> _Segment | None:
+    with _LOCK:
+        segment = _SEGMENTS.get(key)
+        if segment is None:
+            return None
+        _SEGMENTS.move_to_end(key)
+    # 键里的 id 只用来定位，原对象回收后可能被复用；真正的判定是与快照的相等比较，也兜住了原地修改
+    return segment if segment.snapshot == message else None
+
+
+def _record(protocol: str, *, hits: int, misses: int, elapsed_ms: float) -> None:
+    with _LOCK:
+        stats = _STATS.setdefault(protocol, {"hits": 0, "misses": 0, "calls": 0, "total_ms": 0.0})
+        stats["hits"] += hits
+        stats["misses"] += misses
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed_ms
+    if hits:
+        record_counter("request_render_cache", hits, protocol=protocol, outcome="hit")
+    if misses:
+        record_counter("request_render_cache", misses, protocol=protocol, outcome="miss")
+    record_timing("request_render", elapsed_ms, protocol=protocol)
+
+
+def render_messages(
+    protocol: str,
+    messages: Iterable[dict[str, Any]],
+    render: Callable[[dict[str, Any]], list[dict[str, Any]]],
+) -> RenderedItems:
+    """逐条消息查缓存渲染；`render` 把一条源消息转成零到多条线格式条目。"""
+    started = time.perf_counter()
+    name = str(protocol or "").strip() or "unknown"
+    segments: list[_Segment] = []
+    hits = misses = 0
+    for message in messages:
+        key = _message_key(name, message)
+        segment = _lookup(key, message)
+        if segment is not None:
+            hits += 1
+            segments.append(segment)
+            continue
+        misses += 1
+        items = render(message)
+        try:
+            snapshot = copy.deepcopy(message)
+        except Exception:
+            # 带不可拷贝对象的消息只渲染不缓存
+            segments.append(_Segment(None, items))
+            continue
+        segment = _Segment(snapshot, items)
+        _store(key, segment)
+        segments.append(segment)
+    _record(name, hits=hits, misses=misses, elapsed_ms=(time.perf_counter() - started) * 1000.0)
+    return RenderedItems(segments)
+
+
+def encode_json_body(payload: Any) -> bytes:
+    """序列化请求体；其中 `render_messages` 产出的列表直接复用缓存片段。"""
+    if isinstance(payload, RenderedItems):
+        serialized = payload.serialized()
+        if serialized is not None:
+            return serialized
+    if isinstance(payload, dict):
+        return b"{" + b",".join(_dumps(str(key)) + b":" + encode_json_body(item) for key, item in payload.items()) + b"}"
+    return _dumps(payload)
+
+
+def request_render_cache_snapshot() -> dict[str, Any]:
+    with _LOCK:
+        entries = len(_SEGMENTS)
+        evictions = _EVICTIONS
+        cached_chars = _CACHED_CHARS
+        stats = {name: dict(values) for name, values in _STATS.items()}
+    protocols = {
+        name: {
+            "hits": int(values["hits"]),
+            "misses": int(values["misses"]),
+            "calls": int(values["calls"]),
+            "avg_ms": round(values["total_ms"] / values["calls"], 4) if values["calls"] else 0.0,
+        }
+        for name, values in stats.items()
+    }
+    return {
+        "entries": entries,
+        "limit": _CACHE_MAX_SIZE,
+        "evictions": evictions,
+        "hits": sum(item["hits"] for item in protocols.values()),
+        "misses": sum(item["misses"] for item in protocols.values()),
+        "cached_chars": cached_chars,
+        "protocols": protocols,
+    }
+
+
+def clear_request_render_cache() -> None:
+    global _CACHED_CHARS
+    with _LOCK:
+        _SEGMENTS.clear()
+        _CACHED_CHARS = 0
+
+
+def reset_for_testing() -> None:
+    global _EVICTIONS, _CACHED_CHARS
+    with _LOCK:
+        _SEGMENTS.clear()
+        _STATS.clear()
+        _EVICTIONS = 0
+        _CACHED_CHARS = 0
+
+
+register_cache_reporter("request_render", request_render_cache_snapshot)
+
+
+__all__ = [
+    "RenderedItems",
+    "clear_request_render_cache",
+    "encode_json_body",
+    "render_messages",
+    "request_render_cache_snapshot",
+    "reset_for_testing",
+]
@@ -112,6 +112,7 @@ from .context_policy import (
 )
 from .data_store import init_data_store
 from .legacy_memory_migrator import LegacyMemoryMigrator
+from .llm_singleflight import clear_singleflight_cache
 from .knowledge_store import PluginKnowledgeStore
 from .background_intelligence import BackgroundIntelligence
 from .ai_routes import (
@@ -705,6 +706,8 @@ def build_plugin_runtime(
 
     def _reload_runtime_services() -> None:
         nonlocal yaml_response_processor
+        # 路由 / 模型可能变了：旧配置下的辅助调用结果不再复用
+        clear_singleflight_cache()
         new_agent_tool_caller = build_routed_tool_caller(
             plugin_config=plugin_config,
             logger=logger,
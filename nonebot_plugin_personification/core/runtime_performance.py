@@ -12,7 +12,7 @@ from math import ceil
 from pathlib import Path
 from typing import Any
 
-from . import metrics, plugin_runtime_logs
+from . import loop_watchdog, memory_footprint, metrics, plugin_runtime_logs, provider_concurrency, reply_turn_trace
 from .runtime_task_supervisor import runtime_task_supervisor
 
 
@@ -20,7 +20,9 @@ _STARTED_AT = time.time()
 _LAG_SAMPLES: deque[float] = deque(maxlen=300)
 _LAG_LOCK = threading.RLock()
 _REPLY_REPORTER: Callable[[], dict[str, Any]] | None = None
-_CACHE_REPORTERS: dict[str, Callable[[], dict[str, Any]]] = {}
+# 名称 -> (统计回调, 内存台账根容器回调, 单独预算)；两个回调至少有一个
+_CACHE_REPORTERS: dict[str, tuple[Callable[[], dict[str, Any]] | None, Callable[[], Any] | None, int | None]] = {}
+_MAX_CACHE_REPORTERS = 64
 _REPORTER_LOCK = threading.RLock()
 
 
@@ -158,14 +160,43 @@ def register_reply_reporter(reporter: Callable[[], dict[str, Any]] | None) -> No
         _REPLY_REPORTER = reporter
 
 
-def register_cache_reporter(name: str, reporter: Callable[[], dict[str, Any]]) -> None:
+def register_cache_reporter(
+    name: str,
+    reporter: Callable[[], dict[str, Any]] | None = None,
+    *,
+    footprint: Callable[[], Any] | None = None,
+    footprint_budget_bytes: int | None = None,
+) -> None:
+    """登记一个进程内缓存。
+
+    reporter 返回条目数 / 上限 / 淘汰 / 命中统计，出现在运行时快照的缓存表里；省略时按 len(footprint()) 报条目数。
+    footprint 返回缓存容器本身（允许模块重新绑定全局变量），由 memory_footprint 周期性抽样估算近似大小；
+    footprint_budget_bytes 为 None 时使用 personification_cache_memory_budget_mb，0 表示不设预算。
+    """
     normalized = str(name or "").strip()
     if not normalized:
         raise ValueError("cache reporter name is required")
+    if reporter is None and footprint is None:
+        raise ValueError("cache reporter or footprint is required")
+    budget = None if footprint_budget_bytes is None else max(0, int(footprint_budget_bytes))
     with _REPORTER_LOCK:
-        if normalized not in _CACHE_REPORTERS and len(_CACHE_REPORTERS) >= 32:
+        if normalized not in _CACHE_REPORTERS and len(_CACHE_REPORTERS) >= _MAX_CACHE_REPORTERS:
             raise ValueError("too many cache reporters")
-        _CACHE_REPORTERS[normalized] = reporter
+        _CACHE_REPORTERS[normalized] = (reporter, footprint, budget)
+
+
+def cache_footprint_roots() -> list[tuple[str, Callable[[], Any], int | None]]:
+    """登记了根容器的缓存：(名称, 根容器回调, 预算)，按名称排序。"""
+    with _REPORTER_LOCK:
+        registrations = sorted(_CACHE_REPORTERS.items())
+    return [(name, footprint, budget) for name, (_reporter, footprint, budget) in registrations if footprint is not None]
+
+
+def _footprint_entries(footprint: Callable[[], Any]) -> dict[str, Any]:
+    try:
+        return {"entries": len(footprint())}
+    except Exception:
+        return {}
 
 
 def _safe_report(reporter: Callable[[], dict[str, Any]] | None) -> dict[str, Any]:
@@ -200,27 +231,33 @@ def _cache_snapshots() -> list[dict[str, Any]]:
         }
     ]
     with _REPORTER_LOCK:
-        reporters = list(sorted(_CACHE_REPORTERS.items()))
-    for name, reporter in reporters:
-        value = _safe_report(reporter)
-        items.append(
-            {
-                "name": name,
-                "entries": max(0, int(value.get("entries", 0) or 0)),
-                "limit": max(0, int(value.get("limit", 0) or 0)),
-                "evictions": max(0, int(value.get("evictions", 0) or 0)),
-            }
-        )
+        registrations = sorted(_CACHE_REPORTERS.items())
+    for name, (reporter, footprint, _budget) in registrations:
+        value = _safe_report(reporter) if reporter is not None else _footprint_entries(footprint)
+        item = {
+            "name": name,
+            "entries": max(0, int(value.get("entries", 0) or 0)),
+            "limit": max(0, int(value.get("limit", 0) or 0)),
+            "evictions": max(0, int(value.get("evictions", 0) or 0)),
+        }
+        # 带命中统计的缓存额外给出命中率；没有查询过时不显示
+        if "hits" in value or "misses" in value:
+            hits = max(0, int(value.get("hits", 0) or 0))
+            lookups = hits + max(0, int(value.get("misses", 0) or 0))
+            item.update(hits=hits, lookups=lookups, hit_rate=round(hits / lookups, 4) if lookups else None)
+        items.append(item)
     return items
 
 
 def snapshot() -> dict[str, Any]:
     writer = plugin_runtime_logs.writer_status()
+    stage_writer = reply_turn_trace.writer_status()
     return {
         "schema_version": 1,
         "sampled_at": time.time(),
         "process": process_snapshot(),
         "event_loop": event_loop_snapshot(),
+        "blocking": loop_watchdog.blocking_snapshot(limit=8),
         "tasks": runtime_task_supervisor.snapshot(),
         "reply": _reply_snapshot(),
         "queues": {
@@ -228,12 +265,24 @@ def snapshot() -> dict[str, Any]:
                 "depth": max(0, int(writer.get("pending", 0) or 0)),
                 "capacity": max(0, int(writer.get("capacity", 0) or 0)),
                 "dropped": max(0, int(writer.get("dropped", 0) or 0)),
-            }
+            },
+            "reply_turn_stages": {
+                "depth": max(0, int(stage_writer.get("pending", 0) or 0)),
+                "capacity": max(0, int(stage_writer.get("capacity", 0) or 0)),
+                "dropped": max(0, int(stage_writer.get("dropped", 0) or 0)),
+            },
         },
         "caches": _cache_snapshots(),
+        "provider_concurrency": provider_concurrency.concurrency_snapshot(),
+        "memory": memory_footprint.footprint_snapshot(),
     }
 
 
+def _register_builtin_caches() -> None:
+    # metrics 不能反向依赖本模块，耗时直方图在这里代为登记
+    register_cache_reporter("runtime_metrics_timings", footprint=lambda: metrics._TIMINGS)
+
+
 def reset_for_testing() -> None:
     global _REPLY_REPORTER
     with _LAG_LOCK:
@@ -241,9 +290,14 @@ def reset_for_testing() -> None:
     with _REPORTER_LOCK:
         _REPLY_REPORTER = None
         _CACHE_REPORTERS.clear()
+    _register_builtin_caches()
+
+
+_register_builtin_caches()
 
 
 __all__ = [
+    "cache_footprint_roots",
     "event_loop_snapshot",
     "process_snapshot",
     "register_cache_reporter",
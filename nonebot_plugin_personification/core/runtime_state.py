@@ -1,9 +1,9 @@
 import time
-from typing import Any, Callable, Optional
+from typing import Any, Callable
 
 import httpx
 
-_shared_http_client: Optional[httpx.AsyncClient] = None
+from .http_clients import close_http_clients, get_http_client
 
 
 def schedule_disabled_override_prompt() -> str:
@@ -17,25 +17,13 @@ def schedule_disabled_override_prompt() -> str:
 
 
 def get_shared_http_client(*, max_connections: int = 20) -> httpx.AsyncClient:
-    global _shared_http_client
-    if _shared_http_client is None or _shared_http_client.is_closed:
-        _shared_http_client = httpx.AsyncClient(
-            limits=httpx.Limits(max_connections=max_connections),
-        )
-    return _shared_http_client
+    """默认参数的共享客户端，统一从 `http_clients` 注册表取；连接上限由注册表按 host 管理。"""
+    del max_connections
+    return get_http_client()
 
 
 async def close_shared_http_client(*, logger: Any = None) -> None:
-    global _shared_http_client
-    if _shared_http_client is None:
-        return
-    try:
-        await _shared_http_client.aclose()
-    except Exception as e:
-        if logger is not None:
-            logger.warning(f"拟人插件：关闭共享 HTTP 客户端失败: {e}")
-    finally:
-        _shared_http_client = None
+    await close_http_clients(logger=logger)
 
 
 def is_msg_processed(
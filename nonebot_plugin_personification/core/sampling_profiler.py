@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+
+# 进程内统计采样器：固定频率读取 sys._current_frames()，不依赖外部 profiler、不需要重启。
+# 输出 Brendan Gregg collapsed 格式（"线程;外层帧;...;叶子帧 次数"），可直接喂给 flamegraph.pl / speedscope。
+MIN_DURATION_SECONDS = 1.0
+MAX_DURATION_SECONDS = 60.0
+MIN_RATE_HZ = 10
+MAX_RATE_HZ = 250
+_MAX_STACK_DEPTH = 64
+_TOP_FUNCTIONS = 30
+# 叶子帧落在这些位置视为线程空闲（等 IO / 等锁 / 等队列），默认不计入
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("concurrent/futures/thread.py", "_worker"),
+}
+_SESSION_LOCK = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """已有采样会话在运行；同一时间只允许一个会话。"""
+
+
+def _frame_label(code: Any) -> str:
+    filename = str(code.co_filename or "")
+    parts = filename.replace(os.sep, "/").rsplit("/", 2)
+    short = "/".join(parts[-2:]) if len(parts) > 1 else filename
+    return f"{code.co_name} ({short}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _is_idle(frame: Any) -> bool:
+    filename = str(frame.f_code.co_filename or "").replace(os.sep, "/")
+    name = frame.f_code.co_name
+    return any(filename.endswith(suffix) and name == leaf for suffix, leaf in _IDLE_LEAVES)
+
+
+def _stack_labels(frame: Any) -> tuple[str, ...]:
+    labels: list[str] = []
+    while frame is not None and len(labels) < _MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+def _thread_names() -> dict[int, str]:
+    return {
+        int(thread.ident): str(thread.name or "thread").replace(";", ":").replace(" ", "_")
+        for thread in threading.enumerate()
+        if thread.ident is not None
+    }
+
+
+def profile(
+    *,
+    duration_seconds: float = 10.0,
+    rate_hz: int = 100,
+    include_idle: bool = False,
+) -> dict[str, Any]:
+    """阻塞地采样 duration_seconds 秒；应在线程池里调用，不要直接跑在事件循环上。"""
+    duration = max(MIN_DURATION_SECONDS, min(MAX_DURATION_SECONDS, float(duration_seconds or 10.0)))
+    rate = max(MIN_RATE_HZ, min(MAX_RATE_HZ, int(rate_hz or 100)))
+    if not _SESSION_LOCK.acquire(blocking=False):
+        raise ProfilerBusyError("profiler session already running")
+    try:
+        return _run(duration=duration, rate=rate, include_idle=bool(include_idle))
+    finally:
+        _SESSION_LOCK.release()
+
+
+def _run(*, duration: float, rate: int, include_idle: bool) -> dict[str, Any]:
+    own_ident = threading.get_ident()
+    interval = 1.0 / rate
+    stacks: Counter[tuple[str, ...]] = Counter()
+    names = _thread_names()
+    ticks = 0
+    idle_samples = 0
+    started = time.perf_counter()
+    deadline = started + duration
+    next_tick = started
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        if now < next_tick:
+            time.sleep(next_tick - now)
+        next_tick += interval
+        ticks += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            if not include_idle and _is_idle(frame):
+                idle_samples += 1
+                continue
+            if ident not in names:
+                names = _thread_names()
+            thread_label = f"{names.get(ident, 'thread')}-{ident % 100000}"
+            stacks[(thread_label, *_stack_labels(frame))] += 1
+    elapsed = time.perf_counter() - started
+
+    self_counts: Counter[str] = Counter()
+    total_counts: Counter[str] = Counter()
+    for stack, count in stacks.items():
+        frames = stack[1:]
+        if frames:
+            self_counts[frames[-1]] += count
+        for label in set(frames):
+            total_counts[label] += count
+    samples = sum(stacks.values())
+    top = [
+        {
+            "function": label,
+            "self_samples": self_counts.get(label, 0),
+            "total_samples": total,
+            "self_pct": round(self_counts.get(label, 0) * 100.0 / samples, 2) if samples else 0.0,
+            "total_pct": round(total * 100.0 / samples, 2) if samples else 0.0,
+        }
+        for label, total in total_counts.items()
+    ]
+    top.sort(key=lambda item: (-item["self_samples"], -item["total_samples"], item["function"]))
+    collapsed = "\n".join(
+        f"{';'.join(stack)} {count}"
+        for stack, count in sorted(stacks.items(), key=lambda item: (-item[1], item[0]))
+    )
+    return {
+        "duration_seconds": round(elapsed, 3),
+        "rate_hz": rate,
+        "ticks": ticks,
+        "samples": samples,
+        "idle_samples": idle_samples,
+        "include_idle": include_idle,
+        "collapsed": collapsed,
+        "top_functions": top[:_TOP_FUNCTIONS],
+    }
+
+
+def is_running() -> bool:
+    return _SESSION_LOCK.locked()
+
+
+__all__ = [
+    "MAX_DURATION_SECONDS",
+    "MAX_RATE_HZ",
+    "MIN_DURATION_SECONDS",
+    "MIN_RATE_HZ",
+    "ProfilerBusyError",
+    "is_running",
+    "profile",
+]
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator, TypeVar
+
+from .runtime_performance import register_cache_reporter
+
+
+# 轻量 span 树：只有被采样的回复轮次才记录，未采样或不在轮次内时 span() 是空操作。
+# 当前 span 放在 ContextVar 里，asyncio.create_task 与 asyncio.to_thread 会复制上下文，
+# 因此子任务、线程里开的 span 自动挂到发起方的 span 下面。
+_MAX_TURNS = 64
+_MAX_SPANS_PER_TURN = 512
+_MAX_ATTR_CHARS = 200
+_DEFAULT_SAMPLE_RATE = 0.25
+
+_T = TypeVar("_T")
+
+
+@dataclass
+class _Span:
+    span_id: int
+    parent_id: int
+    name: str
+    start: float
+    end: float = 0.0
+    lane: str = ""
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class _TurnTrace:
+    trace_id: str
+    started_at: float
+    mono_start: float
+    spans: list[_Span] = field(default_factory=list)
+    dropped: int = 0
+    next_id: int = 1
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_CURRENT: contextvars.ContextVar[tuple[_TurnTrace, int] | None] = contextvars.ContextVar(
+    "personification_span_trace_current",
+    default=None,
+)
+_RING: deque[_TurnTrace] = deque(maxlen=_MAX_TURNS)
+_RING_LOCK = threading.Lock()
+_SAMPLE_RATE = _DEFAULT_SAMPLE_RATE
+_SAMPLED_TOTAL = 0
+_SKIPPED_TOTAL = 0
+
+
+def configure_span_trace(plugin_config: Any) -> None:
+    global _SAMPLE_RATE
+    try:
+        rate = float(getattr(plugin_config, "personification_span_trace_sample_rate", _DEFAULT_SAMPLE_RATE))
+    except (TypeError, ValueError):
+        rate = _DEFAULT_SAMPLE_RATE
+    _SAMPLE_RATE = max(0.0, min(1.0, rate))
+
+
+def _lane() -> str:
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        # to_thread 的工作线程里没有运行中的事件循环
+        task = None
+    if task is not None:
+        return f"task:{task.get_name()}"
+    return f"thread:{threading.current_thread().name}"
+
+
+def _clean_attrs(attrs: dict[str, Any]) -> dict[str, Any]:
+    cleaned: dict[str, Any] = {}
+    for key, value in attrs.items():
+        if value is None:
+            continue
+        if isinstance(value, (bool, int, float)):
+            cleaned[str(key)] = value
+        else:
+            cleaned[str(key)] = str(value)[:_MAX_ATTR_CHARS]
+    return cleaned
+
+
+def _open_span(turn: _TurnTrace, parent_id: int, name: str, attrs: dict[str, Any]) -> _Span | None:
+    with turn.lock:
+        if len(turn.spans) >= _MAX_SPANS_PER_TURN:
+            turn.dropped += 1
+            return None
+        item = _Span(
+            span_id=turn.next_id,
+            parent_id=parent_id,
+            name=str(name or "span"),
+            start=time.monotonic(),
+            lane=_lane(),
+            attrs=_clean_attrs(attrs),
+        )
+        turn.next_id += 1
+        turn.spans.append(item)
+    return item
+
+
+def _close_span(item: _Span, error: BaseException | None) -> None:
+    if error is not None:
+        item.attrs["error"] = type(error).__name__
+    item.end = time.monotonic()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """在当前轮次下开一个子 span；当前轮次未采样时什么也不做。"""
+    current = _CURRENT.get()
+    if current is None:
+        yield
+        return
+    turn, parent_id = current
+    item = _open_span(turn, parent_id, name, attrs)
+    if item is None:
+        yield
+        return
+    token = _CURRENT.set((turn, item.span_id))
+    error: BaseException | None = None
+    try:
+        yield
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _CURRENT.reset(token)
+        _close_span(item, error)
+
+
+@contextmanager
+def turn_span(
+    trace_id: str,
+    name: str = "reply.turn",
+    *,
+    sample_rate: float | None = None,
+    **attrs: Any,
+) -> Iterator[None]:
+    """开启一个回复轮次的根 span；按采样率决定是否记录，已在轮次内时退化为子 span。
+
+    sample_rate 传入时覆盖 configure_span_trace 的全局值，便于配置热更新即时生效。
+    """
+    global _SAMPLED_TOTAL, _SKIPPED_TOTAL
+    if _CURRENT.get() is not None:
+        with span(name, **attrs):
+            yield
+        return
+    rate = _SAMPLE_RATE if sample_rate is None else max(0.0, min(1.0, float(sample_rate)))
+    if rate <= 0.0 or random.random() >= rate:
+        _SKIPPED_TOTAL += 1
+        yield
+        return
+    _SAMPLED_TOTAL += 1
+    turn = _TurnTrace(
+        trace_id=str(trace_id or "").strip() or f"span-{time.time_ns():x}",
+        started_at=time.time(),
+        mono_start=time.monotonic(),
+    )
+    with _RING_LOCK:
+        _RING.append(turn)
+    item = _open_span(turn, 0, name, attrs)
+    token = _CURRENT.set((turn, item.span_id if item is not None else 0))
+    error: BaseException | None = None
+    try:
+        yield
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _CURRENT.reset(token)
+        if item is not None:
+            _close_span(item, error)
+
+
+def traced(
+    name: str,
+    attr_keys: tuple[str, ...] = (),
+) -> Callable[[Callable[..., Awaitable[_T]]], Callable[..., Awaitable[_T]]]:
+    """异步函数装饰器：调用期间包一层 span，attr_keys 指定的关键字参数记为属性。"""
+
+    def _decorate(func: Callable[..., Awaitable[_T]]) -> Callable[..., Awaitable[_T]]:
+        @functools.wraps(func)
+        async def _wrapper(*args: Any, **kwargs: Any) -> _T:
+            if _CURRENT.get() is None:
+                return await func(*args, **kwargs)
+            attrs = {key: kwargs.get(key) for key in attr_keys}
+            with span(name, **attrs):
+                return await func(*args, **kwargs)
+
+        return _wrapper
+
+    return _decorate
+
+
+def _find_turn(trace_id: str) -> _TurnTrace | None:
+    normalized = str(trace_id or "").strip()
+    with _RING_LOCK:
+        for turn in reversed(_RING):
+            if turn.trace_id == normalized:
+                return turn
+    return None
+
+
+def _span_rows(turn: _TurnTrace) -> list[dict[str, Any]]:
+    with turn.lock:
+        spans = list(turn.spans)
+    now = time.monotonic()
+    depth: dict[int, int] = {}
+    rows: list[dict[str, Any]] = []
+    for item in spans:
+        level = depth.get(item.parent_id, -1) + 1 if item.parent_id else 0
+        depth[item.span_id] = level
+        end = item.end or now
+        rows.append(
+            {
+                "span_id": item.span_id,
+                "parent_id": item.parent_id,
+                "name": item.name,
+                "depth": level,
+                "lane": item.lane,
+                "offset_ms": round((item.start - turn.mono_start) * 1000.0, 3),
+                "duration_ms": round(max(0.0, end - item.start) * 1000.0, 3),
+                "open": not item.end,
+                "attrs": dict(item.attrs),
+            }
+        )
+    return rows
+
+
+def _summary(turn: _TurnTrace, rows: list[dict[str, Any]]) -> dict[str, Any]:
+    root = rows[0] if rows else {}
+    return {
+        "trace_id": turn.trace_id,
+        "started_at": turn.started_at,
+        "duration_ms": float(root.get("duration_ms", 0.0) or 0.0),
+        "span_count": len(rows),
+        "dropped_spans": turn.dropped,
+        "open": bool(root.get("open", False)),
+        "attrs": dict(root.get("attrs", {}) or {}),
+    }
+
+
+def recent_turns(limit: int = 20) -> list[dict[str, Any]]:
+    with _RING_LOCK:
+        turns = list(_RING)[-max(1, int(limit or 1)):]
+    return [_summary(turn, _span_rows(turn)) for turn in reversed(turns)]
+
+
+def get_turn(trace_id: str) -> dict[str, Any] | None:
+    turn = _find_turn(trace_id)
+    if turn is None:
+        return None
+    rows = _span_rows(turn)
+    return {**_summary(turn, rows), "spans": rows}
+
+
+def export_chrome_trace(trace_id: str) -> dict[str, Any] | None:
+    """导出为 Chrome trace-event JSON（chrome://tracing / Perfetto 可直接打开）。"""
+    turn = _find_turn(trace_id)
+    if turn is None:
+        return None
+    rows = _span_rows(turn)
+    lanes: dict[str, int] = {}
+    events: list[dict[str, Any]] = []
+    for row in rows:
+        tid = lanes.setdefault(row["lane"], len(lanes) + 1)
+        events.append(
+            {
+                "name": row["name"],
+                "cat": row["name"].split(".", 1)[0],
+                "ph": "X",
+                "ts": round(row["offset_ms"] * 1000.0, 1),
+                "dur": round(row["duration_ms"] * 1000.0, 1),
+                "pid": 1,
+                "tid": tid,
+                "args": {"span_id": row["span_id"], "parent_id": row["parent_id"], **row["attrs"]},
+            }
+        )
+    events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"reply {turn.trace_id}"}})
+    for lane, tid in lanes.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": lane}})
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"trace_id": turn.trace_id, "started_at": turn.started_at, "dropped_spans": turn.dropped},
+    }
+
+
+def snapshot() -> dict[str, Any]:
+    with _RING_LOCK:
+        entries = len(_RING)
+    return {
+        "entries": entries,
+        "limit": _MAX_TURNS,
+        "evictions": max(0, _SAMPLED_TOTAL - entries),
+        "sample_rate": _SAMPLE_RATE,
+        "sampled": _SAMPLED_TOTAL,
+        "skipped": _SKIPPED_TOTAL,
+    }
+
+
+def reset_for_testing() -> None:
+    global _SAMPLE_RATE, _SAMPLED_TOTAL, _SKIPPED_TOTAL
+    with _RING_LOCK:
+        _RING.clear()
+    _SAMPLE_RATE = _DEFAULT_SAMPLE_RATE
+    _SAMPLED_TOTAL = 0
+    _SKIPPED_TOTAL = 0
+
+
+register_cache_reporter("span_trace_turns", snapshot, footprint=lambda: _RING)
+
+
+__all__ = [
+    "configure_span_trace",
+    "export_chrome_trace",
+    "get_turn",
+    "recent_turns",
+    "reset_for_testing",
+    "snapshot",
+    "span",
+    "traced",
+    "turn_span",
+]
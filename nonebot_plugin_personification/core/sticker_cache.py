@@ -3,6 +3,7 @@ import time
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+from .runtime_performance import register_cache_reporter
 from .sticker_library import (
     SUPPORTED_STICKER_SUFFIXES,
     resolve_sticker_dir,
@@ -33,3 +34,6 @@ def get_sticker_files(path: str | Path | None, *, ttl_seconds: int = 300) -> Lis
         ]
         _cache[cache_key] = (now + max(1, int(ttl_seconds)), scanned)
         return list(scanned)
+
+
+register_cache_reporter("sticker_scan_cache", footprint=lambda: _cache)
@@ -9,6 +9,7 @@ from dataclasses import dataclass
 from typing import Any
 
 from .embedding_index import cosine_similarity, embed_text, tokenize
+from .group_message_buffer import group_message_buffer
 
 
 THREAD_ATTACH_THRESHOLD = 0.45
@@ -72,18 +73,24 @@ def _thread_rows(conn: sqlite3.Connection, group_id: str, now_ts: float) -> list
     ).fetchall()
 
 
-def _recent_thread_messages(conn: sqlite3.Connection, group_id: str) -> dict[str, list[sqlite3.Row]]:
-    rows = conn.execute(
-        """
-        SELECT thread_id, user_id, content, mentioned_ids, timestamp
-        FROM group_messages
-        WHERE group_id=? AND thread_id<>''
-        ORDER BY timestamp DESC
-        LIMIT 120
-        """,
-        (str(group_id),),
-    ).fetchall()
-    grouped: dict[str, list[sqlite3.Row]] = {}
+def _recent_thread_messages(conn: sqlite3.Connection, group_id: str) -> dict[str, list[Any]]:
+    rows = group_message_buffer.select(
+        str(group_id),
+        limit=120,
+        predicate=lambda row: str(row["thread_id"] or "") != "",
+    )
+    if rows is None:
+        rows = conn.execute(
+            """
+            SELECT thread_id, user_id, content, mentioned_ids, timestamp
+            FROM group_messages
+            WHERE group_id=? AND thread_id<>''
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 120
+            """,
+            (str(group_id),),
+        ).fetchall()
+    grouped: dict[str, list[Any]] = {}
     for row in rows:
         thread_id = str(row["thread_id"] or "")
         if not thread_id:
@@ -95,6 +102,9 @@ def _recent_thread_messages(conn: sqlite3.Connection, group_id: str) -> dict[str
 def _reply_thread(conn: sqlite3.Connection, group_id: str, reply_to_msg_id: str) -> str:
     if not reply_to_msg_id:
         return ""
+    cached = group_message_buffer.lookup_message(str(group_id), str(reply_to_msg_id))
+    if cached is not None and str(cached.get("thread_id") or ""):
+        return str(cached["thread_id"])
     row = conn.execute(
         """
         SELECT thread_id FROM group_messages
@@ -114,24 +124,35 @@ def _recent_source_row(
     source_kind: str,
     now_ts: float,
     max_age_seconds: float,
-) -> sqlite3.Row | None:
+) -> Any:
+    rows = group_message_buffer.select(
+        str(group_id),
+        limit=1,
+        since=float(now_ts - max_age_seconds),
+        predicate=lambda row: (
+            str(row["source_kind"] or "").strip().lower() == str(source_kind)
+            and str(row["thread_id"] or "") != ""
+        ),
+    )
+    if rows is not None:
+        return rows[0] if rows else None
     return conn.execute(
         """
         SELECT thread_id, user_id, message_id, source_kind, timestamp
         FROM group_messages
         WHERE group_id=? AND LOWER(TRIM(source_kind))=? AND timestamp>=? AND thread_id<>''
-        ORDER BY timestamp DESC
+        ORDER BY timestamp DESC, id DESC
         LIMIT 1
         """,
         (str(group_id), str(source_kind), float(now_ts - max_age_seconds)),
     ).fetchone()
 
 
-def _row_mentions(row: sqlite3.Row) -> tuple[str, ...]:
+def _row_mentions(row: Any) -> tuple[str, ...]:
     return tuple(_json_loads_list(row["mentioned_ids"]))
 
 
-def _row_relation_targets(row: sqlite3.Row) -> tuple[str, ...]:
+def _row_relation_targets(row: Any) -> tuple[str, ...]:
     reply_to_user_id = str(row["reply_to_user_id"] or "").strip()
     return tuple(
         dict.fromkeys(
@@ -149,21 +170,27 @@ def _carried_human_thread(
     user_id: str,
     now_ts: float,
 ) -> tuple[str, tuple[str, ...]]:
-    rows = conn.execute(
-        """
-        SELECT thread_id, user_id, reply_to_user_id, mentioned_ids, is_bot, source_kind,
-               message_id, timestamp
-        FROM group_messages
-        WHERE group_id=? AND timestamp>=?
-        ORDER BY timestamp DESC
-        LIMIT ?
-        """,
-        (
-            str(group_id),
-            float(now_ts - HUMAN_DIALOGUE_ATTACH_SECONDS),
-            HUMAN_DIALOGUE_RECORD_LIMIT,
-        ),
-    ).fetchall()
+    rows = group_message_buffer.select(
+        str(group_id),
+        limit=HUMAN_DIALOGUE_RECORD_LIMIT,
+        since=float(now_ts - HUMAN_DIALOGUE_ATTACH_SECONDS),
+    )
+    if rows is None:
+        rows = conn.execute(
+            """
+            SELECT thread_id, user_id, reply_to_user_id, mentioned_ids, is_bot, source_kind,
+                   message_id, timestamp
+            FROM group_messages
+            WHERE group_id=? AND timestamp>=?
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+            """,
+            (
+                str(group_id),
+                float(now_ts - HUMAN_DIALOGUE_ATTACH_SECONDS),
+                HUMAN_DIALOGUE_RECORD_LIMIT,
+            ),
+        ).fetchall()
     ordered = list(reversed(rows))
     current_user_id = str(user_id or "").strip()
     for anchor_index in range(len(ordered) - 1, -1, -1):
@@ -124,7 +124,12 @@ def inject_current_time_context(
         "role": "system",
         "content": build_current_time_context_block(now),
     }
-    return [time_message, *copied]
+    # 时间块每秒都在变：放在开头的连续 system 消息之后，人设等静态前缀保持逐字节稳定，
+    # provider 的前缀缓存才命中得上
+    insert_at = 0
+    while insert_at < len(copied) and copied[insert_at].get("role") == "system":
+        insert_at += 1
+    return [*copied[:insert_at], time_message, *copied[insert_at:]]
 
 
 def get_tokyo_now() -> datetime:
@@ -0,0 +1,301 @@
+"""上下文预算用的本地 token 计数。
+
+旧的按字符估算（中文 1.5、其它字符 1/4）在中英混排时偏差很大：中文被高估、代码 / 数字 / 标点被低估，
+要么挤爆 provider 上限触发重试，要么白白浪费上下文。这里换成可插拔的计数层：
+
+- `heuristic`（默认回退）：仿 BPE 预分词把文本切成汉字 / 假名 / 谚文串、英文词、数字串、标点串、换行，再按片段类型计数，
+  不依赖任何词表，纯正则一遍扫描；系数按真实 o200k 计数校准过（见 tests/test_token_counter.py 的夹具）
+- `tiktoken`：环境里装了 tiktoken 且词表可用时用真实 BPE（o200k_base）；加载失败自动退回 heuristic。
+  `auto` 只用本地已缓存的词表，不会在启动时联网下载；显式选 `tiktoken` 才允许首次下载，
+  启动时放到线程里加载并限时，超时退回 heuristic，不阻塞事件循环
+- `register_tokenizer(name, factory)` 可接入其它本地分词器
+
+同一段文本的计数按内容哈希缓存，历史消息跨回合反复计数时直接命中；截断取不超预算的最长前缀
+（近似计数逐片段累加一遍得出，外部分词器按前缀长度二分查找）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import importlib.util
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterable
+
+from .runtime_performance import register_cache_reporter
+
+TokenCounter = Callable[[str], int]
+
+_TIKTOKEN_ENCODING = "o200k_base"
+_TIKTOKEN_BLOB_URL = "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken"
+# 显式 tiktoken 首次下载词表的启动等待上限（秒）
+_LOAD_TIMEOUT = 15.0
+
+_CACHE_MAX_SIZE = 4096
+# 短文本直接算比哈希 + 查表还快
+_CACHE_MIN_CHARS = 32
+
+_PIECE_RE = re.compile(
+    r"(?P<han>[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)"
+    r"|(?P<kana>[\u3040-\u30ff]+)"
+    r"|(?P<hangul>[\uac00-\ud7af]+)"
+    # 词前的一个空格或 ASCII 标点（`(event`、`.send`、`_store`）在 BPE 里通常和词合成一个 token
+    r"|(?P<word>[ !-/:-@\[-`{-~]?[A-Za-z]+)"
+    r"|(?P<digits>\d+)"
+    r"|(?P<newline>[ \t]*\n+)"
+    r"|(?P<space>\s+)"
+    r"|(?P<punct>[!-/:-@\[-`{-~]+)"
+    r"|(?P<wide>[\U00010000-\U0010ffff])"
+    r"|(?P<other>.)",
+    re.S,
+)
+
+
+def _piece_tokens(kind: str | None, piece: str) -> int:
+    if kind == "han":
+        # 常用汉字词组会被合并，整体约每字 0.7 个 token
+        return (len(piece) * 7 + 9) // 10
+    if kind == "kana":
+        return (len(piece) + 2) // 3
+    if kind == "hangul":
+        return (len(piece) + 1) // 2
+    if kind == "other" or kind == "newline" or kind == "wide":
+        return 1
+    if kind == "word":
+        # 常见词（含前导空格 / 标点）一个 token，超长词 / 驼峰拼接词大约每 8 个字母一段
+        letters = len(piece) - (not piece[0].isalpha())
+        return 1 if letters <= 10 else (letters + 7) // 8
+    if kind == "digits":
+        # 数字按至多 3 位一组切分
+        return (len(piece) + 2) // 3
+    if kind == "punct":
+        return (len(piece) + 1) // 2
+    if kind == "space" and len(piece) > 1:
+        return 1
+    return 0
+
+
+def heuristic_token_count(text: str) -> int:
+    """仿 BPE 预分词的近似计数：汉字约每字 0.7、假名 / 谚文按 2~3 字合并、英文按词、数字按 3 位一组、标点两两合并。"""
+    return sum(_piece_tokens(match.lastgroup, match.group()) for match in _PIECE_RE.finditer(text))
+
+
+def _heuristic_prefix_length(text: str, max_tokens: int) -> int:
+    """近似计数可以逐片段累加，一遍扫描就能找到截断点，不必反复整段重数。"""
+    used = 0
+    for match in _PIECE_RE.finditer(text):
+        piece = match.group()
+        tokens = _piece_tokens(match.lastgroup, piece)
+        if used + tokens <= max_tokens:
+            used += tokens
+            continue
+        keep = 0
+        for size in range(1, len(piece)):
+            if used + _piece_tokens(match.lastgroup, piece[:size]) > max_tokens:
+                break
+            keep = size
+        return match.start() + keep
+    return len(text)
+
+
+def _tiktoken_vocab_cached() -> bool:
+    """按 tiktoken 自己的缓存规则检查 o200k 词表是否已在本地。"""
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["TIKTOKEN_CACHE_DIR"]
+    elif "DATA_GYM_CACHE_DIR" in os.environ:
+        cache_dir = os.environ["DATA_GYM_CACHE_DIR"]
+    else:
+        cache_dir = os.path.join(tempfile.gettempdir(), "data-gym-cache")
+    if not cache_dir:
+        # 缓存目录设为空串表示禁用缓存，每次都要联网
+        return False
+    cache_key = hashlib.sha1(_TIKTOKEN_BLOB_URL.encode()).hexdigest()
+    return os.path.exists(os.path.join(cache_dir, cache_key))
+
+
+def _tiktoken_factory() -> TokenCounter:
+    import tiktoken  # type: ignore[import-not-found]
+
+    encoding = tiktoken.get_encoding(_TIKTOKEN_ENCODING)
+
+    def _count(text: str) -> int:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return _count
+
+
+_FACTORIES: dict[str, Callable[[], TokenCounter]] = {
+    "heuristic": lambda: heuristic_token_count,
+    "tiktoken": _tiktoken_factory,
+}
+
+_LOCK = threading.Lock()
+_COUNTS: OrderedDict[bytes, int] = OrderedDict()
+_STATS: dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+_STATE: dict[str, Any] = {"name": "heuristic", "counter": heuristic_token_count, "requested": "auto", "configured": False}
+
+
+def register_tokenizer(name: str, factory: Callable[[], TokenCounter]) -> None:
+    key = str(name or "").strip().lower()
+    if not key:
+        raise ValueError("tokenizer name is required")
+    _FACTORIES[key] = factory
+
+
+def _resolve(requested: str) -> tuple[str, TokenCounter]:
+    candidates: list[str]
+    if requested == "auto":
+        available = importlib.util.find_spec("tiktoken") is not None and _tiktoken_vocab_cached()
+        candidates = ["tiktoken"] if available else []
+    else:
+        candidates = [requested]
+    for name in candidates:
+        factory = _FACTORIES.get(name)
+        if factory is None:
+            continue
+        try:
+            counter = factory()
+            counter("ok")
+        except Exception:
+            # 词表缺失（离线环境首次下载失败等）时退回近似计数
+            continue
+        return name, counter
+    return "heuristic", heuristic_token_count
+
+
+def _apply(requested: str, resolved: str, counter: TokenCounter) -> str:
+    with _LOCK:
+        _STATE.update(name=resolved, counter=counter, requested=requested, configured=True)
+        _COUNTS.clear()
+    return resolved
+
+
+def use_tokenizer(name: str = "auto") -> str:
+    """切换计数器并清空计数缓存；返回实际生效的计数器名。会同步加载词表，事件循环里请用 load_token_counter。"""
+    requested = str(name or "auto").strip().lower() or "auto"
+    return _apply(requested, *_resolve(requested))
+
+
+def _requested_tokenizer(plugin_config: Any) -> str:
+    return str(getattr(plugin_config, "personification_context_tokenizer", "auto") or "auto").strip().lower() or "auto"
+
+
+def _already_configured(requested: str) -> bool:
+    with _LOCK:
+        return bool(_STATE["configured"]) and requested == _STATE["requested"]
+
+
+def configure_token_counter(plugin_config: Any) -> str:
+    requested = _requested_tokenizer(plugin_config)
+    if _already_configured(requested):
+        return active_tokenizer()
+    return use_tokenizer(requested)
+
+
+async def load_token_counter(plugin_config: Any, *, timeout: float = _LOAD_TIMEOUT, logger: Any = None) -> str:
+    """启动用：在线程里加载词表并限时；超时退回近似计数，后台线程的结果丢弃。"""
+    requested = _requested_tokenizer(plugin_config)
+    if _already_configured(requested):
+        return active_tokenizer()
+    try:
+        resolved, counter = await asyncio.wait_for(asyncio.to_thread(_resolve, requested), timeout=timeout)
+    except asyncio.TimeoutError:
+        if logger is not None:
+            logger.warning(f"拟人插件：分词器 {requested} 加载超过 {timeout:g}s，先用近似计数")
+        resolved, counter = "heuristic", heuristic_token_count
+    return _apply(requested, resolved, counter)
+
+
+def active_tokenizer() -> str:
+    return str(_STATE["name"])
+
+
+def count_tokens(text: Any) -> int:
+    raw = str(text or "")
+    if not raw:
+        return 0
+    counter: TokenCounter = _STATE["counter"]
+    if len(raw) < _CACHE_MIN_CHARS:
+        return counter(raw)
+    key = hashlib.blake2b(raw.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _LOCK:
+        cached = _COUNTS.get(key)
+        if cached is not None:
+            _COUNTS.move_to_end(key)
+            _STATS["hits"] += 1
+            return cached
+    value = counter(raw)
+    with _LOCK:
+        _STATS["misses"] += 1
+        _COUNTS[key] = value
+        while len(_COUNTS) > _CACHE_MAX_SIZE:
+            _COUNTS.popitem(last=False)
+            _STATS["evictions"] += 1
+    return value
+
+
+def count_chunks_tokens(chunks: Iterable[Any]) -> int:
+    return sum(count_tokens(chunk) for chunk in chunks)
+
+
+def truncate_to_token_budget(text: Any, max_tokens: int) -> str:
+    """保留不超过 max_tokens 的最长前缀；外部分词器按前缀长度二分查找。"""
+    raw = str(text or "")
+    if max_tokens <= 0:
+        return ""
+    counter: TokenCounter = _STATE["counter"]
+    if counter is heuristic_token_count:
+        return raw[: _heuristic_prefix_length(raw, max_tokens)].strip()
+    if counter(raw) <= max_tokens:
+        return raw.strip()
+    low, high = 0, len(raw)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if counter(raw[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return raw[:low].strip()
+
+
+def token_counter_snapshot() -> dict[str, Any]:
+    with _LOCK:
+        return {
+            "entries": len(_COUNTS),
+            "limit": _CACHE_MAX_SIZE,
+            "evictions": _STATS["evictions"],
+            "hits": _STATS["hits"],
+            "misses": _STATS["misses"],
+            "tokenizer": _STATE["name"],
+        }
+
+
+def reset_for_testing() -> None:
+    with _LOCK:
+        _COUNTS.clear()
+        for name in _STATS:
+            _STATS[name] = 0
+        _STATE.update(name="heuristic", counter=heuristic_token_count, requested="auto", configured=False)
+
+
+register_cache_reporter("token_counts", token_counter_snapshot)
+
+
+__all__ = [
+    "TokenCounter",
+    "active_tokenizer",
+    "configure_token_counter",
+    "count_chunks_tokens",
+    "count_tokens",
+    "heuristic_token_count",
+    "load_token_counter",
+    "register_tokenizer",
+    "reset_for_testing",
+    "token_counter_snapshot",
+    "truncate_to_token_budget",
+    "use_tokenizer",
+]
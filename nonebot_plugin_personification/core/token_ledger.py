@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import time
 import threading
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Any
 
-from .db import connect_sync
+from .db import connect_sync, get_db_path
 from .llm_context import current_llm_context
 
 _WINDOW_ALIASES = {
@@ -18,6 +20,66 @@ _WINDOW_ALIASES = {
 }
 _GENERATION_LOCK = threading.Lock()
 _LEDGER_GENERATION = 0
+# 调用先在内存按 (库路径, 小时桶, group, user, model, purpose) 聚合，定时一次事务落库；
+# 未落库调用数达到上限时就地刷出，上限为 0 时退化为逐次同步写
+_DEFAULT_FLUSH_INTERVAL_SECONDS = 5.0
+_DEFAULT_MAX_UNFLUSHED_CALLS = 200
+_FLUSH_INTERVAL_SECONDS = _DEFAULT_FLUSH_INTERVAL_SECONDS
+_MAX_UNFLUSHED_CALLS = _DEFAULT_MAX_UNFLUSHED_CALLS
+_PENDING_LOCK = threading.Lock()
+_PendingKey = tuple[str, str, str, str, str, str, str]
+_PENDING_USAGE: dict[_PendingKey, list[Any]] = {}
+_PENDING_CALLS = 0
+# 请求延迟/成败只进 provider×model×purpose 汇总表：(库路径, 小时桶, 日桶, provider, model, purpose)
+_OutcomeKey = tuple[str, str, str, str, str, str]
+_PENDING_OUTCOMES: dict[_OutcomeKey, list[Any]] = {}
+# 延迟直方图各档上界（毫秒），最后一档为 >30s
+_LATENCY_BUCKETS_MS = (1000.0, 3000.0, 10000.0, 30000.0)
+_ROLLUP_COLUMNS = (
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "call_count",
+    "request_count",
+    "error_count",
+    "latency_sum_ms",
+    "latency_le_1s",
+    "latency_le_3s",
+    "latency_le_10s",
+    "latency_le_30s",
+    "latency_gt_30s",
+    "cached_prompt_tokens",
+    "hedge_count",
+    "hedge_wins",
+)
+# 前缀缓存命中的输入 token、对冲次数在汇总行里的下标
+_ROLLUP_CACHED_INDEX = _ROLLUP_COLUMNS.index("cached_prompt_tokens")
+_ROLLUP_HEDGE_INDEX = _ROLLUP_COLUMNS.index("hedge_count")
+_ROLLUP_UPSERT_SET = ",\n".join(
+    [f"{column} = {column} + excluded.{column}" for column in _ROLLUP_COLUMNS]
+    + ["updated_at = MAX(updated_at, excluded.updated_at)"]
+)
+_ROLLUP_HOURLY_UPSERT = f"""
+    INSERT INTO llm_usage_rollup_hourly
+        (bucket_hour, bucket_day, provider, model, purpose, {", ".join(_ROLLUP_COLUMNS)}, updated_at)
+    VALUES ({", ".join("?" for _ in range(len(_ROLLUP_COLUMNS) + 6))})
+    ON CONFLICT(bucket_hour, provider, model, purpose) DO UPDATE SET
+    {_ROLLUP_UPSERT_SET}
+"""
+_ROLLUP_DAILY_UPSERT = f"""
+    INSERT INTO llm_usage_rollup_daily
+        (bucket_day, provider, model, purpose, {", ".join(_ROLLUP_COLUMNS)}, updated_at)
+    VALUES ({", ".join("?" for _ in range(len(_ROLLUP_COLUMNS) + 5))})
+    ON CONFLICT(bucket_day, provider, model, purpose) DO UPDATE SET
+    {_ROLLUP_UPSERT_SET}
+"""
+# 保留策略：按群/用户拆分的原始账本各自保留；日汇总永久保留，小时汇总保留 35 天
+_DEFAULT_RAW_RETENTION_DAYS = 180
+_DEFAULT_HOURLY_RETENTION_DAYS = 7
+_ROLLUP_HOURLY_RETENTION_DAYS = 35
+_RAW_RETENTION_DAYS = _DEFAULT_RAW_RETENTION_DAYS
+_HOURLY_RETENTION_DAYS = _DEFAULT_HOURLY_RETENTION_DAYS
+_LAST_COMPACT_AT = 0.0
 
 
 def ledger_generation() -> int:
@@ -31,6 +93,32 @@ def _advance_generation() -> None:
         _LEDGER_GENERATION += 1
 
 
+def configure_token_ledger(plugin_config: Any) -> None:
+    """读取落库周期、崩溃安全上限与原始账本保留天数；非法值回退默认。"""
+    global _FLUSH_INTERVAL_SECONDS, _MAX_UNFLUSHED_CALLS, _RAW_RETENTION_DAYS, _HOURLY_RETENTION_DAYS
+    try:
+        interval = float(getattr(plugin_config, "personification_token_ledger_flush_seconds", _DEFAULT_FLUSH_INTERVAL_SECONDS))
+    except (TypeError, ValueError):
+        interval = _DEFAULT_FLUSH_INTERVAL_SECONDS
+    try:
+        max_calls = int(getattr(plugin_config, "personification_token_ledger_max_unflushed_calls", _DEFAULT_MAX_UNFLUSHED_CALLS))
+    except (TypeError, ValueError):
+        max_calls = _DEFAULT_MAX_UNFLUSHED_CALLS
+    try:
+        raw_days = int(getattr(plugin_config, "personification_token_ledger_raw_retention_days", _DEFAULT_RAW_RETENTION_DAYS))
+    except (TypeError, ValueError):
+        raw_days = _DEFAULT_RAW_RETENTION_DAYS
+    try:
+        hourly_days = int(getattr(plugin_config, "personification_token_ledger_hourly_retention_days", _DEFAULT_HOURLY_RETENTION_DAYS))
+    except (TypeError, ValueError):
+        hourly_days = _DEFAULT_HOURLY_RETENTION_DAYS
+    _FLUSH_INTERVAL_SECONDS = max(0.5, interval)
+    _MAX_UNFLUSHED_CALLS = max(0, max_calls)
+    # 0 表示原始日账本永久保留；小时账本至少覆盖 24h 窗口
+    _RAW_RETENTION_DAYS = max(0, raw_days)
+    _HOURLY_RETENTION_DAYS = max(2, hourly_days)
+
+
 def record_response_usage(
     response: Any,
     *,
@@ -128,6 +216,19 @@ def _infer_provider(model: str, explicit: str = "") -> str:
     return ""
 
 
+def _functional_purpose(purpose: str) -> str:
+    # 剥离 `|provider=xxx` 尾巴；只有 provider 标记时视为未标注
+    functional = str(purpose or "").split("|", 1)[0].strip()
+    return "" if functional.startswith("provider=") else functional
+
+
+def _latency_bucket_index(latency_ms: float) -> int:
+    for index, upper in enumerate(_LATENCY_BUCKETS_MS):
+        if latency_ms <= upper:
+            return index
+    return len(_LATENCY_BUCKETS_MS)
+
+
 def _provider_from_model_purpose(model: str, purpose: str) -> str:
     provider = ""
     if "provider=" in purpose:
@@ -147,14 +248,18 @@ def record_llm_call(
     user_id: str = "",
     purpose: str = "",
     provider: str = "",
+    cached_tokens: int = 0,
     bucket_day: str | None = None,
     bucket_hour: str | None = None,
 ) -> None:
     """记录一次 LLM 调用，按 (day, group, user, model, purpose) 桶累加。
+    增量先进内存，由后台任务、读路径或未落库上限触发批量写入。
     `provider` 显式提供时优先；否则从 model 名推导（anthropic/gemini/openai/codex）。
     purpose 内已编码 provider 信息：写入时实际 purpose=`{original}|provider={p}`，
     查询时按子串匹配（简单 schema 兼容）。
+    `cached_tokens` 是 prompt_tokens 中命中 provider 前缀缓存的部分，只进汇总表。
     """
+    global _PENDING_CALLS
     bucket, hour_bucket = _normalize_bucket_values(
         bucket_day=bucket_day,
         bucket_hour=bucket_hour,
@@ -164,101 +269,435 @@ def record_llm_call(
     if pt == 0 and ct == 0:
         return
     tt = pt + ct
+    cached = min(pt, max(0, int(cached_tokens or 0)))
     resolved_provider = _infer_provider(model, provider)
     # 把 provider 编码到 purpose 字段（向后兼容，不改 schema）
     purpose_str = str(purpose or "")
     if resolved_provider and "provider=" not in purpose_str:
         purpose_str = f"{purpose_str}|provider={resolved_provider}" if purpose_str else f"provider={resolved_provider}"
-    now = time.time()
+    key = (
+        str(get_db_path()),
+        hour_bucket,
+        bucket,
+        str(group_id or ""),
+        str(user_id or ""),
+        str(model or ""),
+        purpose_str,
+    )
+    with _PENDING_LOCK:
+        entry = _PENDING_USAGE.setdefault(key, [0, 0, 0, 0, 0.0, 0])
+        entry[0] += pt
+        entry[1] += ct
+        entry[2] += tt
+        entry[3] += 1
+        entry[4] = time.time()
+        entry[5] += cached
+        _PENDING_CALLS += 1
+        should_flush = _PENDING_CALLS >= max(1, _MAX_UNFLUSHED_CALLS)
+    _advance_generation()
+    if should_flush:
+        _flush_quietly()
+
+
+def record_llm_outcome(
+    *,
+    model: str,
+    latency_ms: float,
+    success: bool,
+    purpose: str = "",
+    provider: str = "",
+    bucket_hour: str | None = None,
+) -> None:
+    """记录一次真实请求的延迟与成败，只累加到 provider×model×purpose 汇总表。"""
+    bucket, hour_bucket = _normalize_bucket_values(bucket_hour=bucket_hour)
+    latency = max(0.0, float(latency_ms or 0))
+    key = (
+        str(get_db_path()),
+        hour_bucket,
+        bucket,
+        _infer_provider(model, provider) or "unknown",
+        str(model or ""),
+        _functional_purpose(purpose),
+    )
+    with _PENDING_LOCK:
+        entry = _PENDING_OUTCOMES.setdefault(key, [0, 0, 0.0, 0, 0, 0, 0, 0, 0.0, 0, 0])
+        entry[0] += 1
+        if not success:
+            entry[1] += 1
+        entry[2] += latency
+        entry[3 + _latency_bucket_index(latency)] += 1
+        entry[8] = time.time()
+    _advance_generation()
+
+
+def record_llm_hedge(
+    *,
+    model: str,
+    hedge_won: bool,
+    purpose: str = "",
+    provider: str = "",
+    bucket_hour: str | None = None,
+) -> None:
+    """记录一次对冲：model/provider 是被对冲（迟迟没结果）的主 provider。"""
+    bucket, hour_bucket = _normalize_bucket_values(bucket_hour=bucket_hour)
+    key = (
+        str(get_db_path()),
+        hour_bucket,
+        bucket,
+        _infer_provider(model, provider) or "unknown",
+        str(model or ""),
+        _functional_purpose(purpose),
+    )
+    with _PENDING_LOCK:
+        entry = _PENDING_OUTCOMES.setdefault(key, [0, 0, 0.0, 0, 0, 0, 0, 0, 0.0, 0, 0])
+        entry[9] += 1
+        if hedge_won:
+            entry[10] += 1
+        entry[8] = time.time()
+    _advance_generation()
+
+
+def pending_token_usage_calls() -> int:
+    with _PENDING_LOCK:
+        return _PENDING_CALLS
+
+
+def _has_pending() -> bool:
+    with _PENDING_LOCK:
+        return bool(_PENDING_USAGE or _PENDING_OUTCOMES)
+
+
+def _take_pending() -> tuple[dict[_PendingKey, list[Any]], dict[_OutcomeKey, list[Any]]]:
+    global _PENDING_USAGE, _PENDING_CALLS, _PENDING_OUTCOMES
+    with _PENDING_LOCK:
+        taken = _PENDING_USAGE, _PENDING_OUTCOMES
+        _PENDING_USAGE = {}
+        _PENDING_OUTCOMES = {}
+        _PENDING_CALLS = 0
+    return taken
+
+
+def _restore_pending(
+    taken: dict[_PendingKey, list[Any]],
+    outcomes: dict[_OutcomeKey, list[Any]],
+) -> None:
+    global _PENDING_CALLS
+    with _PENDING_LOCK:
+        for key, values in taken.items():
+            entry = _PENDING_USAGE.setdefault(key, [0, 0, 0, 0, 0.0, 0])
+            for index in range(4):
+                entry[index] += values[index]
+            entry[4] = max(float(entry[4]), float(values[4]))
+            entry[5] += values[5]
+            _PENDING_CALLS += int(values[3])
+        for key, values in outcomes.items():
+            entry = _PENDING_OUTCOMES.setdefault(key, [0, 0, 0.0, 0, 0, 0, 0, 0, 0.0, 0, 0])
+            for index in range(8):
+                entry[index] += values[index]
+            entry[8] = max(float(entry[8]), float(values[8]))
+            entry[9] += values[9]
+            entry[10] += values[10]
+
+
+def _merge_rollup(
+    rollups: dict[tuple[str, ...], list[Any]],
+    key: tuple[str, ...],
+    values: list[Any],
+    offset: int,
+    updated_at: float,
+) -> None:
+    entry = rollups.setdefault(key, [0] * len(_ROLLUP_COLUMNS) + [0.0])
+    for index, value in enumerate(values):
+        entry[offset + index] += value
+    entry[-1] = max(float(entry[-1]), float(updated_at))
+
+
+def _write_rollups(
+    conn: Any,
+    hourly: dict[tuple[str, ...], list[Any]],
+) -> None:
+    """hourly 的键为 (小时桶, 日桶, provider, model, purpose)，日汇总由其折叠得到。"""
+    daily: dict[tuple[str, ...], list[Any]] = {}
+    for (hour_bucket, bucket, provider, model, purpose), values in hourly.items():
+        _merge_rollup(daily, (bucket, provider, model, purpose), values[:-1], 0, values[-1])
+    conn.executemany(_ROLLUP_HOURLY_UPSERT, [(*key, *values) for key, values in hourly.items()])
+    conn.executemany(_ROLLUP_DAILY_UPSERT, [(*key, *values) for key, values in daily.items()])
+
+
+def flush_pending_token_usage() -> int:
+    """把内存里的调用增量在一个事务里写入小时/日账本与汇总表，返回写入的小时桶数。
+
+    写入失败时增量放回待写表，异常继续上抛。
+    """
+    taken, outcomes = _take_pending()
+    if not taken and not outcomes:
+        return 0
+    by_db: dict[str, tuple[dict[tuple[str, ...], list[Any]], list[tuple[Any, ...]], dict[tuple[str, ...], list[Any]]]] = {}
+    for (db_path, hour_bucket, bucket, group_id, user_id, model, purpose), values in taken.items():
+        daily, hourly_params, rollups = by_db.setdefault(db_path, ({}, [], {}))
+        hourly_params.append((hour_bucket, bucket, group_id, user_id, model, purpose, *values[:5]))
+        day_entry = daily.setdefault((bucket, group_id, user_id, model, purpose), [0, 0, 0, 0, 0.0])
+        for index in range(4):
+            day_entry[index] += values[index]
+        day_entry[4] = max(float(day_entry[4]), float(values[4]))
+        rollup_key = (hour_bucket, bucket, _provider_from_model_purpose(model, purpose), model, _functional_purpose(purpose))
+        _merge_rollup(rollups, rollup_key, values[:4], 0, values[4])
+        _merge_rollup(rollups, rollup_key, values[5:6], _ROLLUP_CACHED_INDEX, values[4])
+    for (db_path, hour_bucket, bucket, provider, model, purpose), values in outcomes.items():
+        _daily, _hourly_params, rollups = by_db.setdefault(db_path, ({}, [], {}))
+        rollup_key = (hour_bucket, bucket, provider, model, purpose)
+        _merge_rollup(rollups, rollup_key, values[:8], 4, values[8])
+        _merge_rollup(rollups, rollup_key, values[9:11], _ROLLUP_HEDGE_INDEX, values[8])
+    committed: set[str] = set()
+    try:
+        for db_path, (daily, hourly_params, rollups) in by_db.items():
+            with connect_sync(Path(db_path)) as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO token_usage_ledger
+                        (bucket_day, group_id, user_id, model, purpose,
+                         prompt_tokens, completion_tokens, total_tokens, call_count, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(bucket_day, group_id, user_id, model, purpose) DO UPDATE SET
+                        prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                        completion_tokens = completion_tokens + excluded.completion_tokens,
+                        total_tokens = total_tokens + excluded.total_tokens,
+                        call_count = call_count + excluded.call_count,
+                        updated_at = MAX(updated_at, excluded.updated_at)
+                    """,
+                    [(*key, *values) for key, values in daily.items()],
+                )
+                conn.executemany(
+                    """
+                    INSERT INTO token_usage_hourly_ledger
+                        (bucket_hour, bucket_day, group_id, user_id, model, purpose,
+                         prompt_tokens, completion_tokens, total_tokens, call_count, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(bucket_hour, group_id, user_id, model, purpose) DO UPDATE SET
+                        prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                        completion_tokens = completion_tokens + excluded.completion_tokens,
+                        total_tokens = total_tokens + excluded.total_tokens,
+                        call_count = call_count + excluded.call_count,
+                        updated_at = MAX(updated_at, excluded.updated_at)
+                    """,
+                    hourly_params,
+                )
+                _write_rollups(conn, rollups)
+                conn.commit()
+            committed.add(db_path)
+    except Exception:
+        _restore_pending(
+            {key: values for key, values in taken.items() if key[0] not in committed},
+            {key: values for key, values in outcomes.items() if key[0] not in committed},
+        )
+        raise
+    return len(taken)
+
+
+def discard_pending_token_usage() -> None:
+    _take_pending()
+
+
+def backfill_usage_rollups(conn: Any) -> int:
+    """旧库升级：汇总表为空时从原始小时/日账本一次性补齐 token 汇总（无延迟数据）。"""
+    if conn.execute("SELECT 1 FROM llm_usage_rollup_daily LIMIT 1").fetchone() is not None:
+        return 0
+    if conn.execute("SELECT 1 FROM token_usage_ledger LIMIT 1").fetchone() is None:
+        return 0
+    hourly: dict[tuple[str, ...], list[Any]] = {}
+    rows = conn.execute(
+        """
+        SELECT bucket_hour, bucket_day, model, purpose,
+               SUM(prompt_tokens) AS pt, SUM(completion_tokens) AS ct,
+               SUM(total_tokens) AS tt, SUM(call_count) AS cc, MAX(updated_at) AS ts
+        FROM token_usage_hourly_ledger
+        GROUP BY bucket_hour, model, purpose
+        """
+    ).fetchall()
+    for row in rows:
+        model, purpose = str(row["model"] or ""), str(row["purpose"] or "")
+        key = (
+            str(row["bucket_hour"]),
+            str(row["bucket_day"]),
+            _provider_from_model_purpose(model, purpose),
+            model,
+            _functional_purpose(purpose),
+        )
+        _merge_rollup(hourly, key, [int(row["pt"] or 0), int(row["ct"] or 0), int(row["tt"] or 0), int(row["cc"] or 0)], 0, float(row["ts"] or 0))
+    conn.executemany(_ROLLUP_HOURLY_UPSERT, [(*key, *values) for key, values in hourly.items()])
+    # 小时账本保留期更短，日汇总以原始日账本为准
+    daily: dict[tuple[str, ...], list[Any]] = {}
+    rows = conn.execute(
+        """
+        SELECT bucket_day, model, purpose,
+               SUM(prompt_tokens) AS pt, SUM(completion_tokens) AS ct,
+               SUM(total_tokens) AS tt, SUM(call_count) AS cc, MAX(updated_at) AS ts
+        FROM token_usage_ledger
+        GROUP BY bucket_day, model, purpose
+        """
+    ).fetchall()
+    for row in rows:
+        model, purpose = str(row["model"] or ""), str(row["purpose"] or "")
+        key = (
+            str(row["bucket_day"]),
+            _provider_from_model_purpose(model, purpose),
+            model,
+            _functional_purpose(purpose),
+        )
+        _merge_rollup(daily, key, [int(row["pt"] or 0), int(row["ct"] or 0), int(row["tt"] or 0), int(row["cc"] or 0)], 0, float(row["ts"] or 0))
+    conn.executemany(_ROLLUP_DAILY_UPSERT, [(*key, *values) for key, values in daily.items()])
+    return len(daily)
+
+
+def compact_token_ledger(
+    *,
+    raw_retention_days: int | None = None,
+    hourly_retention_days: int | None = None,
+    now: datetime | None = None,
+) -> dict[str, int]:
+    """按保留策略删除过期的原始账本与小时汇总；日汇总不删，长期统计只读汇总表。"""
+    _flush_quietly()
+    current = now or datetime.now()
+    raw_days = _RAW_RETENTION_DAYS if raw_retention_days is None else max(0, int(raw_retention_days))
+    hourly_days = _HOURLY_RETENTION_DAYS if hourly_retention_days is None else max(2, int(hourly_retention_days))
+    deleted = {"hourly": 0, "raw": 0, "rollup_hourly": 0}
     with connect_sync() as conn:
-        conn.execute(
-            """
-            INSERT INTO token_usage_ledger
-                (bucket_day, group_id, user_id, model, purpose,
-                 prompt_tokens, completion_tokens, total_tokens, call_count, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
-            ON CONFLICT(bucket_day, group_id, user_id, model, purpose) DO UPDATE SET
-                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
-                completion_tokens = completion_tokens + excluded.completion_tokens,
-                total_tokens = total_tokens + excluded.total_tokens,
-                call_count = call_count + 1,
-                updated_at = excluded.updated_at
-            """,
-            (bucket, str(group_id or ""), str(user_id or ""), str(model or ""),
-             purpose_str, pt, ct, tt, now),
+        cursor = conn.execute(
+            "DELETE FROM token_usage_hourly_ledger WHERE bucket_hour < ?",
+            (_hour_str(current - timedelta(days=hourly_days)),),
         )
-        conn.execute(
-            """
-            INSERT INTO token_usage_hourly_ledger
-                (bucket_hour, bucket_day, group_id, user_id, model, purpose,
-                 prompt_tokens, completion_tokens, total_tokens, call_count, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
-            ON CONFLICT(bucket_hour, group_id, user_id, model, purpose) DO UPDATE SET
-                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
-                completion_tokens = completion_tokens + excluded.completion_tokens,
-                total_tokens = total_tokens + excluded.total_tokens,
-                call_count = call_count + 1,
-                updated_at = excluded.updated_at
-            """,
-            (hour_bucket, bucket, str(group_id or ""), str(user_id or ""), str(model or ""),
-             purpose_str, pt, ct, tt, now),
+        deleted["hourly"] = int(cursor.rowcount or 0)
+        if raw_days > 0:
+            cursor = conn.execute(
+                "DELETE FROM token_usage_ledger WHERE bucket_day < ?",
+                (_day_str(current - timedelta(days=raw_days)),),
+            )
+            deleted["raw"] = int(cursor.rowcount or 0)
+        cursor = conn.execute(
+            "DELETE FROM llm_usage_rollup_hourly WHERE bucket_hour < ?",
+            (_hour_str(current - timedelta(days=_ROLLUP_HOURLY_RETENTION_DAYS)),),
         )
+        deleted["rollup_hourly"] = int(cursor.rowcount or 0)
         conn.commit()
-    _advance_generation()
+    if any(deleted.values()):
+        _advance_generation()
+    return deleted
+
+
+def _compaction_due(now: float) -> bool:
+    return not _LAST_COMPACT_AT or now - _LAST_COMPACT_AT >= 86400
+
+
+def maybe_compact_token_ledger(*, force: bool = False) -> dict[str, int]:
+    global _LAST_COMPACT_AT
+    now = time.time()
+    if not force and not _compaction_due(now):
+        return {}
+    _LAST_COMPACT_AT = now
+    try:
+        return compact_token_ledger()
+    except Exception:
+        return {}
+
+
+def _flush_quietly() -> None:
+    # 读路径先把未落库增量刷进去，仪表盘与额度统计保持精确；刷失败时增量留待下次
+    try:
+        flush_pending_token_usage()
+    except Exception:
+        pass
+
+
+async def run_token_ledger_flusher() -> None:
+    while True:
+        await asyncio.sleep(_FLUSH_INTERVAL_SECONDS)
+        try:
+            if _has_pending():
+                await asyncio.to_thread(flush_pending_token_usage)
+            if _compaction_due(time.time()):
+                await asyncio.to_thread(maybe_compact_token_ledger)
+        except Exception:
+            # 增量已放回待写表，下个周期重试
+            continue
 
 
 def query_provider_summary(window: str = "month") -> dict[str, Any]:
-    """按 provider 维度聚合最近窗口的 token 用量。返回 {provider: totals}。
-    provider 从 purpose 字段中的 `provider=xxx` 子串解析，或从 model 名兜底推导。
+    """按 provider 维度聚合最近窗口的 token 用量、请求数、失败数与延迟分布。
+
+    直接读 provider×model×purpose 汇总表，行数与群/用户数量无关。
     """
+    _flush_quietly()
     window_key = normalize_window(window)
     if window_key == "day":
         start_str = _hour_str(_hour_range_start())
-        table_name = "token_usage_hourly_ledger"
+        table_name = "llm_usage_rollup_hourly"
         where_field = "bucket_hour"
     else:
         start_str = _day_str(_range_start(window_key))
-        table_name = "token_usage_ledger"
+        table_name = "llm_usage_rollup_daily"
         where_field = "bucket_day"
-    providers: dict[str, dict[str, int]] = {}
     with connect_sync() as conn:
         rows = conn.execute(
             f"""
-            SELECT model, purpose,
-                   SUM(prompt_tokens) AS pt,
-                   SUM(completion_tokens) AS ct,
-                   SUM(total_tokens) AS tt,
-                   SUM(call_count) AS cc
+            SELECT provider,
+                   SUM(prompt_tokens) AS prompt_tokens,
+                   SUM(completion_tokens) AS completion_tokens,
+                   SUM(total_tokens) AS total_tokens,
+                   SUM(call_count) AS call_count,
+                   SUM(request_count) AS request_count,
+                   SUM(error_count) AS error_count,
+                   SUM(latency_sum_ms) AS latency_sum_ms,
+                   SUM(latency_le_1s) AS latency_le_1s,
+                   SUM(latency_le_3s) AS latency_le_3s,
+                   SUM(latency_le_10s) AS latency_le_10s,
+                   SUM(latency_le_30s) AS latency_le_30s,
+                   SUM(latency_gt_30s) AS latency_gt_30s,
+                   SUM(cached_prompt_tokens) AS cached_prompt_tokens,
+                   SUM(hedge_count) AS hedge_count,
+                   SUM(hedge_wins) AS hedge_wins
             FROM {table_name}
             WHERE {where_field} >= ?
-            GROUP BY model, purpose
+            GROUP BY provider
             """,
             (start_str,),
         ).fetchall()
+    providers = []
     for row in rows:
-        model = str(row["model"] or "")
-        purpose = str(row["purpose"] or "")
-        provider = _provider_from_model_purpose(model, purpose)
-        bucket = providers.setdefault(provider, {
-            "prompt_tokens": 0, "completion_tokens": 0,
-            "total_tokens": 0, "call_count": 0,
-        })
-        bucket["prompt_tokens"] += int(row["pt"] or 0)
-        bucket["completion_tokens"] += int(row["ct"] or 0)
-        bucket["total_tokens"] += int(row["tt"] or 0)
-        bucket["call_count"] += int(row["cc"] or 0)
+        requests = int(row["request_count"] or 0)
+        prompt_tokens = int(row["prompt_tokens"] or 0)
+        cached_tokens = int(row["cached_prompt_tokens"] or 0)
+        providers.append(
+            {
+                "provider": str(row["provider"] or "unknown"),
+                **_row_to_dict(row, ("prompt_tokens", "completion_tokens", "total_tokens", "call_count")),
+                "request_count": requests,
+                "error_count": int(row["error_count"] or 0),
+                "avg_latency_ms": round(float(row["latency_sum_ms"] or 0) / requests, 1) if requests else 0.0,
+                "cached_prompt_tokens": cached_tokens,
+                "prefix_cache_hit_rate": round(cached_tokens / prompt_tokens, 4) if prompt_tokens else 0.0,
+                "hedge_count": int(row["hedge_count"] or 0),
+                "hedge_wins": int(row["hedge_wins"] or 0),
+                "latency_buckets": {
+                    column[len("latency_"):]: int(row[column] or 0)
+                    for column in _ROLLUP_COLUMNS
+                    if column.startswith("latency_") and column != "latency_sum_ms"
+                },
+            }
+        )
     return {
         "window": window_key,
         "start_day": start_str,
-        "providers": [
-            {"provider": p, **vals}
-            for p, vals in sorted(providers.items(), key=lambda kv: -kv[1]["total_tokens"])
-        ],
+        "providers": sorted(providers, key=lambda item: -item["total_tokens"]),
     }
 
 
 def query_total_consumption() -> dict[str, Any]:
-    """返回不受窗口限制的累计 token 消耗。"""
+    """返回不受窗口限制的累计 token 消耗。
+
+    总量、provider/model/purpose 与逐日曲线读日汇总表；按群排行依赖原始日账本，
+    只覆盖其保留期内的数据。
+    """
+    _flush_quietly()
     with connect_sync() as conn:
         total_row = conn.execute(
             """
@@ -267,20 +706,21 @@ def query_total_consumption() -> dict[str, Any]:
                 COALESCE(SUM(completion_tokens), 0) AS completion_tokens,
                 COALESCE(SUM(total_tokens), 0) AS total_tokens,
                 COALESCE(SUM(call_count), 0) AS call_count,
-                MIN(bucket_day) AS first_day,
-                MAX(bucket_day) AS last_day
-            FROM token_usage_ledger
+                MIN(CASE WHEN call_count > 0 THEN bucket_day END) AS first_day,
+                MAX(CASE WHEN call_count > 0 THEN bucket_day END) AS last_day
+            FROM llm_usage_rollup_daily
             """
         ).fetchone()
         provider_rows = conn.execute(
             """
-            SELECT model, purpose,
+            SELECT provider,
                    SUM(prompt_tokens) AS prompt_tokens,
                    SUM(completion_tokens) AS completion_tokens,
                    SUM(total_tokens) AS total_tokens,
                    SUM(call_count) AS call_count
-            FROM token_usage_ledger
-            GROUP BY model, purpose
+            FROM llm_usage_rollup_daily
+            GROUP BY provider
+            HAVING SUM(call_count) > 0
             """
         ).fetchall()
         model_rows = conn.execute(
@@ -290,9 +730,10 @@ def query_total_consumption() -> dict[str, Any]:
                    SUM(completion_tokens) AS completion_tokens,
                    SUM(total_tokens) AS total_tokens,
                    SUM(call_count) AS call_count
-            FROM token_usage_ledger
+            FROM llm_usage_rollup_daily
             WHERE model != ''
             GROUP BY model
+            HAVING SUM(call_count) > 0
             ORDER BY total_tokens DESC
             LIMIT 50
             """
@@ -318,9 +759,10 @@ def query_total_consumption() -> dict[str, Any]:
                    SUM(completion_tokens) AS completion_tokens,
                    SUM(total_tokens) AS total_tokens,
                    SUM(call_count) AS call_count
-            FROM token_usage_ledger
+            FROM llm_usage_rollup_daily
             WHERE purpose != ''
             GROUP BY purpose
+            HAVING SUM(call_count) > 0
             ORDER BY total_tokens DESC
             LIMIT 80
             """
@@ -332,18 +774,16 @@ def query_total_consumption() -> dict[str, Any]:
                    SUM(completion_tokens) AS completion_tokens,
                    SUM(total_tokens) AS total_tokens,
                    SUM(call_count) AS call_count
-            FROM token_usage_ledger
+            FROM llm_usage_rollup_daily
             GROUP BY bucket_day
+            HAVING SUM(call_count) > 0
             ORDER BY bucket_day ASC
             """
         ).fetchall()
 
     providers: dict[str, dict[str, int]] = {}
     for row in provider_rows:
-        model = str(row["model"] or "")
-        purpose = str(row["purpose"] or "")
-        provider = _provider_from_model_purpose(model, purpose)
-        bucket = providers.setdefault(provider, _empty_totals())
+        bucket = providers.setdefault(str(row["provider"] or "unknown"), _empty_totals())
         for key, column in (
             ("prompt_tokens", "prompt_tokens"),
             ("completion_tokens", "completion_tokens"),
@@ -497,7 +937,7 @@ def _query_hourly_summary() -> dict[str, Any]:
                 COALESCE(SUM(completion_tokens), 0) AS completion_tokens,
                 COALESCE(SUM(total_tokens), 0) AS total_tokens,
                 COALESCE(SUM(call_count), 0) AS call_count
-            FROM token_usage_hourly_ledger
+            FROM llm_usage_rollup_hourly
             WHERE bucket_hour >= ?
             """,
             (start_str,),
@@ -509,9 +949,10 @@ def _query_hourly_summary() -> dict[str, Any]:
                    SUM(completion_tokens) AS completion_tokens,
                    SUM(total_tokens) AS total_tokens,
                    SUM(call_count) AS call_count
-            FROM token_usage_hourly_ledger
+            FROM llm_usage_rollup_hourly
             WHERE bucket_hour >= ?
             GROUP BY bucket_hour
+            HAVING SUM(call_count) > 0
             ORDER BY bucket_hour ASC
             """,
             (start_str,),
@@ -523,9 +964,10 @@ def _query_hourly_summary() -> dict[str, Any]:
                    SUM(completion_tokens) AS completion_tokens,
                    SUM(total_tokens) AS total_tokens,
                    SUM(call_count) AS call_count
-            FROM token_usage_hourly_ledger
+            FROM llm_usage_rollup_hourly
             WHERE bucket_hour >= ? AND model != ''
             GROUP BY model
+            HAVING SUM(call_count) > 0
             ORDER BY total_tokens DESC
             """,
             (start_str,),
@@ -552,9 +994,10 @@ def _query_hourly_summary() -> dict[str, Any]:
                    SUM(completion_tokens) AS completion_tokens,
                    SUM(total_tokens) AS total_tokens,
                    SUM(call_count) AS call_count
-            FROM token_usage_hourly_ledger
+            FROM llm_usage_rollup_hourly
             WHERE bucket_hour >= ? AND purpose != ''
             GROUP BY purpose
+            HAVING SUM(call_count) > 0
             ORDER BY total_tokens DESC
             LIMIT 50
             """,
@@ -608,7 +1051,11 @@ def _query_hourly_summary() -> dict[str, Any]:
 
 
 def query_summary(window: str = "month") -> dict[str, Any]:
-    """返回当前窗口的总 token 数 + 按 day/model/group 的分布。"""
+    """返回当前窗口的总 token 数 + 按 day/model/group 的分布。
+
+    除按群排行外都读汇总表，按群排行读按群拆分的原始账本。
+    """
+    _flush_quietly()
     window_key = normalize_window(window)
     if window_key == "day":
         return _query_hourly_summary()
@@ -622,7 +1069,7 @@ def query_summary(window: str = "month") -> dict[str, Any]:
                 COALESCE(SUM(completion_tokens), 0) AS completion_tokens,
                 COALESCE(SUM(total_tokens), 0) AS total_tokens,
                 COALESCE(SUM(call_count), 0) AS call_count
-            FROM token_usage_ledger
+            FROM llm_usage_rollup_daily
             WHERE bucket_day >= ?
             """,
             (start_str,),
@@ -634,9 +1081,10 @@ def query_summary(window: str = "month") -> dict[str, Any]:
                    SUM(completion_tokens) AS completion_tokens,
                    SUM(total_tokens) AS total_tokens,
                    SUM(call_count) AS call_count
-            FROM token_usage_ledger
+            FROM llm_usage_rollup_daily
             WHERE bucket_day >= ?
             GROUP BY bucket_day
+            HAVING SUM(call_count) > 0
             ORDER BY bucket_day DESC
             """,
             (start_str,),
@@ -648,9 +1096,10 @@ def query_summary(window: str = "month") -> dict[str, Any]:
                    SUM(completion_tokens) AS completion_tokens,
                    SUM(total_tokens) AS total_tokens,
                    SUM(call_count) AS call_count
-            FROM token_usage_ledger
+            FROM llm_usage_rollup_daily
             WHERE bucket_day >= ? AND model != ''
             GROUP BY model
+            HAVING SUM(call_count) > 0
             ORDER BY total_tokens DESC
             """,
             (start_str,),
@@ -670,7 +1119,7 @@ def query_summary(window: str = "month") -> dict[str, Any]:
             """,
             (start_str,),
         ).fetchall()
-        # purpose 维度：从 purpose 字段抽 functional 部分（剥离 `|provider=xxx` 尾巴）
+        # purpose 维度：汇总表里已是 functional 部分（写入时剥离 `|provider=xxx` 尾巴）
         by_purpose_rows = conn.execute(
             """
             SELECT purpose,
@@ -678,9 +1127,10 @@ def query_summary(window: str = "month") -> dict[str, Any]:
                    SUM(completion_tokens) AS completion_tokens,
                    SUM(total_tokens) AS total_tokens,
                    SUM(call_count) AS call_count
-            FROM token_usage_ledger
+            FROM llm_usage_rollup_daily
             WHERE bucket_day >= ? AND purpose != ''
             GROUP BY purpose
+            HAVING SUM(call_count) > 0
             ORDER BY total_tokens DESC
             LIMIT 50
             """,
@@ -733,6 +1183,7 @@ def query_summary(window: str = "month") -> dict[str, Any]:
 
 def query_group_detail(group_id: str, window: str = "month") -> dict[str, Any]:
     """单个群在窗口内按 day/model 的明细。"""
+    _flush_quietly()
     window_key = normalize_window(window)
     if window_key == "day":
         start_str = _hour_str(_hour_range_start())
@@ -827,11 +1278,21 @@ def _aggregate_purpose_rows(rows: list[Any]) -> list[dict[str, Any]]:
 
 
 __all__ = [
+    "backfill_usage_rollups",
+    "compact_token_ledger",
+    "configure_token_ledger",
+    "discard_pending_token_usage",
+    "flush_pending_token_usage",
     "ledger_generation",
+    "maybe_compact_token_ledger",
+    "pending_token_usage_calls",
     "record_llm_call",
+    "record_llm_hedge",
+    "record_llm_outcome",
     "query_summary",
     "query_group_detail",
     "query_provider_summary",
     "query_total_consumption",
     "normalize_window",
+    "run_token_ledger_flusher",
 ]
@@ -0,0 +1,178 @@
+"""OpenAI 风格工具 schema → 各 provider 线格式的转换缓存。
+
+Agent 每一步、每次 provider 回退都会把同一组工具 schema 重新深度遍历转换一遍（Gemini 还要做 schema 归一化）。
+这里按单个工具 schema 的结构哈希记住转换结果：工具集合里改动一个工具只重算那一个，
+其余工具直接复用；相同输入得到同一份结构，序列化后的工具块在多次请求之间逐字节一致，利于 provider 侧前缀缓存。
+
+- 结构哈希本身和一次 Gemini 转换差不多贵；ToolRegistry 每次重建外层 dict，但 `parameters` 沿用 AgentTool 上的同一个对象，
+  所以 parameters 的哈希再按对象身份记一层，命中时只需哈希名字 / 描述这些小字段。注册后的 parameters 视为不可变
+- 转换结果在缓存内共享，调用方只能替换顶层字段（返回的是顶层浅拷贝），不要原地修改嵌套的 schema
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable
+
+from .metrics import record_counter, record_timing
+from .runtime_performance import register_cache_reporter
+
+_CACHE_MAX_SIZE = 512
+_MISSING = object()
+
+_LOCK = threading.Lock()
+# (provider, schema 哈希) -> 转换结果；转换器判定不可用的工具缓存为 None
+_CONVERTED: OrderedDict[tuple[str, str], dict[str, Any] | None] = OrderedDict()
+# id(parameters) -> (parameters, 哈希)；持有强引用，id 在条目存活期间不会被复用
+_PARAMETER_DIGESTS: OrderedDict[int, tuple[Any, str]] = OrderedDict()
+_STATS: dict[str, dict[str, float]] = {}
+_EVICTIONS = 0
+
+
+def _digest(value: Any) -> str:
+    payload = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _parameters_digest(parameters: Any) -> str:
+    if not isinstance(parameters, dict):
+        return _digest(parameters)
+    with _LOCK:
+        cached = _PARAMETER_DIGESTS.get(id(parameters))
+        if cached is not None and cached[0] is parameters:
+            _PARAMETER_DIGESTS.move_to_end(id(parameters))
+            return cached[1]
+    digest = _digest(parameters)
+    with _LOCK:
+        _PARAMETER_DIGESTS[id(parameters)] = (parameters, digest)
+        while len(_PARAMETER_DIGESTS) > _CACHE_MAX_SIZE:
+            _PARAMETER_DIGESTS.popitem(last=False)
+    return digest
+
+
+def tool_schema_digest(tool: Any) -> str:
+    """与键顺序无关的结构哈希；`parameters` 单独哈希并按对象身份复用。"""
+    if not isinstance(tool, dict):
+        return _digest(tool)
+    function_def = tool.get("function")
+    if isinstance(function_def, dict) and "parameters" in function_def:
+        shell = {**tool, "function": {**function_def, "parameters": _parameters_digest(function_def["parameters"])}}
+    elif "parameters" in tool:
+        shell = {**tool, "parameters": _parameters_digest(tool["parameters"])}
+    else:
+        return _digest(tool)
+    return _digest(shell)
+
+
+def _lookup(key: tuple[str, str]) -> Any:
+    with _LOCK:
+        value = _CONVERTED.get(key, _MISSING)
+        if value is not _MISSING:
+            _CONVERTED.move_to_end(key)
+        return value
+
+
+def _store(key: tuple[str, str], value: dict[str, Any] | None) -> None:
+    global _EVICTIONS
+    with _LOCK:
+        _CONVERTED[key] = value
+        _CONVERTED.move_to_end(key)
+        while len(_CONVERTED) > _CACHE_MAX_SIZE:
+            _CONVERTED.popitem(last=False)
+            _EVICTIONS += 1
+
+
+def _record(provider: str, *, hits: int, misses: int, elapsed_ms: float) -> None:
+    with _LOCK:
+        stats = _STATS.setdefault(provider, {"hits": 0, "misses": 0, "calls": 0, "total_ms": 0.0})
+        stats["hits"] += hits
+        stats["misses"] += misses
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed_ms
+    if hits:
+        record_counter("tool_schema_cache", hits, provider=provider, outcome="hit")
+    if misses:
+        record_counter("tool_schema_cache", misses, provider=provider, outcome="miss")
+    record_timing("tool_schema_conversion", elapsed_ms, provider=provider)
+
+
+def convert_tool_schemas(
+    provider: str,
+    tools: Iterable[Any],
+    convert: Callable[[dict[str, Any]], dict[str, Any] | None],
+) -> list[dict[str, Any]]:
+    """逐个工具查缓存转换；非 dict 与转换器返回 None 的工具被丢弃，顺序与输入一致。"""
+    started = time.perf_counter()
+    name = str(provider or "").strip() or "unknown"
+    converted: list[dict[str, Any]] = []
+    hits = misses = 0
+    for tool in list(tools or []):
+        if not isinstance(tool, dict):
+            continue
+        key = (name, tool_schema_digest(tool))
+        value = _lookup(key)
+        if value is _MISSING:
+            misses += 1
+            value = convert(tool)
+            _store(key, value)
+        else:
+            hits += 1
+        if value is not None:
+            converted.append(dict(value))
+    _record(name, hits=hits, misses=misses, elapsed_ms=(time.perf_counter() - started) * 1000.0)
+    return converted
+
+
+def tool_schema_cache_snapshot() -> dict[str, Any]:
+    with _LOCK:
+        entries = len(_CONVERTED)
+        evictions = _EVICTIONS
+        stats = {name: dict(values) for name, values in _STATS.items()}
+    providers = {
+        name: {
+            "hits": int(values["hits"]),
+            "misses": int(values["misses"]),
+            "calls": int(values["calls"]),
+            "avg_ms": round(values["total_ms"] / values["calls"], 4) if values["calls"] else 0.0,
+        }
+        for name, values in stats.items()
+    }
+    return {
+        "entries": entries,
+        "limit": _CACHE_MAX_SIZE,
+        "evictions": evictions,
+        "hits": sum(item["hits"] for item in providers.values()),
+        "misses": sum(item["misses"] for item in providers.values()),
+        "providers": providers,
+    }
+
+
+def clear_tool_schema_cache() -> None:
+    with _LOCK:
+        _CONVERTED.clear()
+        _PARAMETER_DIGESTS.clear()
+
+
+def reset_for_testing() -> None:
+    global _EVICTIONS
+    with _LOCK:
+        _CONVERTED.clear()
+        _PARAMETER_DIGESTS.clear()
+        _STATS.clear()
+        _EVICTIONS = 0
+
+
+register_cache_reporter("tool_schema", tool_schema_cache_snapshot)
+
+
+__all__ = [
+    "clear_tool_schema_cache",
+    "convert_tool_schemas",
+    "reset_for_testing",
+    "tool_schema_cache_snapshot",
+    "tool_schema_digest",
+]
@@ -10,6 +10,7 @@ from typing import Any, Iterable, Literal
 
 from .media_refs import is_supported_video_filename, normalize_video_ref
 from .message_relations import extract_reply_message_id
+from .onebot_cache import get_onebot_message
 
 
 MediaOrigin = Literal["current", "quoted", "batch"]
@@ -365,29 +366,10 @@ async def resolve_onebot_quoted_media_refs(
     reply_message_id = extract_reply_message_id(event)
     if not reply_message_id:
         return refs
-    request_message_id: str | int = reply_message_id
-    if reply_message_id.isdigit():
-        try:
-            request_message_id = int(reply_message_id)
-        except (TypeError, ValueError, OverflowError):
-            request_message_id = reply_message_id
-    try:
-        get_msg = getattr(bot, "get_msg", None)
-        if callable(get_msg):
-            request = get_msg(message_id=request_message_id)
-        else:
-            call_api = getattr(bot, "call_api", None)
-            if not callable(call_api):
-                return refs
-            request = call_api("get_msg", message_id=request_message_id)
-        payload = _onebot_message_payload(
-            await asyncio.wait_for(
-                request,
-                timeout=max(1.0, float(timeout_seconds or 15.0)),
-            )
-        )
-    except Exception:
+    payload = await get_onebot_message(bot, reply_message_id, timeout_seconds=timeout_seconds)
+    if payload is None:
         return refs
+    payload = _onebot_message_payload(payload)
     quoted_refs = extract_media_from_message(
         _object_value(payload, "message"),
         origin="quoted",
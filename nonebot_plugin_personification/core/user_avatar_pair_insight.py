@@ -20,6 +20,7 @@ from .media_understanding import (
     get_primary_image_route_fingerprint,
 )
 from .protocol_adapter import get_protocol_adapter
+from .runtime_performance import register_cache_reporter
 from .safe_image_download import download_public_image
 from .user_profile_meta import qq_avatar_url
 from .visual_capabilities import VISUAL_ROUTE_VISION
@@ -883,6 +884,9 @@ def _clear_pair_cache_for_testing() -> None:
     _USER_GENERATIONS.clear()
 
 
+register_cache_reporter("avatar_pair_cache", footprint=lambda: _PAIR_CACHE)
+
+
 __all__ = [
     "AVATAR_PAIR_ANALYSIS_SCHEMA_VERSION",
     "AVATAR_PAIR_ALLOWED_MIMES",
@@ -4,6 +4,7 @@ import asyncio
 from typing import Any
 
 from .db import connect_sync, get_db_path
+from .group_relation_edges import discard_pending_relation_edges
 
 
 async def purge_user_profile_data(
@@ -50,6 +51,7 @@ async def purge_user_profile_data(
 
     policy_service = getattr(bundle, "user_policy_service", None)
     db_path = getattr(policy_service, "db_path", None) or get_db_path()
+    discard_pending_relation_edges(user_id=uid)
     with connect_sync(db_path) as conn:
         conn.execute("BEGIN IMMEDIATE")
         # These legacy rows are deleted here as a safe fallback when PersonaStore is
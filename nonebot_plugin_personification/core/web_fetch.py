@@ -22,6 +22,8 @@ from urllib.parse import urljoin, urlparse
 import httpx
 from bs4 import BeautifulSoup
 
+from .http_clients import shared_http_client
+
 _DEFAULT_TIMEOUT = 60.0
 _DEFAULT_MAX_CHARS = 3000
 _MAX_BYTES = 2 * 1024 * 1024  # 2 MB
@@ -196,7 +198,7 @@ async def fetch_web_page(
         }
         if proxy_url:
             client_kwargs["proxy"] = proxy_url
-        async with httpx.AsyncClient(**client_kwargs) as client:
+        async with shared_http_client(**client_kwargs) as client:
             current_url = str(url)
             resp = None
             for redirect_count in range(6):
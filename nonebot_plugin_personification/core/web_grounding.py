@@ -9,6 +9,8 @@ from urllib.parse import quote
 
 import httpx
 
+from .http_clients import shared_http_client
+
 
 # personification-semantic-boundary: grounding-context-only
 # Keyword buckets here only choose web-search context shape. They must not be
@@ -383,7 +385,7 @@ async def fetch_tavily_results(
         "max_results": max(3, min(int(max_results or 6), 10)),
     }
     try:
-        async with httpx.AsyncClient(**_client_kwargs(timeout=15.0)) as client:
+        async with shared_http_client(**_client_kwargs(timeout=15.0)) as client:
             resp = await client.post("https://api.tavily.com/search", json=payload)
             if resp.status_code != 200:
                 return []
@@ -431,7 +433,7 @@ async def fetch_baike_summary(keyword: str, *, logger: Any) -> str:
         )
     }
     try:
-        async with httpx.AsyncClient(**_client_kwargs(timeout=10.0, follow_redirects=True, headers=headers)) as client:
+        async with shared_http_client(**_client_kwargs(timeout=10.0, follow_redirects=True, headers=headers)) as client:
             url = f"https://baike.baidu.com/search/word?word={quote(keyword)}"
             resp = await client.get(url)
             if resp.status_code != 200:
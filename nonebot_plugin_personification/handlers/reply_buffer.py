@@ -9,6 +9,7 @@ from typing import Any, Callable, Dict
 from ..core import metrics
 from ..core.context_cleanup import release_message_buffer_entry_resources
 from ..core.message_relations import extract_reply_message_id
+from ..core.runtime_performance import register_cache_reporter
 from ..core.target_inference import normalize_message_target_for_review
 from ..core.turn_media import (
     TurnMediaRef,
@@ -1299,3 +1300,6 @@ async def handle_reply_event(
         start_buffer_timer=start_buffer_timer,
     )
     logger.debug(f"拟人插件：已缓冲会话 {session_key} 的消息，等待后续...")
+
+
+register_cache_reporter("reply_recent_media", footprint=lambda: _recent_media_by_sender)
@@ -0,0 +1,140 @@
+"""流式首段提前发送：模型还在生成后文时，先把已经完整的第一段发出去。
+
+设计约束：
+- 只认显式段落边界（空行），与 split_text_into_segments 的切分口径一致，
+  提前发出的内容就是非流式路径下本该发出的第一条消息；
+- 段落里出现控制标记、结构化输出、会被后处理改写的套话时放弃提前发送，宁可退回整段发送；
+- 每轮最多提前发送一次；最终回复只补发已发段落之后的部分，不再以已发段落开头时调用方停止补发，
+  按已发内容收口并记入 trace，不会把首段重发一遍。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Any, Awaitable, Callable
+
+# 后处理会删改的内容：标记/标签/代码块/十六进制串/控制词，以及 processor 里按正则剥掉的套话
+_UNSAFE_RE = re.compile(r"[\[\]<>{}【】`]|[A-F0-9]{16,}|NO_REPLY|SILENCE|BLOCK")
+_REWRITTEN_PREFIX_RE = re.compile(r"^(根据你的描述|总的来说|总体来说|如果你需要|如果需要的话)")
+_REWRITTEN_TAIL_RE = re.compile(r"如果你需要|需要的话")
+_PARAGRAPH_BREAK_RE = re.compile(r"\S[ \t]*\r?\n\s*\n")
+
+
+def is_early_dispatch_safe(segment: str, *, max_chars: int = 0) -> bool:
+    text = str(segment or "").strip()
+    if not text:
+        return False
+    if max_chars > 0 and len(text) > max_chars:
+        return False
+    if _UNSAFE_RE.search(text) or _REWRITTEN_PREFIX_RE.search(text) or _REWRITTEN_TAIL_RE.search(text):
+        return False
+    return True
+
+
+def early_dispatch_candidate(
+    text: str,
+    *,
+    split: Callable[[str], list[str]],
+    max_chars: int = 0,
+) -> str:
+    """缓冲区里第一段已经被空行"封口"时返回该段，否则返回空串。"""
+    if not _PARAGRAPH_BREAK_RE.search(text or ""):
+        return ""
+    segments = split(text)
+    if not segments:
+        return ""
+    first = str(segments[0] or "").strip()
+    return first if is_early_dispatch_safe(first, max_chars=max_chars) else ""
+
+
+class EarlyReplyDispatcher:
+    """作为 llm_stream 的 sink 接收文本增量，首段封口后起一个发送任务。
+
+    send 返回 True 表示已交付；抛错或返回 False 都视为未发送，调用方照常整段发送。
+    """
+
+    def __init__(
+        self,
+        *,
+        send: Callable[[str], Awaitable[bool]],
+        split: Callable[[str], list[str]],
+        max_chars: int = 0,
+        screen: Callable[[str], bool] | None = None,
+    ) -> None:
+        self._send = send
+        self._split = split
+        self._max_chars = max(0, int(max_chars or 0))
+        self._screen = screen
+        self._buffer = ""
+        self._task: asyncio.Task[None] | None = None
+        self._closed = False
+        self.sent_text = ""
+        self.error: BaseException | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+
+    def begin_attempt(self) -> None:
+        # 发送前换了 provider / 重试：丢弃旧缓冲；已经发出去的段落收不回来，交给最终比对
+        if self._task is None:
+            self._buffer = ""
+
+    def feed(self, text: str) -> None:
+        if self._closed or self._task is not None:
+            return
+        self._buffer += str(text or "")
+        candidate = early_dispatch_candidate(self._buffer, split=self._split, max_chars=self._max_chars)
+        if not candidate:
+            return
+        if self._screen is not None:
+            try:
+                if not self._screen(candidate):
+                    self._closed = True
+                    return
+            except Exception:
+                self._closed = True
+                return
+        self._task = asyncio.create_task(self._run(candidate))
+
+    async def _run(self, segment: str) -> None:
+        try:
+            delivered = await self._send(segment)
+        except Exception as exc:
+            self.error = exc
+            return
+        if delivered:
+            self.sent_text = segment
+
+    async def finish(self) -> str:
+        """生成结束后调用：不再接收增量，等待在途发送完成，返回已发出的段落。"""
+        self._closed = True
+        if self._task is not None:
+            await self._task
+        return self.sent_text
+
+    def remaining_segments(self, segments: list[str]) -> list[str] | None:
+        """剔除已提前发出的前缀，只留未发部分；最终首段不再以已发内容开头时返回 None。"""
+        if not self.sent_text:
+            return list(segments)
+        if not segments:
+            return None
+        first = str(segments[0] or "").strip()
+        if not first.startswith(self.sent_text):
+            return None
+        # 最终切分可能把已发段落和后文并成一段，这时只去掉已发的那一截
+        rest = first[len(self.sent_text):].strip()
+        return ([rest] if rest else []) + list(segments[1:])
+
+
+def early_dispatch_enabled(plugin_config: Any) -> bool:
+    return bool(getattr(plugin_config, "personification_reply_streaming_enabled", False))
+
+
+__all__ = [
+    "EarlyReplyDispatcher",
+    "early_dispatch_candidate",
+    "early_dispatch_enabled",
+    "is_early_dispatch_safe",
+]
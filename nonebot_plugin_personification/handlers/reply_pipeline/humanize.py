@@ -13,6 +13,8 @@ import re
 import time
 from typing import Any
 
+from ...core.runtime_performance import register_cache_reporter
+
 # ──────────────────────── 打字延迟 ────────────────────────
 
 _BASE_READ_RANGE = (0.5, 1.2)
@@ -300,6 +302,9 @@ def reset_humanize_state() -> None:
     _last_quote.clear()
 
 
+register_cache_reporter("humanize_last_quote", footprint=lambda: _last_quote)
+
+
 __all__ = [
     "compute_typing_delay",
     "compute_gap_delay",
@@ -17,6 +17,7 @@ from ...core.current_group_context_tool import register_current_group_context_to
 from ...core.error_utils import log_exception
 from ...core.image_input import provider_supports_vision
 from ...core.image_result_cache import image_fingerprint
+from ...core.llm_singleflight import PURPOSE_IMAGE_CLASSIFICATION, coalesced_chat
 from ...core.memory_defaults import DEFAULT_PRIVATE_HISTORY_TURNS, MAX_PRIVATE_HISTORY_TURNS
 from ...core.memory_recall_gate import gate_memory_candidates
 from ...core.message_parts import build_user_message_content
@@ -29,7 +30,9 @@ from ...core.qq_expression_tools import register_send_qq_expression_tools
 from ...core.gemini_profile import build_gemini_route_policy_prompt
 from ...core.group_member_avatar_insight import register_group_member_avatar_insight_tool
 from ...core.reply_text_policy import normalize_visible_reply_text
-from ...core.reply_style_policy import build_reply_style_policy_prompt
+from ...core.reply_style_policy import build_photo_context_style_note, build_reply_style_policy_prompt
+from ...core.runtime_performance import register_cache_reporter
+from ...core.span_trace import span, traced
 from ...core.visible_output import guard_visible_text
 from ..reply_commit import (
     acquire_reply_commit,
@@ -66,6 +69,7 @@ def build_reply_operation_id(*, bot: Any, event: Any, reply_trace_id: str = "")
     return f"qq-reply:{bot_id}:{event_identity}"
 
 
+@traced("onebot.send", attr_keys=("surface",))
 async def dispatch_reply_part(
     *,
     bot: Any,
@@ -225,18 +229,19 @@ async def _recall_agent_candidate_memories(
     user_id = str(getattr(event, "user_id", "") or "").strip()
     mode = "deep" if memory_need == "deep" else "auto"
     try:
-        candidates = await asyncio.to_thread(
-            memory_store.recall_memories,
-            query=query,
-            scope="auto",
-            user_id=user_id,
-            group_id=group_id,
-            # Broad candidate pool; the second-stage gate below owns the
-            # automatic-context limit and never exposes all candidates.
-            limit=24,
-            mode=mode,
-            context_type="group" if group_id else "private",
-        )
+        with span("memory.recall", mode=mode):
+            candidates = await asyncio.to_thread(
+                memory_store.recall_memories,
+                query=query,
+                scope="auto",
+                user_id=user_id,
+                group_id=group_id,
+                # Broad candidate pool; the second-stage gate below owns the
+                # automatic-context limit and never exposes all candidates.
+                limit=24,
+                mode=mode,
+                context_type="group" if group_id else "private",
+            )
         caller = getattr(runtime, "lite_tool_caller", None) or getattr(runtime, "agent_tool_caller", None)
         max_inject = max(
             0,
@@ -404,10 +409,15 @@ async def classify_incoming_image(
             continue
         attempted_vision_classify = True
         try:
-            response = await caller.chat_with_tools(
-                messages=request_messages,
-                tools=[],
-                use_builtin_search=False,
+            response = await coalesced_chat(
+                caller,
+                request_messages,
+                lambda caller=caller: caller.chat_with_tools(
+                    messages=request_messages,
+                    tools=[],
+                    use_builtin_search=False,
+                ),
+                purpose=PURPOSE_IMAGE_CLASSIFICATION,
             )
         except Exception as exc:
             log_exception(
@@ -766,6 +776,7 @@ async def get_cached_friend_ids(bot: Any, logger: Any, ttl_seconds: int = 300) -
     return friend_ids
 
 
+@traced("agent.run")
 async def run_agent_if_enabled(
     *,
     bot: Any,
@@ -1131,7 +1142,7 @@ def build_final_visible_reply_text(
     return sanitize_history_text(final_reply)
 
 
-def build_base_system_prompt(
+def build_base_system_prompt_parts(
     *,
     base_prompt: str,
     user_name: str,
@@ -1149,19 +1160,16 @@ def build_base_system_prompt(
     primary_api_type: str = "",
     primary_model: str = "",
     native_search_enabled: bool = False,
-) -> str:
+) -> tuple[str, str]:
+    """返回 (静态前缀, 易变部分)。
+
+    静态前缀只含人设、会话类型规则、风格与核心准则，同一人设同一会话类型下逐字节不变，
+    供 provider 前缀缓存命中；对方昵称/好感、情绪、钩子注入的记忆与上下文等每轮变化的内容
+    全部放进易变部分，排在静态前缀之后。
+    """
     profile = load_persona_profile(base_prompt)
     parts: List[str] = [base_prompt if isinstance(base_prompt, str) else ""]
     parts.append(render_persona_snapshot(profile))
-    parts.extend(chunk for chunk in prelude_chunks if chunk)
-    parts.append(
-        "## 当前对话环境\n"
-        f"- 对方昵称：{user_name}\n"
-        f"- 对方好感等级：{level_name}\n"
-        f"- 你的互动倾向：{combined_attitude}"
-    )
-    if emotion_block:
-        parts.append(emotion_block)
     if plugin_summary:
         parts.append(f"[已安装插件摘要（仅供参考）]\n{str(plugin_summary).strip()}")
     if is_private_session:
@@ -1188,23 +1196,7 @@ def build_base_system_prompt(
             "9. 遇到可能是游戏/圈子黑话的词语，若上下文无法确认含义，不要按字面理解强行接话，优先沉默或等待更多上下文再参与。\n"
             "10. 回复时不要把对方说的话原样重复后加感叹（如“太真实了/太直球了”），直接接话即可。"
         )
-    parts.append(
-        build_reply_style_policy_prompt(
-            has_visual_context=has_visual_context,
-            photo_like=photo_like,
-            is_group=not is_private_session,
-        )
-    )
-    gemini_policy = build_gemini_route_policy_prompt(
-        api_type=primary_api_type,
-        model=primary_model,
-        has_visual_context=has_visual_context,
-        has_video_context=has_video_context,
-        native_search_enabled=native_search_enabled,
-    )
-    if gemini_policy:
-        parts.append(gemini_policy)
-    parts.extend(chunk for chunk in context_chunks if chunk)
+    parts.append(build_reply_style_policy_prompt(is_group=not is_private_session))
     parts.append(
         "## 核心行动准则\n"
         "1. 保持自然口吻，拒绝模板化官腔和客服腔。\n"
@@ -1225,8 +1217,34 @@ def build_base_system_prompt(
         "不写结尾点评或总结、不堆营业腔和网络黑话。可以用自己的人设口吻即兴接两三句、玩梗式轻轻带过，"
         "但绝不展开成长篇命题作文，也不要为此出戏、扮演成别的角色或换成别的说话风格。"
     )
-    parts.extend(chunk for chunk in postlude_chunks if chunk)
-    return ensure_prompt_injection_guard("\n\n".join(part for part in parts if part))
+    stable_prefix = ensure_prompt_injection_guard("\n\n".join(part for part in parts if part))
+
+    volatile: List[str] = list(chunk for chunk in prelude_chunks if chunk)
+    volatile.append(
+        "## 当前对话环境\n"
+        f"- 对方昵称：{user_name}\n"
+        f"- 对方好感等级：{level_name}\n"
+        f"- 你的互动倾向：{combined_attitude}"
+    )
+    if emotion_block:
+        volatile.append(emotion_block)
+    volatile.append(build_photo_context_style_note(has_visual_context=has_visual_context, photo_like=photo_like))
+    volatile.append(
+        build_gemini_route_policy_prompt(
+            api_type=primary_api_type,
+            model=primary_model,
+            has_visual_context=has_visual_context,
+            has_video_context=has_video_context,
+            native_search_enabled=native_search_enabled,
+        )
+    )
+    volatile.extend(chunk for chunk in context_chunks if chunk)
+    volatile.extend(chunk for chunk in postlude_chunks if chunk)
+    return stable_prefix, "\n\n".join(part for part in volatile if part)
+
+
+def build_base_system_prompt(**kwargs: Any) -> str:
+    return "\n\n".join(part for part in build_base_system_prompt_parts(**kwargs) if part)
 
 
 def build_confidence_style_instruction(confidence: float, *, is_group: bool = False) -> str:
@@ -1291,9 +1309,14 @@ def build_scenario_instruction(scenario: str) -> str:
     return _SCENARIO_INSTRUCTIONS.get(normalized, "")
 
 
+register_cache_reporter("image_classify_cache", footprint=lambda: _IMAGE_CLASSIFY_CACHE)
+register_cache_reporter("reply_friend_ids", footprint=lambda: _FRIEND_IDS_CACHE)
+
+
 __all__ = [
     "batch_has_newer_messages",
     "build_base_system_prompt",
+    "build_base_system_prompt_parts",
     "build_confidence_style_instruction",
     "build_scenario_instruction",
     "build_final_visible_reply_text",
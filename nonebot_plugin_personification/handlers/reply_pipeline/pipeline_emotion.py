@@ -13,6 +13,7 @@ from ...agent.runtime.planner import (
     turn_plan_from_semantic_frame,
     turn_plan_to_semantic_frame,
 )
+from ...agent.runtime.preflight import preflight_turn_with_llm
 from ...agent.runtime.tool_catalog import registry_planner_metadata
 from ...core.chat_intent import (
     infer_turn_semantic_frame_with_llm,
@@ -31,6 +32,7 @@ from ...core.response_review import (
     arbitrate_reply_mode,
     extract_recent_bot_reply_texts,
 )
+from ...core.span_trace import traced
 from ...core.target_inference import normalize_message_target_for_plan, normalize_message_target_for_review
 from ...core.user_avatar_insight import add_current_user_avatar_planner_metadata
 from .pipeline_context import batch_has_newer_messages
@@ -372,6 +374,177 @@ async def plan_turn_with_timeout(
     return turn_plan, elapsed_ms, fallback_reason, timeout_s, "metadata"
 
 
+def _preflight_slices(preflight: Any) -> int:
+    return int(getattr(preflight, "semantic_frame", None) is not None) + int(
+        getattr(preflight, "turn_plan", None) is not None
+    )
+
+
+def turn_preflight_enabled(plugin_config: Any) -> bool:
+    return bool(getattr(plugin_config, "personification_turn_preflight_enabled", False))
+
+
+async def preflight_turn_with_timeout(
+    text: str,
+    *,
+    plugin_config: Any,
+    is_group: bool = False,
+    is_random_chat: bool = False,
+    is_direct_mention: bool = False,
+    has_images: bool = False,
+    message_target: str = "",
+    qzone_event_type: str = "",
+    tool_caller: Any = None,
+    recent_context: str = "",
+    relationship_hint: str = "",
+    repeat_clusters: list[dict[str, Any]] | None = None,
+    current_inner_state: str = "",
+    current_emotion_state: str = "",
+    available_tools: list[dict[str, Any]] | None = None,
+    group_knowledge_hint: str = "",
+    fallback_tool_caller: Any = None,
+    logger: Any = None,
+    metric_scene: str = "group",
+    metric_mode: str = "shadow",
+    media_grounding: str = "",
+) -> tuple[tuple[Any, float, str, float, str], tuple[Any, float, str, float, str]]:
+    """一次往返同时拿语义帧和 TurnPlan，返回值与两个单独调用的结果元组同形。
+
+    解析失败的 slice 退回对应的单独调用；整体超时则两边直接走 metadata fallback，
+    避免在已耗尽的预算上再串行补两次调用。
+    """
+    timeout_s = semantic_frame_timeout_seconds(plugin_config)
+    started_at = time.monotonic()
+    planner_message_target = normalize_message_target_for_plan(message_target)
+    primary_caller, secondary_caller = _effective_callers(tool_caller, fallback_tool_caller)
+
+    async def _call(caller: Any, timeout: float) -> tuple[Any | None, bool]:
+        try:
+            preflight = await asyncio.wait_for(
+                preflight_turn_with_llm(
+                    text,
+                    is_group=is_group,
+                    is_random_chat=is_random_chat,
+                    is_direct_mention=is_direct_mention,
+                    has_images=has_images,
+                    message_target=message_target,
+                    plan_message_target=planner_message_target,
+                    qzone_event_type=qzone_event_type,
+                    tool_caller=caller,
+                    recent_context=recent_context,
+                    relationship_hint=relationship_hint,
+                    repeat_clusters=repeat_clusters,
+                    current_inner_state=current_inner_state,
+                    current_emotion_state=current_emotion_state,
+                    available_tools=available_tools,
+                    group_knowledge_hint=group_knowledge_hint,
+                    media_grounding=media_grounding,
+                ),
+                timeout=max(0.1, timeout),
+            )
+            return preflight, False
+        except asyncio.TimeoutError:
+            return None, True
+
+    preflight = None
+    source = "metadata"
+    timed_out = False
+    if primary_caller is not None:
+        preflight, timed_out = await _call(
+            primary_caller,
+            _primary_attempt_timeout(timeout_s, secondary_caller is not None),
+        )
+        source = "preflight_primary"
+        if (preflight is None or not preflight.complete) and secondary_caller is not None:
+            remaining_s = max(0.0, timeout_s - (time.monotonic() - started_at))
+            if remaining_s > 0.05:
+                secondary, secondary_timed_out = await _call(secondary_caller, remaining_s)
+                timed_out = timed_out or secondary_timed_out
+                if _preflight_slices(secondary) > _preflight_slices(preflight):
+                    preflight, source = secondary, "preflight_secondary"
+    elapsed_ms = (time.monotonic() - started_at) * 1000.0
+    record_timing("turn_preflight_ms", elapsed_ms, scene=metric_scene)
+
+    semantic_frame = getattr(preflight, "semantic_frame", None)
+    turn_plan = getattr(preflight, "turn_plan", None)
+    record_counter(
+        "turn_preflight.total",
+        scene=metric_scene,
+        frame="ok" if semantic_frame is not None else "fallback",
+        plan="ok" if turn_plan is not None else "fallback",
+    )
+    if timed_out and semantic_frame is None and turn_plan is None:
+        _warn_semantic_timeout(logger, "turn preflight LLM", timeout_s)
+        semantic_frame = metadata_fallback_turn_semantic_frame_for_session(
+            is_group=is_group,
+            is_random_chat=is_random_chat,
+        )
+        _mark_fallback_reason(semantic_frame, "turn_preflight_timeout")
+        turn_plan = metadata_fallback_turn_plan(
+            is_group=is_group,
+            is_random_chat=is_random_chat,
+            is_direct_mention=is_direct_mention,
+            has_images=has_images,
+            message_target=planner_message_target,
+            qzone_event_type=qzone_event_type,
+        )
+        _mark_fallback_reason(turn_plan, "turn_preflight_timeout")
+        return (
+            (semantic_frame, elapsed_ms, "turn_preflight_timeout", timeout_s, "metadata"),
+            (turn_plan, elapsed_ms, "turn_preflight_timeout", timeout_s, "metadata"),
+        )
+
+    if semantic_frame is not None:
+        _mark_llm_source(semantic_frame, source)
+        frame_result = (semantic_frame, elapsed_ms, "", timeout_s, source)
+    else:
+        frame_result = await infer_turn_semantic_frame_with_timeout(
+            text,
+            plugin_config=plugin_config,
+            is_group=is_group,
+            is_random_chat=is_random_chat,
+            is_direct_mention=is_direct_mention,
+            message_target=message_target,
+            tool_caller=tool_caller,
+            recent_context=recent_context,
+            relationship_hint=relationship_hint,
+            repeat_clusters=repeat_clusters,
+            current_inner_state=current_inner_state,
+            current_emotion_state=current_emotion_state,
+            fallback_tool_caller=fallback_tool_caller,
+            logger=logger,
+            metric_scene=metric_scene,
+            media_grounding=media_grounding,
+        )
+    if turn_plan is not None:
+        _mark_llm_source(turn_plan, source)
+        plan_result = (turn_plan, elapsed_ms, "", timeout_s, source)
+    else:
+        plan_result = await plan_turn_with_timeout(
+            text,
+            plugin_config=plugin_config,
+            is_group=is_group,
+            is_random_chat=is_random_chat,
+            is_direct_mention=is_direct_mention,
+            has_images=has_images,
+            message_target=message_target,
+            qzone_event_type=qzone_event_type,
+            tool_caller=tool_caller,
+            recent_context=recent_context,
+            relationship_hint=relationship_hint,
+            repeat_clusters=repeat_clusters,
+            current_inner_state=current_inner_state,
+            current_emotion_state=current_emotion_state,
+            available_tools=available_tools,
+            group_knowledge_hint=group_knowledge_hint,
+            fallback_tool_caller=fallback_tool_caller,
+            logger=logger,
+            metric_mode=metric_mode,
+            media_grounding=media_grounding,
+        )
+    return frame_result, plan_result
+
+
 @dataclass
 class PreparedReplySemantics:
     data_dir: Any
@@ -409,6 +582,7 @@ def compose_reply_emotion_block(
     return block
 
 
+@traced("reply.semantics")
 async def prepare_reply_semantics(
     *,
     runtime: Any,
@@ -532,13 +706,16 @@ async def prepare_reply_semantics(
                 ),
             )
     else:
-        semantic_frame, semantic_elapsed_ms, semantic_fallback_reason, semantic_timeout_s, semantic_source = (
-            await infer_turn_semantic_frame_with_timeout(
+        shadow_result = None
+        if planner_shadow_enabled and turn_preflight_enabled(runtime.plugin_config):
+            # 语义帧与影子 TurnPlan 合并成一次往返
+            frame_result, shadow_result = await preflight_turn_with_timeout(
                 raw_message_text or current_agent_message_content,
                 plugin_config=runtime.plugin_config,
                 is_group=not is_private_session,
                 is_random_chat=is_random_chat,
                 is_direct_mention=is_direct_mention,
+                has_images=has_images,
                 message_target=message_target,
                 tool_caller=runtime.lite_tool_caller or runtime.agent_tool_caller,
                 fallback_tool_caller=runtime.agent_tool_caller,
@@ -547,11 +724,33 @@ async def prepare_reply_semantics(
                 repeat_clusters=repeat_clusters,
                 current_inner_state=render_inner_state_hint(inner_state),
                 current_emotion_state=emotion_memory_hint,
+                available_tools=planner_available_tools,
+                group_knowledge_hint=group_knowledge_hint,
                 media_grounding=media_grounding,
                 logger=runtime.logger,
                 metric_scene="private" if is_private_session else "group",
+                metric_mode="shadow",
             )
-        )
+        else:
+            frame_result = await infer_turn_semantic_frame_with_timeout(
+                raw_message_text or current_agent_message_content,
+                plugin_config=runtime.plugin_config,
+                is_group=not is_private_session,
+                is_random_chat=is_random_chat,
+                is_direct_mention=is_direct_mention,
+                message_target=message_target,
+                tool_caller=runtime.lite_tool_caller or runtime.agent_tool_caller,
+                fallback_tool_caller=runtime.agent_tool_caller,
+                recent_context=recent_context_hint,
+                relationship_hint=relationship_hint,
+                repeat_clusters=repeat_clusters,
+                current_inner_state=render_inner_state_hint(inner_state),
+                current_emotion_state=emotion_memory_hint,
+                media_grounding=media_grounding,
+                logger=runtime.logger,
+                metric_scene="private" if is_private_session else "group",
+            )
+        semantic_frame, semantic_elapsed_ms, semantic_fallback_reason, semantic_timeout_s, semantic_source = frame_result
         record_timing(
             "reply.semantic_frame_ms",
             semantic_elapsed_ms,
@@ -597,27 +796,29 @@ async def prepare_reply_semantics(
                 hint="若此阶段经常较慢，配置 lite_model 并保持 strict_main_model 关闭",
             )
         if planner_shadow_enabled:
-            shadow_plan, shadow_elapsed_ms, shadow_fallback_reason, shadow_timeout_s, shadow_source = await plan_turn_with_timeout(
-                raw_message_text or current_agent_message_content,
-                plugin_config=runtime.plugin_config,
-                is_group=not is_private_session,
-                is_random_chat=is_random_chat,
-                is_direct_mention=is_direct_mention,
-                has_images=has_images,
-                message_target=message_target,
-                tool_caller=runtime.lite_tool_caller or runtime.agent_tool_caller,
-                fallback_tool_caller=runtime.agent_tool_caller,
-                recent_context=recent_context_hint,
-                relationship_hint=relationship_hint,
-                repeat_clusters=repeat_clusters,
-                current_inner_state=render_inner_state_hint(inner_state),
-                current_emotion_state=emotion_memory_hint,
-                available_tools=planner_available_tools,
-                group_knowledge_hint=group_knowledge_hint,
-                media_grounding=media_grounding,
-                logger=runtime.logger,
-                metric_mode="shadow",
-            )
+            if shadow_result is None:
+                shadow_result = await plan_turn_with_timeout(
+                    raw_message_text or current_agent_message_content,
+                    plugin_config=runtime.plugin_config,
+                    is_group=not is_private_session,
+                    is_random_chat=is_random_chat,
+                    is_direct_mention=is_direct_mention,
+                    has_images=has_images,
+                    message_target=message_target,
+                    tool_caller=runtime.lite_tool_caller or runtime.agent_tool_caller,
+                    fallback_tool_caller=runtime.agent_tool_caller,
+                    recent_context=recent_context_hint,
+                    relationship_hint=relationship_hint,
+                    repeat_clusters=repeat_clusters,
+                    current_inner_state=render_inner_state_hint(inner_state),
+                    current_emotion_state=emotion_memory_hint,
+                    available_tools=planner_available_tools,
+                    group_knowledge_hint=group_knowledge_hint,
+                    media_grounding=media_grounding,
+                    logger=runtime.logger,
+                    metric_mode="shadow",
+                )
+            shadow_plan, shadow_elapsed_ms, shadow_fallback_reason, shadow_timeout_s, shadow_source = shadow_result
             record_timing("turn_planner.plan_ms", shadow_elapsed_ms, mode="shadow")
             if shadow_fallback_reason:
                 is_timeout = shadow_fallback_reason.endswith("_timeout")
@@ -775,9 +976,11 @@ __all__ = [
     "load_reply_states_with_timeout",
     "plan_turn_with_timeout",
     "persist_reply_emotion_state",
+    "preflight_turn_with_timeout",
     "prepare_reply_semantics",
     "schedule_inner_state_update_after_reply",
     "semantic_frame_timeout_hint",
     "semantic_frame_timeout_seconds",
     "should_speak_in_random_chat",
+    "turn_preflight_enabled",
 ]
@@ -22,6 +22,7 @@ from ...core.gif_understanding import (
 from ...core.media_understanding import analyze_images_with_route_or_fallback
 from ...core.metrics import record_counter
 from ...core.qq_expression_library import semantic_text_for_qq_expression_segment
+from ...core.runtime_performance import register_cache_reporter
 from ...core.sticker_library import (
     analyze_sticker_image,
     image_bytes_to_data_url,
@@ -1060,6 +1061,10 @@ async def maybe_choose_reply_sticker(
     return sticker_segment, sticker_name
 
 
+register_cache_reporter("group_sticker_state", footprint=lambda: _GROUP_STICKER_STATE)
+register_cache_reporter("sticker_collect_cooldown", footprint=lambda: _COLLECT_COOLDOWN_STATE)
+
+
 __all__ = [
     "IncomingStickerCandidate",
     "auto_collect_stickers",
@@ -25,7 +25,9 @@ from ...core.image_input import (
     normalize_image_detail,
     normalize_image_input_mode,
 )
+from ...core.llm_stream import stream_text_deltas
 from ...core.metrics import record_counter, record_timing
+from ...core.span_trace import span, turn_span
 from ...core.meme_reply_policy import format_meme_turn_prompt, prepare_meme_turn_context
 from ...core.message_parts import build_user_message_content, clone_messages_with_text_suffix
 from ...core.message_relations import extract_send_message_id
@@ -42,6 +44,7 @@ from ...core.gemini_profile import (
 from ...core import protocol_capabilities as _protocol_caps
 from ...flows.yaml_parser import parse_yaml_response
 from . import humanize as _humanize
+from .early_dispatch import EarlyReplyDispatcher, early_dispatch_enabled
 from .reaction import maybe_poke_back, maybe_react_on_silence
 from ...agent.runtime.responder import (
     apply_persona_response_to_semantic_frame,
@@ -152,6 +155,7 @@ from ..reply_commit import (
 from .pipeline_context import (
     batch_has_newer_messages as _batch_has_newer_messages,
     build_base_system_prompt as _build_base_system_prompt,
+    build_base_system_prompt_parts as _build_base_system_prompt_parts,
     build_confidence_style_instruction as _build_confidence_style_instruction,
     build_scenario_instruction as _build_scenario_instruction,
     build_final_visible_reply_text as _build_final_visible_reply_text,
@@ -517,6 +521,13 @@ async def _send_policy_direct_closure(
         )
 
 
+def _span_sample_rate(runtime: Any) -> float | None:
+    try:
+        return float(getattr(runtime.plugin_config, "personification_span_trace_sample_rate"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
 async def process_response_logic(bot: Any, event: Any, state: Dict[str, Any], deps: ReplyProcessorDeps) -> None:
     # plugin_invoker 代为执行其它插件命令时会用 handle_event 重新分发合成事件，
     # 这里直接短路，确保合成事件永远不会再次进入拟人回复/Agent 流程（防递归）。
@@ -597,7 +608,13 @@ async def process_response_logic(bot: Any, event: Any, state: Dict[str, Any], de
         trace_token = None
         trace_mod = None
     try:
-        await _process_response_logic_impl(bot, event, state, deps)
+        with turn_span(
+            trace_id,
+            sample_rate=_span_sample_rate(deps.runtime),
+            session="group" if hasattr(event, "group_id") else "private",
+            group_id=str(getattr(event, "group_id", "") or ""),
+        ):
+            await _process_response_logic_impl(bot, event, state, deps)
     except asyncio.CancelledError:
         cancelled = True
         raise
@@ -1622,10 +1639,11 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
     image_summary_suffix = ""
     if summary_timeout > 0.05:
         try:
-            image_summary_suffix = await asyncio.wait_for(
-                _image_summary_task(),
-                timeout=summary_timeout,
-            )
+            with span("media.image_summary", images=len(tool_image_urls)):
+                image_summary_suffix = await asyncio.wait_for(
+                    _image_summary_task(),
+                    timeout=summary_timeout,
+                )
         except asyncio.TimeoutError:
             runtime.logger.warning(
                 f"拟人插件：视觉摘要超过本轮前置预算 {summary_timeout:.1f}s，继续使用 provenance 进入语义判断。"
@@ -1913,23 +1931,24 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
 
     hook_ctx.session_messages = session_messages_for_model
     hook_ctx.semantic_frame = semantic_frame
-    prelude_chunks = await get_hook_registry().run_all(hook_ctx, phase="system_prelude")
-    context_chunks = await get_hook_registry().run_all(hook_ctx, phase="system_context")
-    primary_api_type, primary_model = _get_primary_provider_signature(runtime)
-    context_chunks = await compress_context_if_needed(
-        context_chunks,
-        max_tokens=context_token_budget_for_route(primary_api_type, primary_model),
-        keep_recent=context_keep_recent_for_route(primary_api_type, primary_model),
-        call_ai_api=runtime.lite_call_ai_api or runtime.call_ai_api,
-    )
-    postlude_chunks = await get_hook_registry().run_all(hook_ctx, phase="system_postlude")
+    with span("prompt.context_hooks"):
+        prelude_chunks = await get_hook_registry().run_all(hook_ctx, phase="system_prelude")
+        context_chunks = await get_hook_registry().run_all(hook_ctx, phase="system_context")
+        primary_api_type, primary_model = _get_primary_provider_signature(runtime)
+        context_chunks = await compress_context_if_needed(
+            context_chunks,
+            max_tokens=context_token_budget_for_route(primary_api_type, primary_model),
+            keep_recent=context_keep_recent_for_route(primary_api_type, primary_model),
+            call_ai_api=runtime.lite_call_ai_api or runtime.call_ai_api,
+        )
+        postlude_chunks = await get_hook_registry().run_all(hook_ctx, phase="system_postlude")
     plugin_summary = ""
     if runtime.knowledge_store is not None:
         try:
             plugin_summary = runtime.knowledge_store.get_plugin_summary_for_prompt()
         except Exception as exc:
             runtime.logger.debug(f"[plugin_knowledge] prompt summary unavailable: {exc}")
-    system_prompt = _build_base_system_prompt(
+    stable_system_prefix, volatile_system_prompt = _build_base_system_prompt_parts(
         base_prompt=base_prompt,
         user_name=user_name,
         level_name=level_name,
@@ -1949,6 +1968,7 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             get_configured_api_providers=runtime.get_configured_api_providers,
         ),
     )
+    system_prompt = "\n\n".join(part for part in (stable_system_prefix, volatile_system_prompt) if part)
     if user_profile_block:
         system_prompt += f"\n\n{user_profile_block}"
     if media_grounding:
@@ -2104,15 +2124,17 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
     if group_config.get("sticker_enabled", True):
         available_stickers = [f.stem for f in runtime.get_sticker_files()]
 
-    messages = [
-        {
-            "role": "system",
-            "content": (
-                f"{system_prompt}\n\n当前可用表情包参考: "
-                f"{', '.join(available_stickers[:15]) if available_stickers else '暂无'}"
-            ),
-        }
-    ]
+    sticker_hint = (
+        f"当前可用表情包参考: {', '.join(available_stickers[:15]) if available_stickers else '暂无'}"
+    )
+    # 静态前缀单独成一条 system 消息，本轮易变的提示、表情包列表放第二条，provider 前缀缓存才能命中
+    if stable_system_prefix and system_prompt.startswith(stable_system_prefix):
+        messages = [
+            {"role": "system", "content": stable_system_prefix},
+            {"role": "system", "content": f"{system_prompt[len(stable_system_prefix):].strip()}\n\n{sticker_hint}".strip()},
+        ]
+    else:
+        messages = [{"role": "system", "content": f"{system_prompt}\n\n{sticker_hint}"}]
     messages.extend(session_messages_for_model)
     hook_ctx.messages = messages
     await get_hook_registry().run_all(hook_ctx, phase="message")
@@ -2226,6 +2248,10 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
         agent_direct_output = False
         agent_quality_context = ""
         favorability_committed = False
+        early_dispatcher: EarlyReplyDispatcher | None = None
+        early_sent_text = ""
+        early_address_plan: dict[str, Any] = {}
+        early_message_id = ""
 
         def _commit_favorability_if_confirmed() -> None:
             nonlocal favorability_committed
@@ -2272,6 +2298,116 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
                 return str(send_result.message_id or "")
             return extract_send_message_id(send_result)
 
+        async def _send_early_segment(segment: str) -> bool:
+            nonlocal early_address_plan, early_message_id
+            if _stale_reply_abort_reason(state):
+                return False
+            await acquire_reply_commit(state)
+            if _stale_reply_abort_reason(state):
+                return False
+            address_plan = _humanize.decide_addressing(
+                plugin_config=runtime.plugin_config,
+                state=state,
+                event=event,
+                group_id=str(group_id),
+                user_id=user_id,
+                is_private=is_private_session,
+                has_newer_batch=_batch_has_newer_messages(state),
+                address_mode=getattr(semantic_frame, "address_mode", "auto"),
+            )
+            rendered_seg = await render_qq_expression_message(
+                segment,
+                message_segment_cls=runtime.message_segment_cls,
+                bot=bot,
+                plugin_config=runtime.plugin_config,
+                logger=runtime.logger,
+            )
+            outgoing: Any = rendered_seg.message
+            if not outgoing:
+                return False
+            try:
+                outgoing = _humanize.prepend_addressing_segments(
+                    message_segment_cls=runtime.message_segment_cls,
+                    outgoing=outgoing,
+                    quote_message_id=address_plan.get("quote_message_id"),
+                    at_target=address_plan.get("at_target"),
+                )
+            except Exception:
+                outgoing = rendered_seg.message
+            send_result = await _send_reply(outgoing)
+            if isinstance(send_result, SendReceipt) and send_result.status != "sent":
+                return False
+            early_address_plan = address_plan
+            early_message_id = _message_id_from_send_result(send_result)
+            record_counter("reply_early_dispatch")
+            try:
+                from ...core import reply_turn_trace
+
+                reply_turn_trace.record_stage(
+                    key="early_dispatch",
+                    label="流式首段",
+                    status="ok",
+                    detail=f"chars={len(segment)} elapsed_ms={int((time.monotonic() - started_at) * 1000)}",
+                )
+            except Exception:
+                pass
+            return True
+
+        def _build_early_dispatcher() -> EarlyReplyDispatcher | None:
+            # 只在"生成完基本原样发出"的轮次启用：凡是后面还有整段审阅、改写、语音或媒体裁决的都不提前发
+            config = runtime.plugin_config
+            if not early_dispatch_enabled(config):
+                return None
+            # tts_service 总会构建，只有真正可用时才可能改走语音
+            tts_service = getattr(runtime, "tts_service", None)
+            if (
+                bool(getattr(config, "personification_persona_responder_json_enabled", False))
+                or bool(getattr(config, "personification_response_review_enabled", False))
+                or (tts_service is not None and tts_service.is_available())
+                or is_random_chat
+                or str(message_intent or "").strip() in {"banter", "expression"}
+                or tool_image_urls
+                or turn_media_context
+                or bool(state.get("agent_evidence_delivery_required", False))
+                or (conversation_context is not None and conversation_context.plugin_episode is not None)
+                or getattr(semantic_frame, "requires_emotional_care", False)
+                or getattr(getattr(semantic_frame, "emotional_support", None), "needed", False)
+                or needs_uncertain_visible_reply_review(
+                    ambiguity_level=getattr(intent_decision, "ambiguity_level", ""),
+                    persona_response_info_added=getattr(semantic_frame, "persona_response_info_added", ""),
+                )
+            ):
+                return None
+            from ...core.visible_output import guard_visible_text
+
+            limits = [
+                int(getattr(config, "personification_max_segment_chars", 0) or 0),
+                int(
+                    resolve_reply_length_policy(
+                        config,
+                        turn_plan=turn_plan,
+                        media_context=turn_media_context,
+                        tool_calls=state.get("agent_tool_calls"),
+                    ).max_chars
+                    or 0
+                ),
+            ]
+
+            def _screen(segment: str) -> bool:
+                if detect_persona_identity_leak(segment):
+                    return False
+                if not is_private_session and _should_suppress_group_topic_loop(segment, session_messages):
+                    return False
+                normalized = normalize_visible_reply_text(strip_response_control_markers(segment))
+                return guard_visible_text(normalized, surface="normal_reply") == segment
+
+            return EarlyReplyDispatcher(
+                send=_send_early_segment,
+                split=runtime.split_text_into_segments,
+                max_chars=min([limit for limit in limits if limit > 0] or [0]),
+                screen=_screen,
+            )
+
         def _finish_action_only_trace() -> None:
             try:
                 from ...core import reply_turn_trace
@@ -2310,6 +2446,93 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             except Exception:
                 pass
 
+        def _append_assistant_reply_history(
+            text: str,
+            *,
+            speaker: str,
+            message_id: str,
+            at_target: Any,
+            sticker_name: str | None = None,
+        ) -> None:
+            assistant_metadata = {
+                "scene": "reply",
+                "sticker_sent": sticker_name if sticker_name else None,
+                "speaker": speaker,
+                "user_id": bot_self_id or None,
+                "source_kind": "bot_reply",
+            }
+            if isinstance(event, types.group_message_event_cls):
+                assistant_metadata.update(
+                    {
+                        "group_id": str(event.group_id),
+                        "message_id": message_id or None,
+                        "reply_to_msg_id": incoming_relation_metadata.get("message_id"),
+                        "reply_to_user_id": user_id,
+                        "mentioned_ids": [str(at_target)] if at_target else [],
+                        "is_at_bot": False,
+                    }
+                )
+            session.append_session_message(
+                session_id,
+                "assistant",
+                text,
+                legacy_session_id=legacy_session_id,
+                **assistant_metadata,
+            )
+            if isinstance(event, types.group_message_event_cls):
+                runtime.record_group_msg(
+                    str(event.group_id),
+                    speaker,
+                    text,
+                    is_bot=True,
+                    user_id=bot_self_id,
+                    message_id=message_id or None,
+                    reply_to_msg_id=incoming_relation_metadata.get("message_id"),
+                    reply_to_user_id=user_id,
+                    source_kind="bot_reply",
+                )
+
+        async def _close_early_sent_turn(reason: str, *, delivered_text: str = "") -> None:
+            # 首段已经提前发出后本轮又要中途收口（旧批次、静默标记、BLOCK、后处理改写等）：
+            # 对方已经看到的内容就是本轮回复，照常写回历史，trace 记为部分交付而不是 no_reply
+            visible_text = _build_final_visible_reply_text(
+                history_text_for_qq_expression(delivered_text or early_sent_text),
+                max_chars=0,
+                sanitize_history_text=session.sanitize_history_text,
+            )
+            if visible_text:
+                _append_assistant_reply_history(
+                    visible_text,
+                    speaker=persona.default_bot_nickname or str(getattr(bot, "self_id", "") or "bot"),
+                    message_id=early_message_id,
+                    at_target=early_address_plan.get("at_target"),
+                )
+            release_reply_commit(state)
+            mark_reply_phase(state, "reply_complete")
+            record_counter("reply_early_dispatch_closed", reason=reason)
+            try:
+                from ...core import reply_turn_trace
+
+                reply_turn_trace.record_stage(
+                    key="early_dispatch_closed",
+                    label="首段已发后收口",
+                    status="warn",
+                    detail=f"reason={reason} chars={len(visible_text)}",
+                    hint="首段已提前发出，本轮按已发内容记入历史，不再补发",
+                )
+                reply_turn_trace.finish_trace(
+                    outcome="partial",
+                    diagnosis_code="early_dispatch_partial",
+                    detail={
+                        "reason": reason,
+                        "early_dispatch": True,
+                        "reply_chars": len(visible_text),
+                        "outgoing_text": visible_text[:500],
+                    },
+                )
+            except Exception:
+                pass
+
         async def _commit_pending_actions() -> None:
             if not pending_actions:
                 return
@@ -2556,7 +2779,15 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
                 )
             except Exception:
                 pass
-            reply_content = await _call_persona_responder_model(fallback_model_messages)
+            early_dispatcher = _build_early_dispatcher()
+            if early_dispatcher is None:
+                reply_content = await _call_persona_responder_model(fallback_model_messages)
+            else:
+                try:
+                    with stream_text_deltas(early_dispatcher):
+                        reply_content = await _call_persona_responder_model(fallback_model_messages)
+                finally:
+                    early_sent_text = await early_dispatcher.finish()
             try:
                 from ...core import reply_turn_trace
 
@@ -2575,6 +2806,9 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             bypass_length_limits = False
             if not reply_content:
                 runtime.logger.warning("拟人插件：未能获取到 AI 回复内容")
+                if early_sent_text:
+                    await _close_early_sent_turn("model_empty")
+                    return
                 if reply_required:
                     reply_content = await _resolve_operational_empty_reply("model_empty")
                     if not reply_content:
@@ -2669,6 +2903,9 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
         stale_reason = _stale_reply_abort_reason(state)
         if stale_reason:
             runtime.logger.info(f"拟人插件：{stale_reason}")
+            if early_sent_text:
+                await _close_early_sent_turn("stale_reply")
+                return
             try:
                 from ...core import reply_turn_trace
 
@@ -2727,7 +2964,7 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
                     reply_content = regenerated.strip()
             except Exception as e:
                 runtime.logger.debug(f"[reply_processor] banter regenerate skipped: {e}")
-        if required_reply_needs_recovery(
+        if not early_sent_text and required_reply_needs_recovery(
             reply_content,
             reply_required=reply_required,
             pending_actions=pending_actions,
@@ -2748,6 +2985,9 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             if _record_pending_action_history_if_any():
                 runtime.logger.info("拟人插件：Agent 静默动作已写入会话历史。")
             runtime.logger.info(f"AI 决定结束与群 {group_id} 中 {user_name}({user_id}) 的对话 (SILENCE)")
+            if early_sent_text:
+                await _close_early_sent_turn("silence")
+                return
             if bool(state.get("reply_delivery_confirmed", False)):
                 mark_reply_delivery_complete(state)
                 release_reply_commit(state)
@@ -2798,6 +3038,9 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
 
                 _t = asyncio.create_task(_notify_superusers())
                 _t.add_done_callback(_task_exc_logger("notify_superusers", runtime.logger))
+            if early_sent_text:
+                await _close_early_sent_turn("block")
+                return
             if reply_required:
                 reply_content = "这个我不能接。"
                 has_block_marker = False
@@ -2808,6 +3051,9 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             runtime.logger.info(
                 f"AI 选择不回复群 {group_id} 中 {user_name}({user_id}) 的消息 (NO_REPLY)"
             )
+            if early_sent_text:
+                await _close_early_sent_turn("no_reply")
+                return
             await _maybe_silence_reaction()
             return
 
@@ -2897,6 +3143,8 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             )
         if review_decision.action == "no_reply":
             runtime.logger.info(f"拟人插件：回复审阅后选择沉默，group={group_id} user={user_id}")
+            if early_sent_text:
+                await _close_early_sent_turn("review_no_reply")
             return
         if review_decision.action == "rewrite" and review_decision.text:
             reply_content = review_decision.text.strip()
@@ -2909,6 +3157,7 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             and reply_required
             and not pending_actions
             and not agent_suppress_reply_recovery
+            and not early_sent_text
         ):
             reply_content = await _resolve_operational_empty_reply("evidence_unavailable")
             if not reply_content:
@@ -2920,6 +3169,9 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             runtime.logger.info(
                 f"拟人插件：最终回复含沉默控制标记，group={group_id} user={user_id}"
             )
+            if early_sent_text:
+                await _close_early_sent_turn("silence")
+                return
             if bool(state.get("reply_delivery_confirmed", False)):
                 mark_reply_delivery_complete(state)
                 release_reply_commit(state)
@@ -2952,6 +3204,9 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
         reply_content = strip_response_control_markers(reply_content)
         reply_content = normalize_visible_reply_text(reply_content)
         if not reply_content and not _IMAGE_B64_RE.search(str(reply_content or "")):
+            if early_sent_text:
+                await _close_early_sent_turn("empty_reply")
+                return
             if agent_suppress_reply_recovery:
                 _finish_suppressed_reply_trace()
                 return
@@ -2964,6 +3219,8 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
         stale_reason = _stale_reply_abort_reason(state)
         if stale_reason:
             runtime.logger.info(f"拟人插件：{stale_reason}")
+            if early_sent_text:
+                await _close_early_sent_turn("stale_reply")
             return
 
         group_config = persona.get_group_config(str(group_id))
@@ -3046,6 +3303,8 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
 
         final_reply = guard_visible_text(final_reply, logger=runtime.logger, surface="normal_reply")
         if not final_reply and not _IMAGE_B64_RE.search(str(reply_content or "")):
+            if early_sent_text:
+                await _close_early_sent_turn("visible_guard_empty")
             return
         length_policy = resolve_reply_length_policy(
             runtime.plugin_config,
@@ -3100,7 +3359,7 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             max_chars=max_chars,
             sanitize_history_text=session.sanitize_history_text,
         )
-        sent_message_id = ""
+        sent_message_id = early_message_id
         sent_as_tts = False
         delivery_partial = False
         delivery_unknown = False
@@ -3112,6 +3371,8 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
         stale_reason = _stale_reply_abort_reason(state)
         if stale_reason:
             runtime.logger.info(f"拟人插件：{stale_reason}")
+            if early_sent_text:
+                await _close_early_sent_turn("stale_reply")
             return
         mark_reply_phase(state, "delivery_commit_wait")
         await acquire_reply_commit(state)
@@ -3120,6 +3381,8 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
         stale_reason = _stale_reply_abort_reason(state)
         if stale_reason:
             runtime.logger.info(f"拟人插件：{stale_reason}")
+            if early_sent_text:
+                await _close_early_sent_turn("stale_reply")
             return
         if getattr(runtime, "user_policy_gate", None) is not None:
             await runtime.user_policy_gate.ensure_current(event)
@@ -3190,6 +3453,26 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
                     segments = expanded
                 if not segments:
                     segments = [final_reply]
+                if early_sent_text and early_dispatcher is not None:
+                    remaining_segments = early_dispatcher.remaining_segments(segments)
+                    if remaining_segments is not None:
+                        segments = remaining_segments
+                    else:
+                        try:
+                            from ...core import reply_turn_trace
+
+                            reply_turn_trace.record_stage(
+                                key="early_dispatch_diverged",
+                                label="流式首段不一致",
+                                status="warn",
+                                detail=f"sent_chars={len(early_sent_text)} final_chars={len(final_reply)}",
+                                hint="后处理改写了已提前发出的首段，本轮不再补发，只记已发内容",
+                            )
+                        except Exception:
+                            pass
+                        # 改写后的整段再发一遍会让首段重复出现，已发出的内容收不回来，只能到此为止
+                        await _close_early_sent_turn("early_dispatch_diverged")
+                        return
 
                 typo_correction: str | None = None
                 if message_intent == "banter" and not looks_like_explanatory_output(final_reply):
@@ -3203,7 +3486,7 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
                         )
                         segments[typo_idx] = mutated
 
-                address_plan = _humanize.decide_addressing(
+                address_plan = early_address_plan if early_sent_text else _humanize.decide_addressing(
                     plugin_config=runtime.plugin_config,
                     state=state,
                     event=event,
@@ -3289,6 +3572,11 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
                     stale_reason = _stale_reply_abort_reason(state)
                     if stale_reason:
                         runtime.logger.info(f"拟人插件：{stale_reason}")
+                        if early_sent_text:
+                            await _close_early_sent_turn(
+                                "stale_reply",
+                                delivered_text="\n".join([early_sent_text, *(item for item in segments[:i] if item.strip())]),
+                            )
                         return
                     rendered_seg = await render_qq_expression_message(
                         seg,
@@ -3300,7 +3588,7 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
                     outgoing: Any = rendered_seg.message
                     if not outgoing:
                         continue
-                    if i == 0:
+                    if i == 0 and not early_sent_text:
                         try:
                             outgoing = _humanize.prepend_addressing_segments(
                                 message_segment_cls=runtime.message_segment_cls,
@@ -3334,6 +3622,8 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             stale_reason = _stale_reply_abort_reason(state)
             if stale_reason:
                 runtime.logger.info(f"拟人插件：{stale_reason}")
+                if early_sent_text:
+                    await _close_early_sent_turn("stale_reply", delivered_text=final_visible_reply_text)
                 return
             send_result = await _send_reply(runtime.message_segment_cls.image(f"base64://{image_b64}"))
             if not sent_message_id:
@@ -3345,6 +3635,8 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
             stale_reason = _stale_reply_abort_reason(state)
             if stale_reason:
                 runtime.logger.info(f"拟人插件：{stale_reason}")
+                if early_sent_text:
+                    await _close_early_sent_turn("stale_reply", delivered_text=final_visible_reply_text)
                 return
             send_result = await _send_reply(sticker_segment)
             if not sent_message_id:
@@ -3364,43 +3656,13 @@ async def _process_response_logic_impl(bot: Any, event: Any, state: Dict[str, An
         if getattr(runtime, "user_policy_gate", None) is not None:
             await runtime.user_policy_gate.ensure_current(event)
         mark_reply_phase(state, "delivery_history_commit")
-        assistant_metadata = {
-            "scene": "reply",
-            "sticker_sent": sticker_name if sticker_name else None,
-            "speaker": bot_nickname,
-            "user_id": bot_self_id or None,
-            "source_kind": "bot_reply",
-        }
-        if isinstance(event, types.group_message_event_cls):
-            assistant_metadata.update(
-                {
-                    "group_id": str(event.group_id),
-                    "message_id": sent_message_id or None,
-                    "reply_to_msg_id": incoming_relation_metadata.get("message_id"),
-                    "reply_to_user_id": user_id,
-                    "mentioned_ids": [str(at_target)] if at_target else [],
-                    "is_at_bot": False,
-                }
-            )
-        session.append_session_message(
-            session_id,
-            "assistant",
+        _append_assistant_reply_history(
             final_visible_reply_text,
-            legacy_session_id=legacy_session_id,
-            **assistant_metadata,
+            speaker=bot_nickname,
+            message_id=sent_message_id,
+            at_target=at_target,
+            sticker_name=sticker_name,
         )
-        if isinstance(event, types.group_message_event_cls):
-            runtime.record_group_msg(
-                str(event.group_id),
-                bot_nickname,
-                final_visible_reply_text,
-                is_bot=True,
-                user_id=bot_self_id,
-                message_id=sent_message_id or None,
-                reply_to_msg_id=incoming_relation_metadata.get("message_id"),
-                reply_to_user_id=user_id,
-                source_kind="bot_reply",
-            )
         release_reply_commit(state)
         delivery_elapsed_ms = int((time.monotonic() - delivery_started_at) * 1000)
         mark_reply_phase(state, "post_send_bookkeeping")
@@ -14,6 +14,7 @@ import time
 from typing import Any
 
 from ...core import protocol_capabilities
+from ...core.runtime_performance import register_cache_reporter
 
 # QQ face id（对照 coolq face id 表）：只用语义明确的常见表情。
 _FACES_BY_MOOD: dict[str, tuple[int, ...]] = {
@@ -183,6 +184,11 @@ def reset_reaction_state() -> None:
     _daily_poke_counts.clear()
 
 
+register_cache_reporter("reaction_last_ts", footprint=lambda: _last_reaction_ts)
+register_cache_reporter("reaction_daily_counts", footprint=lambda: _daily_counts)
+register_cache_reporter("reaction_daily_poke_counts", footprint=lambda: _daily_poke_counts)
+
+
 __all__ = [
     "maybe_react_on_silence",
     "maybe_poke_back",
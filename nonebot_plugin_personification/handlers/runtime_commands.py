@@ -15,6 +15,7 @@ from ..core.remote_skill_review import (
 )
 
 from ..core.data_store import get_data_store
+from ..core.group_chat_meta import clear_group_chat_meta
 from ..core.knowledge_builder import (
     maybe_start_plugin_knowledge_builder,
     stop_plugin_knowledge_builder,
@@ -876,7 +877,7 @@ async def handle_full_reset_memory_command(
         driver._personification_msg_cache.clear()
 
     store = get_data_store()
-    await store.save("chat_history", {})
+    await asyncio.to_thread(clear_group_chat_meta)
     await store.save("inner_state", {})
     await store.save("proactive_state", {})
 
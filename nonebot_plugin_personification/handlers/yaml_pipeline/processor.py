@@ -137,8 +137,10 @@ from ..reply_pipeline.pipeline_emotion import (
     infer_turn_semantic_frame_with_timeout,
     load_reply_states_with_timeout,
     plan_turn_with_timeout,
+    preflight_turn_with_timeout,
     schedule_inner_state_update_after_reply,
     semantic_frame_timeout_hint,
+    turn_preflight_enabled,
 )
 from ..reply_pipeline import humanize as _humanize
 from ..reply_commit import (
@@ -1093,13 +1095,15 @@ async def process_yaml_response_logic(
                     hint=semantic_frame_timeout_hint(plan_timeout_s),
                 )
         else:
-            semantic_frame, semantic_elapsed_ms, semantic_fallback_reason, semantic_timeout_s, semantic_source = (
-                await infer_turn_semantic_frame_with_timeout(
+            shadow_result = None
+            if planner_shadow_enabled and turn_preflight_enabled(plugin_config):
+                frame_result, shadow_result = await preflight_turn_with_timeout(
                     plan_source_text,
                     plugin_config=plugin_config,
                     is_group=not is_private_session,
                     is_random_chat=is_random_chat,
                     is_direct_mention=is_direct_mention,
+                    has_images=bool(last_images),
                     message_target=planner_message_target,
                     tool_caller=lite_tool_caller,
                     fallback_tool_caller=agent_tool_caller,
@@ -1108,10 +1112,33 @@ async def process_yaml_response_logic(
                     repeat_clusters=repeat_clusters,
                     current_inner_state=render_inner_state_hint(inner_state),
                     current_emotion_state=emotion_memory_hint,
+                    available_tools=planner_available_tools,
                     media_grounding=media_grounding,
                     logger=logger,
                     metric_scene="yaml_private" if is_private_session else "yaml_group",
+                    metric_mode="yaml_shadow",
                 )
+            else:
+                frame_result = await infer_turn_semantic_frame_with_timeout(
+                    plan_source_text,
+                    plugin_config=plugin_config,
+                    is_group=not is_private_session,
+                    is_random_chat=is_random_chat,
+                    is_direct_mention=is_direct_mention,
+                    message_target=planner_message_target,
+                    tool_caller=lite_tool_caller,
+                    fallback_tool_caller=agent_tool_caller,
+                    recent_context=recent_context_hint,
+                    relationship_hint=relationship_hint,
+                    repeat_clusters=repeat_clusters,
+                    current_inner_state=render_inner_state_hint(inner_state),
+                    current_emotion_state=emotion_memory_hint,
+                    media_grounding=media_grounding,
+                    logger=logger,
+                    metric_scene="yaml_private" if is_private_session else "yaml_group",
+                )
+            semantic_frame, semantic_elapsed_ms, semantic_fallback_reason, semantic_timeout_s, semantic_source = (
+                frame_result
             )
             record_timing(
                 "reply.semantic_frame_ms",
@@ -1143,26 +1170,28 @@ async def process_yaml_response_logic(
                     hint=semantic_frame_timeout_hint(semantic_timeout_s),
                 )
             if planner_shadow_enabled:
-                shadow_plan, shadow_elapsed_ms, shadow_fallback_reason, shadow_timeout_s, shadow_source = await plan_turn_with_timeout(
-                    plan_source_text,
-                    plugin_config=plugin_config,
-                    is_group=not is_private_session,
-                    is_random_chat=is_random_chat,
-                    is_direct_mention=is_direct_mention,
-                    has_images=bool(last_images),
-                    message_target=planner_message_target,
-                    tool_caller=lite_tool_caller,
-                    fallback_tool_caller=agent_tool_caller,
-                    recent_context=recent_context_hint,
-                    relationship_hint=relationship_hint,
-                    repeat_clusters=repeat_clusters,
-                    current_inner_state=render_inner_state_hint(inner_state),
-                    current_emotion_state=emotion_memory_hint,
-                    available_tools=planner_available_tools,
-                    media_grounding=media_grounding,
-                    logger=logger,
-                    metric_mode="yaml_shadow",
-                )
+                if shadow_result is None:
+                    shadow_result = await plan_turn_with_timeout(
+                        plan_source_text,
+                        plugin_config=plugin_config,
+                        is_group=not is_private_session,
+                        is_random_chat=is_random_chat,
+                        is_direct_mention=is_direct_mention,
+                        has_images=bool(last_images),
+                        message_target=planner_message_target,
+                        tool_caller=lite_tool_caller,
+                        fallback_tool_caller=agent_tool_caller,
+                        recent_context=recent_context_hint,
+                        relationship_hint=relationship_hint,
+                        repeat_clusters=repeat_clusters,
+                        current_inner_state=render_inner_state_hint(inner_state),
+                        current_emotion_state=emotion_memory_hint,
+                        available_tools=planner_available_tools,
+                        media_grounding=media_grounding,
+                        logger=logger,
+                        metric_mode="yaml_shadow",
+                    )
+                shadow_plan, shadow_elapsed_ms, shadow_fallback_reason, shadow_timeout_s, shadow_source = shadow_result
                 record_timing("turn_planner.plan_ms", shadow_elapsed_ms, mode="yaml_shadow")
                 if shadow_fallback_reason:
                     is_timeout = shadow_fallback_reason.endswith("_timeout")
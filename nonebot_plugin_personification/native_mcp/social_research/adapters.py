@@ -10,6 +10,7 @@ from urllib.parse import quote, urlparse
 
 import httpx
 
+from ...core.http_clients import shared_http_client
 from .browser import BrowserPool
 from .models import clean_text, normalize_url, stable_fingerprint
 
@@ -135,7 +136,7 @@ async def read_bilibili_ai_subtitles(canonical_url: str) -> list[dict[str, Any]]
         raw = inline
         if url:
             try:
-                async with httpx.AsyncClient(
+                async with shared_http_client(
                     timeout=httpx.Timeout(8.0, connect=4.0), follow_redirects=False, trust_env=False
                 ) as client:
                     response = await client.get(url, headers={"Accept": "application/json,text/vtt,text/plain"})
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""长历史上下文 token 计数基准。
+
+用法：
+    python plugin/personification/scripts/bench_context_tokens.py --history 500 --turns 20
+    TIKTOKEN_CACHE_DIR=/path/to/cache python plugin/personification/scripts/bench_context_tokens.py --format json
+
+构造一段群聊长历史（中文闲聊、中英混排、代码、链接 / 数字串按比例混合），模拟连续若干轮回复：
+每轮追加两条新消息，再按 compress_context_if_needed 的方式把整段历史重新计数一遍；另把前 40 条拼成长文本截到预算内。
+对比旧的字符规则（汉字 1.5、其余 4 字符一个）、当前近似计数（冷启动 / 跨轮命中缓存）和 tiktoken（词表在本地时）。
+tiktoken 可用时以它为准，同时报告各规则对整段历史的估算偏差。
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import random
+import statistics
+import sys
+import time
+import types
+from pathlib import Path
+from typing import Any, Callable
+
+_SAMPLES = (
+    "今晚 8 点开黑，有人来吗？",
+    "刚看完《葬送的芙莉莲》第 28 集，Frieren 和 Himmel 那段回忆太好哭了",
+    "哈哈哈哈哈哈笑死我了，你这也太离谱了吧😂😂",
+    "I think the implementation is fine, but we should double-check the configuration before deploying.",
+    "def handler(event):\n    return await bot.send(event, 'ok')\n",
+    "订单号 20240101123456，金额 ¥128.50，请在 https://example.com/pay 完成支付",
+    "GPT-4o 和 Claude 3.5 Sonnet 哪个写代码更好？我觉得各有千秋吧",
+    "请帮我总结一下这篇文章的主要观点，并给出三条建议。",
+    "こんにちは、今日はいい天気ですね。",
+)
+
+
+def _load_token_counter() -> Any:
+    package_dir = Path(__file__).resolve().parents[1]
+    # 只挂命名空间，不加载整个插件
+    for name, path in (("plugin", package_dir.parent), ("plugin.personification", package_dir)):
+        module = sys.modules.get(name)
+        if module is None:
+            module = types.ModuleType(name)
+            module.__path__ = [str(path)]  # type: ignore[attr-defined]
+            sys.modules[name] = module
+    return importlib.import_module("plugin.personification.core.token_counter")
+
+
+def _legacy_count(text: str) -> int:
+    cjk_chars = sum(1 for ch in text if "\u4e00" <= ch <= "\u9fff")
+    return int(cjk_chars * 1.5 + (len(text) - cjk_chars) / 4) + 1
+
+
+def build_history(*, history: int, turns: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    chunks: list[str] = []
+    for index in range(history + turns * 2):
+        speaker = rng.choice(("小明", "小红", "阿杰", "Bot"))
+        body = " ".join(rng.choice(_SAMPLES) for _ in range(rng.randint(1, 4)))
+        chunks.append(f"[群聊 #{index}] {speaker}: {body}")
+    return chunks
+
+
+def _measure(count: Callable[[str], int], chunks: list[str], *, history: int, turns: int) -> dict[str, float]:
+    per_turn: list[float] = []
+    for turn in range(turns):
+        window = chunks[: history + turn * 2]
+        started = time.process_time()
+        sum(count(chunk) for chunk in window)
+        per_turn.append((time.process_time() - started) * 1000.0)
+    return {
+        "first_ms": round(per_turn[0], 3),
+        "later_p50_ms": round(statistics.median(per_turn[1:] or per_turn), 3),
+        "total_ms": round(sum(per_turn), 3),
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    token_counter = _load_token_counter()
+    chunks = build_history(history=args.history, turns=args.turns, seed=args.seed)
+    window = chunks[: args.history]
+    longest = "\n".join(window[:40])
+    results: dict[str, Any] = {}
+
+    def _record(name: str, count: Callable[[str], int], truncate: Callable[[str, int], str] | None) -> None:
+        item: dict[str, Any] = {
+            **_measure(count, chunks, history=args.history, turns=args.turns),
+            "estimate": sum(count(chunk) for chunk in window),
+        }
+        if truncate is not None:
+            started = time.process_time()
+            truncate(longest, args.budget)
+            item["truncate_ms"] = round((time.process_time() - started) * 1000.0, 3)
+        results[name] = item
+
+    _record("legacy_chars", _legacy_count, None)
+    token_counter.use_tokenizer("heuristic")
+    _record("heuristic_uncached", token_counter.heuristic_token_count, token_counter.truncate_to_token_budget)
+    token_counter.reset_for_testing()
+    token_counter.use_tokenizer("heuristic")
+    _record("heuristic_cached", token_counter.count_tokens, token_counter.truncate_to_token_budget)
+    if token_counter.use_tokenizer("tiktoken") == "tiktoken":
+        _record("tiktoken_cached", token_counter.count_tokens, token_counter.truncate_to_token_budget)
+        reference = results["tiktoken_cached"]["estimate"]
+        for item in results.values():
+            item["error_pct"] = round((item["estimate"] - reference) * 100.0 / max(1, reference), 1)
+    return results
+
+
+def render_report(results: dict[str, Any], settings: dict[str, Any]) -> str:
+    lines = [
+        "# 长历史上下文 token 计数基准（CPU 时间）",
+        "",
+        "设置：" + "，".join(f"{key}={value}" for key, value in settings.items()),
+        "",
+        "| 计数方式 | 首轮 ms | 后续轮 p50 ms | 合计 ms | 截断 ms | 历史估算 | 相对 o200k 偏差 |",
+        "| --- | ---: | ---: | ---: | ---: | ---: | ---: |",
+    ]
+    for name, values in results.items():
+        error = f"{values['error_pct']}%" if "error_pct" in values else "-"
+        lines.append(
+            f"| {name} | {values['first_ms']} | {values['later_p50_ms']} | {values['total_ms']} "
+            f"| {values.get('truncate_ms', '-')} | {values['estimate']} | {error} |"
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="长历史上下文 token 计数基准")
+    parser.add_argument("--history", type=int, default=500, help="第一轮时的历史消息条数")
+    parser.add_argument("--turns", type=int, default=20, help="模拟的回复轮数（每轮追加两条消息并重新计数）")
+    parser.add_argument("--budget", type=int, default=2000, help="截断测试的 token 预算")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["md", "json"], default="md")
+    args = parser.parse_args()
+    args.history = max(1, args.history)
+    args.turns = max(1, args.turns)
+
+    results = run(args)
+    settings = {"history": args.history, "turns": args.turns, "budget": args.budget}
+    if args.format == "json":
+        print(json.dumps({"settings": settings, "results": results}, ensure_ascii=False, indent=2))
+    else:
+        print(render_report(results, settings))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
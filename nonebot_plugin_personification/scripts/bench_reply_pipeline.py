@@ -0,0 +1,493 @@
+#!/usr/bin/env python
+"""拟人插件回复管线端到端延迟基准。
+
+用法：
+    python plugin/personification/scripts/bench_reply_pipeline.py \\
+        --input plugin/personification/tests/replay_corpus/*.jsonl \\
+        --profile typical --iterations 3 --output bench_report.md
+
+    # 对照某个开关：同一语料跑两次，比较报表
+    python plugin/personification/scripts/bench_reply_pipeline.py --set personification_turn_preflight_enabled=true
+
+流程：
+- 在本进程内启动 mock_llm_server（确定性回复 + 可配置延迟档位），插件的主 provider 指向它
+- 用临时数据目录初始化 NoneBot（none 驱动）并加载插件，直接构建 runtime，不启动后台任务
+- 把回放语料里每段的"当前需要回应的最新消息"还原为 OneBot v11 群聊 / 私聊事件，
+  逐条送进 process_response_logic（跳过规则匹配与缓冲，和 WebUI 健康探测走的是同一入口）
+- 统计每回合端到端耗时、LLM 请求数、SQLite 写语句数，输出 p50/p95/p99
+
+LLM 请求数与 DB 写入数按"本回合开始到下一回合开始"计：回合结束后 --settle-ms 内
+落地的后台任务（记忆抽取、状态写回等）算在触发它的回合上，但不计入延迟。
+QZone 场景没有对应的聊天事件，会被跳过。
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import importlib
+import importlib.util
+import itertools
+import json
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from math import ceil
+from pathlib import Path
+from typing import Any
+
+_CURRENT_MESSAGE_MARKER = "# 当前需要回应的最新消息\n"
+_WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+_BOT_SELF_ID = 10000
+_GROUP_ID = 30001
+_API_BASE_PATHS = {"openai": "/v1", "anthropic": "", "gemini": "/v1beta"}
+
+
+@dataclass
+class BenchTurn:
+    file: str
+    line_no: int
+    scene: str
+    speaker: str
+    text: str
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class TurnSample:
+    scene: str
+    latency_ms: float
+    llm_calls: int
+    db_writes: int
+    replied: bool
+    error: str = ""
+
+
+def extract_current_message(messages: list[dict[str, Any]]) -> tuple[str, str]:
+    """从回放 messages 里取出最后一条"当前需要回应的最新消息"，返回 (说话人, 文本)。"""
+    for message in reversed(messages or []):
+        content = message.get("content") if isinstance(message, dict) else None
+        if not isinstance(content, str) or _CURRENT_MESSAGE_MARKER not in content:
+            continue
+        line = content.rsplit(_CURRENT_MESSAGE_MARKER, 1)[1].strip().splitlines()[0].strip()
+        speaker, sep, text = line.partition(":")
+        if not sep:
+            speaker, sep, text = line.partition("：")
+        if not sep:
+            return "", line
+        return speaker.strip(), text.strip()
+    return "", ""
+
+
+def load_turns(paths: list[str]) -> tuple[list[BenchTurn], int]:
+    """读取回放语料，返回 (可回放回合, 跳过的条数)。"""
+    turns: list[BenchTurn] = []
+    skipped = 0
+    files: list[str] = []
+    for pattern in paths:
+        files.extend(sorted(glob.glob(pattern, recursive=True)))
+    for file_path in files:
+        path = Path(file_path)
+        if not path.exists() or path.suffix != ".jsonl":
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, raw in enumerate(f, start=1):
+                raw = raw.strip()
+                if not raw:
+                    continue
+                try:
+                    data = json.loads(raw)
+                except json.JSONDecodeError as exc:
+                    print(f"[warn] {file_path}:{line_no} JSON 解析失败: {exc}", file=sys.stderr)
+                    skipped += 1
+                    continue
+                if not isinstance(data, dict):
+                    skipped += 1
+                    continue
+                scene = str(data.get("scene", "") or "")
+                speaker, text = extract_current_message(list(data.get("messages") or []))
+                if scene not in {"group", "private"} or not text:
+                    skipped += 1
+                    continue
+                turns.append(
+                    BenchTurn(
+                        file=str(file_path),
+                        line_no=line_no,
+                        scene=scene,
+                        speaker=speaker or "user",
+                        text=text,
+                        metadata=dict(data.get("metadata") or {}),
+                    )
+                )
+    return turns, skipped
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """nearest-rank 分位数，和 runtime_performance 的口径一致。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, ceil(pct * len(ordered)) - 1))
+    return float(ordered[index])
+
+
+def summarize(samples: list[TurnSample]) -> dict[str, Any]:
+    def _block(items: list[TurnSample]) -> dict[str, Any]:
+        latencies = [item.latency_ms for item in items]
+        return {
+            "turns": len(items),
+            "replied": sum(1 for item in items if item.replied),
+            "errors": sum(1 for item in items if item.error),
+            "p50_ms": round(percentile(latencies, 0.50), 1),
+            "p95_ms": round(percentile(latencies, 0.95), 1),
+            "p99_ms": round(percentile(latencies, 0.99), 1),
+            "max_ms": round(max(latencies, default=0.0), 1),
+            "llm_calls_per_turn": round(sum(item.llm_calls for item in items) / len(items), 2) if items else 0.0,
+            "max_llm_calls": max((item.llm_calls for item in items), default=0),
+            "db_writes_per_turn": round(sum(item.db_writes for item in items) / len(items), 2) if items else 0.0,
+            "max_db_writes": max((item.db_writes for item in items), default=0),
+        }
+
+    scenes = sorted({item.scene for item in samples})
+    return {
+        "overall": _block(samples),
+        "by_scene": {scene: _block([item for item in samples if item.scene == scene]) for scene in scenes},
+    }
+
+
+def render_report(summary: dict[str, Any], settings: dict[str, Any]) -> str:
+    lines = [
+        "# 拟人插件回复管线基准",
+        "",
+        "- " + "，".join(f"{key}={value}" for key, value in settings.items()),
+        "",
+        "| 范围 | 回合 | 已回复 | 异常 | p50 (ms) | p95 (ms) | p99 (ms) | max (ms) | LLM/回合 | 最大 LLM | DB 写/回合 | 最大 DB 写 |",
+        "| --- | --- | --- | --- | --- | --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    rows = [("全部", summary["overall"])] + list(summary["by_scene"].items())
+    for name, stats in rows:
+        lines.append(
+            f"| {name} | {stats['turns']} | {stats['replied']} | {stats['errors']} | "
+            f"{stats['p50_ms']:.0f} | {stats['p95_ms']:.0f} | {stats['p99_ms']:.0f} | {stats['max_ms']:.0f} | "
+            f"{stats['llm_calls_per_turn']} | {stats['max_llm_calls']} | "
+            f"{stats['db_writes_per_turn']} | {stats['max_db_writes']} |"
+        )
+    return "\n".join(lines)
+
+
+class DbWriteCounter:
+    """包住 sqlite3.connect，给每个连接挂 trace 回调统计写语句；aiosqlite 也走这里。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._original: Any = None
+
+    @property
+    def writes(self) -> int:
+        with self._lock:
+            return self._writes
+
+    def _trace(self, statement: str) -> None:
+        if statement.lstrip().upper().startswith(_WRITE_PREFIXES):
+            with self._lock:
+                self._writes += 1
+
+    def install(self) -> None:
+        if self._original is not None:
+            return
+        original = self._original = sqlite3.connect
+
+        def _connect(*args: Any, **kwargs: Any) -> sqlite3.Connection:
+            conn = original(*args, **kwargs)
+            conn.set_trace_callback(self._trace)
+            return conn
+
+        sqlite3.connect = _connect  # type: ignore[assignment]
+
+    def uninstall(self) -> None:
+        if self._original is not None:
+            sqlite3.connect = self._original  # type: ignore[assignment]
+            self._original = None
+
+
+def _load_mock_server() -> Any:
+    module_name = "personification_mock_llm_server"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    script_path = Path(__file__).resolve().parent / "mock_llm_server.py"
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"无法加载 mock_llm_server: {script_path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def parse_overrides(items: list[str]) -> dict[str, Any]:
+    overrides: dict[str, Any] = {}
+    for item in items:
+        key, sep, raw = str(item).partition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"--set 需要 KEY=VALUE 形式: {item}")
+        try:
+            value: Any = json.loads(raw)
+        except json.JSONDecodeError:
+            value = raw
+        overrides[key.strip()] = value
+    return overrides
+
+
+class _BenchBot:
+    """只记录发送内容的 OneBot 假 bot；非发送类 API 一律返回空结果。"""
+
+    type = "OneBot V11"
+
+    def __init__(self) -> None:
+        self.self_id = str(_BOT_SELF_ID)
+        self.sent: list[str] = []
+        self._message_ids = itertools.count(1)
+
+    async def send(self, event: Any, message: Any, **kwargs: Any) -> dict[str, Any]:
+        del event, kwargs
+        self.sent.append(str(message))
+        return {"message_id": next(self._message_ids)}
+
+    async def call_api(self, api: str, **data: Any) -> Any:
+        if str(api).startswith("send_"):
+            self.sent.append(str(data.get("message", "")))
+            return {"message_id": next(self._message_ids)}
+        if api in {"get_group_member_info", "get_stranger_info"}:
+            return {"user_id": data.get("user_id"), "nickname": "", "card": "", "role": "member"}
+        if api == "get_group_member_list":
+            return []
+        return {}
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        async def _api(**data: Any) -> Any:
+            return await self.call_api(name, **data)
+
+        return _api
+
+
+def _build_event(turn: BenchTurn, message_id: int, user_ids: dict[str, int]) -> Any:
+    from nonebot.adapters.onebot.v11 import GroupMessageEvent, Message, MessageSegment, PrivateMessageEvent
+    from nonebot.adapters.onebot.v11.event import Sender
+
+    user_id = user_ids.setdefault(turn.speaker, 20001 + len(user_ids))
+    direct = bool(turn.metadata.get("is_direct_mention"))
+    if turn.scene == "group" and direct:
+        message = MessageSegment.at(_BOT_SELF_ID) + MessageSegment.text(" " + turn.text)
+        raw_message = f"[CQ:at,qq={_BOT_SELF_ID}] {turn.text}"
+    else:
+        message = Message(turn.text)
+        raw_message = turn.text
+    common = dict(
+        time=int(time.time()),
+        self_id=_BOT_SELF_ID,
+        post_type="message",
+        message_id=message_id,
+        user_id=user_id,
+        message=message,
+        original_message=message,
+        raw_message=raw_message,
+        font=0,
+        sender=Sender(user_id=user_id, nickname=turn.speaker),
+        to_me=direct or turn.scene == "private",
+    )
+    if turn.scene == "group":
+        return GroupMessageEvent(
+            message_type="group", sub_type="normal", group_id=_GROUP_ID, anonymous=None, **common
+        )
+    return PrivateMessageEvent(message_type="private", sub_type="friend", **common)
+
+
+async def run_benchmark(
+    turns: list[BenchTurn],
+    *,
+    api_type: str = "openai",
+    profile: str = "fast",
+    iterations: int = 1,
+    seed: int = 0,
+    settle_ms: float = 200.0,
+    overrides: dict[str, Any] | None = None,
+    data_dir: str = "",
+    log_level: str = "WARNING",
+) -> list[TurnSample]:
+    import nonebot
+
+    mock = _load_mock_server()
+    server = mock.MockLLMServer(profile=profile, seed=seed)
+    base_url = await server.start()
+    counter = DbWriteCounter()
+    counter.install()
+    root = Path(data_dir or tempfile.mkdtemp(prefix="personification_bench_"))
+    try:
+        nonebot.init(
+            driver="~none",
+            log_level=log_level,
+            localstore_data_dir=str(root / "localstore" / "data"),
+            localstore_cache_dir=str(root / "localstore" / "cache"),
+            localstore_config_dir=str(root / "localstore" / "config"),
+            personification_data_dir=str(root / "personification"),
+            personification_api_type=api_type,
+            personification_api_url=base_url + _API_BASE_PATHS.get(api_type, ""),
+            personification_api_key="mock",
+            personification_model=f"mock-{api_type}",
+            **dict(overrides or {}),
+        )
+        package_dir = Path(__file__).resolve().parents[1]
+        if str(package_dir.parent) not in sys.path:
+            sys.path.insert(0, str(package_dir.parent))
+        plugin = nonebot.load_plugin(package_dir.name)
+        if plugin is None:
+            raise RuntimeError(f"插件加载失败: {package_dir.name}")
+        plugin_module = plugin.module
+
+        from nonebot.adapters.onebot.v11 import (
+            GroupMessageEvent,
+            Message,
+            MessageEvent,
+            MessageSegment,
+            PokeNotifyEvent,
+            PrivateMessageEvent,
+        )
+        from nonebot.exception import FinishedException
+        from nonebot.permission import SUPERUSER
+
+        runtime_builder = importlib.import_module(f"{package_dir.name}.core.plugin_runtime")
+        processor = importlib.import_module(f"{package_dir.name}.handlers.reply_pipeline.processor")
+        bundle = runtime_builder.build_plugin_runtime(
+            plugin_config=plugin_module.plugin_config,
+            superusers=set(),
+            logger=nonebot.logger,
+            get_driver=nonebot.get_driver,
+            get_bots=nonebot.get_bots,
+            superuser_permission=SUPERUSER,
+            finished_exception_cls=FinishedException,
+            group_message_event_cls=GroupMessageEvent,
+            private_message_event_cls=PrivateMessageEvent,
+            message_event_cls=MessageEvent,
+            poke_event_cls=PokeNotifyEvent,
+            message_cls=Message,
+            message_segment_cls=MessageSegment,
+            md_to_pic=None,
+        )
+
+        bot = _BenchBot()
+        user_ids: dict[str, int] = {}
+        message_ids = itertools.count(int(time.time()) % 1_000_000 * 1000)
+        pending: list[tuple[str, float, bool, str, int, int]] = []
+        samples: list[TurnSample] = []
+
+        def _close_previous() -> None:
+            # 上一回合的调用 / 写入计到下一回合开始前，后台收尾工作归属触发它的回合
+            if not pending:
+                return
+            scene, latency_ms, replied, error, calls_before, writes_before = pending.pop()
+            samples.append(
+                TurnSample(
+                    scene=scene,
+                    latency_ms=latency_ms,
+                    llm_calls=int(server.stats["requests"]) - calls_before,
+                    db_writes=counter.writes - writes_before,
+                    replied=replied,
+                    error=error,
+                )
+            )
+
+        for _ in range(max(1, int(iterations))):
+            for turn in turns:
+                _close_previous()
+                event = _build_event(turn, next(message_ids), user_ids)
+                state = {
+                    "is_random_chat": bool(turn.metadata.get("is_random_chat")),
+                    "message_target": str(turn.metadata.get("message_target", "") or ""),
+                }
+                calls_before, writes_before = int(server.stats["requests"]), counter.writes
+                sent_before = len(bot.sent)
+                error = ""
+                started = time.perf_counter()
+                try:
+                    await processor.process_response_logic(bot, event, state, bundle.reply_processor_deps)
+                except FinishedException:
+                    pass
+                except Exception as exc:
+                    error = type(exc).__name__
+                latency_ms = (time.perf_counter() - started) * 1000.0
+                pending.append(
+                    (turn.scene, latency_ms, len(bot.sent) > sent_before, error, calls_before, writes_before)
+                )
+                if settle_ms > 0:
+                    await asyncio.sleep(settle_ms / 1000.0)
+        _close_previous()
+        return samples
+    finally:
+        counter.uninstall()
+        await server.stop()
+
+
+def main() -> int:
+    default_corpus = str(Path(__file__).resolve().parents[2] / "tests" / "replay_corpus" / "*.jsonl")
+    parser = argparse.ArgumentParser(description="拟人插件回复管线端到端基准（mock LLM）")
+    parser.add_argument("--input", nargs="+", default=[default_corpus], help="回放语料 jsonl（支持 glob）")
+    parser.add_argument("--api-type", choices=sorted(_API_BASE_PATHS), default="openai", help="mock 走哪套线协议")
+    parser.add_argument("--profile", default="fast", help="mock 延迟档位：instant / fast / typical / slow")
+    parser.add_argument("--iterations", type=int, default=1, help="整套语料重复轮数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--settle-ms", type=float, default=200.0, help="回合之间等待后台任务落地的时间")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], help="插件配置覆盖 KEY=VALUE，可重复")
+    parser.add_argument("--data-dir", default="", help="数据目录（默认临时目录）")
+    parser.add_argument("--format", choices=["md", "json"], default="md")
+    parser.add_argument("--output", default="-", help="输出路径，'-' 表示打印到 stdout")
+    parser.add_argument("--verbose", action="store_true", help="保留插件 INFO 日志")
+    args = parser.parse_args()
+
+    turns, skipped = load_turns(args.input)
+    if not turns:
+        print(f"[warn] 未在 {args.input} 找到可回放的群聊 / 私聊回合", file=sys.stderr)
+        return 1
+    overrides = parse_overrides(args.overrides)
+    samples = asyncio.run(
+        run_benchmark(
+            turns,
+            api_type=args.api_type,
+            profile=args.profile,
+            iterations=args.iterations,
+            seed=args.seed,
+            settle_ms=args.settle_ms,
+            overrides=overrides,
+            data_dir=args.data_dir,
+            log_level="INFO" if args.verbose else "WARNING",
+        )
+    )
+    summary = summarize(samples)
+    settings = {
+        "api_type": args.api_type,
+        "profile": args.profile,
+        "iterations": args.iterations,
+        "seed": args.seed,
+        "skipped": skipped,
+        **overrides,
+    }
+    if args.format == "json":
+        report = json.dumps({"settings": settings, **summary}, ensure_ascii=False, indent=2)
+    else:
+        report = render_report(summary, settings)
+    if args.output in {"", "-"}:
+        print(report)
+    else:
+        Path(args.output).write_text(report, encoding="utf-8")
+        print(f"报表已写入 {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
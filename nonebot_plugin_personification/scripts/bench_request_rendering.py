@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""Agent 多步回合的 provider 请求渲染 CPU 基准。
+
+用法：
+    python plugin/personification/scripts/bench_request_rendering.py --steps 12 --images 2 --image-kb 600
+
+构造一个典型的多工具回合：人设 system + 若干历史消息 + 带 base64 图片的当前消息，
+之后每一步追加一条 assistant tool_calls 与对应的 tool 结果。每一步都按 chat_with_tools 的方式
+（先 inject_current_time_context 浅拷贝消息，再转线格式；Gemini 另外序列化请求体）渲染一次，
+分别统计"每步清空渲染缓存"（等价于旧的整段重建）和"跨步复用"两种情况下每步的 CPU 时间。
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import importlib
+import json
+import random
+import statistics
+import sys
+import time
+import types
+from pathlib import Path
+from typing import Any, Callable
+
+
+def _load_modules() -> tuple[Any, Any, Any]:
+    package_dir = Path(__file__).resolve().parents[1]
+    # 工具调用实现按 plugin.personification.* 绝对路径导入，这里只挂命名空间，不加载整个插件
+    for name, path in (("plugin", package_dir.parent), ("plugin.personification", package_dir)):
+        module = sys.modules.get(name)
+        if module is None:
+            module = types.ModuleType(name)
+            module.__path__ = [str(path)]  # type: ignore[attr-defined]
+            sys.modules[name] = module
+    impl = importlib.import_module("plugin.personification.skills.skillpacks.tool_caller.scripts.impl")
+    rendering = importlib.import_module("plugin.personification.core.request_rendering")
+    time_ctx = importlib.import_module("plugin.personification.core.time_ctx")
+    return impl, rendering, time_ctx
+
+
+def build_turn(*, history: int, images: int, image_kb: int, tool_result_chars: int, seed: int) -> tuple[list[dict], list[list[dict]]]:
+    """返回 (回合开始时的消息, 每一步追加的消息)。"""
+    rng = random.Random(seed)
+    messages: list[dict[str, Any]] = [{"role": "system", "content": "你是群里的老朋友，说话简短自然。" * 200}]
+    for index in range(history):
+        role = "user" if index % 2 == 0 else "assistant"
+        messages.append({"role": role, "content": f"[历史 {index}] 周末去哪玩比较好 maybe hiking " * 12})
+    parts: list[dict[str, Any]] = [{"type": "text", "text": "帮我看看这几张图里是什么地方，顺便查查怎么去"}]
+    for _ in range(images):
+        data = base64.b64encode(rng.randbytes(image_kb * 1024)).decode("ascii")
+        parts.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{data}"}})
+    messages.append({"role": "user", "content": parts})
+    deltas: list[list[dict]] = []
+    for step in range(64):
+        call_id = f"call_{step}"
+        deltas.append(
+            [
+                {
+                    "role": "assistant",
+                    "content": "",
+                    "tool_calls": [
+                        {
+                            "id": call_id,
+                            "type": "function",
+                            "function": {"name": "web_search", "arguments": json.dumps({"query": f"路线 {step}"}, ensure_ascii=False)},
+                        }
+                    ],
+                },
+                {"role": "tool", "tool_call_id": call_id, "content": "搜索结果：" + "相关内容 " * (tool_result_chars // 5)},
+            ]
+        )
+    return messages, deltas
+
+
+def _tools() -> list[dict]:
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": f"tool_{index}",
+                "description": "示例工具",
+                "parameters": {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]},
+            },
+        }
+        for index in range(12)
+    ]
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    impl, rendering, time_ctx = _load_modules()
+    base, deltas = build_turn(
+        history=args.history,
+        images=args.images,
+        image_kb=args.image_kb,
+        tool_result_chars=args.tool_result_chars,
+        seed=args.seed,
+    )
+    tools = _tools()
+
+    def _gemini(messages: list[dict], *, incremental: bool) -> None:
+        system_instruction, contents = impl._convert_messages_to_gemini(messages)
+        payload = {
+            "contents": contents,
+            "systemInstruction": {"parts": [{"text": system_instruction}]},
+            "tools": [{"functionDeclarations": impl._convert_openai_tools_to_gemini(tools)}],
+        }
+        if incremental:
+            rendering.encode_json_body(payload)
+        else:
+            # 旧路径：httpx 按 json= 整段序列化
+            json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+    protocols: dict[str, Callable[..., None]] = {
+        "gemini": _gemini,
+        "anthropic": lambda messages, incremental: impl._convert_messages_to_anthropic(messages),
+        "openai_responses": lambda messages, incremental: impl._openai_responses_input(messages),
+    }
+    results: dict[str, Any] = {}
+    for name, render in protocols.items():
+        for mode in ("rebuild", "incremental"):
+            rendering.reset_for_testing()
+            messages = list(base)
+            per_step: list[float] = []
+            for step in range(args.steps):
+                if step:
+                    messages.extend(deltas[step - 1])
+                if mode == "rebuild":
+                    rendering.clear_request_render_cache()
+                started = time.process_time()
+                for _ in range(args.fallbacks):
+                    render(time_ctx.inject_current_time_context(messages), incremental=mode == "incremental")
+                per_step.append((time.process_time() - started) * 1000.0)
+            results.setdefault(name, {})[mode] = {
+                "first_ms": round(per_step[0], 3),
+                "later_p50_ms": round(statistics.median(per_step[1:] or per_step), 3),
+                "total_ms": round(sum(per_step), 3),
+            }
+    return results
+
+
+def render_report(results: dict[str, Any], settings: dict[str, Any]) -> str:
+    lines = [
+        "# Agent 请求渲染基准（每步 CPU 时间）",
+        "",
+        "设置：" + "，".join(f"{key}={value}" for key, value in settings.items()),
+        "",
+        "| 协议 | 模式 | 首步 ms | 后续步 p50 ms | 回合合计 ms |",
+        "| --- | --- | ---: | ---: | ---: |",
+    ]
+    for name, modes in results.items():
+        for mode, values in modes.items():
+            lines.append(f"| {name} | {mode} | {values['first_ms']} | {values['later_p50_ms']} | {values['total_ms']} |")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Agent 多步回合 provider 请求渲染 CPU 基准")
+    parser.add_argument("--steps", type=int, default=12, help="agent 步数（每步追加一次工具调用与结果）")
+    parser.add_argument("--fallbacks", type=int, default=1, help="每步渲染次数（模拟 provider 回退）")
+    parser.add_argument("--history", type=int, default=30, help="回合开始前的历史消息条数")
+    parser.add_argument("--images", type=int, default=2, help="当前消息里的 base64 图片数")
+    parser.add_argument("--image-kb", type=int, default=600, help="每张图片的原始字节数（KB）")
+    parser.add_argument("--tool-result-chars", type=int, default=3000, help="每条工具结果的大致字符数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["md", "json"], default="md")
+    args = parser.parse_args()
+    args.steps = max(1, min(args.steps, 65))
+    args.fallbacks = max(1, args.fallbacks)
+
+    results = run(args)
+    settings = {
+        "steps": args.steps,
+        "fallbacks": args.fallbacks,
+        "history": args.history,
+        "images": args.images,
+        "image_kb": args.image_kb,
+    }
+    if args.format == "json":
+        print(json.dumps({"settings": settings, "results": results}, ensure_ascii=False, indent=2))
+    else:
+        print(render_report(results, settings))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,643 @@
+#!/usr/bin/env python
+"""本地确定性 mock LLM 服务。
+
+同时提供三套线协议，供回复管线在不触达真实 provider 的情况下做端到端压测：
+- OpenAI `POST /v1/chat/completions`（含 SSE 流式与 tool_calls）
+- Anthropic `POST /v1/messages`（含 SSE 流式与 tool_use）
+- Gemini `POST /v1beta/models/{model}:generateContent` / `:streamGenerateContent?alt=sse`
+
+回复来源：
+- 脚本规则：按 system / user 文本子串匹配，返回固定文本或工具调用
+- 内置规则：识别语义帧、TurnPlan、合并预判这几类结构化判别 prompt，返回合法 JSON
+- 其余请求：按 seed + 模型 + 最后一条用户消息哈希挑一条固定短句，同一请求永远得到同一回复
+
+延迟按 profile 模拟首 token 延迟、抖动与 token 速率；抖动同样按 seed + 请求内容确定。
+
+用法：
+    python plugin/personification/scripts/mock_llm_server.py --port 18080 --profile typical
+    python plugin/personification/scripts/mock_llm_server.py --script rules.json --seed 7
+
+规则文件是 JSON 数组，每项形如：
+    {"name": "weather", "match": "天气", "scope": "user", "content": "今天晴",
+     "tool_calls": [{"name": "web_search", "arguments": {"query": "天气"}}]}
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+from aiohttp import web
+
+
+@dataclass(frozen=True)
+class LatencyProfile:
+    first_token_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # 0 表示不限速，整段一次性吐出
+    tokens_per_second: float = 0.0
+
+
+LATENCY_PROFILES: dict[str, LatencyProfile] = {
+    "instant": LatencyProfile(),
+    "fast": LatencyProfile(first_token_ms=150.0, jitter_ms=30.0, tokens_per_second=200.0),
+    "typical": LatencyProfile(first_token_ms=600.0, jitter_ms=150.0, tokens_per_second=60.0),
+    "slow": LatencyProfile(first_token_ms=2500.0, jitter_ms=800.0, tokens_per_second=25.0),
+}
+
+_DEFAULT_REPLIES = (
+    "哈哈哈确实离谱",
+    "这个我也想知道",
+    "等我想想，好像是这样",
+    "可以啊，今晚冲",
+    "辛苦了，早点休息",
+    "你这个思路挺有意思",
+    "懂了，那就先这样",
+    "笑死，太真实了",
+)
+
+# 结构化判别 prompt 的固定应答，让前置阶段走 LLM 成功路径而不是 metadata fallback
+_SEMANTIC_FRAME_JSON = {
+    "chat_intent": "banter",
+    "plugin_question_intent": "capability",
+    "ambiguity_level": "low",
+    "recommend_silence": False,
+    "requires_emotional_care": False,
+    "sticker_appropriate": True,
+    "meta_question": False,
+    "domain_focus": "social",
+    "evidence_policy": "none",
+    "citation_mode": "none",
+    "user_attitude": "日常闲聊",
+    "bot_emotion": "轻松",
+    "emotion_intensity": "low",
+    "expression_style": "自然简短",
+    "tts_style_hint": "自然",
+    "sticker_mood_hint": "开心|接梗",
+    "conversation_scenario": "casual_banter",
+    "address_mode": "auto",
+    "confidence": 0.85,
+    "reason": "mock 判别",
+}
+_TURN_PLAN_JSON = {
+    "reply_action": "reply",
+    "speech_act": "participate",
+    "memory_need": "none",
+    "research_need": "none",
+    "vision_need": "none",
+    "qzone_continue": False,
+    "output_mode": "chat_short",
+    "tool_intent": ["none"],
+    "ambiguity_level": "low",
+    "message_target": "broadcast",
+    "session_goal": "接一句",
+    "domain_focus": "social",
+    "evidence_policy": "none",
+    "citation_mode": "none",
+    "confidence": 0.85,
+    "reason": "mock 规划",
+}
+
+
+@dataclass
+class ScriptRule:
+    match: str
+    content: str = ""
+    tool_calls: list[dict[str, Any]] = field(default_factory=list)
+    scope: str = "any"
+    name: str = ""
+    # 0 表示不限次数
+    times: int = 0
+    used: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ScriptRule":
+        return cls(
+            match=str(data.get("match", "") or ""),
+            content=str(data.get("content", "") or ""),
+            tool_calls=[dict(item) for item in list(data.get("tool_calls") or []) if isinstance(item, dict)],
+            scope=str(data.get("scope", "any") or "any"),
+            name=str(data.get("name", "") or ""),
+            times=max(0, int(data.get("times", 0) or 0)),
+        )
+
+    def matches(self, request: "MockRequest") -> bool:
+        if self.times and self.used >= self.times:
+            return False
+        if self.tool_calls and (request.after_tool_result or not request.tool_names):
+            # 工具结果回来后不再重复发起同一调用，避免 Agent 循环打满轮数
+            return False
+        haystack = {
+            "system": request.system_text,
+            "user": request.user_text,
+        }.get(self.scope, f"{request.system_text}\n{request.user_text}")
+        return self.match in haystack
+
+
+BUILTIN_RULES: tuple[ScriptRule, ...] = (
+    ScriptRule(
+        name="turn_preflight",
+        scope="system",
+        match='{"semantic_frame":{...},"turn_plan":{...}}',
+        content=json.dumps({"semantic_frame": _SEMANTIC_FRAME_JSON, "turn_plan": _TURN_PLAN_JSON}, ensure_ascii=False),
+    ),
+    ScriptRule(
+        name="semantic_frame",
+        scope="system",
+        match='"chat_intent":"banter|explanation',
+        content=json.dumps(_SEMANTIC_FRAME_JSON, ensure_ascii=False),
+    ),
+    ScriptRule(
+        name="inner_state_update",
+        scope="user",
+        match="请根据对话内容简短更新你的内心状态",
+        content=json.dumps({"mood": "开心", "energy": "正常"}, ensure_ascii=False),
+    ),
+    ScriptRule(
+        name="turn_plan",
+        scope="system",
+        match='"reply_action":"reply|silence|ask_clarify"',
+        content=json.dumps(_TURN_PLAN_JSON, ensure_ascii=False),
+    ),
+)
+
+
+def load_script_rules(path: str | Path) -> list[ScriptRule]:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(data, list):
+        raise ValueError("script file must be a JSON array of rules")
+    return [ScriptRule.from_dict(item) for item in data if isinstance(item, dict)]
+
+
+@dataclass
+class MockRequest:
+    protocol: str
+    model: str
+    stream: bool
+    system_text: str
+    user_text: str
+    tool_names: list[str]
+    after_tool_result: bool
+    prompt_chars: int
+
+
+@dataclass
+class MockReply:
+    content: str
+    tool_calls: list[dict[str, Any]]
+    rule: str
+
+
+def _text_of(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts: list[str] = []
+        for item in content:
+            if isinstance(item, str):
+                parts.append(item)
+            elif isinstance(item, dict) and isinstance(item.get("text"), str):
+                parts.append(item["text"])
+        return "\n".join(parts)
+    return ""
+
+
+def _openai_request(body: dict[str, Any]) -> MockRequest:
+    messages = [item for item in list(body.get("messages") or []) if isinstance(item, dict)]
+    system = "\n".join(_text_of(m.get("content")) for m in messages if m.get("role") in {"system", "developer"})
+    users = [_text_of(m.get("content")) for m in messages if m.get("role") == "user"]
+    tools = [
+        str((tool.get("function") or {}).get("name", "") or "")
+        for tool in list(body.get("tools") or [])
+        if isinstance(tool, dict)
+    ]
+    return MockRequest(
+        protocol="openai",
+        model=str(body.get("model", "") or ""),
+        stream=bool(body.get("stream")),
+        system_text=system,
+        user_text=users[-1] if users else "",
+        tool_names=[name for name in tools if name],
+        after_tool_result=bool(messages) and messages[-1].get("role") == "tool",
+        prompt_chars=len(json.dumps(messages, ensure_ascii=False)),
+    )
+
+
+def _anthropic_request(body: dict[str, Any]) -> MockRequest:
+    messages = [item for item in list(body.get("messages") or []) if isinstance(item, dict)]
+    users = [m for m in messages if m.get("role") == "user"]
+    last_blocks = users[-1].get("content") if users else None
+    after_tool = isinstance(last_blocks, list) and any(
+        isinstance(block, dict) and block.get("type") == "tool_result" for block in last_blocks
+    )
+    # 服务端工具（如 web_search_20250305）由 provider 自己执行，不参与 tool_use 匹配
+    tools = [
+        str(tool.get("name", "") or "")
+        for tool in list(body.get("tools") or [])
+        if isinstance(tool, dict) and not str(tool.get("type", "") or "").startswith("web_search")
+    ]
+    return MockRequest(
+        protocol="anthropic",
+        model=str(body.get("model", "") or ""),
+        stream=bool(body.get("stream")),
+        system_text=_text_of(body.get("system")),
+        user_text=_text_of(last_blocks) if users else "",
+        tool_names=[name for name in tools if name],
+        after_tool_result=bool(after_tool),
+        prompt_chars=len(json.dumps(messages, ensure_ascii=False)),
+    )
+
+
+def _gemini_request(body: dict[str, Any], model: str, stream: bool) -> MockRequest:
+    contents = [item for item in list(body.get("contents") or []) if isinstance(item, dict)]
+    users = [c for c in contents if c.get("role", "user") == "user"]
+    last_parts = list(users[-1].get("parts") or []) if users else []
+    declarations: list[str] = []
+    for tool in list(body.get("tools") or []):
+        if isinstance(tool, dict):
+            declarations.extend(
+                str(item.get("name", "") or "")
+                for item in list(tool.get("functionDeclarations") or [])
+                if isinstance(item, dict)
+            )
+    return MockRequest(
+        protocol="gemini",
+        model=model,
+        stream=stream,
+        system_text=_text_of(list((body.get("systemInstruction") or {}).get("parts") or [])),
+        user_text=_text_of(last_parts),
+        tool_names=[name for name in declarations if name],
+        after_tool_result=any(isinstance(part, dict) and "functionResponse" in part for part in last_parts),
+        prompt_chars=len(json.dumps(contents, ensure_ascii=False)),
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    # 中文约 1.5 字 / token，英文约 4 字符 / token；压测只需要稳定的量级
+    return max(1, math.ceil(len(text) / 2))
+
+
+def _chunks(text: str, size: int = 2) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)] or [""]
+
+
+class MockLLMServer:
+    """进程内可启停的 mock provider；`base_url` 在 start() 之后可用。"""
+
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        profile: str | LatencyProfile = "instant",
+        rules: list[ScriptRule] | None = None,
+        seed: int = 0,
+        builtin_rules: bool = True,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.profile = LATENCY_PROFILES[profile] if isinstance(profile, str) else profile
+        self.rules = list(rules or []) + ([ScriptRule(**_rule_kwargs(rule)) for rule in BUILTIN_RULES] if builtin_rules else [])
+        self.seed = int(seed)
+        self._runner: web.AppRunner | None = None
+        self._ids = itertools.count(1)
+        self.stats: dict[str, Any] = {}
+        self.reset_stats()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def reset_stats(self) -> None:
+        self.stats = {
+            "requests": 0,
+            "stream_requests": 0,
+            "by_protocol": {},
+            "by_rule": {},
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+    def _record(self, request: MockRequest, reply: MockReply, completion_tokens: int) -> None:
+        stats = self.stats
+        stats["requests"] += 1
+        stats["stream_requests"] += int(request.stream)
+        stats["by_protocol"][request.protocol] = stats["by_protocol"].get(request.protocol, 0) + 1
+        stats["by_rule"][reply.rule] = stats["by_rule"].get(reply.rule, 0) + 1
+        stats["prompt_tokens"] += estimate_tokens("x" * request.prompt_chars)
+        stats["completion_tokens"] += completion_tokens
+
+    def _digest(self, request: MockRequest) -> int:
+        # system prompt 里带插件注入的当前时间，参与哈希会让同一条消息每秒换一个回复
+        raw = f"{self.seed}\x00{request.model}\x00{request.user_text}"
+        return int.from_bytes(hashlib.sha256(raw.encode("utf-8")).digest()[:8], "big")
+
+    def decide(self, request: MockRequest) -> MockReply:
+        for rule in self.rules:
+            if rule.matches(request):
+                rule.used += 1
+                tool_calls = [call for call in rule.tool_calls if str(call.get("name", "")) in request.tool_names]
+                return MockReply(content=rule.content, tool_calls=tool_calls, rule=rule.name or rule.match[:24])
+        text = _DEFAULT_REPLIES[self._digest(request) % len(_DEFAULT_REPLIES)]
+        return MockReply(content=text, tool_calls=[], rule="default")
+
+    def _first_token_delay(self, request: MockRequest) -> float:
+        profile = self.profile
+        if profile.first_token_ms <= 0 and profile.jitter_ms <= 0:
+            return 0.0
+        jitter = random.Random(self._digest(request)).uniform(-profile.jitter_ms, profile.jitter_ms)
+        return max(0.0, profile.first_token_ms + jitter) / 1000.0
+
+    def _token_delay(self, tokens: int) -> float:
+        rate = self.profile.tokens_per_second
+        return tokens / rate if rate > 0 else 0.0
+
+    async def _paced(self, request: MockRequest, pieces: list[str]) -> AsyncIterator[str]:
+        await asyncio.sleep(self._first_token_delay(request))
+        for index, piece in enumerate(pieces):
+            if index:
+                await asyncio.sleep(self._token_delay(1))
+            yield piece
+
+    async def _complete(self, request: MockRequest) -> tuple[MockReply, int]:
+        reply = self.decide(request)
+        completion_tokens = estimate_tokens(reply.content + json.dumps(reply.tool_calls, ensure_ascii=False))
+        self._record(request, reply, completion_tokens)
+        if not request.stream:
+            await asyncio.sleep(self._first_token_delay(request) + self._token_delay(completion_tokens))
+        return reply, completion_tokens
+
+    @staticmethod
+    async def _sse(http_request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"},
+        )
+        await response.prepare(http_request)
+        return response
+
+    # ---------- OpenAI ----------
+
+    async def _handle_openai(self, http_request: web.Request) -> web.StreamResponse:
+        body = await http_request.json()
+        request = _openai_request(body)
+        reply, completion_tokens = await self._complete(request)
+        call_id = next(self._ids)
+        tool_calls = [
+            {
+                "id": f"call_mock_{call_id}_{index}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments") or {}, ensure_ascii=False)},
+            }
+            for index, call in enumerate(reply.tool_calls)
+        ]
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        usage = {
+            "prompt_tokens": estimate_tokens("x" * request.prompt_chars),
+            "completion_tokens": completion_tokens,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": f"chatcmpl-mock-{call_id}", "created": int(time.time()), "model": request.model}
+        if not request.stream:
+            message: dict[str, Any] = {"role": "assistant", "content": reply.content or None}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return web.json_response(
+                {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                    "usage": usage,
+                }
+            )
+
+        response = await self._sse(http_request)
+
+        async def _send(choices: list[dict[str, Any]], **extra: Any) -> None:
+            chunk = {**base, "object": "chat.completion.chunk", "choices": choices, **extra}
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        first = True
+        async for piece in self._paced(request, _chunks(reply.content)):
+            delta: dict[str, Any] = {"content": piece}
+            if first:
+                delta["role"] = "assistant"
+                first = False
+            await _send([{"index": 0, "delta": delta, "finish_reason": None}])
+        for index, call in enumerate(tool_calls):
+            await _send([{"index": 0, "delta": {"tool_calls": [{"index": index, **call}]}, "finish_reason": None}])
+        await _send([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await _send([], usage=usage)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    # ---------- Anthropic ----------
+
+    async def _handle_anthropic(self, http_request: web.Request) -> web.StreamResponse:
+        body = await http_request.json()
+        request = _anthropic_request(body)
+        reply, completion_tokens = await self._complete(request)
+        call_id = next(self._ids)
+        blocks: list[dict[str, Any]] = []
+        if reply.content:
+            blocks.append({"type": "text", "text": reply.content})
+        for index, call in enumerate(reply.tool_calls):
+            blocks.append(
+                {
+                    "type": "tool_use",
+                    "id": f"toolu_mock_{call_id}_{index}",
+                    "name": call["name"],
+                    "input": dict(call.get("arguments") or {}),
+                }
+            )
+        stop_reason = "tool_use" if reply.tool_calls else "end_turn"
+        usage = {"input_tokens": estimate_tokens("x" * request.prompt_chars), "output_tokens": completion_tokens}
+        message = {
+            "id": f"msg_mock_{call_id}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.model,
+            "stop_sequence": None,
+        }
+        if not request.stream:
+            return web.json_response({**message, "content": blocks, "stop_reason": stop_reason, "usage": usage})
+
+        response = await self._sse(http_request)
+
+        async def _event(name: str, data: dict[str, Any]) -> None:
+            payload = json.dumps({"type": name, **data}, ensure_ascii=False)
+            await response.write(f"event: {name}\ndata: {payload}\n\n".encode("utf-8"))
+
+        await _event(
+            "message_start",
+            {"message": {**message, "content": [], "stop_reason": None, "usage": {**usage, "output_tokens": 1}}},
+        )
+        for index, block in enumerate(blocks):
+            if block["type"] == "text":
+                await _event("content_block_start", {"index": index, "content_block": {"type": "text", "text": ""}})
+                async for piece in self._paced(request, _chunks(block["text"])):
+                    await _event("content_block_delta", {"index": index, "delta": {"type": "text_delta", "text": piece}})
+            else:
+                await _event("content_block_start", {"index": index, "content_block": {**block, "input": {}}})
+                await _event(
+                    "content_block_delta",
+                    {
+                        "index": index,
+                        "delta": {"type": "input_json_delta", "partial_json": json.dumps(block["input"], ensure_ascii=False)},
+                    },
+                )
+            await _event("content_block_stop", {"index": index})
+        await _event(
+            "message_delta",
+            {"delta": {"stop_reason": stop_reason, "stop_sequence": None}, "usage": {"output_tokens": completion_tokens}},
+        )
+        await _event("message_stop", {})
+        await response.write_eof()
+        return response
+
+    # ---------- Gemini ----------
+
+    async def _handle_gemini(self, http_request: web.Request) -> web.StreamResponse:
+        model, _, method = http_request.match_info["target"].partition(":")
+        if method not in {"generateContent", "streamGenerateContent"}:
+            raise web.HTTPNotFound(text=f"unsupported method: {method}")
+        body = await http_request.json()
+        request = _gemini_request(body, model, method == "streamGenerateContent")
+        reply, completion_tokens = await self._complete(request)
+        function_parts = [
+            {"functionCall": {"name": call["name"], "args": dict(call.get("arguments") or {})}}
+            for call in reply.tool_calls
+        ]
+        prompt_tokens = estimate_tokens("x" * request.prompt_chars)
+        usage = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": completion_tokens,
+            "totalTokenCount": prompt_tokens + completion_tokens,
+        }
+
+        def _chunk(parts: list[dict[str, Any]], *, final: bool) -> dict[str, Any]:
+            candidate: dict[str, Any] = {"content": {"role": "model", "parts": parts}, "index": 0}
+            data: dict[str, Any] = {"candidates": [candidate], "modelVersion": model}
+            if final:
+                candidate["finishReason"] = "STOP"
+                data["usageMetadata"] = usage
+            return data
+
+        if not request.stream:
+            parts = ([{"text": reply.content}] if reply.content else []) + function_parts
+            return web.json_response(_chunk(parts, final=True))
+
+        response = await self._sse(http_request)
+        pieces = _chunks(reply.content) if reply.content else []
+        async for piece in self._paced(request, pieces or [""]):
+            if piece:
+                payload = json.dumps(_chunk([{"text": piece}], final=False), ensure_ascii=False)
+                await response.write(f"data: {payload}\r\n\r\n".encode("utf-8"))
+        payload = json.dumps(_chunk(function_parts, final=True), ensure_ascii=False)
+        await response.write(f"data: {payload}\r\n\r\n".encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    # ---------- 管理接口 ----------
+
+    async def _handle_models(self, _http_request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": [{"id": "mock-model", "object": "model"}]})
+
+    async def _handle_stats(self, _http_request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    async def _handle_reset(self, _http_request: web.Request) -> web.Response:
+        self.reset_stats()
+        return web.json_response({"ok": True})
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self._handle_openai)
+        app.router.add_post("/chat/completions", self._handle_openai)
+        app.router.add_post("/v1/messages", self._handle_anthropic)
+        app.router.add_post("/v1beta/models/{target}", self._handle_gemini)
+        app.router.add_post("/v1/models/{target}", self._handle_gemini)
+        app.router.add_get("/v1/models", self._handle_models)
+        app.router.add_get("/_mock/stats", self._handle_stats)
+        app.router.add_post("/_mock/reset", self._handle_reset)
+        return app
+
+    async def start(self) -> str:
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            server = getattr(site, "_server", None)
+            sockets = list(getattr(server, "sockets", None) or [])
+            if sockets:
+                self.port = int(sockets[0].getsockname()[1])
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "MockLLMServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_exc: Any) -> None:
+        await self.stop()
+
+
+def _rule_kwargs(rule: ScriptRule) -> dict[str, Any]:
+    # 内置规则按实例复制，计数互不影响
+    return {
+        "match": rule.match,
+        "content": rule.content,
+        "tool_calls": [dict(item) for item in rule.tool_calls],
+        "scope": rule.scope,
+        "name": rule.name,
+        "times": rule.times,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="拟人插件本地 mock LLM 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), default="fast", help="延迟 / token 速率档位")
+    parser.add_argument("--script", default="", help="脚本规则 JSON 文件")
+    parser.add_argument("--seed", type=int, default=0, help="默认回复与抖动的随机种子")
+    args = parser.parse_args()
+
+    rules = load_script_rules(args.script) if args.script else []
+    server = MockLLMServer(host=args.host, port=args.port, profile=args.profile, rules=rules, seed=args.seed)
+
+    async def _serve() -> None:
+        base_url = await server.start()
+        print(
+            f"mock LLM 已启动：OpenAI {base_url}/v1  Anthropic {base_url}  Gemini {base_url}/v1beta",
+            file=sys.stderr,
+        )
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,7 @@ from urllib.parse import quote_plus, urlparse
 import httpx
 
 from ..agent.tool_registry import AgentTool
+from ..core.http_clients import shared_http_client
 
 
 _HEADERS = {
@@ -253,7 +254,7 @@ def _build_search_engine_tools(
             return json.dumps({"ok": False, "query": "", "results": [], "error": "missing_query"}, ensure_ascii=False)
         resolved_limit = max(1, min(10, int(limit or 5)))
         selected_engines = _select_engines(engines, engine_name=engine, region=region)
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
+        async with shared_http_client(timeout=15.0, follow_redirects=True) as client:
             nested = await asyncio.gather(
                 *[
                     _fetch_search_results(
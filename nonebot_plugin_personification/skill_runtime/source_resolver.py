@@ -20,6 +20,8 @@ import httpx
 import yaml
 import socket
 
+from ..core.http_clients import shared_http_client
+
 
 _SKILL_PAGE_HOSTS = {"clawhub.ai", "skillhub.tencent.com", "skillhub.cn"}
 _MAX_REMOTE_ZIP_BYTES = 50 * 1024 * 1024
@@ -454,7 +456,7 @@ async def _resolve_remote_download_url(url: str) -> str:
     if not any(domain == host or host.endswith(f".{domain}") for domain in _SKILL_PAGE_HOSTS):
         return url
 
-    async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
+    async with shared_http_client(follow_redirects=True, timeout=30.0) as client:
         response = await client.get(url)
         response.raise_for_status()
         html_text = response.text
@@ -483,7 +485,7 @@ async def _resolve_remote_download_url(url: str) -> str:
 
 
 async def _download_zip(url: str, target: Path, logger: Any) -> None:
-    async with httpx.AsyncClient(follow_redirects=False, timeout=60.0) as client:
+    async with shared_http_client(follow_redirects=False, timeout=60.0) as client:
         current_url = url
         for _ in range(_MAX_REMOTE_REDIRECTS):
             if not await _is_safe_remote_url(current_url, logger):
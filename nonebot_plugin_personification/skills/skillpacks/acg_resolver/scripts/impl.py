@@ -9,11 +9,13 @@ import httpx
 
 try:
     from .....agent.tool_registry import AgentTool
+    from .....core.http_clients import shared_http_client
     from .....core.web_grounding import do_web_search
     from ...vision_analyze.scripts.impl import analyze_images
     from ...wiki_search.scripts.impl import wiki_lookup_candidates
 except ImportError:  # pragma: no cover
     from plugin.personification.agent.tool_registry import AgentTool  # type: ignore
+    from plugin.personification.core.http_clients import shared_http_client  # type: ignore
     from plugin.personification.core.web_grounding import do_web_search  # type: ignore
     from plugin.personification.skills.skillpacks.vision_analyze.scripts.impl import analyze_images  # type: ignore
     from plugin.personification.skills.skillpacks.wiki_search.scripts.impl import wiki_lookup_candidates  # type: ignore
@@ -181,7 +183,7 @@ async def resolve_acg_entity(
     if shared_client is not None:
         wiki_payload = await wiki_lookup_candidates(effective_query, http_client=shared_client, logger=runtime.logger)
     else:
-        async with httpx.AsyncClient(follow_redirects=True) as http_client:
+        async with shared_http_client(follow_redirects=True) as http_client:
             wiki_payload = await wiki_lookup_candidates(effective_query, http_client=http_client, logger=runtime.logger)
 
     top_candidates = []
@@ -4,6 +4,7 @@ import httpx
 
 from plugin.personification.agent.tool_registry import AgentTool
 from . import impl
+from plugin.personification.core.http_clients import shared_http_client
 
 
 class _SilentLogger:
@@ -21,7 +22,7 @@ def build_tools(runtime):
     async def _with_client(callback):
         if shared_client is not None:
             return await callback(shared_client)
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as http_client:
+        async with shared_http_client(timeout=15.0, follow_redirects=True) as http_client:
             return await callback(http_client)
 
     async def _game_info_handler(game: str, aspect: str, query: str = "") -> str:
@@ -16,6 +16,7 @@ from plugin.personification.core.gemini_transport import (
     raise_for_gemini_status,
     request_with_gemini_auth,
 )
+from plugin.personification.core.http_clients import shared_http_client
 from plugin.personification.core.image_refs import normalize_image_refs
 from plugin.personification.core.llm_context import use_single_attempt_retry_policy
 from plugin.personification.core.safe_image_download import download_public_image
@@ -435,7 +436,7 @@ async def _generate_image_openai_http(
         client_kwargs: dict[str, Any] = {"timeout": httpx.Timeout(float(timeout or 180.0), connect=15.0)}
         if proxy:
             client_kwargs["proxy"] = proxy
-        async with httpx.AsyncClient(**client_kwargs) as client:
+        async with shared_http_client(**client_kwargs) as client:
             response = await client.post(endpoint, json=payload, headers=headers)
             response.raise_for_status()
             data = response.json()
@@ -501,7 +502,7 @@ async def _generate_image_gemini_http(
         }
         if proxy:
             client_kwargs["proxy"] = proxy
-        async with httpx.AsyncClient(**client_kwargs) as client:
+        async with shared_http_client(**client_kwargs) as client:
             async def _send(auth):  # noqa: ANN001, ANN202
                 return await client.post(
                     endpoint,
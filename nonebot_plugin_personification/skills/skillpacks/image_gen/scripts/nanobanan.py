@@ -6,6 +6,7 @@ from typing import Any
 
 import httpx
 
+from plugin.personification.core.http_clients import shared_http_client
 from plugin.personification.core.image_refs import normalize_image_refs
 
 from .impl import _ok_image, normalize_image_generation_size
@@ -116,7 +117,7 @@ async def generate_image_nanobanan(
     client_kwargs = caller._http_client_kwargs(connect_timeout=15.0)
     client_kwargs["timeout"] = httpx.Timeout(timeout_value, connect=15.0)
     try:
-        async with httpx.AsyncClient(**client_kwargs) as client:
+        async with shared_http_client(**client_kwargs) as client:
             response = await client.post(
                 endpoint,
                 json=envelope,
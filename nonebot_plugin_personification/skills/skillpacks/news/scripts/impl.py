@@ -7,6 +7,7 @@ from typing import Any, Iterable
 import httpx
 
 from plugin.personification.agent.tool_registry import AgentTool
+from plugin.personification.core.http_clients import shared_http_client
 
 
 BASE_URL_DEFAULT = "https://60s.viki.moe"
@@ -76,7 +77,7 @@ EXCHANGE_RATE_DESCRIPTION = """查询货币汇率。
 
 async def _request_json(base_url: str, path: str, *, params: dict[str, Any] | None = None) -> Any:
     endpoint = f"{base_url.rstrip('/')}{path}"
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    async with shared_http_client(timeout=10.0) as client:
         resp = await client.get(endpoint, params=params)
         resp.raise_for_status()
         return resp.json()
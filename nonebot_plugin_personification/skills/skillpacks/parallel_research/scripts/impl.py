@@ -20,6 +20,7 @@ from plugin.personification.agent.runtime.tool_loop import (
     append_assistant_tool_calls_message,
     append_tool_result_messages,
 )
+from plugin.personification.core.http_clients import shared_http_client
 from plugin.personification.core.web_grounding import do_web_search
 from plugin.personification.core.web_fetch import WebFetchError, fetch_web_page
 from plugin.personification.skills.skillpacks.acg_resolver.scripts import impl as acg_impl
@@ -330,7 +331,7 @@ async def _with_http_client(runtime: Any, callback):
     shared_client = getattr(runtime, "http_client", None)
     if shared_client is not None:
         return await callback(shared_client)
-    async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as http_client:
+    async with shared_http_client(timeout=15.0, follow_redirects=True) as http_client:
         return await callback(http_client)
 
 
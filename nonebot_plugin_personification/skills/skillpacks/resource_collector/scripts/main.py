@@ -7,6 +7,7 @@ import re
 import httpx
 
 from plugin.personification.agent.tool_registry import AgentTool
+from plugin.personification.core.http_clients import shared_http_client
 from plugin.personification.skills.skillpacks.vision_analyze.scripts import impl as vision_impl
 
 from . import impl
@@ -145,7 +146,7 @@ def build_tools(runtime):
     async def _with_client(callback):
         if shared_client is not None:
             return await callback(shared_client)
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as http_client:
+        async with shared_http_client(timeout=15.0, follow_redirects=True) as http_client:
             return await callback(http_client)
 
     async def _confirm_handler(raw_query: str = "", context_hint: str = "") -> str:
@@ -341,7 +342,7 @@ def build_send_image_tools(runtime, executor):  # noqa: ANN001
     async def _with_client(callback):
         if shared_client is not None:
             return await callback(shared_client)
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as http_client:
+        async with shared_http_client(timeout=15.0, follow_redirects=True) as http_client:
             return await callback(http_client)
 
     async def _search_and_send_images(
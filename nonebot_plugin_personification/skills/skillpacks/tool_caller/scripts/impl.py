@@ -3,19 +3,19 @@ from __future__ import annotations
 import asyncio
 import base64
 import copy
+import hashlib
 import json
 import mimetypes
 import re
-import time
 import uuid
 from abc import ABC, abstractmethod
-from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 
+from plugin.personification.core.http_clients import clear_http_clients, get_http_client, shared_http_client
 from plugin.personification.core.image_refs import normalize_image_ref
 from plugin.personification.core.gemini_transport import (
     is_google_gemini_endpoint,
@@ -23,9 +23,17 @@ from plugin.personification.core.gemini_transport import (
     request_with_gemini_auth,
 )
 from plugin.personification.core.llm_context import current_llm_context, use_single_attempt_retry_policy
+from plugin.personification.core.llm_stream import (
+    begin_stream_attempt,
+    emit_text_delta,
+    iter_sse_events,
+    streaming_requested,
+)
 from plugin.personification.core.message_parts import extract_text_from_parts, normalize_message_parts
 from plugin.personification.core.media_refs import normalize_audio_ref, normalize_video_ref
+from plugin.personification.core.request_rendering import encode_json_body, render_messages
 from plugin.personification.core.time_ctx import build_current_time_context_block, inject_current_time_context
+from plugin.personification.core.tool_schema_cache import convert_tool_schemas
 
 
 OPENAI_REASONING_MAP = {
@@ -54,62 +62,13 @@ ANTHROPIC_BUILTIN_SEARCH_TOOL = {
     "max_uses": 5,
 }
 
-_HTTP_CLIENT_POOL_MAX_SIZE = 8
-_HTTP_CLIENT_POOL_IDLE_SECONDS = 300.0
-_HTTP_CLIENT_POOL: "OrderedDict[tuple[Any, ...], tuple[httpx.AsyncClient, float]]" = OrderedDict()
-_HTTP_CLIENT_POOL_LOCK = asyncio.Lock()
-
-
-async def _get_pooled_http_client(
-    key: tuple[Any, ...],
-    **client_kwargs: Any,
-) -> httpx.AsyncClient:
-    now = time.monotonic()
-    stale_clients: list[httpx.AsyncClient] = []
-    result_client: httpx.AsyncClient | None = None
-    async with _HTTP_CLIENT_POOL_LOCK:
-        for existing_key, (existing, last_used) in list(_HTTP_CLIENT_POOL.items()):
-            if getattr(existing, "is_closed", False) or (now - last_used) > _HTTP_CLIENT_POOL_IDLE_SECONDS:
-                _HTTP_CLIENT_POOL.pop(existing_key, None)
-                stale_clients.append(existing)
-
-        cached = _HTTP_CLIENT_POOL.get(key)
-        if cached is not None:
-            hit, _ = cached
-            if not getattr(hit, "is_closed", False):
-                _HTTP_CLIENT_POOL.move_to_end(key)
-                _HTTP_CLIENT_POOL[key] = (hit, now)
-                result_client = hit
-            else:
-                _HTTP_CLIENT_POOL.pop(key, None)
-                stale_clients.append(hit)
-
-        if result_client is None:
-            result_client = httpx.AsyncClient(**client_kwargs)
-            _HTTP_CLIENT_POOL[key] = (result_client, now)
-            while len(_HTTP_CLIENT_POOL) > _HTTP_CLIENT_POOL_MAX_SIZE:
-                _, (evicted, _) = _HTTP_CLIENT_POOL.popitem(last=False)
-                stale_clients.append(evicted)
-
-    for stale_item in stale_clients:
-        if not getattr(stale_item, "is_closed", False):
-            try:
-                await stale_item.aclose()
-            except Exception:
-                pass
-    return result_client
-
-
-def _http_client_pool_key(*parts: Any, timeout: Any = "", connect_timeout: Any = "", proxy: str = "") -> tuple[Any, ...]:
-    return tuple(str(part or "") for part in parts) + (
-        f"timeout={timeout}",
-        f"connect={connect_timeout}",
-        f"proxy={proxy or ''}",
-    )
+async def _get_pooled_http_client(**client_kwargs: Any) -> httpx.AsyncClient:
+    """模型调用复用进程级共享客户端；鉴权走请求头，不同账号可共用同一组长连接。"""
+    return get_http_client(**client_kwargs)
 
 
 def _clear_http_client_pool() -> None:
-    _HTTP_CLIENT_POOL.clear()
+    clear_http_clients()
 
 
 @dataclass
@@ -347,6 +306,42 @@ def _extract_system_message(messages: List[dict]) -> Tuple[str, List[dict]]:
     return "\n\n".join(part for part in system_parts if part), rest
 
 
+def _system_message_texts(messages: List[dict]) -> List[str]:
+    texts: List[str] = []
+    for message in messages:
+        if message.get("role") != "system":
+            continue
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "".join(
+                str(item.get("text", "")) if isinstance(item, dict) and item.get("type") == "text" else str(item)
+                for item in content
+            )
+        if str(content):
+            texts.append(str(content))
+    return texts
+
+
+def _stable_prefix_cache_key(messages: List[dict]) -> str:
+    """按首条 system 消息（人设/规则等静态块）算前缀缓存分桶键；没有 system 时返回空串。"""
+    texts = _system_message_texts(messages)
+    if not texts:
+        return ""
+    return "personification-" + hashlib.sha256(texts[0].encode("utf-8")).hexdigest()[:24]
+
+
+def _anthropic_system_blocks(messages: List[dict]) -> List[dict]:
+    """每条 system 消息一个 text 块；首块是静态前缀，打上 cache_control 断点。
+
+    Anthropic 按 tools → system → messages 的顺序缓存，断点之前的内容逐字节不变才能命中；
+    低于模型最小缓存长度时服务端直接忽略断点。
+    """
+    blocks: List[dict] = [{"type": "text", "text": text} for text in _system_message_texts(messages)]
+    if blocks:
+        blocks[0]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
 def _messages_contain_images(messages: List[dict]) -> bool:
     for message in messages:
         if str(message.get("role", "") or "").strip() not in {"user", "assistant"}:
@@ -693,14 +688,7 @@ def _convert_openai_tool_to_gemini(tool: dict) -> dict | None:
 
 
 def _convert_openai_tools_to_gemini(tools: List[dict]) -> List[dict]:
-    converted: List[dict] = []
-    for tool in list(tools or []):
-        if not isinstance(tool, dict):
-            continue
-        declaration = _convert_openai_tool_to_gemini(tool)
-        if declaration is not None:
-            converted.append(declaration)
-    return converted
+    return convert_tool_schemas("gemini", tools, _convert_openai_tool_to_gemini)
 
 
 def _attach_wire_tools_count(exc: BaseException, count: int) -> None:
@@ -847,22 +835,23 @@ def _gemini_parts_from_content(content: Any) -> List[dict]:
     return [{"text": str(content)}]
 
 
+def _gemini_contents_from_message(message: dict) -> List[dict]:
+    native_content = message.get(_PROVIDER_HISTORY_KEY) if message.get("role") == "assistant" else None
+    if isinstance(native_content, dict):
+        return [copy.deepcopy(native_content)]
+    parts = _gemini_parts_from_content(message.get("parts", message.get("content", "")))
+    parts.extend(_gemini_tool_call_parts(message.get("tool_calls", [])))
+    return [
+        {
+            "role": "model" if message.get("role") == "assistant" else "user",
+            "parts": parts,
+        }
+    ]
+
+
 def _convert_messages_to_gemini(messages: List[dict]) -> Tuple[Optional[str], List[dict]]:
     system_instruction, rest_messages = _extract_system_message(messages)
-    contents: List[dict] = []
-    for message in rest_messages:
-        native_content = message.get(_PROVIDER_HISTORY_KEY) if message.get("role") == "assistant" else None
-        if isinstance(native_content, dict):
-            contents.append(copy.deepcopy(native_content))
-            continue
-        parts = _gemini_parts_from_content(message.get("parts", message.get("content", "")))
-        parts.extend(_gemini_tool_call_parts(message.get("tool_calls", [])))
-        contents.append(
-            {
-                "role": "model" if message.get("role") == "assistant" else "user",
-                "parts": parts,
-            }
-        )
+    contents = render_messages("gemini", rest_messages, _gemini_contents_from_message)
     return system_instruction or None, contents
 
 
@@ -1013,53 +1002,56 @@ def _openai_responses_input_item_from_content(role: str, content: Any) -> dict |
     return {"role": role, "content": converted_parts}
 
 
+def _openai_responses_items_from_message(message: dict) -> List[dict]:
+    native_items = message.get(_PROVIDER_HISTORY_KEY) if message.get("role") == "assistant" else None
+    if isinstance(native_items, list):
+        return copy.deepcopy(native_items)
+    input_items: List[dict] = []
+    role = str(message.get("role", "user") or "user")
+    content = message.get("parts", message.get("content", ""))
+    if role in {"user", "assistant"}:
+        item = _openai_responses_input_item_from_content(role, content)
+        if item is not None:
+            input_items.append(item)
+        if role == "assistant":
+            raw_tool_calls = message.get("tool_calls", [])
+            if isinstance(raw_tool_calls, list):
+                for raw_tool_call in raw_tool_calls:
+                    if not isinstance(raw_tool_call, dict):
+                        continue
+                    function_part = raw_tool_call.get("function", {})
+                    if not isinstance(function_part, dict):
+                        function_part = {}
+                    call_id = str(raw_tool_call.get("id") or raw_tool_call.get("call_id") or "").strip()
+                    name = str(function_part.get("name", "")).strip()
+                    arguments = function_part.get("arguments", "{}")
+                    if isinstance(arguments, dict):
+                        arguments = json.dumps(arguments, ensure_ascii=False)
+                    else:
+                        arguments = str(arguments or "{}")
+                    if call_id and name:
+                        input_items.append(
+                            {
+                                "type": "function_call",
+                                "call_id": call_id,
+                                "name": name,
+                                "arguments": arguments,
+                            }
+                        )
+    elif role == "tool":
+        input_items.append(
+            {
+                "type": "function_call_output",
+                "call_id": str(message.get("tool_call_id", "")),
+                "output": str(message.get("content", "")),
+            }
+        )
+    return input_items
+
+
 def _openai_responses_input(messages: List[dict]) -> tuple[str | None, List[dict]]:
     system_instruction, rest_messages = _extract_system_message(messages)
-    input_items: List[dict] = []
-    for message in rest_messages:
-        native_items = message.get(_PROVIDER_HISTORY_KEY) if message.get("role") == "assistant" else None
-        if isinstance(native_items, list):
-            input_items.extend(copy.deepcopy(native_items))
-            continue
-        role = str(message.get("role", "user") or "user")
-        content = message.get("parts", message.get("content", ""))
-        if role in {"user", "assistant"}:
-            item = _openai_responses_input_item_from_content(role, content)
-            if item is not None:
-                input_items.append(item)
-            if role == "assistant":
-                raw_tool_calls = message.get("tool_calls", [])
-                if isinstance(raw_tool_calls, list):
-                    for raw_tool_call in raw_tool_calls:
-                        if not isinstance(raw_tool_call, dict):
-                            continue
-                        function_part = raw_tool_call.get("function", {})
-                        if not isinstance(function_part, dict):
-                            function_part = {}
-                        call_id = str(raw_tool_call.get("id") or raw_tool_call.get("call_id") or "").strip()
-                        name = str(function_part.get("name", "")).strip()
-                        arguments = function_part.get("arguments", "{}")
-                        if isinstance(arguments, dict):
-                            arguments = json.dumps(arguments, ensure_ascii=False)
-                        else:
-                            arguments = str(arguments or "{}")
-                        if call_id and name:
-                            input_items.append(
-                                {
-                                    "type": "function_call",
-                                    "call_id": call_id,
-                                    "name": name,
-                                    "arguments": arguments,
-                                }
-                            )
-        elif role == "tool":
-            input_items.append(
-                {
-                    "type": "function_call_output",
-                    "call_id": str(message.get("tool_call_id", "")),
-                    "output": str(message.get("content", "")),
-                }
-            )
+    input_items = render_messages("openai_responses", rest_messages, _openai_responses_items_from_message)
     return system_instruction or None, input_items
 
 
@@ -1121,6 +1113,10 @@ _USAGE_PROMPT_KEYS = ("prompt_tokens", "input_tokens", "promptTokenCount", "prom
 _USAGE_COMPLETION_KEYS = ("completion_tokens", "output_tokens", "candidatesTokenCount", "completionTokens", "outputTokens")
 _USAGE_TOTAL_KEYS = ("total_tokens", "totalTokenCount", "totalTokens")
 _USAGE_CONTAINER_KEYS = ("usage", "usageMetadata", "usage_metadata")
+# 前缀缓存命中：OpenAI 放在 *_tokens_details 子对象里，Anthropic/Gemini 直接平铺
+_USAGE_CACHED_DETAIL_KEYS = ("prompt_tokens_details", "input_tokens_details")
+_USAGE_CACHE_READ_KEYS = ("cache_read_input_tokens", "cachedContentTokenCount")
+_USAGE_CACHE_WRITE_KEYS = ("cache_creation_input_tokens",)
 
 
 def _read_usage_value(source: Any, keys: tuple[str, ...]) -> int:
@@ -1154,6 +1150,9 @@ def _extract_usage(response: Any) -> dict:
     兼容三种容器键：response.usage / response.usageMetadata / response.usage_metadata
     （chat.completions、Responses、generateContent 三套 API 各用一种）
 
+    命中前缀缓存时额外返回 cached_tokens（prompt_tokens 中按缓存计费的部分）。
+    Anthropic 的 input_tokens 不含缓存读写，这里并回 prompt_tokens，口径与另外两家一致。
+
     response 可以是 dict、Pydantic 对象、嵌套结构。无法定位时返回 {}。
     """
     try:
@@ -1172,14 +1171,25 @@ def _extract_usage(response: Any) -> dict:
             return {}
         prompt = _read_usage_value(usage_obj, _USAGE_PROMPT_KEYS)
         completion = _read_usage_value(usage_obj, _USAGE_COMPLETION_KEYS)
+        cache_read = _read_usage_value(usage_obj, ("cache_read_input_tokens",))
+        cache_write = _read_usage_value(usage_obj, _USAGE_CACHE_WRITE_KEYS)
+        prompt += cache_read + cache_write
         total = _read_usage_value(usage_obj, _USAGE_TOTAL_KEYS) or (prompt + completion)
         if prompt == 0 and completion == 0 and total == 0:
             return {}
-        return {
+        result = {
             "prompt_tokens": prompt,
             "completion_tokens": completion,
             "total_tokens": total,
         }
+        cached = _read_usage_value(usage_obj, _USAGE_CACHE_READ_KEYS)
+        for detail_key in _USAGE_CACHED_DETAIL_KEYS:
+            detail = usage_obj.get(detail_key) if isinstance(usage_obj, dict) else getattr(usage_obj, detail_key, None)
+            if detail is not None:
+                cached = cached or _read_usage_value(detail, ("cached_tokens",))
+        if cached > 0:
+            result["cached_tokens"] = min(cached, prompt) if prompt else cached
+        return result
     except Exception:
         return {}
 
@@ -1211,22 +1221,23 @@ def _anthropic_tool_use_blocks(tool_calls: Any) -> List[dict]:
     return blocks
 
 
+def _anthropic_messages_from_message(message: dict) -> List[dict]:
+    native_content = message.get(_PROVIDER_HISTORY_KEY) if message.get("role") == "assistant" else None
+    if isinstance(native_content, list):
+        return [{"role": "assistant", "content": copy.deepcopy(native_content)}]
+    content_blocks = _anthropic_content_blocks(message.get("content", ""))
+    content_blocks.extend(_anthropic_tool_use_blocks(message.get("tool_calls", [])))
+    return [
+        {
+            "role": "assistant" if message.get("role") == "assistant" else "user",
+            "content": content_blocks,
+        }
+    ]
+
+
 def _convert_messages_to_anthropic(messages: List[dict]) -> Tuple[str, List[dict]]:
     system_instruction, rest_messages = _extract_system_message(messages)
-    converted: List[dict] = []
-    for message in rest_messages:
-        native_content = message.get(_PROVIDER_HISTORY_KEY) if message.get("role") == "assistant" else None
-        if isinstance(native_content, list):
-            converted.append({"role": "assistant", "content": copy.deepcopy(native_content)})
-            continue
-        content_blocks = _anthropic_content_blocks(message.get("content", ""))
-        content_blocks.extend(_anthropic_tool_use_blocks(message.get("tool_calls", [])))
-        converted.append(
-            {
-                "role": "assistant" if message.get("role") == "assistant" else "user",
-                "content": content_blocks,
-            }
-        )
+    converted = render_messages("anthropic", rest_messages, _anthropic_messages_from_message)
     return system_instruction, converted
 
 
@@ -1238,6 +1249,151 @@ def _anthropic_used_builtin_search(content_blocks: List[Any]) -> bool:
     return False
 
 
+async def _collect_openai_chat_stream(stream: Any) -> dict[str, Any]:
+    """消费 chat.completions 流：文本增量实时转发，tool_calls 按 index 拼接 id/name/arguments。"""
+    begin_stream_attempt()
+    text_parts: List[str] = []
+    calls: Dict[int, dict[str, str]] = {}
+    usage: Any = None
+    annotations: List[Any] = []
+    async for chunk in stream:
+        chunk_usage = _obj_get(chunk, "usage")
+        if chunk_usage:
+            usage = chunk_usage
+        choices = list(_obj_get(chunk, "choices", []) or [])
+        if not choices:
+            continue
+        delta = _obj_get(choices[0], "delta") or {}
+        text = _obj_get(delta, "content")
+        if text:
+            text_parts.append(str(text))
+            emit_text_delta(text)
+        annotations.extend(list(_obj_get(delta, "annotations", []) or []))
+        for position, raw_call in enumerate(list(_obj_get(delta, "tool_calls", []) or [])):
+            call_id = str(_obj_get(raw_call, "id", "") or "")
+            index = _obj_get(raw_call, "index")
+            if not isinstance(index, int):
+                # 少数兼容层不带 index：按 id 归并，缺 id 时续写最后一个
+                known = [key for key, value in calls.items() if call_id and value["id"] == call_id]
+                if known:
+                    index = known[0]
+                elif call_id or not calls:
+                    index = len(calls) + position
+                else:
+                    index = max(calls)
+            entry = calls.setdefault(index, {"id": "", "name": "", "arguments": ""})
+            if call_id and not entry["id"]:
+                entry["id"] = call_id
+            function_part = _obj_get(raw_call, "function") or {}
+            name = str(_obj_get(function_part, "name", "") or "")
+            if name and not entry["name"]:
+                entry["name"] = name
+            entry["arguments"] += str(_obj_get(function_part, "arguments", "") or "")
+    tool_calls = [
+        ToolCall(
+            id=entry["id"] or f"call-{index}",
+            name=entry["name"],
+            arguments=_parse_tool_arguments(entry["arguments"] or "{}"),
+        )
+        for index, entry in sorted(calls.items())
+        if entry["name"]
+    ]
+    return {
+        "content": "".join(text_parts).strip(),
+        "tool_calls": tool_calls,
+        "usage": _extract_usage({"usage": usage}) if usage is not None else {},
+        "used_builtin_search": bool(annotations),
+    }
+
+
+async def _collect_anthropic_stream(stream: Any) -> dict[str, Any]:
+    """消费 messages 流事件，按 content block index 还原出与非流式一致的 content 列表。"""
+    begin_stream_attempt()
+    blocks: Dict[int, dict[str, Any]] = {}
+    partial_json: Dict[int, List[str]] = {}
+    usage: dict[str, Any] = {}
+    async for event in stream:
+        event_type = str(_obj_get(event, "type", "") or "")
+        if event_type == "message_start":
+            usage.update(_response_to_dict(_obj_get(_obj_get(event, "message"), "usage")) or {})
+        elif event_type == "content_block_start":
+            index = int(_obj_get(event, "index", len(blocks)) or 0)
+            block = _obj_get(event, "content_block")
+            blocks[index] = dict(_response_to_dict(block))
+        elif event_type == "content_block_delta":
+            index = int(_obj_get(event, "index", 0) or 0)
+            block = blocks.setdefault(index, {"type": "text", "text": ""})
+            delta = _obj_get(event, "delta") or {}
+            delta_type = str(_obj_get(delta, "type", "") or "")
+            if delta_type == "text_delta":
+                text = str(_obj_get(delta, "text", "") or "")
+                block["text"] = str(block.get("text") or "") + text
+                emit_text_delta(text)
+            elif delta_type == "input_json_delta":
+                partial_json.setdefault(index, []).append(str(_obj_get(delta, "partial_json", "") or ""))
+            elif delta_type == "thinking_delta":
+                block["thinking"] = str(block.get("thinking") or "") + str(_obj_get(delta, "thinking", "") or "")
+            elif delta_type == "signature_delta":
+                block["signature"] = str(_obj_get(delta, "signature", "") or "")
+        elif event_type == "message_delta":
+            usage.update(
+                {
+                    key: value
+                    for key, value in (_response_to_dict(_obj_get(event, "usage")) or {}).items()
+                    if value is not None
+                }
+            )
+    for index, chunks in partial_json.items():
+        raw = "".join(chunks).strip()
+        if raw and index in blocks:
+            blocks[index]["input"] = _parse_tool_arguments(raw)
+    content = [block for _, block in sorted(blocks.items())]
+    text_parts: List[str] = []
+    tool_calls: List[ToolCall] = []
+    for block in content:
+        if block.get("type") == "text":
+            text_parts.append(str(block.get("text") or ""))
+        elif block.get("type") == "tool_use":
+            tool_calls.append(
+                ToolCall(
+                    id=str(block.get("id") or ""),
+                    name=str(block.get("name") or ""),
+                    arguments=_parse_tool_arguments(block.get("input") or {}),
+                )
+            )
+    return {
+        "content": content,
+        "text": "".join(text_parts).strip(),
+        "tool_calls": tool_calls,
+        "usage": _extract_usage({"usage": usage}),
+    }
+
+
+async def _collect_gemini_stream(response: httpx.Response) -> dict[str, Any]:
+    """消费 streamGenerateContent?alt=sse；非 thought 文本实时转发，functionCall 随 parts 原样合并。"""
+    begin_stream_attempt()
+    events: list[dict[str, Any]] = []
+    try:
+        async for _event, data in iter_sse_events(response.aiter_lines()):
+            if not data or data == "[DONE]":
+                continue
+            try:
+                parsed = json.loads(data)
+            except Exception:
+                continue
+            if not isinstance(parsed, dict):
+                continue
+            events.append(parsed)
+            for candidate in list(parsed.get("candidates") or [])[:1]:
+                content = candidate.get("content") if isinstance(candidate, dict) else None
+                for part in list((content or {}).get("parts") or []):
+                    if isinstance(part, dict) and part.get("text") and not part.get("thought"):
+                        emit_text_delta(part["text"])
+    finally:
+        await response.aclose()
+    return _merge_gemini_stream_events(events)
+
+
 class OpenAIToolCaller(ToolCaller):
     def __init__(
         self,
@@ -1279,17 +1435,7 @@ class OpenAIToolCaller(ToolCaller):
             }
             if self.proxy:
                 http_kwargs["proxy"] = self.proxy
-            http_client = await _get_pooled_http_client(
-                _http_client_pool_key(
-                    "openai",
-                    self.base_url,
-                    self.api_key[:12],
-                    timeout=self.timeout,
-                    connect_timeout=connect_timeout,
-                    proxy=self.proxy,
-                ),
-                **http_kwargs,
-            )
+            http_client = await _get_pooled_http_client(**http_kwargs)
             client_kwargs: Dict[str, Any] = {
                 "api_key": self.api_key,
                 "base_url": self.base_url,
@@ -1393,6 +1539,8 @@ class OpenAIToolCaller(ToolCaller):
                         _m = {**_m, "content": ""}
                     normalized_messages.append(_m)
 
+                prompt_cache_key = _stable_prefix_cache_key(normalized_messages)
+
                 def _build_chat_payload(*, use_native_search: bool, use_original_tools: bool) -> Dict[str, Any]:
                     payload = {
                         "model": self.model,
@@ -1407,6 +1555,15 @@ class OpenAIToolCaller(ToolCaller):
                     reasoning = _maybe_openai_reasoning(self.model, self.thinking_mode)
                     if reasoning and self._supports_reasoning is not False:
                         payload["reasoning"] = reasoning
+                    # 官方端点自动做前缀缓存，prompt_cache_key 把同一静态前缀的请求路由到同一缓存分片；
+                    # 兼容层未必认这个字段，只对官方端点发送
+                    if "api.openai.com" in self.base_url and prompt_cache_key:
+                        payload["extra_body"] = {"prompt_cache_key": prompt_cache_key}
+                    if streaming_requested():
+                        payload["stream"] = True
+                        # 兼容层对 stream_options 支持参差，只对官方端点请求流末 usage
+                        if "api.openai.com" in self.base_url:
+                            payload["stream_options"] = {"include_usage": True}
                     return payload
 
                 payload = _build_chat_payload(
@@ -1437,6 +1594,18 @@ class OpenAIToolCaller(ToolCaller):
                     else:
                         raise
 
+            if payload.get("stream"):
+                streamed = await _collect_openai_chat_stream(response)
+                return ToolCallerResponse(
+                    finish_reason="tool_calls" if streamed["tool_calls"] else "stop",
+                    content=streamed["content"],
+                    tool_calls=streamed["tool_calls"],
+                    raw={"stream": True},
+                    used_builtin_search=streamed["used_builtin_search"],
+                    usage=streamed["usage"],
+                    model_used=str(self.model or ""),
+                    wire_tools_count=wire_tools_count,
+                )
             message = response.choices[0].message
             raw_tool_calls = list(_obj_get(message, "tool_calls", []) or [])
             tool_calls = [
@@ -1534,19 +1703,36 @@ class GeminiToolCaller(ToolCaller):
                 }
             }
 
-        url = f"{self.base_url.rstrip('/')}/models/{self.model}:generateContent"
+        stream = streaming_requested()
+        method = "streamGenerateContent" if stream else "generateContent"
+        url = f"{self.base_url.rstrip('/')}/models/{self.model}:{method}"
+        body = encode_json_body(payload)
         try:
-            async with httpx.AsyncClient(
+            async with shared_http_client(
                 timeout=httpx.Timeout(self.timeout, connect=min(15.0, self.timeout)),
                 follow_redirects=False,
             ) as client:
                 async def _send(auth):  # noqa: ANN001, ANN202
-                    return await client.post(
+                    if not stream:
+                        return await client.post(
+                            url,
+                            headers={"Content-Type": "application/json", **auth.headers},
+                            params=auth.params,
+                            content=body,
+                        )
+                    request = client.build_request(
+                        "POST",
                         url,
                         headers={"Content-Type": "application/json", **auth.headers},
-                        params=auth.params,
-                        json=payload,
+                        params={**dict(auth.params or {}), "alt": "sse"},
+                        content=body,
                     )
+                    streamed = await client.send(request, stream=True)
+                    if streamed.status_code >= 300:
+                        # 错误响应体很小，读完即关，鉴权协商重试与状态码判定都按普通响应处理
+                        await streamed.aread()
+                        await streamed.aclose()
+                    return streamed
 
                 auth_result = await request_with_gemini_auth(
                     endpoint=self.base_url,
@@ -1561,7 +1747,10 @@ class GeminiToolCaller(ToolCaller):
                     auth_mode=auth_result.mode,
                     request_count=auth_result.request_count,
                 )
-                data = response.json()
+                if stream:
+                    data = await _collect_gemini_stream(response)
+                else:
+                    data = response.json()
         except Exception as exc:
             _attach_wire_tools_count(exc, len(declarations))
             raise
@@ -1703,13 +1892,29 @@ class AnthropicToolCaller(ToolCaller):
                 "max_tokens": 1024,
             }
             if system_instruction:
-                payload["system"] = system_instruction
+                payload["system"] = _anthropic_system_blocks(messages)
             if tool_payload:
+                tool_payload[-1] = {**tool_payload[-1], "cache_control": {"type": "ephemeral"}}
                 payload["tools"] = tool_payload
             thinking = _maybe_anthropic_thinking(self.thinking_mode)
             if thinking:
                 payload["thinking"] = thinking
 
+            if streaming_requested():
+                payload["stream"] = True
+                streamed = await _collect_anthropic_stream(await client.messages.create(**payload))
+                return ToolCallerResponse(
+                    finish_reason="tool_calls" if streamed["tool_calls"] else "stop",
+                    content=streamed["text"],
+                    tool_calls=streamed["tool_calls"],
+                    raw={"stream": True, "content": streamed["content"]},
+                    used_builtin_search=_anthropic_used_builtin_search(streamed["content"]),
+                    usage=streamed["usage"],
+                    model_used=str(self.model or ""),
+                    wire_tools_count=wire_tools_count,
+                    provider_history=copy.deepcopy(streamed["content"]) if streamed["tool_calls"] else None,
+                )
+
             response = await client.messages.create(**payload)
 
             content_blocks = list(_obj_get(response, "content", []) or [])
@@ -1903,7 +2108,7 @@ async def _refresh_codex_token(auth: dict, auth_path: _Path) -> dict:
         return auth
 
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        async with shared_http_client(timeout=15.0) as client:
             resp = await client.post(
                 "https://auth.openai.com/oauth/token",
                 json={
@@ -2276,17 +2481,7 @@ class OpenAICodexToolCaller(ToolCaller):
                 }
                 if self.proxy:
                     client_kwargs["proxy"] = self.proxy
-                client = await _get_pooled_http_client(
-                    _http_client_pool_key(
-                        "codex",
-                        _CODEX_API_ENDPOINT,
-                        access_token[:16],
-                        timeout=self.timeout,
-                        connect_timeout=connect_timeout,
-                        proxy=self.proxy,
-                    ),
-                    **client_kwargs,
-                )
+                client = await _get_pooled_http_client(**client_kwargs)
                 async with client.stream(
                     "POST",
                     _CODEX_API_ENDPOINT,
@@ -2608,7 +2803,7 @@ class OpenAICodexToolCaller(ToolCaller):
             "Authorization": f"Bearer {access_token}",
             "Accept": "image/*,*/*",
         }
-        async with httpx.AsyncClient(timeout=httpx.Timeout(self.timeout, connect=15.0)) as client:
+        async with shared_http_client(timeout=httpx.Timeout(self.timeout, connect=15.0)) as client:
             response = await client.get(url, headers=headers)
             response.raise_for_status()
         payload = bytes(response.content or b"")
@@ -3101,7 +3296,7 @@ async def _refresh_oauth_token(
         client_kwargs["proxy"] = proxy
     if trust_env is not None:
         client_kwargs["trust_env"] = trust_env
-    async with httpx.AsyncClient(**client_kwargs) as client:
+    async with shared_http_client(**client_kwargs) as client:
         resp = await client.post(
             _GEMINI_OAUTH_TOKEN_URL,
             data={
@@ -3694,18 +3889,7 @@ class GeminiCliToolCaller(ToolCaller):
 
     async def _load_code_assist_project(self, access_token: str) -> str:
         client_kwargs = self._http_client_kwargs(connect_timeout=15.0)
-        client = await _get_pooled_http_client(
-            _http_client_pool_key(
-                self._auth_label,
-                "loadCodeAssist",
-                self._load_code_assist_endpoint(),
-                access_token[:16],
-                timeout=self.timeout,
-                connect_timeout=15.0,
-                proxy=self.proxy,
-            ),
-            **client_kwargs,
-        )
+        client = await _get_pooled_http_client(**client_kwargs)
         resp = await client.post(
             self._load_code_assist_endpoint(),
             json={"metadata": self._load_code_assist_metadata()},
@@ -3823,18 +4007,7 @@ class GeminiCliToolCaller(ToolCaller):
             auth_refreshed_for_401 = False
             selected_model_name = ""
             client_kwargs = self._http_client_kwargs(connect_timeout=15.0)
-            client = await _get_pooled_http_client(
-                _http_client_pool_key(
-                    self._auth_label,
-                    "generateContent",
-                    _GEMINI_CLI_GENERATE_ENDPOINT,
-                    access_token[:16],
-                    timeout=self.timeout,
-                    connect_timeout=15.0,
-                    proxy=self.proxy,
-                ),
-                **client_kwargs,
-            )
+            client = await _get_pooled_http_client(**client_kwargs)
             if True:
 
                 async def _post_once(_model_name: str, _access_token: str, _project: str):
@@ -3845,7 +4018,7 @@ class GeminiCliToolCaller(ToolCaller):
                     }
                     resp = await client.post(
                         _GEMINI_CLI_GENERATE_ENDPOINT,
-                        json=envelope_inner,
+                        content=encode_json_body(envelope_inner),
                         headers=self._headers(_access_token),
                     )
                     resp.raise_for_status()
@@ -4132,7 +4305,11 @@ def _parse_antigravity_sse_response(text: str) -> dict[str, Any]:
         except Exception:
             fallback = {}
         return fallback if isinstance(fallback, dict) else {}
+    return {"response": _merge_gemini_stream_events(events), "stream": events}
 
+
+def _merge_gemini_stream_events(events: list[dict[str, Any]]) -> dict[str, Any]:
+    """把 streamGenerateContent 的逐块事件合并成一个 generateContent 响应体。"""
     parts: list[dict[str, Any]] = []
     finish_reason = ""
     grounding: Any = None
@@ -4180,7 +4357,7 @@ def _parse_antigravity_sse_response(text: str) -> dict[str, Any]:
     merged: dict[str, Any] = {"candidates": [candidate]}
     if usage:
         merged["usageMetadata"] = usage
-    return {"response": merged, "stream": events}
+    return merged
 
 
 def _antigravity_is_transient_network_error(exc: Exception) -> bool:
@@ -4416,18 +4593,7 @@ class AntigravityCliToolCaller(GeminiCliToolCaller):
             project_refreshed_for_403 = False
             selected_model_name = ""
             client_kwargs = self._http_client_kwargs(connect_timeout=15.0)
-            client = await _get_pooled_http_client(
-                _http_client_pool_key(
-                    self._auth_label,
-                    "streamGenerateContent",
-                    _ANTIGRAVITY_CLI_STREAM_ENDPOINT,
-                    access_token[:16],
-                    timeout=self.timeout,
-                    connect_timeout=15.0,
-                    proxy=self.proxy,
-                ),
-                **client_kwargs,
-            )
+            client = await _get_pooled_http_client(**client_kwargs)
             if True:
 
                 async def _post_once(_model_name: str, _access_token: str, _project: str):
@@ -4445,7 +4611,7 @@ class AntigravityCliToolCaller(GeminiCliToolCaller):
                         try:
                             resp = await client.post(
                                 _ANTIGRAVITY_CLI_STREAM_ENDPOINT,
-                                json=envelope_inner,
+                                content=encode_json_body(envelope_inner),
                                 headers=self._headers(_access_token),
                             )
                             resp.raise_for_status()
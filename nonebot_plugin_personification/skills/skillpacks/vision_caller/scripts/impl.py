@@ -8,6 +8,7 @@ from typing import Any, Awaitable, Callable, Dict, List, Optional
 import httpx
 
 from plugin.personification.core.gemini_transport import raise_for_gemini_status, request_with_gemini_auth
+from plugin.personification.core.http_clients import shared_http_client
 from plugin.personification.core.image_refs import normalize_image_ref
 from plugin.personification.core.llm_context import use_single_attempt_retry_policy
 from plugin.personification.core.time_ctx import build_current_time_context_block
@@ -22,8 +23,8 @@ def _tool_impl() -> Any:
     return impl
 
 
-def _convert_openai_tool_to_gemini(tool: Any) -> Any:
-    return _tool_impl()._convert_openai_tool_to_gemini(tool)
+def _convert_openai_tools_to_gemini(tools: Any) -> Any:
+    return _tool_impl()._convert_openai_tools_to_gemini(tools)
 
 
 def _extract_gemini_text(data: Any) -> str:
@@ -108,7 +109,7 @@ class OpenAIVisionCaller(VisionCaller):
         if not normalized_image_url:
             raise ValueError(f"invalid_image_ref:{problem or 'unknown'}")
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(self.timeout, connect=10.0)) as http_client:
+        async with shared_http_client(timeout=httpx.Timeout(self.timeout, connect=10.0)) as http_client:
             client = AsyncOpenAI(
                 api_key=self.api_key,
                 base_url=self.base_url,
@@ -154,7 +155,7 @@ class OpenAIVisionCaller(VisionCaller):
         ]
         latest_text = ""
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(self.timeout, connect=10.0)) as http_client:
+        async with shared_http_client(timeout=httpx.Timeout(self.timeout, connect=10.0)) as http_client:
             client = AsyncOpenAI(
                 api_key=self.api_key,
                 base_url=self.base_url,
@@ -285,7 +286,7 @@ class GeminiVisionCaller(VisionCaller):
 
     async def _generate_content(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         url = self._request_url()
-        async with httpx.AsyncClient(
+        async with shared_http_client(
             timeout=httpx.Timeout(self.timeout, connect=10.0),
             follow_redirects=False,
         ) as client:
@@ -341,10 +342,7 @@ class GeminiVisionCaller(VisionCaller):
         if tools:
             tool_payload.append(
                 {
-                    "functionDeclarations": [
-                        _convert_openai_tool_to_gemini(tool)
-                        for tool in tools
-                    ]
+                    "functionDeclarations": _convert_openai_tools_to_gemini(tools)
                 }
             )
         contents: List[dict] = [
@@ -9,6 +9,7 @@ from urllib.parse import quote
 import httpx
 
 from plugin.personification.agent.tool_registry import AgentTool
+from plugin.personification.core.http_clients import shared_http_client
 
 
 WEATHER_DESCRIPTION = """查询指定城市的天气信息，支持当前天气和未来 1-16 天预报。
@@ -140,7 +141,7 @@ async def fetch_weather(city: str, days: Any = 1) -> str:
 
 async def _fetch_weather_wttr(city: str) -> str:
     url = f"https://wttr.in/{quote(city)}?format=3&lang=zh"
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    async with shared_http_client(timeout=10.0) as client:
         response = await client.get(url)
         response.raise_for_status()
         return response.text.strip()
@@ -177,7 +178,7 @@ async def _geocode_city(client: httpx.AsyncClient, city: str) -> dict[str, Any]:
 
 
 async def _fetch_weather_open_meteo(city: str) -> str:
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    async with shared_http_client(timeout=10.0) as client:
         first = await _geocode_city(client, city)
         lat = first.get("latitude")
         lon = first.get("longitude")
@@ -260,7 +261,7 @@ def _is_heavy_weather(code: int, precipitation: Any, probability: Any) -> bool:
 
 
 async def _fetch_weather_open_meteo_forecast(city: str, days: int) -> str:
-    async with httpx.AsyncClient(timeout=12.0) as client:
+    async with shared_http_client(timeout=12.0) as client:
         first = await _geocode_city(client, city)
         lat = first.get("latitude") if first.get("latitude") is not None else first.get("lat")
         lon = first.get("longitude") if first.get("longitude") is not None else first.get("lon")
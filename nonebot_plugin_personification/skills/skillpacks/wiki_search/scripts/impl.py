@@ -9,6 +9,8 @@ from typing import Any
 
 import httpx
 
+from plugin.personification.core.http_clients import shared_http_client
+
 
 _WIKIPEDIA_API = "https://zh.wikipedia.org/w/api.php"
 _MOEGIRL_API = "https://zh.moegirl.org.cn/api.php"
@@ -148,7 +150,7 @@ async def _request_json(
         resp = await http_client.get(url, params=params, headers=_DEFAULT_HEADERS, timeout=timeout)
         resp.raise_for_status()
         return resp.json()
-    async with httpx.AsyncClient(headers=_DEFAULT_HEADERS, follow_redirects=True) as client:
+    async with shared_http_client(headers=_DEFAULT_HEADERS, follow_redirects=True) as client:
         resp = await client.get(url, params=params, timeout=timeout)
         resp.raise_for_status()
         return resp.json()
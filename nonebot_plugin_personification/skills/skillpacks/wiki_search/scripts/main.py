@@ -7,6 +7,7 @@ import httpx
 
 from plugin.personification.agent.tool_registry import AgentTool
 from . import impl
+from plugin.personification.core.http_clients import shared_http_client
 
 
 class _SilentLogger:
@@ -57,7 +58,7 @@ def build_tools(runtime):
     async def _with_client(callback):
         if shared_client is not None:
             return await callback(shared_client)
-        async with httpx.AsyncClient(follow_redirects=True) as http_client:
+        async with shared_http_client(follow_redirects=True) as http_client:
             return await callback(http_client)
 
     async def _wiki_lookup_handler(query: str) -> str:
@@ -4,6 +4,14 @@ from typing import Any, Dict, List, Optional
 
 from .core.data_store import get_data_store
 from .core.db import connect_sync
+from .core.group_chat_meta import (
+    claim_style_analysis,
+    load_all_group_chat_meta,
+    load_group_chat_meta,
+    replace_all_group_chat_meta,
+    update_group_chat_meta,
+)
+from .core.group_message_buffer import GROUP_MESSAGE_COLUMNS, group_message_buffer
 from .core.group_roles import normalize_group_role
 from .core.group_relation_edges import update_relation_edges_from_message
 from .core.thread_tracker import assign_thread_for_message
@@ -12,7 +20,6 @@ from .core.thread_tracker import assign_thread_for_message
 _WHITELIST_STORE = "whitelist"
 _REQUESTS_STORE = "requests"
 _GROUP_CONFIG_STORE = "group_config"
-_CHAT_HISTORY_STORE = "chat_history"
 
 _plugin_config: Any = None
 
@@ -72,47 +79,15 @@ def _get_group_style_auto_analyze_cooldown_hours() -> float:
     return 12.0
 
 
-def _load_chat_meta() -> Dict[str, dict]:
-    data = get_data_store().load_sync(_CHAT_HISTORY_STORE)
-    return data if isinstance(data, dict) else {}
-
-
-def _save_chat_meta(data: Dict[str, dict]) -> None:
-    get_data_store().save_sync(_CHAT_HISTORY_STORE, data if isinstance(data, dict) else {})
-
-
 def load_chat_history() -> Dict[str, dict]:
-    data = _load_chat_meta()
-    for group_id in list(data.keys()):
-        group_data = data.get(group_id)
-        if not isinstance(group_data, dict):
-            data[group_id] = {"style": "", "messages": []}
-            continue
+    data: Dict[str, dict] = load_all_group_chat_meta()
+    for group_id, group_data in data.items():
         group_data["messages"] = get_recent_group_msgs(group_id, limit=200, expire_hours=0)
     return data
 
 
 def save_chat_history(data: Dict[str, dict]):
-    metadata: Dict[str, dict] = {}
-    for group_id, group_data in (data or {}).items():
-        if not isinstance(group_data, dict):
-            continue
-        metadata[str(group_id)] = {k: v for k, v in group_data.items() if k != "messages"}
-    _save_chat_meta(metadata)
-
-
-def _upsert_chat_meta(group_id: str, mutator: Any) -> Dict[str, dict]:
-    def _mutate(current: object) -> Dict[str, dict]:
-        data = current if isinstance(current, dict) else {}
-        group_data = data.get(group_id)
-        if not isinstance(group_data, dict):
-            group_data = {"style": ""}
-            data[group_id] = group_data
-        mutator(group_data)
-        return data
-
-    updated = get_data_store().mutate_sync(_CHAT_HISTORY_STORE, _mutate)
-    return updated if isinstance(updated, dict) else {}
+    replace_all_group_chat_meta({str(group_id): group_data for group_id, group_data in (data or {}).items()})
 
 
 def record_group_msg(
@@ -150,32 +125,34 @@ def record_group_msg(
             source_kind=str(safe_metadata.get("source_kind", "bot" if is_bot else "user") or "user"),
             timestamp=now_ts,
         )
-        conn.execute(
+        stored_row: Dict[str, Any] = {
+            "group_id": str(group_id),
+            "user_id": str(safe_metadata.get("user_id", "") or ""),
+            "nickname": str(nickname or ""),
+            "content": str(content or ""),
+            "image_count": image_count,
+            "visual_summary": visual_summary,
+            "is_bot": 1 if is_bot else 0,
+            "reply_to_msg_id": safe_metadata.get("reply_to_msg_id"),
+            "reply_to_user_id": safe_metadata.get("reply_to_user_id"),
+            "mentioned_ids": json.dumps(mentioned_ids, ensure_ascii=False),
+            "is_at_bot": 1 if bool(safe_metadata.get("is_at_bot")) else 0,
+            "message_id": str(safe_metadata.get("message_id", "") or "") or None,
+            "thread_id": thread_assignment.thread_id,
+            "source_kind": str(safe_metadata.get("source_kind", "bot" if is_bot else "user") or "user"),
+            "sender_role": sender_role,
+            "timestamp": now_ts,
+        }
+        cursor = conn.execute(
             """
             INSERT INTO group_messages(
                 group_id, user_id, nickname, content, image_count, visual_summary, is_bot,
                 reply_to_msg_id, reply_to_user_id, mentioned_ids, is_at_bot, message_id, thread_id, source_kind, sender_role, timestamp
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (
-                str(group_id),
-                str(safe_metadata.get("user_id", "") or ""),
-                str(nickname or ""),
-                str(content or ""),
-                image_count,
-                visual_summary,
-                1 if is_bot else 0,
-                safe_metadata.get("reply_to_msg_id"),
-                safe_metadata.get("reply_to_user_id"),
-                json.dumps(mentioned_ids, ensure_ascii=False),
-                1 if bool(safe_metadata.get("is_at_bot")) else 0,
-                str(safe_metadata.get("message_id", "") or "") or None,
-                thread_assignment.thread_id,
-                str(safe_metadata.get("source_kind", "bot" if is_bot else "user") or "user"),
-                sender_role,
-                now_ts,
-            ),
+            tuple(stored_row[name] for name in GROUP_MESSAGE_COLUMNS[1:]),
         )
+        stored_row["id"] = int(cursor.lastrowid or 0)
         update_relation_edges_from_message(
             conn,
             group_id=str(group_id),
@@ -194,13 +171,15 @@ def record_group_msg(
             "SELECT COUNT(1) AS cnt FROM group_messages WHERE group_id=?",
             (str(group_id),),
         ).fetchone()
-        conn.commit()
         count = int(row["cnt"] if hasattr(row, "__getitem__") else row[0]) if row else 0
-
-    def _mutator(group_data: dict[str, Any]) -> None:
-        group_data["message_total_count"] = count
-
-    _upsert_chat_meta(str(group_id), _mutator)
+        update_group_chat_meta(
+            str(group_id),
+            conn=conn,
+            message_total_count=count,
+            last_message_at=now_ts,
+        )
+        conn.commit()
+    group_message_buffer.append(stored_row)
     return count
 
 
@@ -209,27 +188,13 @@ def should_trigger_group_style_analysis(group_id: str, total_message_count: int)
     if total_message_count < threshold:
         return False
 
-    now_ts = time.time()
-    cooldown_seconds = _get_group_style_auto_analyze_cooldown_hours() * 3600
-    min_new_messages = _get_group_style_auto_analyze_min_new_messages()
-    triggered = False
-
-    def _mutator(group_data: dict[str, Any]) -> None:
-        nonlocal triggered
-        last_at = float(group_data.get("last_auto_analyze_at", 0) or 0)
-        last_count = int(group_data.get("last_auto_analyze_message_count", 0) or 0)
-        should_trigger = False
-        if last_at <= 0 or last_count <= 0:
-            should_trigger = True
-        elif total_message_count - last_count >= min_new_messages and now_ts - last_at >= cooldown_seconds:
-            should_trigger = True
-        if should_trigger:
-            group_data["last_auto_analyze_at"] = now_ts
-            group_data["last_auto_analyze_message_count"] = int(total_message_count)
-            triggered = True
-
-    _upsert_chat_meta(group_id, _mutator)
-    return triggered
+    return claim_style_analysis(
+        group_id,
+        total_message_count=total_message_count,
+        now_ts=time.time(),
+        min_new_messages=_get_group_style_auto_analyze_min_new_messages(),
+        cooldown_seconds=_get_group_style_auto_analyze_cooldown_hours() * 3600,
+    )
 
 
 def clear_group_msgs(group_id: str):
@@ -237,30 +202,11 @@ def clear_group_msgs(group_id: str):
         conn.execute("DELETE FROM group_messages WHERE group_id=?", (str(group_id),))
         conn.execute("DELETE FROM conversation_threads WHERE group_id=?", (str(group_id),))
         conn.commit()
+    group_message_buffer.invalidate(str(group_id))
 
 
-def get_group_msg_by_message_id(group_id: str, message_id: str) -> Optional[Dict[str, Any]]:
-    normalized_group_id = str(group_id)
-    normalized_message_id = str(message_id or "").strip()
-    if not normalized_group_id or not normalized_message_id:
-        return None
-
-    with connect_sync() as conn:
-        row = conn.execute(
-            """
-            SELECT group_id, user_id, nickname, content, image_count, visual_summary, is_bot,
-                   reply_to_msg_id, reply_to_user_id, mentioned_ids, is_at_bot, message_id, thread_id, source_kind, sender_role, timestamp
-            FROM group_messages
-            WHERE group_id=? AND message_id=?
-            ORDER BY timestamp DESC
-            LIMIT 1
-            """,
-            (normalized_group_id, normalized_message_id),
-        ).fetchone()
-    if not row:
-        return None
-
-    raw_mentions = row["mentioned_ids"] if hasattr(row, "__getitem__") else row[9]
+def _message_from_row(row: Any) -> Dict[str, Any]:
+    raw_mentions = row["mentioned_ids"]
     try:
         mentioned_ids = json.loads(raw_mentions) if raw_mentions else []
     except Exception:
@@ -285,58 +231,64 @@ def get_group_msg_by_message_id(group_id: str, message_id: str) -> Optional[Dict
     }
 
 
-def get_recent_group_msgs(group_id: str, limit: int = 200, expire_hours: Optional[float] = None) -> List[Dict]:
-    if expire_hours is None:
-        expire_hours = _get_message_expire_hours()
+def get_group_msg_by_message_id(group_id: str, message_id: str) -> Optional[Dict[str, Any]]:
+    normalized_group_id = str(group_id)
+    normalized_message_id = str(message_id or "").strip()
+    if not normalized_group_id or not normalized_message_id:
+        return None
 
-    clauses = ["group_id=?"]
-    params: list[Any] = [str(group_id)]
-    if expire_hours > 0:
-        clauses.append("timestamp>=?")
-        params.append(time.time() - expire_hours * 3600)
-    params.append(max(1, int(limit)))
+    cached = group_message_buffer.lookup_message(normalized_group_id, normalized_message_id)
+    if cached is not None:
+        return _message_from_row(cached)
 
+    seq = group_message_buffer.write_seq(normalized_group_id)
     with connect_sync() as conn:
-        rows = conn.execute(
+        row = conn.execute(
             f"""
-            SELECT group_id, user_id, nickname, content, image_count, visual_summary, is_bot,
-                   reply_to_msg_id, reply_to_user_id, mentioned_ids, is_at_bot, message_id, thread_id, source_kind, sender_role, timestamp
+            SELECT {", ".join(GROUP_MESSAGE_COLUMNS)}
             FROM group_messages
-            WHERE {" AND ".join(clauses)}
-            ORDER BY timestamp DESC
-            LIMIT ?
+            WHERE group_id=? AND message_id=?
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1
             """,
-            tuple(params),
-        ).fetchall()
+            (normalized_group_id, normalized_message_id),
+        ).fetchone()
+    if not row:
+        return None
+    group_message_buffer.remember_message(
+        {name: row[name] for name in GROUP_MESSAGE_COLUMNS},
+        seq=seq,
+    )
+    return _message_from_row(row)
 
-    messages: List[Dict[str, Any]] = []
-    for row in reversed(rows):
-        raw_mentions = row["mentioned_ids"] if hasattr(row, "__getitem__") else row[9]
-        try:
-            mentioned_ids = json.loads(raw_mentions) if raw_mentions else []
-        except Exception:
-            mentioned_ids = []
-        messages.append(
-            {
-                "group_id": row["group_id"],
-                "user_id": row["user_id"],
-                "nickname": row["nickname"],
-                "content": row["content"],
-                "image_count": int(row["image_count"] or 0),
-                "visual_summary": str(row["visual_summary"] or ""),
-                "time": float(row["timestamp"] or 0),
-                "is_bot": bool(row["is_bot"]),
-                "reply_to_msg_id": row["reply_to_msg_id"],
-                "reply_to_user_id": row["reply_to_user_id"],
-                "mentioned_ids": mentioned_ids if isinstance(mentioned_ids, list) else [],
-                "is_at_bot": bool(row["is_at_bot"]),
-                "message_id": row["message_id"],
-                "thread_id": row["thread_id"],
-                "source_kind": row["source_kind"],
-                "sender_role": row["sender_role"],
-            }
-        )
-    return messages
+
+def get_recent_group_msgs(group_id: str, limit: int = 200, expire_hours: Optional[float] = None) -> List[Dict]:
+    if expire_hours is None:
+        expire_hours = _get_message_expire_hours()
+
+    since = time.time() - expire_hours * 3600 if expire_hours > 0 else None
+    rows = group_message_buffer.select(str(group_id), limit=max(1, int(limit)), since=since)
+    if rows is None:
+        clauses = ["group_id=?"]
+        params: list[Any] = [str(group_id)]
+        if since is not None:
+            clauses.append("timestamp>=?")
+            params.append(since)
+        params.append(max(1, int(limit)))
+
+        with connect_sync() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT {", ".join(GROUP_MESSAGE_COLUMNS)}
+                FROM group_messages
+                WHERE {" AND ".join(clauses)}
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+                """,
+                tuple(params),
+            ).fetchall()
+
+    return [_message_from_row(row) for row in reversed(rows)]
 
 
 def build_group_context_window(
@@ -369,21 +321,19 @@ def build_group_context_window(
 
 
 def set_group_style(group_id: str, style: str):
-    _upsert_chat_meta(group_id, lambda group_data: group_data.__setitem__("style", style))
+    update_group_chat_meta(group_id, style=style)
 
 
 def get_group_style(group_id: str) -> str:
-    data = _load_chat_meta()
-    group_data = data.get(group_id)
-    if not isinstance(group_data, dict):
+    group_data = load_group_chat_meta(group_id)
+    if group_data is None:
         return ""
     return str(group_data.get("style", "") or "")
 
 
 def get_group_topic_summary(group_id: str) -> str:
-    data = _load_chat_meta()
-    group_data = data.get(group_id)
-    if not isinstance(group_data, dict):
+    group_data = load_group_chat_meta(group_id)
+    if group_data is None:
         return ""
     summary = str(group_data.get("topic_summary", "") or "")
     if not summary:
@@ -408,11 +358,7 @@ def get_group_topic_summary(group_id: str) -> str:
 
 
 def set_group_topic_summary(group_id: str, summary: str, ts: float) -> None:
-    def _mutator(group_data: dict[str, Any]) -> None:
-        group_data["topic_summary"] = summary
-        group_data["topic_summary_at"] = float(ts)
-
-    _upsert_chat_meta(group_id, _mutator)
+    update_group_chat_meta(group_id, topic_summary=summary, topic_summary_at=float(ts))
 
 
 def load_group_configs() -> Dict[str, dict]:
@@ -14,6 +14,7 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from ...core import config_registry, env_writer, webui_audit_log
 from ...core.config_search import build_config_search_index
+from ...core.http_clients import shared_http_client
 from ...core.operation_diagnostics import detail, diagnostic, exception_diagnostic, step
 from ...core.sensitive_data import sanitize_object
 from ..deps import AdminIdentity, require_admin
@@ -354,7 +355,7 @@ async def _probe_http_models(provider: dict[str, Any]) -> tuple[list[dict[str, s
     client_kwargs: dict[str, Any] = {"timeout": timeout, "follow_redirects": False}
     if proxy:
         client_kwargs["proxy"] = proxy
-    async with httpx.AsyncClient(**client_kwargs) as client:
+    async with shared_http_client(**client_kwargs) as client:
         if parser_api_type == "gemini":
             from ...core.gemini_transport import raise_for_gemini_status, request_with_gemini_auth
 
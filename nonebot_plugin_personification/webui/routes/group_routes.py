@@ -17,6 +17,7 @@ from ...core.group_member_aliases import (
     set_group_member_aliases,
 )
 from ...core.meme_dictionary import delete_meme_entry, list_meme_entries, upsert_meme_entry
+from ...core.group_chat_meta import load_all_group_chat_meta
 from ...core.group_directory import discover_group_union
 from ...core.onebot_cache import get_user_nickname
 from ...core.operation_diagnostics import detail, diagnostic, exception_diagnostic, step
@@ -380,19 +381,10 @@ def _load_member_relationship_edges(
     try:
         import time as _time
 
-        from ...core.group_relation_edges import _decayed_weight
+        from ...core.group_relation_edges import _decayed_weight, load_group_relation_edges
 
         with connect_sync() as conn:
-            rows = conn.execute(
-                """
-                SELECT src_user_id, dst_user_id, edge_kind, weight, last_seen_at
-                FROM group_relation_edges
-                WHERE group_id=?
-                ORDER BY last_seen_at DESC
-                LIMIT 500
-                """,
-                (str(group_id),),
-            ).fetchall()
+            rows = load_group_relation_edges(conn, str(group_id), limit=500)
         now_ts = _time.time()
     except Exception:
         return {}
@@ -460,16 +452,24 @@ def build_group_router(*, runtime) -> APIRouter:
     async def list_groups(_: AdminIdentity = Depends(require_admin)) -> dict:
         svc = _profile_service(runtime)
         groups = await discover_group_union(runtime)
+        try:
+            chat_meta = load_all_group_chat_meta()
+        except Exception:
+            chat_meta = {}
         items: list[dict[str, Any]] = []
         for group in groups:
             gid = str(group["group_id"])
             sources = list(group.get("sources", []))
+            meta = chat_meta.get(gid, {})
             items.append(
                 {
                     **group,
                     "group_id": gid,
                     "source": sources[0] if len(sources) == 1 else "union",
                     "has_memory": "profile_memory" in sources,
+                    "message_total_count": int(meta.get("message_total_count", 0) or 0),
+                    "last_message_at": float(meta.get("last_message_at", 0) or 0),
+                    "has_style": bool(meta.get("style")),
                     "favorability": serialize_favorability(
                         runtime,
                         f"group_{gid}",
@@ -1555,19 +1555,11 @@ def build_group_router(*, runtime) -> APIRouter:
         try:
             import time as _time
 
+            from ...core.group_relation_edges import _decayed_weight, load_group_relation_edges
+
             with connect_sync() as conn:
-                rows = conn.execute(
-                    """
-                    SELECT src_user_id, dst_user_id, edge_kind, weight, last_seen_at
-                    FROM group_relation_edges
-                    WHERE group_id=?
-                    ORDER BY last_seen_at DESC
-                    LIMIT 80
-                    """,
-                    (str(group_id),),
-                ).fetchall()
+                rows = load_group_relation_edges(conn, str(group_id), limit=80)
             now_ts = _time.time()
-            from ...core.group_relation_edges import _decayed_weight
 
             aliases_by_user = list_group_member_aliases(group_id)
             recent_names_by_user = _load_recent_group_member_names(group_id)
@@ -11,6 +11,7 @@ import httpx
 from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 
 from ...core import webui_audit_log
+from ...core.http_clients import shared_http_client
 from ...core.mcp_management import (
     get_mcp_manager,
     mcp_registry_sources,
@@ -882,7 +883,7 @@ def build_mcp_router(*, runtime: Any) -> APIRouter:
             url = str(resolved.get("url") or "")
             if not _cover_url_allowed(platform, url):
                 raise ValueError("cover URL rejected")
-            async with httpx.AsyncClient(timeout=10, follow_redirects=False) as client:
+            async with shared_http_client(timeout=10, follow_redirects=False) as client:
                 for _redirect in range(4):
                     async with client.stream("GET", url, headers={"Accept": "image/*"}) as upstream:
                         if upstream.status_code in {301, 302, 303, 307, 308}:
@@ -818,21 +818,12 @@ def build_memory_router(*, runtime) -> APIRouter:
         if group_id.strip():
             try:
                 from ...core.db import connect_sync
-                from ...core.group_relation_edges import _decayed_weight
+                from ...core.group_relation_edges import _decayed_weight, load_group_relation_edges
                 import time as _time
 
                 now_ts = _time.time()
                 with connect_sync() as conn:
-                    rel_rows = conn.execute(
-                        """
-                        SELECT src_user_id, dst_user_id, edge_kind, weight, last_seen_at
-                        FROM group_relation_edges
-                        WHERE group_id=?
-                        ORDER BY last_seen_at DESC
-                        LIMIT 200
-                        """,
-                        (str(group_id).strip(),),
-                    ).fetchall()
+                    rel_rows = load_group_relation_edges(conn, str(group_id).strip(), limit=200)
                 for row in rel_rows:
                     w = _decayed_weight(float(row["weight"] or 0), float(row["last_seen_at"] or 0), now_ts=now_ts)
                     if w <= 0.15:
@@ -1,13 +1,37 @@
 from __future__ import annotations
 
+import asyncio
+import re
+import secrets
 from typing import Any
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field
 
-from ...core import runtime_performance
+from ...core import memory_footprint, metrics, runtime_performance, sampling_profiler, span_trace, webui_audit_log
 from ..deps import AdminIdentity, require_admin
 
 
+class ProfileBody(BaseModel):
+    duration_seconds: float = Field(
+        10.0,
+        ge=sampling_profiler.MIN_DURATION_SECONDS,
+        le=sampling_profiler.MAX_DURATION_SECONDS,
+    )
+    rate_hz: int = Field(100, ge=sampling_profiler.MIN_RATE_HZ, le=sampling_profiler.MAX_RATE_HZ)
+    include_idle: bool = False
+
+
+class TracemallocStartBody(BaseModel):
+    frames: int = Field(10, ge=1, le=25)
+
+
+class TracemallocDiffBody(BaseModel):
+    limit: int = Field(20, ge=1, le=100)
+    reset_baseline: bool = False
+
+
 def build_performance_router(*, runtime: Any) -> APIRouter:  # noqa: ARG001
     router = APIRouter(prefix="/api/performance", tags=["performance"])
 
@@ -15,7 +39,124 @@ def build_performance_router(*, runtime: Any) -> APIRouter:  # noqa: ARG001
     async def runtime_snapshot(_: AdminIdentity = Depends(require_admin)) -> dict[str, Any]:
         return runtime_performance.snapshot()
 
+    @router.get("/traces")
+    async def span_traces(limit: int = 20, _: AdminIdentity = Depends(require_admin)) -> dict[str, Any]:
+        return {
+            "items": span_trace.recent_turns(max(1, min(64, int(limit or 20)))),
+            "sampling": span_trace.snapshot(),
+        }
+
+    @router.get("/traces/{trace_id}")
+    async def span_trace_detail(trace_id: str, _: AdminIdentity = Depends(require_admin)) -> dict[str, Any]:
+        detail = span_trace.get_turn(trace_id)
+        if detail is None:
+            raise HTTPException(status_code=404, detail="trace not found")
+        return detail
+
+    @router.get("/traces/{trace_id}/chrome")
+    async def span_trace_chrome(trace_id: str, _: AdminIdentity = Depends(require_admin)) -> JSONResponse:
+        payload = span_trace.export_chrome_trace(trace_id)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="trace not found")
+        filename = re.sub(r"[^A-Za-z0-9_.-]", "_", trace_id)[:80] or "trace"
+        return JSONResponse(
+            payload,
+            headers={"Content-Disposition": f'attachment; filename="reply-trace-{filename}.json"'},
+        )
+
+    @router.post("/profile")
+    async def sampling_profile(body: ProfileBody, admin: AdminIdentity = Depends(require_admin)) -> dict[str, Any]:
+        if sampling_profiler.is_running():
+            raise HTTPException(status_code=409, detail="已有性能采样正在进行，请等待其结束")
+        try:
+            result = await asyncio.to_thread(
+                sampling_profiler.profile,
+                duration_seconds=body.duration_seconds,
+                rate_hz=body.rate_hz,
+                include_idle=body.include_idle,
+            )
+        except sampling_profiler.ProfilerBusyError:
+            raise HTTPException(status_code=409, detail="已有性能采样正在进行，请等待其结束") from None
+        webui_audit_log.record(
+            action="performance_profile",
+            qq=admin.qq,
+            device_id=admin.device_id,
+            detail={
+                "duration_seconds": result["duration_seconds"],
+                "rate_hz": result["rate_hz"],
+                "samples": result["samples"],
+            },
+        )
+        return result
+
+    @router.get("/memory")
+    async def memory_snapshot(refresh: bool = False, _: AdminIdentity = Depends(require_admin)) -> dict[str, Any]:
+        if refresh:
+            await asyncio.to_thread(memory_footprint.sample_footprints)
+        return memory_footprint.footprint_snapshot()
+
+    @router.post("/memory/tracemalloc/start")
+    async def tracemalloc_start(
+        body: TracemallocStartBody,
+        admin: AdminIdentity = Depends(require_admin),
+    ) -> dict[str, Any]:
+        status = await asyncio.to_thread(memory_footprint.start_tracemalloc, frames=body.frames)
+        webui_audit_log.record(
+            action="performance_tracemalloc_start",
+            qq=admin.qq,
+            device_id=admin.device_id,
+            detail={"frames": body.frames},
+        )
+        return status
+
+    @router.post("/memory/tracemalloc/diff")
+    async def tracemalloc_diff(
+        body: TracemallocDiffBody,
+        _: AdminIdentity = Depends(require_admin),
+    ) -> dict[str, Any]:
+        try:
+            return await asyncio.to_thread(
+                memory_footprint.tracemalloc_diff,
+                limit=body.limit,
+                reset_baseline=body.reset_baseline,
+            )
+        except RuntimeError:
+            raise HTTPException(status_code=409, detail="内存分配追踪未开启，请先开始追踪") from None
+
+    @router.post("/memory/tracemalloc/stop")
+    async def tracemalloc_stop(admin: AdminIdentity = Depends(require_admin)) -> dict[str, Any]:
+        status = memory_footprint.stop_tracemalloc()
+        webui_audit_log.record(
+            action="performance_tracemalloc_stop",
+            qq=admin.qq,
+            device_id=admin.device_id,
+        )
+        return status
+
+    return router
+
+
+def build_openmetrics_router(*, runtime: Any) -> APIRouter:
+    """`/metrics` 供 Prometheus 抓取；默认关闭，开启后可选 Bearer token，不走 WebUI 登录。"""
+    router = APIRouter(tags=["performance"])
+
+    @router.get("/metrics")
+    async def openmetrics(request: Request) -> Response:
+        config = getattr(runtime, "plugin_config", None)
+        if not bool(getattr(config, "personification_metrics_endpoint_enabled", False)):
+            raise HTTPException(status_code=404, detail="Not Found")
+        token = str(getattr(config, "personification_metrics_endpoint_token", "") or "").strip()
+        if token:
+            supplied = str(request.headers.get("authorization", "") or "")
+            if not secrets.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+                raise HTTPException(status_code=401, detail="invalid metrics token")
+        return Response(
+            metrics.render_openmetrics(),
+            media_type=metrics.OPENMETRICS_CONTENT_TYPE,
+            headers={"Cache-Control": "no-store"},
+        )
+
     return router
 
 
-__all__ = ["build_performance_router"]
+__all__ = ["build_openmetrics_router", "build_performance_router"]
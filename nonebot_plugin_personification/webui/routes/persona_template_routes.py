@@ -20,6 +20,7 @@ import yaml
 from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
 
 from ...core import webui_audit_log
+from ...core.http_clients import shared_http_client
 from ...core.paths import get_data_dir
 from ...core.llm_context import reset_llm_context, set_llm_context
 from ...core.persona_template_history import (
@@ -1164,7 +1165,7 @@ async def _search_avatar_image_sources(
     query_failures = 0
     web_fallback_rows = 0
     image_diagnostics: list[dict[str, Any]] = []
-    async with httpx.AsyncClient(follow_redirects=False, timeout=12.0) as client:
+    async with shared_http_client(follow_redirects=False, timeout=12.0) as client:
         async def one(query: str) -> list[dict[str, Any]]:
             nonlocal query_failures, web_fallback_rows
             try:
@@ -1450,7 +1451,7 @@ async def _gather_wiki_sources(
         return []
     queries = _persona_search_queries(work_title, character_name, search_aliases)[:6]
     sources: list[dict[str, Any]] = []
-    async with httpx.AsyncClient(follow_redirects=True) as client:
+    async with shared_http_client(follow_redirects=True) as client:
         async def _lookup_one(query: str) -> list[dict[str, Any]]:
             try:
                 payload = await asyncio.wait_for(
@@ -1886,7 +1887,7 @@ async def _gather_direct_page_sources(
     }
     sources: list[dict[str, Any]] = []
     timeout = httpx.Timeout(10.0, connect=4.0)
-    async with httpx.AsyncClient(follow_redirects=True, headers=headers, timeout=timeout) as client:
+    async with shared_http_client(follow_redirects=True, headers=headers, timeout=timeout) as client:
         sources.extend(
             await _gather_special_api_sources(
                 work_title=work_title,
@@ -2048,7 +2049,7 @@ async def _bing_search_sources(
         "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,ja;q=0.7",
     }
     try:
-        async with httpx.AsyncClient(follow_redirects=True, headers=headers, timeout=10.0) as client:
+        async with shared_http_client(follow_redirects=True, headers=headers, timeout=10.0) as client:
             resp = await client.get(
                 "https://www.bing.com/search",
                 params={"q": query, "mkt": "zh-CN", "setlang": "zh-CN"},
@@ -2118,7 +2119,7 @@ async def _sogou_search_sources(
         "Accept-Encoding": "gzip, deflate",
     }
     try:
-        async with httpx.AsyncClient(follow_redirects=True, headers=headers, timeout=10.0) as client:
+        async with shared_http_client(follow_redirects=True, headers=headers, timeout=10.0) as client:
             resp = await client.get("https://www.sogou.com/web", params={"query": query})
             if resp.status_code != 200:
                 return []
@@ -2211,7 +2212,7 @@ async def _enrich_sources_with_pages(
             "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
         )
     }
-    async with httpx.AsyncClient(follow_redirects=True, headers=headers, timeout=10.0) as client:
+    async with shared_http_client(follow_redirects=True, headers=headers, timeout=10.0) as client:
         for url, fallback_title, source_name in urls:
             try:
                 resp = await client.get(url)
@@ -41,7 +41,7 @@ let state = {
   audit: null, auditFilter: "",
   logs: null, traces: null, logLevel: "", logQuery: "", logTraceId: "", logLoadingMore: false, logExpandedIds: {}, traceDetail: null, selectedTraceId: "",
   proactiveStats: null, proactiveRecent: null, proactiveScope: "",
-  agentStatus: null, transferExport: null, transferImport: null, transferBotInfo: null,
+  agentStatus: null, spanTraces: null, spanTraceDetail: null, profileResult: null, profileRunning: false, profileDuration: 10, profileRate: 100, tracemallocDiff: null, transferExport: null, transferImport: null, transferBotInfo: null,
   userPolicy: null, userPolicyTier: "blocked", selectedUserPolicy: null, userPolicyBusy: false, userPolicyLimit: 50,
   userPolicyBotInfo: null, userPolicyBotId: "", userPolicyFriends: [], userPolicyFriendError: "",
   userPolicyDraftUserId: "", userPolicyDurationHours: 0,
@@ -828,12 +828,14 @@ async function loadView() {
         state.groupsAvailable = groupsResp.available;
       }
     } else if (view === "agent_status") {
-      const [status, performanceData] = await Promise.all([
+      const [status, performanceData, spanTraces] = await Promise.all([
         api("/agent-status"),
         api("/performance/runtime"),
+        api("/performance/traces").catch(() => null),
       ]);
       state.agentStatus = status;
       state.runtimePerformance = performanceData;
+      state.spanTraces = spanTraces;
     } else if (view === "data_transfer") {
       state.transferBotInfo = await api("/qq/info").catch(() => null);
     } else if (view === "user_policy") {
@@ -13,9 +13,114 @@ function opsMegabytes(value) {
 function renderRuntimePerformance() {
   const data=state.runtimePerformance;
   if(!data)return `<div class="card"><h2>运行性能</h2><p class="muted">正在读取进程和事件循环指标…</p></div>`;
-  const process=data.process||{},loop=data.event_loop||{},reply=data.reply||{},tasks=data.tasks||{},queue=(data.queues||{}).runtime_logs||{};
-  const cacheRows=(data.caches||[]).map(item=>`<tr><td>${escapeHtml(item.name||"-")}</td><td class="u-tabular">${Number(item.entries||0)} / ${Number(item.limit||0)}</td><td class="u-tabular">${Number(item.evictions||0)}</td></tr>`).join("");
-  return `<div class="card"><div class="between"><h2>运行性能</h2><span class="muted u-atomic">进程内即时采样</span></div><div class="ops-stat-grid"><div class="ops-stat"><span>当前内存</span><strong>${escapeHtml(opsMegabytes(process.rss_bytes))}</strong><small>峰值 ${escapeHtml(opsMegabytes(process.peak_rss_bytes))}</small></div><div class="ops-stat"><span>事件循环 p95</span><strong>${Number(loop.p95_ms||0).toFixed(1)} ms</strong><small>最近 ${Number(loop.samples||0)} 个样本</small></div><div class="ops-stat"><span>回复排队</span><strong>${Number(reply.waiting||0)}</strong><small>${Number(reply.active||0)} 活动 · ${Number(reply.session_gates||0)} 会话 gate</small></div><div class="ops-stat"><span>后台任务</span><strong>${Number(tasks.failed_total||0)} 次失败</strong><small>${Number(tasks.total||0)} 个受监管任务</small></div></div><div class="table-wrap table-scroll" tabindex="0" role="region" aria-label="运行资源使用情况"><table class="data-table"><thead><tr><th scope="col">缓存/容器</th><th scope="col">使用量</th><th scope="col">溢出/淘汰</th></tr></thead><tbody>${cacheRows||'<tr><td colspan="3" class="muted">暂无缓存统计</td></tr>'}<tr><td>运行日志队列</td><td class="u-tabular">${Number(queue.depth||0)} / ${Number(queue.capacity||0)}</td><td class="u-tabular">${Number(queue.dropped||0)}</td></tr></tbody></table></div></div>`;
+  const process=data.process||{},loop=data.event_loop||{},reply=data.reply||{},tasks=data.tasks||{},queue=(data.queues||{}).runtime_logs||{},stageQueue=(data.queues||{}).reply_turn_stages||{};
+  const cacheRows=(data.caches||[]).map(item=>`<tr><td>${escapeHtml(item.name||"-")}</td><td class="u-tabular">${Number(item.entries||0)} / ${Number(item.limit||0)}${item.hit_rate==null?"":` · 命中 ${(Number(item.hit_rate)*100).toFixed(1)}%`}</td><td class="u-tabular">${Number(item.evictions||0)}</td></tr>`).join("");
+  return `<div class="card"><div class="between"><h2>运行性能</h2><span class="muted u-atomic">进程内即时采样</span></div><div class="ops-stat-grid"><div class="ops-stat"><span>当前内存</span><strong>${escapeHtml(opsMegabytes(process.rss_bytes))}</strong><small>峰值 ${escapeHtml(opsMegabytes(process.peak_rss_bytes))}</small></div><div class="ops-stat"><span>事件循环 p95</span><strong>${Number(loop.p95_ms||0).toFixed(1)} ms</strong><small>最近 ${Number(loop.samples||0)} 个样本</small></div><div class="ops-stat"><span>回复排队</span><strong>${Number(reply.waiting||0)}</strong><small>${Number(reply.active||0)} 活动 · ${Number(reply.session_gates||0)} 会话 gate</small></div><div class="ops-stat"><span>后台任务</span><strong>${Number(tasks.failed_total||0)} 次失败</strong><small>${Number(tasks.total||0)} 个受监管任务</small></div></div><div class="table-wrap table-scroll" tabindex="0" role="region" aria-label="运行资源使用情况"><table class="data-table"><thead><tr><th scope="col">缓存/容器</th><th scope="col">使用量</th><th scope="col">溢出/淘汰</th></tr></thead><tbody>${cacheRows||'<tr><td colspan="3" class="muted">暂无缓存统计</td></tr>'}<tr><td>运行日志队列</td><td class="u-tabular">${Number(queue.depth||0)} / ${Number(queue.capacity||0)}</td><td class="u-tabular">${Number(queue.dropped||0)}</td></tr><tr><td>回复阶段写入队列</td><td class="u-tabular">${Number(stageQueue.depth||0)} / ${Number(stageQueue.capacity||0)}</td><td class="u-tabular">${Number(stageQueue.dropped||0)}</td></tr></tbody></table></div></div>`;
+}
+
+function renderProviderConcurrency(){
+  const items=(state.runtimePerformance||{}).provider_concurrency;
+  if(!Array.isArray(items))return "";
+  const rows=items.map(item=>{const queued=item.queued_by_priority||{};return `<tr><td>${escapeHtml(item.provider||"-")}</td><td class="u-tabular">${Number(item.limit||0).toFixed(1)} / ${Number(item.max_limit||0)}</td><td class="u-tabular">${Number(item.in_flight||0)}</td><td class="u-tabular" title="回复 ${Number(queued.interactive||0)} · 主动 ${Number(queued.proactive||0)} · 后台 ${Number(queued.background||0)}">${Number(item.queued||0)}</td><td class="u-tabular">${Number(item.avg_wait_ms||0).toFixed(0)} / ${Number(item.max_wait_ms||0).toFixed(0)} ms</td><td class="u-tabular">${Number(item.decreases||0)}</td></tr>`;}).join("");
+  return `<div class="card"><div class="between"><h2>Provider 并发</h2><span class="muted u-atomic">成功加性增长 · 429/超时减半</span></div><div class="table-wrap table-scroll" tabindex="0" role="region" aria-label="各 provider 自适应并发上限与排队情况"><table class="data-table"><thead><tr><th scope="col">Provider</th><th scope="col">当前上限</th><th scope="col">在途</th><th scope="col">排队</th><th scope="col">平均/最长等待</th><th scope="col">收缩次数</th></tr></thead><tbody>${rows||'<tr><td colspan="6" class="muted">暂无 provider 请求</td></tr>'}</tbody></table></div></div>`;
+}
+
+function renderLoopBlocking(){
+  const data=(state.runtimePerformance||{}).blocking;
+  if(!data)return "";
+  const rows=(data.offenders||[]).map(item=>`<tr><td><code class="u-ellipsis" title="${escapeAttr((item.stack||[]).join("\n"))}">${escapeHtml(item.culprit||"-")}</code></td><td class="u-tabular">${Number(item.count||0)}</td><td class="u-tabular">${Number(item.total_ms||0).toFixed(0)} ms</td><td class="u-tabular">${Number(item.max_ms||0).toFixed(0)} ms</td></tr>`).join("");
+  const threshold=Number(data.threshold_ms||0);
+  return `<div class="card"><div class="between"><h2>事件循环阻塞点</h2><span class="muted u-atomic">${threshold>0?`阈值 ${threshold.toFixed(0)} ms · 共 ${Number(data.stalls||0)} 次停顿`:"看门狗已关闭"}</span></div><div class="table-wrap table-scroll" tabindex="0" role="region" aria-label="事件循环阻塞调用栈排行"><table class="data-table"><thead><tr><th scope="col">阻塞位置（悬停查看调用栈）</th><th scope="col">次数</th><th scope="col">累计阻塞</th><th scope="col">最长一次</th></tr></thead><tbody>${rows||'<tr><td colspan="4" class="muted">暂未发现超过阈值的阻塞</td></tr>'}</tbody></table></div></div>`;
+}
+
+function renderMemoryFootprint(){
+  const data=(state.runtimePerformance||{}).memory;
+  if(!data)return "";
+  const rows=(data.items||[]).map(item=>{
+    const growth=Number(item.growth_bytes||0);
+    return `<tr><td>${escapeHtml(item.name||"-")}${item.over_budget?'<span class="tag required">超预算</span>':""}${item.error?`<span class="tag secret">${escapeHtml(item.error)}</span>`:""}</td><td class="u-tabular">${item.entries===null||item.entries===undefined?"-":Number(item.entries)}</td><td class="u-tabular">${escapeHtml(opsMegabytes(item.approx_bytes))}</td><td class="u-tabular">${Number(item.budget_bytes||0)?escapeHtml(opsMegabytes(item.budget_bytes)):"不限"}</td><td class="u-tabular">${growth>0?"+":""}${(growth/1024).toFixed(1)} KB</td></tr>`;
+  }).join("");
+  const trace=data.tracemalloc||{},diff=state.tracemallocDiff;
+  const sampled=data.sampled_at?`${new Date(Number(data.sampled_at)*1000).toLocaleTimeString()} 估算 · 耗时 ${Number(data.sample_ms||0).toFixed(0)} ms`:"尚未估算";
+  const diffRows=((diff||{}).top||[]).map(item=>`<tr><td><code class="u-ellipsis" title="${escapeAttr(item.location)}">${escapeHtml(item.location)}</code></td><td class="u-tabular">${Number(item.size_diff_bytes||0)>0?"+":""}${(Number(item.size_diff_bytes||0)/1024).toFixed(1)} KB</td><td class="u-tabular">${Number(item.count_diff||0)>0?"+":""}${Number(item.count_diff||0)}</td><td class="u-tabular">${(Number(item.size_bytes||0)/1024).toFixed(1)} KB</td></tr>`).join("");
+  const diffTable=diff?`<p class="muted">相对基线净增长 ${(Number(diff.total_diff_bytes||0)/1024/1024).toFixed(2)} MB</p><div class="table-wrap table-scroll" tabindex="0" role="region" aria-label="内存分配增长位置"><table class="data-table"><thead><tr><th scope="col">分配位置</th><th scope="col">净增长</th><th scope="col">对象数变化</th><th scope="col">当前占用</th></tr></thead><tbody>${diffRows||'<tr><td colspan="4" class="muted">与基线相比没有变化</td></tr>'}</tbody></table></div>`:"";
+  const traceButtons=trace.tracing?`<button class="btn small" onclick="diffTracemalloc(false)">对比基线</button><button class="btn small" onclick="diffTracemalloc(true)">对比并重设基线</button><button class="btn small danger" onclick="stopTracemalloc()">停止追踪</button>`:'<button class="btn small" onclick="startTracemalloc()">开始分配追踪</button>';
+  return `<div class="card"><div class="between"><h2>缓存内存台账</h2><span class="muted u-atomic">${escapeHtml(sampled)}</span></div><div class="row"><span>登记 ${Number(data.registered||0)} 个缓存，估算合计 ${escapeHtml(opsMegabytes(data.total_approx_bytes))}</span><button class="btn small" onclick="refreshMemoryFootprint()">立即估算</button></div><div class="table-wrap table-scroll" tabindex="0" role="region" aria-label="缓存近似内存占用"><table class="data-table"><thead><tr><th scope="col">缓存</th><th scope="col">条目</th><th scope="col">近似占用</th><th scope="col">预算</th><th scope="col">较上次</th></tr></thead><tbody>${rows||'<tr><td colspan="5" class="muted">点击「立即估算」生成第一份台账</td></tr>'}</tbody></table></div><div class="between"><h3>分配追踪（tracemalloc）</h3><span class="muted u-atomic">${trace.tracing?`追踪中 · 当前 ${escapeHtml(opsMegabytes(trace.traced_bytes))}`:"未开启；开启后所有分配都有额外开销"}</span></div><div class="row">${traceButtons}</div>${diffTable}</div>`;
+}
+
+async function refreshMemoryFootprint(){
+  try{
+    const memory=await api("/performance/memory?refresh=true",{cache:"no-store"});
+    state.runtimePerformance={...(state.runtimePerformance||{}),memory};
+    updateAgentStatusIsland();
+  }catch(e){
+    alertFlash("err","内存估算失败："+e.message);
+  }
+}
+
+async function tracemallocAction(path,body){
+  try{
+    return await api(`/performance/memory/tracemalloc/${path}`,{method:"POST",headers:{"content-type":"application/json"},body:JSON.stringify(body||{})});
+  }catch(e){
+    alertFlash("err","分配追踪操作失败："+e.message);
+    return null;
+  }
+}
+
+async function startTracemalloc(){
+  const status=await tracemallocAction("start",{frames:10});
+  if(!status)return;
+  state.tracemallocDiff=null;
+  state.runtimePerformance={...(state.runtimePerformance||{}),memory:{...((state.runtimePerformance||{}).memory||{}),tracemalloc:status}};
+  updateAgentStatusIsland();
+}
+
+async function diffTracemalloc(resetBaseline){
+  const diff=await tracemallocAction("diff",{limit:20,reset_baseline:!!resetBaseline});
+  if(!diff)return;
+  state.tracemallocDiff=diff;
+  updateAgentStatusIsland();
+}
+
+async function stopTracemalloc(){
+  const status=await tracemallocAction("stop");
+  if(!status)return;
+  state.tracemallocDiff=null;
+  state.runtimePerformance={...(state.runtimePerformance||{}),memory:{...((state.runtimePerformance||{}).memory||{}),tracemalloc:status}};
+  updateAgentStatusIsland();
+}
+
+function renderSamplingProfiler(){
+  const result=state.profileResult;
+  const duration=Number(state.profileDuration||10),rate=Number(state.profileRate||100);
+  const rows=((result||{}).top_functions||[]).map(item=>`<tr><td><code class="u-ellipsis" title="${escapeAttr(item.function)}">${escapeHtml(item.function)}</code></td><td class="u-tabular">${Number(item.self_pct||0).toFixed(1)}%</td><td class="u-tabular">${Number(item.total_pct||0).toFixed(1)}%</td></tr>`).join("");
+  const summary=result?`<p class="muted">${Number(result.duration_seconds||0).toFixed(1)} 秒 · ${Number(result.rate_hz||0)} Hz · ${Number(result.samples||0)} 个栈样本（已忽略 ${Number(result.idle_samples||0)} 个空闲样本）</p>`:"";
+  const table=result?`<div class="table-wrap table-scroll" tabindex="0" role="region" aria-label="采样热点函数"><table class="data-table"><thead><tr><th scope="col">函数</th><th scope="col">自身占比</th><th scope="col">含子调用占比</th></tr></thead><tbody>${rows||'<tr><td colspan="3" class="muted">采样期间没有非空闲线程</td></tr>'}</tbody></table></div>`:"";
+  return `<div class="card"><div class="between"><h2>按需性能采样</h2><span class="muted">对全部线程做统计采样，不影响当前会话状态</span></div><div class="row"><label>时长（秒）<input type="number" min="1" max="60" value="${duration}" onchange="state.profileDuration=Number(this.value)||10"></label><label>频率（Hz）<input type="number" min="10" max="250" value="${rate}" onchange="state.profileRate=Number(this.value)||100"></label><button class="btn small" ${state.profileRunning?"disabled":""} onclick="runSamplingProfile()">${state.profileRunning?"采样中…":"开始采样"}</button>${result?'<button class="btn small" onclick="downloadCollapsedStacks()">下载 collapsed 栈</button>':""}</div>${summary}${table}</div>`;
+}
+
+async function runSamplingProfile(){
+  if(state.profileRunning)return;
+  state.profileRunning=true;
+  updateAgentStatusIsland();
+  try{
+    state.profileResult=await api("/performance/profile",{method:"POST",headers:{"content-type":"application/json"},body:JSON.stringify({duration_seconds:Number(state.profileDuration||10),rate_hz:Number(state.profileRate||100)})});
+  }catch(e){
+    alertFlash("err","性能采样未完成："+e.message);
+  }finally{
+    state.profileRunning=false;
+    updateAgentStatusIsland();
+  }
+}
+
+function downloadCollapsedStacks(){
+  const text=(state.profileResult||{}).collapsed||"";
+  if(!text)return;
+  const url=URL.createObjectURL(new Blob([text+"\n"],{type:"text/plain"}));
+  const a=document.createElement("a");
+  a.href=url;a.download="personification-profile.collapsed.txt";
+  document.body.appendChild(a);a.click();a.remove();
+  setTimeout(()=>URL.revokeObjectURL(url),4000);
 }
 
 function renderBrowserPerformance(){
@@ -27,6 +132,34 @@ function renderBrowserPerformance(){
   return `<div class="card"><div class="between"><h2>浏览器当前会话</h2><span class="muted">仅保存在本标签页，不上传路径参数或用户内容</span></div><div class="ops-stat-grid"><div class="ops-stat"><span>活动视图渲染 p95</span><strong>${Number((data.render||{}).p95_ms||0).toFixed(1)} ms</strong><small>${Number((data.render||{}).count||0)} 次采样</small></div><div class="ops-stat"><span>最慢 API p95</span><strong>${Number(slowest.p95_ms||0).toFixed(1)} ms</strong><small>${escapeHtml(slowest.key||"暂无请求")}</small></div><div class="ops-stat"><span>Long Task</span><strong>${Number((data.long_tasks||{}).count||0)}</strong><small>最大 ${Number((data.long_tasks||{}).max_ms||0).toFixed(1)} ms</small></div><div class="ops-stat"><span>Web Vitals</span><strong>LCP ${escapeHtml(lcp)}</strong><small>INP ${escapeHtml(inp)} · CLS ${Number(data.layout_shift||0).toFixed(3)}</small></div></div></div>`;
 }
 
+function renderSpanWaterfall(){
+  const data=state.spanTraces;
+  if(!data)return "";
+  const sampling=data.sampling||{};
+  const rows=(data.items||[]).map(item=>`<tr><td class="col-id"><code class="u-ellipsis" title="${escapeAttr(item.trace_id)}">${escapeHtml(item.trace_id)}</code></td><td class="u-tabular">${Number(item.duration_ms||0).toFixed(1)} ms${item.open?" · 进行中":""}</td><td class="u-tabular">${Number(item.span_count||0)}${Number(item.dropped_spans||0)?` (+${Number(item.dropped_spans||0)} 丢弃)`:""}</td><td class="col-actions"><button class="btn small" aria-label="查看瀑布图 ${escapeAttr(item.trace_id)}" onclick="openSpanWaterfall('${escapeAttr(item.trace_id)}')">瀑布图</button></td></tr>`).join("");
+  const detail=state.spanTraceDetail;
+  let waterfall="";
+  if(detail){
+    const total=Math.max(Number(detail.duration_ms||0),...(detail.spans||[]).map(row=>Number(row.offset_ms||0)+Number(row.duration_ms||0)),0.001);
+    const bars=(detail.spans||[]).map(row=>{
+      const left=Math.min(100,Number(row.offset_ms||0)/total*100),width=Math.max(0.4,Math.min(100-left,Number(row.duration_ms||0)/total*100));
+      const attrs=Object.entries(row.attrs||{}).map(([key,value])=>`${key}=${value}`).join(" ");
+      return `<div class="span-row" title="${escapeAttr(`${row.name} ${Number(row.duration_ms||0).toFixed(1)} ms ${row.lane||""} ${attrs}`)}"><span class="span-name u-ellipsis" style="padding-left:${Number(row.depth||0)*12}px">${escapeHtml(row.name)}</span><span class="span-track"><span class="span-bar${row.attrs&&row.attrs.error?" error":""}" style="left:${left.toFixed(2)}%;width:${width.toFixed(2)}%"></span></span><span class="span-ms u-tabular">${Number(row.duration_ms||0).toFixed(1)} ms</span></div>`;
+    }).join("");
+    waterfall=`<div class="span-waterfall" role="region" aria-label="Span 瀑布图"><div class="between"><strong class="u-ellipsis" title="${escapeAttr(detail.trace_id)}">${escapeHtml(detail.trace_id)}</strong><a class="btn small" href="${escapeAttr(`${API}/performance/traces/${encodeURIComponent(detail.trace_id)}/chrome`)}" download>导出 Chrome trace</a></div>${bars||'<p class="muted">该轮次没有记录到 span</p>'}</div>`;
+  }
+  return `<div class="card"><div class="between"><h2>回复 Span 瀑布图</h2><span class="muted u-atomic">采样率 ${(Number(sampling.sample_rate||0)*100).toFixed(0)}% · 保留最近 ${Number(sampling.limit||0)} 轮</span></div><div class="table-wrap table-scroll" tabindex="0" role="region" aria-label="采样回复轮次列表"><table class="data-table"><thead><tr><th scope="col" class="col-id">Trace</th><th scope="col">总耗时</th><th scope="col">Span 数</th><th scope="col" class="col-actions"><span class="sr-only">操作</span></th></tr></thead><tbody>${rows||'<tr><td colspan="4" class="muted">暂无采样轮次</td></tr>'}</tbody></table></div>${waterfall}</div>`;
+}
+
+async function openSpanWaterfall(traceId){
+  try{
+    state.spanTraceDetail=await api(`/performance/traces/${encodeURIComponent(traceId)}`,{cache:"no-store"});
+    updateAgentStatusIsland();
+  }catch(e){
+    alertFlash("err","Span 瀑布图不可用："+e.message);
+  }
+}
+
 function opsAgo(seconds) {
   const value=Number(seconds||0);
   if(value<60)return `${Math.round(value)} 秒前`;
@@ -41,7 +174,7 @@ function renderAgentStatusContent() {
   const rows=(data.recent||[]).map(row=>`<tr><td class="col-status">${opsStatus(row.state)}</td><td class="col-id"><code class="u-ellipsis" title="${escapeAttr(row.trace_id)}">${escapeHtml(row.trace_id)}</code></td><td class="col-id"><span class="u-ellipsis" title="${escapeAttr(row.stage || "-")}">${escapeHtml(row.stage||"-")}</span></td><td class="col-status"><span class="u-ellipsis" title="${escapeAttr(row.outcome || row.diagnosis_code || "-")}">${escapeHtml(row.outcome||row.diagnosis_code||"-")}</span></td><td class="col-time u-atomic u-tabular">${escapeHtml(opsAgo(row.age_seconds))}</td><td class="col-actions"><button class="btn small" aria-label="查看 Trace ${escapeAttr(row.trace_id)}" onclick="openAgentTrace('${escapeAttr(row.trace_id)}')">Trace</button></td></tr>`).join("");
   return `<section class="ops-hero"><div><span class="eyebrow">LIVE RUNTIME</span><h2>Agent 运行脉搏</h2><p>只展示可审计状态，不暴露隐藏推理、画像正文或工具参数。</p></div><div class="ops-hero-state">${opsStatus(data.overall)}<button class="btn small" onclick="refreshAgentStatus()">立即刷新</button></div></section>
   <div class="ops-stat-grid"><div class="ops-stat"><span>连接 Bot</span><strong>${Number((data.bots||{}).connected||0)}</strong></div><div class="ops-stat"><span>正在执行</span><strong>${Number(data.running||0)}</strong></div><div class="ops-stat"><span>陈旧任务</span><strong>${Number(data.stale||0)}</strong></div><div class="ops-stat"><span>内心状态</span><strong>${escapeHtml(inner.mood||"-")} · ${escapeHtml(inner.energy||"-")}</strong><small class="u-atomic u-tabular">${escapeHtml(inner.updated_at||"尚未更新")}</small></div></div>
-  ${renderRuntimePerformance()}${renderBrowserPerformance()}<div class="card"><div class="between"><h2>最近运行</h2><span class="muted u-atomic">5 秒自动刷新</span></div><div class="table-wrap table-scroll" tabindex="0" role="region" aria-label="Agent 最近运行列表"><table class="data-table wide"><thead><tr><th scope="col" class="col-status">状态</th><th scope="col" class="col-id">Trace</th><th scope="col" class="col-id">当前/末阶段</th><th scope="col" class="col-status">结果</th><th scope="col" class="col-time">最后活动</th><th scope="col" class="col-actions"><span class="sr-only">操作</span></th></tr></thead><tbody>${rows||'<tr><td colspan="6" class="muted">暂无运行记录</td></tr>'}</tbody></table></div></div>`;
+  ${renderRuntimePerformance()}${renderProviderConcurrency()}${renderLoopBlocking()}${renderMemoryFootprint()}${renderSamplingProfiler()}${renderBrowserPerformance()}${renderSpanWaterfall()}<div class="card"><div class="between"><h2>最近运行</h2><span class="muted u-atomic">5 秒自动刷新</span></div><div class="table-wrap table-scroll" tabindex="0" role="region" aria-label="Agent 最近运行列表"><table class="data-table wide"><thead><tr><th scope="col" class="col-status">状态</th><th scope="col" class="col-id">Trace</th><th scope="col" class="col-id">当前/末阶段</th><th scope="col" class="col-status">结果</th><th scope="col" class="col-time">最后活动</th><th scope="col" class="col-actions"><span class="sr-only">操作</span></th></tr></thead><tbody>${rows||'<tr><td colspan="6" class="muted">暂无运行记录</td></tr>'}</tbody></table></div></div>`;
 }
 
 function renderAgentStatus(){return `<div id="agent-status-island">${renderAgentStatusContent()}</div>`;}
@@ -52,8 +185,8 @@ let _agentStatusRunning=false;
 let _agentStatusGeneration=0;
 let _agentStatusFingerprint="";
 
-function agentStatusFingerprint(status,performanceData){
-  try{return JSON.stringify([status||null,performanceData||null]);}catch{return String(Date.now());}
+function agentStatusFingerprint(status,performanceData,spanTraces){
+  try{return JSON.stringify([status||null,performanceData||null,spanTraces||null]);}catch{return String(Date.now());}
 }
 
 function updateAgentStatusIsland(){
@@ -70,14 +203,16 @@ async function refreshAgentStatus({manual=true,generation=_agentStatusGeneration
   const controller=new AbortController();
   _agentStatusAbort=controller;
   try{
-    const [status,performanceData]=await Promise.all([
+    const [status,performanceData,spanTraces]=await Promise.all([
       api("/agent-status",{signal:controller.signal,cache:"no-store"}),
       api("/performance/runtime",{signal:controller.signal,cache:"no-store"}),
+      api("/performance/traces",{signal:controller.signal,cache:"no-store"}).catch(()=>null),
     ]);
     if(generation!==_agentStatusGeneration||state.view!=="agent_status")return false;
-    const fingerprint=agentStatusFingerprint(status,performanceData);
+    const fingerprint=agentStatusFingerprint(status,performanceData,spanTraces);
     state.agentStatus=status;
     state.runtimePerformance=performanceData;
+    state.spanTraces=spanTraces;
     if(fingerprint!==_agentStatusFingerprint){
       _agentStatusFingerprint=fingerprint;
       updateAgentStatusIsland();
@@ -104,7 +239,7 @@ function scheduleAgentStatusPoll(generation,delay=5000){
 
 function startAgentStatusPolling(){
   const generation=++_agentStatusGeneration;
-  _agentStatusFingerprint=agentStatusFingerprint(state.agentStatus,state.runtimePerformance);
+  _agentStatusFingerprint=agentStatusFingerprint(state.agentStatus,state.runtimePerformance,state.spanTraces);
   scheduleAgentStatusPoll(generation,5000);
 }
 
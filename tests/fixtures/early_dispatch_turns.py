@@ -0,0 +1,174 @@
+"""在独立进程里加载整个插件（none 驱动 + mock provider），开启流式首段提前发送后跑几轮私聊回复。
+
+每个场景输出实际发出的消息、写回会话历史的 assistant 内容和 trace 结局，最后一行打印 JSON。
+- streamed：正常流式，首段提前发出，之后只补发剩余段落
+- stale：首段发出后马上来了更新批次
+- diverged / silence：首段发出后 provider 重试，第二次给出改写过的首段 / [SILENCE]
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import importlib.util
+import itertools
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+_SCRIPTS_DIR = _REPO_ROOT / "nonebot_plugin_personification" / "scripts"
+_PACKAGE = "nonebot_plugin_personification"
+
+_FIRST = "先说结论，周六去爬山。"
+_REST = "路线我晚点发你。"
+_SCENARIOS: dict[str, tuple[str, str]] = {
+    # 场景名 -> (用户消息, 第二次尝试的最终回复；空串表示走 mock provider 的真实流式响应)
+    "streamed": ("周末去哪里玩比较好", ""),
+    "stale": ("周末去哪里转转呢", ""),
+    "diverged": ("周末去哪儿放松下", "先说结论，周日去爬山。\n\n" + _REST),
+    "silence": ("周末有什么安排吗", "[SILENCE]"),
+}
+
+
+def _load_script(name: str) -> Any:
+    spec = importlib.util.spec_from_file_location(f"early_dispatch_{name}", _SCRIPTS_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+async def _run() -> dict[str, Any]:
+    import nonebot
+
+    bench = _load_script("bench_reply_pipeline")
+    mock = bench._load_mock_server()
+    frame = dict(mock._SEMANTIC_FRAME_JSON, chat_intent="explanation", conversation_scenario="casual_chat")
+    rules = [
+        # banter 轮次不做提前发送，判别结果改成普通问答
+        mock.ScriptRule(
+            name="frame",
+            scope="system",
+            match='"chat_intent":"banter|explanation',
+            content=json.dumps(frame, ensure_ascii=False),
+        ),
+        mock.ScriptRule(name="reply", scope="user", match="周末", content=f"{_FIRST}\n\n{_REST}"),
+    ]
+    server = mock.MockLLMServer(profile="instant", rules=rules)
+    base_url = await server.start()
+    root = Path(tempfile.mkdtemp(prefix="personification_early_dispatch_"))
+    try:
+        nonebot.init(
+            driver="~none",
+            log_level="ERROR",
+            localstore_data_dir=str(root / "localstore" / "data"),
+            localstore_cache_dir=str(root / "localstore" / "cache"),
+            localstore_config_dir=str(root / "localstore" / "config"),
+            personification_data_dir=str(root / "personification"),
+            personification_api_type="openai",
+            personification_api_url=base_url + "/v1",
+            personification_api_key="mock",
+            personification_model="mock-openai",
+            personification_agent_enabled=False,
+            personification_reply_streaming_enabled=True,
+        )
+        if str(_REPO_ROOT) not in sys.path:
+            sys.path.insert(0, str(_REPO_ROOT))
+        plugin = nonebot.load_plugin(_PACKAGE)
+
+        from nonebot.adapters.onebot.v11 import (
+            GroupMessageEvent,
+            Message,
+            MessageEvent,
+            MessageSegment,
+            PokeNotifyEvent,
+            PrivateMessageEvent,
+        )
+        from nonebot.exception import FinishedException
+        from nonebot.permission import SUPERUSER
+
+        runtime_builder = importlib.import_module(f"{_PACKAGE}.core.plugin_runtime")
+        processor = importlib.import_module(f"{_PACKAGE}.handlers.reply_pipeline.processor")
+        llm_stream = importlib.import_module(f"{_PACKAGE}.core.llm_stream")
+        reply_turn_trace = importlib.import_module(f"{_PACKAGE}.core.reply_turn_trace")
+        bundle = runtime_builder.build_plugin_runtime(
+            plugin_config=plugin.module.plugin_config,
+            superusers=set(),
+            logger=nonebot.logger,
+            get_driver=nonebot.get_driver,
+            get_bots=nonebot.get_bots,
+            superuser_permission=SUPERUSER,
+            finished_exception_cls=FinishedException,
+            group_message_event_cls=GroupMessageEvent,
+            private_message_event_cls=PrivateMessageEvent,
+            message_event_cls=MessageEvent,
+            poke_event_cls=PokeNotifyEvent,
+            message_cls=Message,
+            message_segment_cls=MessageSegment,
+            md_to_pic=None,
+        )
+        deps = bundle.reply_processor_deps
+        original_call = deps.runtime.call_ai_api
+        message_ids = itertools.count(1)
+        user_ids: dict[str, int] = {}
+        results: dict[str, Any] = {}
+
+        for scenario, (text, retried_reply) in _SCENARIOS.items():
+            batch_entry: dict[str, Any] = {"current_generation": 1}
+            bot = bench._BenchBot()
+            bot_send = bot.send
+
+            async def _send(event: Any, message: Any, _send=bot_send, _stale=scenario == "stale", **kwargs: Any) -> Any:
+                result = await _send(event, message, **kwargs)
+                if _stale:
+                    batch_entry["newer_batch_for_current"] = True
+                return result
+
+            bot.send = _send  # type: ignore[method-assign]
+
+            async def _call(messages: Any, *args: Any, _final=retried_reply, **kwargs: Any) -> Any:
+                if not _final or not llm_stream.streaming_requested():
+                    return await original_call(messages, *args, **kwargs)
+                # 第一次尝试吐出首段后断流，换一次请求拿到不同的完整回复
+                llm_stream.begin_stream_attempt()
+                llm_stream.emit_text_delta(f"{_FIRST}\n\n")
+                await asyncio.sleep(0.05)
+                llm_stream.begin_stream_attempt()
+                return _final
+
+            deps.runtime.call_ai_api = _call
+            turn = bench.BenchTurn(file="", line_no=0, scene="private", speaker=f"用户{scenario}", text=text)
+            event = bench._build_event(turn, next(message_ids), user_ids)
+            state: dict[str, Any] = {"batch_runtime_ref": {"entry": batch_entry, "generation": 1}}
+            try:
+                await processor.process_response_logic(bot, event, state, deps)
+            except FinishedException:
+                pass
+            finally:
+                deps.runtime.call_ai_api = original_call
+
+            reply_turn_trace.flush_pending()
+            trace = reply_turn_trace.get_trace(str(state.get("reply_trace_id", "") or "")) or {}
+            session_id = deps.session.build_private_session_id(str(event.user_id))
+            history = [
+                str(item.get("content", ""))
+                for item in deps.session.get_session_messages(session_id)
+                if item.get("role") == "assistant"
+            ]
+            results[scenario] = {
+                "sent": list(bot.sent),
+                "history": history,
+                "outcome": trace.get("outcome", ""),
+                "diagnosis_code": trace.get("diagnosis_code", ""),
+                "detail": trace.get("detail") or {},
+                "stages": [stage.get("key", "") for stage in trace.get("stages") or []],
+            }
+        return results
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(_run()), ensure_ascii=False))
@@ -89,10 +89,11 @@ def test_single_attempt_reuses_model_selected_by_normal_probe(monkeypatch) -> No
     requested_models: list[str] = []
 
     class _Client:
-        async def post(self, url, *, json, headers):  # noqa: ANN001, ANN202
-            requested_models.append(json["model"])
+        async def post(self, url, *, content, headers):  # noqa: ANN001, ANN202
+            model = json.loads(content)["model"]
+            requested_models.append(model)
             request = impl.httpx.Request("POST", url)
-            if json["model"] == "gemini-3.5-flash-low":
+            if model == "gemini-3.5-flash-low":
                 return impl.httpx.Response(404, request=request, text="not found")
             return impl.httpx.Response(
                 200,
@@ -138,10 +139,11 @@ def test_single_attempt_rotates_404_candidate_without_probe_state(monkeypatch) -
     requested_models: list[str] = []
 
     class _Client:
-        async def post(self, url, *, json, headers):  # noqa: ANN001, ANN202
-            requested_models.append(json["model"])
+        async def post(self, url, *, content, headers):  # noqa: ANN001, ANN202
+            model = json.loads(content)["model"]
+            requested_models.append(model)
             request = impl.httpx.Request("POST", url)
-            if json["model"] == "gemini-3.5-flash-low":
+            if model == "gemini-3.5-flash-low":
                 return impl.httpx.Response(404, request=request, text="not found")
             return impl.httpx.Response(
                 200,
@@ -216,9 +218,9 @@ def _run_chat(model: str = "gemini-3.5-flash") -> dict[str, Any]:
         async def __aexit__(self, *args: Any) -> None:
             return None
 
-        async def post(self, url: str, *, json: dict, headers: dict) -> Any:
+        async def post(self, url: str, *, content: bytes, headers: dict) -> Any:
             captured["url"] = url
-            captured["json"] = json
+            captured["json"] = json.loads(content)
             captured["headers"] = headers
             resp = MagicMock()
             resp.raise_for_status = MagicMock()
@@ -334,7 +336,7 @@ def test_antigravity_retries_transient_tls_eof() -> None:
         async def __aexit__(self, *args: Any) -> None:
             return None
 
-        async def post(self, url: str, *, json: dict, headers: dict) -> Any:
+        async def post(self, url: str, *, content: bytes, headers: dict) -> Any:
             attempts["count"] += 1
             if attempts["count"] == 1:
                 raise impl.httpx.ConnectError("TLS/SSL connection has been closed (EOF)")
@@ -803,7 +805,7 @@ def test_default_proxy_is_empty_and_not_passed_to_httpx() -> None:
         async def __aexit__(self, *args: Any) -> None:
             return None
 
-        async def post(self, url, *, json, headers):
+        async def post(self, url, *, content, headers):
             resp = MagicMock()
             resp.raise_for_status = MagicMock()
             resp.json = lambda: {"response": {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}}
@@ -848,7 +850,7 @@ def test_env_proxy_is_respected_when_no_explicit_proxy() -> None:
         async def __aexit__(self, *args: Any) -> None:
             return None
 
-        async def post(self, url, *, json, headers):
+        async def post(self, url, *, content, headers):
             resp = MagicMock()
             resp.raise_for_status = MagicMock()
             resp.json = lambda: {"response": {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}}
@@ -900,7 +902,7 @@ def test_explicit_proxy_passed_through_to_httpx() -> None:
         async def __aexit__(self, *args: Any) -> None:
             return None
 
-        async def post(self, url, *, json, headers):
+        async def post(self, url, *, content, headers):
             resp = MagicMock()
             resp.raise_for_status = MagicMock()
             resp.json = lambda: {"response": {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}}
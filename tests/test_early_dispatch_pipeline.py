@@ -0,0 +1,60 @@
+"""流式首段提前发送走完整回复管线：首段发出后无论正常收尾、旧批次、改写还是静默，都不重发首段，
+已发内容写回历史，trace 记为部分交付。
+
+插件要以 nonebot 插件身份加载，放在子进程里跑（tests/fixtures/early_dispatch_turns.py）。
+"""
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+_FIXTURE = Path(__file__).resolve().parent / "fixtures" / "early_dispatch_turns.py"
+_FIRST = "先说结论，周六去爬山。"
+
+
+@pytest.fixture(scope="module")
+def turns() -> dict:
+    completed = subprocess.run(
+        [sys.executable, str(_FIXTURE)],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        timeout=240,
+    )
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _assert_partial(result: dict, reason: str) -> None:
+    assert result["sent"] == [_FIRST]
+    assert result["history"] == [_FIRST]
+    assert (result["outcome"], result["diagnosis_code"]) == ("partial", "early_dispatch_partial")
+    assert result["detail"]["reason"] == reason
+    assert result["detail"]["outgoing_text"] == _FIRST
+    assert "early_dispatch_closed" in result["stages"]
+
+
+def test_streamed_reply_sends_first_segment_early_and_only_the_rest_afterwards(turns) -> None:
+    result = turns["streamed"]
+    assert result["sent"] == [_FIRST, "路线我晚点发你。"]
+    assert result["stages"].index("early_dispatch") < result["stages"].index("fallback_model_result")
+    assert result["outcome"] == "ok"
+    assert len(result["history"]) == 1
+    assert result["history"][0].startswith(_FIRST)
+
+
+def test_stale_batch_after_early_send_records_sent_segment(turns) -> None:
+    _assert_partial(turns["stale"], "stale_reply")
+
+
+def test_rewritten_final_reply_does_not_resend_first_segment(turns) -> None:
+    _assert_partial(turns["diverged"], "early_dispatch_diverged")
+    assert "early_dispatch_diverged" in turns["diverged"]["stages"]
+
+
+def test_silence_after_early_send_keeps_sent_segment_in_history(turns) -> None:
+    _assert_partial(turns["silence"], "silence")
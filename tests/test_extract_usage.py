@@ -97,3 +97,39 @@ def test_usage_metadata_snake_case_variant() -> None:
     }
     out = impl._extract_usage(response)
     assert out == {"prompt_tokens": 11, "completion_tokens": 22, "total_tokens": 33}
+
+
+def test_cached_prompt_tokens_from_each_provider_family() -> None:
+    openai_usage = {
+        "usage": {
+            "prompt_tokens": 2000,
+            "completion_tokens": 20,
+            "total_tokens": 2020,
+            "prompt_tokens_details": {"cached_tokens": 1536},
+        }
+    }
+    assert impl._extract_usage(openai_usage)["cached_tokens"] == 1536
+    responses_usage = SimpleNamespace(
+        usage=SimpleNamespace(input_tokens=900, output_tokens=9, input_tokens_details=SimpleNamespace(cached_tokens=512))
+    )
+    assert impl._extract_usage(responses_usage)["cached_tokens"] == 512
+
+    # Anthropic 的 input_tokens 不含缓存读写，合并后 prompt_tokens 才是真实输入量
+    anthropic_usage = {
+        "usage": {
+            "input_tokens": 50,
+            "output_tokens": 10,
+            "cache_read_input_tokens": 3000,
+            "cache_creation_input_tokens": 200,
+        }
+    }
+    assert impl._extract_usage(anthropic_usage) == {
+        "prompt_tokens": 3250,
+        "completion_tokens": 10,
+        "total_tokens": 3260,
+        "cached_tokens": 3000,
+    }
+    gemini_usage = {
+        "usageMetadata": {"promptTokenCount": 4000, "candidatesTokenCount": 8, "cachedContentTokenCount": 3072}
+    }
+    assert impl._extract_usage(gemini_usage)["cached_tokens"] == 3072
@@ -53,9 +53,9 @@ def test_gemini_round_trip_preserves_native_content_signature_and_call_id(monkey
         async def __aexit__(self, *_args) -> None:
             return None
 
-        async def post(self, _url, headers=None, params=None, json=None):  # noqa: ANN001, ANN201
+        async def post(self, _url, headers=None, params=None, content=None):  # noqa: ANN001, ANN201
             del headers, params
-            captured.append(json or {})
+            captured.append(json_module.loads(content or b"{}"))
             return _Response(responses.pop(0))
 
     monkeypatch.setattr(impl.httpx, "AsyncClient", _Client)
@@ -157,10 +157,10 @@ def test_gemini_cli_continuation_stays_on_originating_concrete_model(monkeypatch
     model_b_calls = 0
 
     class _Client:
-        async def post(self, url, *, json, headers):  # noqa: ANN001, ANN202
+        async def post(self, url, *, content, headers):  # noqa: ANN001, ANN202
             nonlocal model_b_calls
             del headers
-            model = json["model"]
+            model = json_module.loads(content)["model"]
             requested_models.append(model)
             request = impl.httpx.Request("POST", url)
             if model == model_a:
@@ -220,10 +220,10 @@ def test_antigravity_continuation_ignores_shared_preferred_model(monkeypatch) ->
     model_b_calls = 0
 
     class _Client:
-        async def post(self, url, *, json, headers):  # noqa: ANN001, ANN202
+        async def post(self, url, *, content, headers):  # noqa: ANN001, ANN202
             nonlocal model_b_calls
             del headers
-            model = json["model"]
+            model = json_module.loads(content)["model"]
             requested_models.append(model)
             request = impl.httpx.Request("POST", url)
             if model == model_a:
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from ._loader import load_personification_module
+
+db = load_personification_module("plugin.personification.core.db")
+data_store = load_personification_module("plugin.personification.core.data_store")
+chat_meta = load_personification_module("plugin.personification.core.group_chat_meta")
+utils = load_personification_module("plugin.personification.utils")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_db(tmp_path):
+    data_store.init_data_store(SimpleNamespace(personification_data_dir=str(tmp_path)))
+    db.init_db_sync(tmp_path)
+    utils.init_utils_config(None)
+    yield tmp_path
+    utils.init_utils_config(None)
+
+
+def test_legacy_chat_history_document_is_migrated_once(_fresh_db) -> None:
+    legacy = {
+        "g1": {"style": "爱玩梗", "topic_summary": "聊游戏", "topic_summary_at": 123.0, "custom_flag": True},
+        "g2": {"message_total_count": 42, "last_auto_analyze_message_count": 40},
+        "bad": "not-a-dict",
+    }
+    with db.connect_sync() as conn:
+        conn.execute(
+            "INSERT INTO kv_store(namespace, key, value, updated_at) VALUES ('chat_history', '__root__', ?, 0)",
+            (json.dumps(legacy, ensure_ascii=False),),
+        )
+        conn.commit()
+
+    db.init_db_sync(_fresh_db)
+
+    migrated = chat_meta.load_all_group_chat_meta()
+    assert set(migrated) == {"g1", "g2"}
+    assert migrated["g1"]["style"] == "爱玩梗"
+    assert migrated["g1"]["custom_flag"] is True
+    assert migrated["g2"]["message_total_count"] == 42
+    assert utils.get_group_style("g1") == "爱玩梗"
+    with db.connect_sync() as conn:
+        leftover = conn.execute("SELECT 1 FROM kv_store WHERE namespace='chat_history'").fetchone()
+    assert leftover is None
+
+
+def test_legacy_memory_migrator_copies_chat_meta_after_kv_document_is_gone(_fresh_db) -> None:
+    migrator_mod = load_personification_module("plugin.personification.core.legacy_memory_migrator")
+    memory_mod = load_personification_module("plugin.personification.core.memory_store")
+    with db.connect_sync() as conn:
+        conn.execute(
+            "INSERT INTO kv_store(namespace, key, value, updated_at) VALUES ('chat_history', '__root__', ?, 0)",
+            (json.dumps({"g1": {"style": "爱玩梗", "custom_flag": True}}, ensure_ascii=False),),
+        )
+        conn.commit()
+    # 升级顺序：init_db 先把 chat_history 文档拆进 group_chat_meta 并删掉，之后才跑旧记忆迁移
+    db.init_db_sync(_fresh_db)
+    cfg = SimpleNamespace(
+        personification_data_dir=str(_fresh_db / "runtime"),
+        personification_memory_enabled=True,
+        personification_memory_palace_enabled=True,
+    )
+    store = memory_mod.MemoryStore(cfg)
+    store.initialize()
+
+    migrator_mod.LegacyMemoryMigrator(store).migrate_once()
+
+    with memory_mod._connect(store.ensure_group_space("g1") / "group_context.db") as conn:
+        rows = dict(conn.execute("SELECT context_key, value FROM context_entries").fetchall())
+    assert json.loads(rows["style"]) == "爱玩梗"
+    assert json.loads(rows["custom_flag"]) is True
+
+
+def test_record_group_msg_updates_counters_in_message_transaction() -> None:
+    utils.record_group_msg("g1", "甲", "第一句", user_id="u1", time=1000)
+    utils.set_group_style("g1", "温和")
+    count = utils.record_group_msg("g1", "乙", "第二句", user_id="u2", time=1010)
+
+    meta = chat_meta.load_group_chat_meta("g1")
+    assert count == 2
+    assert meta["message_total_count"] == 2
+    assert meta["last_message_at"] == 1010
+    assert meta["style"] == "温和"
+
+
+def test_style_analysis_claim_is_single_winner_until_new_messages(monkeypatch) -> None:
+    config = SimpleNamespace(
+        personification_group_style_auto_analyze_threshold=10,
+        personification_group_style_auto_analyze_min_new_messages=5,
+        personification_group_style_auto_analyze_cooldown_hours=0.0,
+    )
+    utils.init_utils_config(config)
+
+    assert utils.should_trigger_group_style_analysis("g1", 9) is False
+    assert utils.should_trigger_group_style_analysis("g1", 10) is True
+    assert utils.should_trigger_group_style_analysis("g1", 12) is False
+    assert utils.should_trigger_group_style_analysis("g1", 15) is True
+    assert chat_meta.load_group_chat_meta("g1")["last_auto_analyze_message_count"] == 15
+
+
+def test_save_and_load_chat_history_round_trip() -> None:
+    utils.save_chat_history({"g1": {"style": "冷静", "messages": [{"content": "丢弃"}], "note": "保留"}})
+    utils.record_group_msg("g1", "甲", "你好", user_id="u1", time=1000)
+
+    loaded = utils.load_chat_history()
+
+    assert loaded["g1"]["style"] == "冷静"
+    assert loaded["g1"]["note"] == "保留"
+    assert [msg["content"] for msg in loaded["g1"]["messages"]] == ["你好"]
+
+    utils.set_group_topic_summary("g1", "打招呼", 1000.0)
+    assert chat_meta.load_group_chat_meta("g1")["topic_summary"] == "打招呼"
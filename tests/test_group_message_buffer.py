@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from ._loader import load_personification_module
+
+db = load_personification_module("plugin.personification.core.db")
+data_store = load_personification_module("plugin.personification.core.data_store")
+buffer_mod = load_personification_module("plugin.personification.core.group_message_buffer")
+utils = load_personification_module("plugin.personification.utils")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_db(tmp_path):
+    data_store.init_data_store(SimpleNamespace(personification_data_dir=str(tmp_path)))
+    db.init_db_sync(tmp_path)
+    buffer_mod.group_message_buffer.reset_for_testing()
+    yield
+    buffer_mod.group_message_buffer.reset_for_testing()
+
+
+def _sql_recent(group_id: str, limit: int, since: float | None) -> list[tuple[int, float]]:
+    clauses = ["group_id=?"]
+    params: list = [group_id]
+    if since is not None:
+        clauses.append("timestamp>=?")
+        params.append(since)
+    params.append(limit)
+    with db.connect_sync() as conn:
+        rows = conn.execute(
+            f"SELECT id, timestamp FROM group_messages WHERE {' AND '.join(clauses)} "
+            "ORDER BY timestamp DESC, id DESC LIMIT ?",
+            tuple(params),
+        ).fetchall()
+    return [(int(row["id"]), float(row["timestamp"])) for row in rows]
+
+
+def test_ring_buffer_matches_sqlite_for_last_n_and_since_queries() -> None:
+    ring = buffer_mod.GroupMessageBuffer(per_group_limit=40)
+    rng = random.Random(7)
+    now = 10_000.0
+    for index in range(160):
+        group_id = "g1" if index % 3 else "g2"
+        # 少量乱序时间戳，覆盖插入到环中间与比环更旧的情况
+        ts = now + index * 5 - (rng.choice([0, 0, 0, 30, 400]))
+        utils.record_group_msg(group_id, f"n{index}", f"消息 {index}", user_id=f"u{index % 7}", time=ts)
+        if index == 20:
+            assert ring.select("g1", limit=5) is not None
+        if index > 20:
+            with db.connect_sync() as conn:
+                last = conn.execute("SELECT * FROM group_messages ORDER BY id DESC LIMIT 1").fetchone()
+            ring.append(dict(last))
+
+    compared = 0
+    for group_id in ("g1", "g2"):
+        for limit in (1, 5, 20, 40):
+            for since in (None, now, now + 300.0, now + 700.0, now + 2000.0):
+                rows = ring.select(group_id, limit=limit, since=since)
+                if rows is None:
+                    continue
+                compared += 1
+                expected = _sql_recent(group_id, limit, since)
+                assert [(int(row["id"]), float(row["timestamp"])) for row in rows] == expected
+    assert compared >= 30
+
+    assert ring.select("g1", limit=41) is None
+    assert ring.snapshot()["hits"] > 0
+
+
+def test_get_recent_group_msgs_serves_from_buffer_and_matches_sql(monkeypatch) -> None:
+    for index in range(12):
+        utils.record_group_msg("g1", "甲", f"第 {index} 句", user_id="u1", message_id=f"m{index}", time=1000 + index)
+
+    cold = utils.get_recent_group_msgs("g1", limit=5, expire_hours=0)
+    utils.record_group_msg("g1", "乙", "新消息", user_id="u2", message_id="m99", time=2000)
+
+    def _no_sql():
+        raise AssertionError("hot read should not touch SQLite")
+
+    monkeypatch.setattr(utils, "connect_sync", _no_sql)
+    hot = utils.get_recent_group_msgs("g1", limit=5, expire_hours=0)
+
+    assert [msg["message_id"] for msg in cold] == ["m7", "m8", "m9", "m10", "m11"]
+    assert [msg["message_id"] for msg in hot] == ["m8", "m9", "m10", "m11", "m99"]
+    assert hot[-1]["content"] == "新消息"
+    assert hot[-1]["thread_id"]
+
+
+def test_clear_group_msgs_invalidates_buffer() -> None:
+    utils.record_group_msg("g1", "甲", "一", user_id="u1", time=1000)
+    assert len(utils.get_recent_group_msgs("g1", limit=5, expire_hours=0)) == 1
+
+    utils.clear_group_msgs("g1")
+
+    assert utils.get_recent_group_msgs("g1", limit=5, expire_hours=0) == []
+
+
+def test_lru_eviction_and_memory_caps() -> None:
+    ring = buffer_mod.GroupMessageBuffer(per_group_limit=8, max_groups=2, max_total_chars=10_000)
+    for group_id in ("a", "b", "c"):
+        utils.record_group_msg(group_id, "甲", "x" * 50, user_id="u1", time=1000)
+        assert ring.select(group_id, limit=1) is not None
+    assert ring.snapshot()["groups"] == 2
+    assert ring.snapshot()["evictions"] == 1
+
+    tight = buffer_mod.GroupMessageBuffer(per_group_limit=8, max_total_chars=300)
+    for index in range(6):
+        utils.record_group_msg("big", "甲", "y" * 100, user_id="u1", time=2000 + index)
+    assert tight.select("big", limit=1) is None
+    snapshot = tight.snapshot()
+    assert (snapshot["groups"], snapshot["chars"], snapshot["evictions"]) == (0, 0, 1)
+
+
+def test_write_during_warmup_falls_back_to_sql(monkeypatch) -> None:
+    ring = buffer_mod.GroupMessageBuffer(per_group_limit=8)
+    utils.record_group_msg("g1", "甲", "一", user_id="u1", time=1000)
+    original = ring._load_rows
+
+    def _racing_load(group_id: str):
+        rows = original(group_id)
+        ring.append({"group_id": group_id, "id": 999, "timestamp": 1001.0, "content": "race"})
+        return rows
+
+    monkeypatch.setattr(ring, "_load_rows", _racing_load)
+
+    assert ring.select("g1", limit=1) is None
+    assert ring.snapshot()["groups"] == 0
+
+
+def test_message_id_lookup_is_fed_on_insert_and_keeps_newest_row(monkeypatch) -> None:
+    utils.record_group_msg("g1", "甲", "旧的", user_id="u1", message_id="dup", time=1000)
+    utils.record_group_msg("g1", "乙", "新的", user_id="u2", message_id="dup", time=1005)
+    utils.record_group_msg("g1", "丙", "无关", user_id="u3", message_id="other", time=1010)
+    with db.connect_sync() as conn:
+        plan = " ".join(
+            str(row["detail"])
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM group_messages WHERE group_id=? AND message_id=?",
+                ("g1", "dup"),
+            ).fetchall()
+        )
+    assert "idx_group_messages_message_id" in plan
+
+    def _no_sql():
+        raise AssertionError("cached message_id lookup should not touch SQLite")
+
+    monkeypatch.setattr(utils, "connect_sync", _no_sql)
+    hit = utils.get_group_msg_by_message_id("g1", "dup")
+
+    assert hit is not None and hit["content"] == "新的"
+    assert buffer_mod.group_message_buffer.message_id_snapshot()["hits"] == 1
+
+
+def test_message_id_lookup_fills_from_sql_and_drops_on_clear() -> None:
+    utils.record_group_msg("g1", "甲", "被引用", user_id="u1", message_id="m1", time=1000)
+    buffer_mod.group_message_buffer.reset_for_testing()
+
+    assert utils.get_group_msg_by_message_id("g1", "m1")["content"] == "被引用"
+    assert buffer_mod.group_message_buffer.lookup_message("g1", "m1")["content"] == "被引用"
+
+    utils.clear_group_msgs("g1")
+
+    assert buffer_mod.group_message_buffer.lookup_message("g1", "m1") is None
+    assert utils.get_group_msg_by_message_id("g1", "m1") is None
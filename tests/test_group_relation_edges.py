@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from ._loader import load_personification_module
+
+db = load_personification_module("plugin.personification.core.db")
+data_store = load_personification_module("plugin.personification.core.data_store")
+edges = load_personification_module("plugin.personification.core.group_relation_edges")
+utils = load_personification_module("plugin.personification.utils")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_db(tmp_path):
+    data_store.init_data_store(SimpleNamespace(personification_data_dir=str(tmp_path)))
+    db.init_db_sync(tmp_path)
+    edges.discard_pending_relation_edges()
+    yield
+    edges.discard_pending_relation_edges()
+
+
+def _stored(group_id: str) -> dict[tuple[str, str, str], tuple[float, float, str]]:
+    with db.connect_sync() as conn:
+        rows = conn.execute(
+            "SELECT src_user_id, dst_user_id, edge_kind, weight, last_seen_at, sample_msg_id "
+            "FROM group_relation_edges WHERE group_id=?",
+            (group_id,),
+        ).fetchall()
+    return {
+        (row["src_user_id"], row["dst_user_id"], row["edge_kind"]): (
+            float(row["weight"]),
+            float(row["last_seen_at"]),
+            str(row["sample_msg_id"]),
+        )
+        for row in rows
+    }
+
+
+def test_batched_flush_matches_per_message_upserts() -> None:
+    increments = [
+        ("u1", "u2", "reply", 2.2, 1000.0, "m1"),
+        ("u1", "u2", "reply", 2.2, 1000.0 + 3600 * 48, "m2"),
+        ("u2", "u1", "turn", 0.7, 1000.0 + 3600 * 50, ""),
+        ("u1", "u2", "reply", 2.2, 1000.0 + 3600 * 24 * 40, ""),
+    ]
+    with db.connect_sync() as conn:
+        edges.upsert_group_relation_edge(
+            conn, group_id="ref", src_user_id="u1", dst_user_id="u2",
+            edge_kind="reply", weight=5.0, last_seen_at=500.0, sample_msg_id="m0",
+        )
+        edges.upsert_group_relation_edge(
+            conn, group_id="g1", src_user_id="u1", dst_user_id="u2",
+            edge_kind="reply", weight=5.0, last_seen_at=500.0, sample_msg_id="m0",
+        )
+        for src, dst, kind, weight, ts, sample in increments:
+            edges.upsert_group_relation_edge(
+                conn, group_id="ref", src_user_id=src, dst_user_id=dst,
+                edge_kind=kind, weight=weight, last_seen_at=ts, sample_msg_id=sample,
+            )
+        conn.commit()
+
+    for src, dst, kind, weight, ts, sample in increments:
+        edges.queue_group_relation_edge(
+            group_id="g1", src_user_id=src, dst_user_id=dst,
+            edge_kind=kind, weight=weight, last_seen_at=ts, sample_msg_id=sample,
+        )
+    assert edges.pending_relation_edge_count() == 2
+
+    assert edges.flush_pending_relation_edges() == 2
+    assert edges.pending_relation_edge_count() == 0
+
+    expected = _stored("ref")
+    actual = _stored("g1")
+    assert actual.keys() == expected.keys()
+    for key, (weight, ts, sample) in expected.items():
+        assert actual[key][0] == pytest.approx(weight, rel=1e-12)
+        assert actual[key][1:] == (ts, sample)
+
+
+def test_readers_merge_unflushed_deltas() -> None:
+    with db.connect_sync() as conn:
+        edges.upsert_group_relation_edge(
+            conn, group_id="g1", src_user_id="u1", dst_user_id="u2",
+            edge_kind="reply", weight=2.0, last_seen_at=100.0,
+        )
+        conn.commit()
+    edges.queue_group_relation_edge(
+        group_id="g1", src_user_id="u1", dst_user_id="u2",
+        edge_kind="reply", weight=1.0, last_seen_at=100.0, sample_msg_id="m9",
+    )
+    edges.queue_group_relation_edge(
+        group_id="g1", src_user_id="u3", dst_user_id="u1",
+        edge_kind="mention", weight=1.0, last_seen_at=200.0,
+    )
+    edges.queue_group_relation_edge(
+        group_id="g2", src_user_id="u1", dst_user_id="u2",
+        edge_kind="reply", weight=9.0, last_seen_at=300.0,
+    )
+
+    with db.connect_sync() as conn:
+        merged = edges.load_group_relation_edges(conn, "g1", limit=10)
+
+    assert [(row["src_user_id"], row["edge_kind"]) for row in merged] == [("u3", "mention"), ("u1", "reply")]
+    assert merged[1]["weight"] == pytest.approx(3.0)
+    assert merged[1]["sample_msg_id"] == "m9"
+    assert _stored("g1")[("u1", "u2", "reply")][0] == pytest.approx(2.0)
+
+
+def test_record_group_msg_defers_edge_writes_until_flush() -> None:
+    utils.record_group_msg("g1", "甲", "先说一句", user_id="u1", message_id="m1", time=1000)
+    utils.record_group_msg(
+        "g1", "乙", "接一下", user_id="u2", message_id="m2",
+        reply_to_msg_id="m1", reply_to_user_id="u1", time=1010,
+    )
+
+    assert _stored("g1") == {}
+    assert edges.pending_relation_edge_count() > 0
+
+    edges.flush_pending_relation_edges(group_id="g1")
+
+    assert ("u2", "u1", "reply") in _stored("g1")
+    assert edges.pending_relation_edge_count() == 0
+
+
+def test_discard_pending_drops_deltas_for_purged_user() -> None:
+    edges.queue_group_relation_edge(
+        group_id="g1", src_user_id="u1", dst_user_id="u2",
+        edge_kind="reply", weight=1.0, last_seen_at=1.0,
+    )
+    edges.queue_group_relation_edge(
+        group_id="g1", src_user_id="u3", dst_user_id="u4",
+        edge_kind="reply", weight=1.0, last_seen_at=1.0,
+    )
+
+    assert edges.discard_pending_relation_edges(user_id="u2") == 1
+    assert edges.flush_pending_relation_edges() == 1
+    assert set(_stored("g1")) == {("u3", "u4", "reply")}
+
+
+def test_interleaved_flushes_on_one_edge_keep_both_deltas(monkeypatch) -> None:
+    import threading
+
+    read_done = threading.Event()
+    other_done = threading.Event()
+
+    class _PausingConn:
+        """后台刷写用的连接：读完存量后停一下，让另一路刷写插进来。"""
+
+        def __init__(self, conn) -> None:
+            self._conn = conn
+
+        @property
+        def in_transaction(self) -> bool:
+            return self._conn.in_transaction
+
+        def execute(self, sql, *args):
+            result = self._conn.execute(sql, *args)
+            if "FROM group_relation_edges" in sql:
+                read_done.set()
+                other_done.wait(0.5)
+            return result
+
+        def executemany(self, sql, rows):
+            return self._conn.executemany(sql, rows)
+
+        def commit(self) -> None:
+            self._conn.commit()
+
+        def __enter__(self):
+            self._conn.__enter__()
+            return self
+
+        def __exit__(self, *exc):
+            return self._conn.__exit__(*exc)
+
+    real_connect = edges.connect_sync
+    monkeypatch.setattr(edges, "connect_sync", lambda *a, **k: _PausingConn(real_connect(*a, **k)))
+
+    def _queue(weight: float) -> None:
+        edges.queue_group_relation_edge(
+            group_id="g1", src_user_id="u1", dst_user_id="u2",
+            edge_kind="reply", weight=weight, last_seen_at=1000.0,
+        )
+
+    _queue(1.0)
+    background = threading.Thread(target=edges.flush_pending_relation_edges)
+    background.start()
+    assert read_done.wait(5)
+
+    # 消息连接上的溢出刷写：调用方事务里已经写过一条消息
+    _queue(2.0)
+
+    def _overflow_flush() -> None:
+        with real_connect() as conn:
+            conn.execute(
+                "INSERT INTO group_messages(group_id, user_id, content, timestamp) VALUES ('g1', 'u1', 'x', 1000)"
+            )
+            edges.flush_pending_relation_edges(conn)
+            conn.commit()
+        other_done.set()
+
+    overflow = threading.Thread(target=_overflow_flush)
+    overflow.start()
+    background.join(10)
+    overflow.join(10)
+
+    assert _stored("g1")[("u1", "u2", "reply")][0] == pytest.approx(3.0)
@@ -0,0 +1,139 @@
+"""共享 HTTP 客户端注册表：按参数 / 事件循环复用、连接复用计数、单 host 限流、不串 cookie、关闭。"""
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+from aiohttp import web
+
+from ._loader import load_personification_module
+
+http_clients = load_personification_module("plugin.personification.core.http_clients")
+runtime_state = load_personification_module("plugin.personification.core.runtime_state")
+
+
+class _Server:
+    def __init__(self, *, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            response = web.Response(text="ok")
+            response.set_cookie("session", "secret")
+            return response
+        finally:
+            self.active -= 1
+
+    async def __aenter__(self) -> "_Server":
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *_exc) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def setup_function() -> None:
+    http_clients.reset_for_testing()
+
+
+def teardown_function() -> None:
+    http_clients.reset_for_testing()
+
+
+def test_clients_are_shared_per_parameters_and_event_loop() -> None:
+    async def _pick():
+        first = http_clients.get_http_client(timeout=httpx.Timeout(10.0, connect=5.0), follow_redirects=True)
+        again = http_clients.get_http_client(timeout=httpx.Timeout(10.0, connect=5.0), follow_redirects=True)
+        other_timeout = http_clients.get_http_client(timeout=30.0, follow_redirects=True)
+        proxied = http_clients.get_http_client(timeout=10.0, proxy="http://127.0.0.1:7890")
+        async with http_clients.shared_http_client(timeout=httpx.Timeout(10.0, connect=5.0), follow_redirects=True) as ctx:
+            pass
+        return first, again, other_timeout, proxied, ctx
+
+    first, again, other_timeout, proxied, ctx = asyncio.run(_pick())
+
+    assert first is again is ctx
+    # 离开 async with 后共享客户端仍可用
+    assert not first.is_closed
+    assert other_timeout is not first and proxied is not first
+    assert http_clients.http_clients_snapshot()["clients_created"] == 3
+    # 上一个事件循环已关闭：新循环里拿到的是新客户端
+    second_loop = asyncio.run(_pick())[0]
+    assert second_loop is not first
+
+
+def test_requests_reuse_connections_and_ignore_set_cookie() -> None:
+    async def _main():
+        async with _Server() as server:
+            client = http_clients.get_http_client(timeout=5.0)
+            for _ in range(3):
+                response = await client.get(f"{server.base_url}/ping")
+                assert response.text == "ok"
+            other = http_clients.get_http_client(timeout=5.0)
+            await other.get(f"{server.base_url}/pong")
+            cookies = dict(client.cookies)
+            await http_clients.close_http_clients()
+            return client, cookies
+
+    client, cookies = asyncio.run(_main())
+
+    snapshot = http_clients.http_clients_snapshot()
+    assert snapshot["requests"] == 4
+    assert snapshot["new_connections"] == 1
+    assert (snapshot["hits"], snapshot["misses"]) == (3, 1)
+    assert cookies == {}
+    assert client.is_closed and snapshot["entries"] == 0
+
+
+def test_per_host_limit_queues_excess_requests() -> None:
+    http_clients.configure_http_clients(SimpleNamespace(personification_http_per_host_limit=2))
+
+    async def _main():
+        async with _Server(delay=0.05) as server:
+            client = http_clients.get_http_client(timeout=5.0)
+            responses = await asyncio.gather(*(client.get(f"{server.base_url}/{i}") for i in range(6)))
+            in_flight = http_clients.http_clients_snapshot()["in_flight"]
+            await http_clients.close_http_clients()
+            return server.peak, [r.status_code for r in responses], in_flight
+
+    peak, statuses, in_flight = asyncio.run(_main())
+
+    assert statuses == [200] * 6
+    assert peak == 2
+    assert in_flight == 0
+    assert http_clients.http_clients_snapshot()["host_waits"] >= 4
+
+
+def test_configuration_change_rebuilds_clients_and_legacy_helpers_delegate() -> None:
+    async def _main():
+        legacy = runtime_state.get_shared_http_client(max_connections=20)
+        assert legacy is http_clients.get_http_client()
+        http_clients.configure_http_clients(SimpleNamespace(personification_http_keepalive_expiry=90.0))
+        rebuilt = http_clients.get_http_client()
+        # 配置不变时不再丢弃已有客户端
+        http_clients.configure_http_clients(SimpleNamespace(personification_http_keepalive_expiry=90.0))
+        kept = http_clients.get_http_client()
+        await runtime_state.close_shared_http_client()
+        return legacy, rebuilt, kept
+
+    legacy, rebuilt, kept = asyncio.run(_main())
+
+    assert rebuilt is not legacy and kept is rebuilt
+    assert legacy.is_closed and rebuilt.is_closed
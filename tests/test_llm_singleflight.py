@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from plugin.personification.core import llm_singleflight, provider_router
+from plugin.personification.core.llm_context import reset_llm_context, set_llm_context
+
+
+@pytest.fixture(autouse=True)
+def _reset_singleflight():
+    llm_singleflight.reset_for_testing()
+    yield
+    llm_singleflight.reset_for_testing()
+    llm_singleflight._CACHEABLE_PURPOSES.pop("test_aux", None)
+
+
+class _Caller:
+    def __init__(self, content: str = "ok", *, delay: float = 0.02, error: Exception | None = None) -> None:
+        self.content = content
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def chat_with_tools(self, messages, tools, use_builtin_search):  # noqa: ANN001
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(content=self.content, tool_calls=[])
+
+
+def _chat(caller: _Caller, text: str = "hi", purpose: str = llm_singleflight.PURPOSE_POLICY_CLASSIFIER):
+    messages = [{"role": "user", "content": text}]
+    return llm_singleflight.coalesced_chat(
+        caller,
+        messages,
+        lambda: caller.chat_with_tools(messages, [], False),
+        purpose=purpose,
+    )
+
+
+def test_concurrent_identical_requests_share_one_call_then_hit_cache() -> None:
+    caller = _Caller()
+
+    async def _main():
+        first = await asyncio.gather(*(_chat(caller) for _ in range(5)), _chat(caller, "other"))
+        second = await _chat(caller)
+        return first, second
+
+    first, second = asyncio.run(_main())
+
+    assert [item.content for item in first] == ["ok"] * 6
+    assert second is first[0]
+    assert caller.calls == 2
+    stats = llm_singleflight.singleflight_snapshot()
+    assert stats["purposes"]["policy_classifier"] == {"hits": 1, "coalesced": 4, "misses": 2, "errors": 0}
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["in_flight"]) == (2, 5, 2, 0)
+
+    for key, (_expires_at, value) in list(llm_singleflight._RESULTS.items()):
+        llm_singleflight._RESULTS[key] = (0.0, value)
+    asyncio.run(_chat(caller))
+    assert caller.calls == 3
+
+
+def test_errors_and_empty_replies_are_shared_but_not_cached() -> None:
+    failing = _Caller(error=RuntimeError("boom"))
+    empty = _Caller(content="  ")
+
+    async def _main():
+        results = await asyncio.gather(_chat(failing), _chat(failing), return_exceptions=True)
+        await _chat(empty)
+        await _chat(empty)
+        return results
+
+    results = asyncio.run(_main())
+
+    assert [type(item) for item in results] == [RuntimeError, RuntimeError]
+    assert failing.calls == 1
+    assert empty.calls == 2
+    assert llm_singleflight.singleflight_snapshot()["purposes"]["policy_classifier"]["errors"] == 1
+    with pytest.raises(RuntimeError):
+        asyncio.run(_chat(failing))
+    assert failing.calls == 2
+
+
+def test_upstream_call_is_cancelled_only_when_every_waiter_leaves() -> None:
+    caller = _Caller(delay=0.2)
+
+    async def _main():
+        keeper = asyncio.create_task(_chat(caller))
+        leaver = asyncio.create_task(_chat(caller))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        assert (await keeper).content == "ok"
+        assert caller.cancelled == 0
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(_chat(caller, "slow"), 0.01)
+        await asyncio.sleep(0)
+        assert caller.cancelled == 1
+        assert (await _chat(caller, "slow")).content == "ok"
+
+    asyncio.run(_main())
+    assert caller.calls == 3
+
+
+def test_uncacheable_purposes_and_distinct_callers_do_not_share() -> None:
+    caller = _Caller()
+    other = _Caller()
+
+    async def _main():
+        await asyncio.gather(_chat(caller, purpose="reply"), _chat(caller, purpose="reply"))
+        await asyncio.gather(_chat(caller), _chat(other))
+
+    asyncio.run(_main())
+
+    assert (caller.calls, other.calls) == (3, 1)
+    key = llm_singleflight.request_key
+    assert key("p", "m", [{"role": "user", "content": " hi ", "_personification_untrusted": True}]) == key(
+        "p", "m", [{"role": "user", "content": "hi"}]
+    )
+    assert key("p", "m", [{"role": "user", "content": "hi"}]) != key("p", "m2", [{"role": "user", "content": "hi"}])
+
+
+def test_call_ai_api_coalesces_registered_purposes(monkeypatch) -> None:
+    calls: list[str] = []
+
+    async def _routed(messages, **kwargs):  # noqa: ANN001, ANN003
+        calls.append(kwargs["model_override"])
+        await asyncio.sleep(0.02)
+        return SimpleNamespace(content="routed", tool_calls=[], vision_unavailable=False)
+
+    monkeypatch.setattr(provider_router, "_call_ai_api_routed", _routed)
+    llm_singleflight.register_cacheable_purpose("test_aux", 30)
+
+    async def _call(purpose: str):
+        token = set_llm_context(purpose=purpose)
+        try:
+            return await provider_router.call_ai_api(
+                [{"role": "user", "content": "same"}],
+                plugin_config=SimpleNamespace(),
+                logger=SimpleNamespace(),
+                model_override="lite",
+            )
+        finally:
+            reset_llm_context(token)
+
+    async def _main():
+        await asyncio.gather(_call("test_aux"), _call("test_aux"), _call("test_aux"))
+        await _call("reply")
+
+    asyncio.run(_main())
+
+    assert calls == ["lite", "lite"]
+    assert llm_singleflight.singleflight_snapshot()["purposes"]["test_aux"]["coalesced"] == 2
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import pytest
+
+from ._loader import load_personification_module
+
+
+impl = load_personification_module("plugin.personification.skills.skillpacks.tool_caller.scripts.impl")
+llm_stream = load_personification_module("plugin.personification.core.llm_stream")
+early_dispatch = load_personification_module("plugin.personification.handlers.reply_pipeline.early_dispatch")
+
+
+def _openai_chunk(delta: dict[str, Any], **extra: Any) -> dict[str, Any]:
+    return {"id": "chunk", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": None}], **extra}
+
+
+_OPENAI_TEXT = [
+    _openai_chunk({"role": "assistant", "content": "第一段"}),
+    _openai_chunk({"content": "说完了。\n\n"}),
+    "pause",
+    _openai_chunk({"content": "第二段"}),
+    {"id": "chunk", "object": "chat.completion.chunk", "created": 0, "model": "stub", "choices": [],
+     "usage": {"prompt_tokens": 7, "completion_tokens": 5, "total_tokens": 12}},
+]
+_OPENAI_TOOLS = [
+    _openai_chunk({"tool_calls": [{"index": 0, "id": "call_a", "type": "function",
+                                   "function": {"name": "web_search", "arguments": "{\"que"}}]}),
+    _openai_chunk({"tool_calls": [{"index": 1, "id": "call_b", "type": "function",
+                                   "function": {"name": "get_time", "arguments": ""}}]}),
+    _openai_chunk({"tool_calls": [{"index": 0, "function": {"arguments": "ry\": \"天气\"}"}}]}),
+    _openai_chunk({"tool_calls": [{"index": 1, "function": {"arguments": "{}"}}]}),
+]
+_ANTHROPIC_EVENTS = [
+    ("message_start", {"type": "message_start", "message": {
+        "id": "msg", "type": "message", "role": "assistant", "model": "stub", "content": [],
+        "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 11, "output_tokens": 1}}}),
+    ("content_block_start", {"type": "content_block_start", "index": 0,
+                             "content_block": {"type": "text", "text": ""}}),
+    ("content_block_delta", {"type": "content_block_delta", "index": 0,
+                             "delta": {"type": "text_delta", "text": "我查一下"}}),
+    ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+    ("content_block_start", {"type": "content_block_start", "index": 1,
+                             "content_block": {"type": "tool_use", "id": "toolu_1", "name": "web_search", "input": {}}}),
+    ("content_block_delta", {"type": "content_block_delta", "index": 1,
+                             "delta": {"type": "input_json_delta", "partial_json": "{\"query\": "}}),
+    ("content_block_delta", {"type": "content_block_delta", "index": 1,
+                             "delta": {"type": "input_json_delta", "partial_json": "\"天气\"}"}}),
+    ("content_block_stop", {"type": "content_block_stop", "index": 1}),
+    ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "tool_use", "stop_sequence": None},
+                       "usage": {"output_tokens": 9}}),
+    ("message_stop", {"type": "message_stop"}),
+]
+_GEMINI_EVENTS = [
+    {"candidates": [{"content": {"role": "model", "parts": [{"text": "想一想", "thought": True}]}}]},
+    {"candidates": [{"content": {"role": "model", "parts": [{"text": "好呀，"}]}}]},
+    {"candidates": [{"content": {"role": "model", "parts": [
+        {"text": "稍等"}, {"functionCall": {"name": "get_time", "args": {"tz": "Asia/Shanghai"}}}]},
+        "finishReason": "STOP"}],
+     "usageMetadata": {"promptTokenCount": 4, "candidatesTokenCount": 3, "totalTokenCount": 7}},
+]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    requests: list[dict[str, Any]] = []
+
+    def log_message(self, *args: Any) -> None:
+        return
+
+    def do_POST(self) -> None:  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        self.requests.append({"path": self.path, "body": body, "headers": dict(self.headers)})
+        if self.path.startswith("/v1/chat/completions"):
+            if not body.get("stream"):
+                self._json({"id": "c", "object": "chat.completion", "created": 0, "model": "stub", "choices": [
+                    {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "一次性"}}]})
+                return
+            chunks = _OPENAI_TOOLS if body.get("tools") else _OPENAI_TEXT
+            self._sse([(None, item) for item in chunks] + [(None, "[DONE]")])
+        elif self.path.startswith("/v1/messages"):
+            self._sse(_ANTHROPIC_EVENTS)
+        elif ":streamGenerateContent" in self.path:
+            self._sse([(None, item) for item in _GEMINI_EVENTS])
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def _json(self, payload: dict[str, Any]) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _sse(self, events: list[tuple[str | None, Any]]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        for name, payload in events:
+            if payload == "pause":
+                time.sleep(0.4)
+                continue
+            data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+            frame = (f"event: {name}\n" if name else "") + f"data: {data}\n\n"
+            self.wfile.write(frame.encode())
+            self.wfile.flush()
+        self.close_connection = True
+
+
+@pytest.fixture
+def stub_server():
+    _StubHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        impl._clear_http_client_pool()
+
+
+class _Collector:
+    def __init__(self) -> None:
+        self.attempts = 0
+        self.deltas: list[str] = []
+
+    def begin_attempt(self) -> None:
+        self.attempts += 1
+
+    def feed(self, text: str) -> None:
+        self.deltas.append(text)
+
+
+_TOOLS = [
+    {"type": "function", "function": {"name": "web_search", "description": "search",
+                                      "parameters": {"type": "object", "properties": {"query": {"type": "string"}}}}},
+    {"type": "function", "function": {"name": "get_time", "description": "time",
+                                      "parameters": {"type": "object", "properties": {}}}},
+]
+
+
+def test_openai_caller_streams_text_and_assembles_tool_call_deltas(stub_server) -> None:
+    caller = impl.OpenAIToolCaller(api_key="sk-test", base_url=f"{stub_server}/v1", model="stub-model")
+    messages = [{"role": "user", "content": "你好"}]
+
+    plain = asyncio.run(caller.chat_with_tools(messages, [], False))
+    assert plain.content == "一次性"
+    assert "stream" not in _StubHandler.requests[-1]["body"]
+
+    collector = _Collector()
+
+    async def _streamed() -> Any:
+        with llm_stream.stream_text_deltas(collector):
+            text = await caller.chat_with_tools(messages, [], False)
+            tools = await caller.chat_with_tools(messages, _TOOLS, False)
+        return text, tools
+
+    text, tools = asyncio.run(_streamed())
+    assert _StubHandler.requests[-1]["body"]["stream"] is True
+    assert text.content == "第一段说完了。\n\n第二段"
+    assert collector.deltas == ["第一段", "说完了。\n\n", "第二段"]
+    assert collector.attempts == 2
+    assert text.usage["total_tokens"] == 12
+    assert tools.finish_reason == "tool_calls"
+    assert [(call.id, call.name, call.arguments) for call in tools.tool_calls] == [
+        ("call_a", "web_search", {"query": "天气"}),
+        ("call_b", "get_time", {}),
+    ]
+
+
+def test_anthropic_caller_streams_tool_use_input_json(stub_server) -> None:
+    caller = impl.AnthropicToolCaller(api_key="sk-ant-test", base_url=stub_server, model="stub")
+    collector = _Collector()
+
+    async def _streamed() -> Any:
+        with llm_stream.stream_text_deltas(collector):
+            return await caller.chat_with_tools([{"role": "user", "content": "天气"}], _TOOLS, False)
+
+    response = asyncio.run(_streamed())
+    assert _StubHandler.requests[-1]["body"]["stream"] is True
+    assert response.content == "我查一下"
+    assert collector.deltas == ["我查一下"]
+    assert [(call.id, call.name, call.arguments) for call in response.tool_calls] == [
+        ("toolu_1", "web_search", {"query": "天气"}),
+    ]
+    assert response.usage["prompt_tokens"] == 11 and response.usage["completion_tokens"] == 9
+    assert response.provider_history[1]["input"] == {"query": "天气"}
+
+
+def test_gemini_caller_streams_sse_and_skips_thought_parts(stub_server) -> None:
+    caller = impl.GeminiToolCaller(
+        api_key="g-key", base_url=f"{stub_server}/v1beta", model="gemini-stub", auth_mode="header"
+    )
+    collector = _Collector()
+
+    async def _streamed() -> Any:
+        with llm_stream.stream_text_deltas(collector):
+            return await caller.chat_with_tools([{"role": "user", "content": "几点了"}], _TOOLS, False)
+
+    response = asyncio.run(_streamed())
+    request = _StubHandler.requests[-1]
+    assert request["path"].startswith("/v1beta/models/gemini-stub:streamGenerateContent")
+    assert "alt=sse" in request["path"]
+    assert collector.deltas == ["好呀，", "稍等"]
+    assert response.content == "好呀，稍等"
+    assert [(call.name, call.arguments) for call in response.tool_calls] == [("get_time", {"tz": "Asia/Shanghai"})]
+    assert response.usage["total_tokens"] == 7
+
+
+def _split(text: str) -> list[str]:
+    return [part.strip() for part in text.split("\n\n") if part.strip()]
+
+
+def test_early_dispatch_candidate_requires_sealed_safe_segment() -> None:
+    candidate = early_dispatch.early_dispatch_candidate
+    assert candidate("第一段还没完", split=_split) == ""
+    assert candidate("第一段完了\n", split=_split) == ""
+    assert candidate("第一段完了\n\n", split=_split) == "第一段完了"
+    assert candidate("第一段完了\n\n第二", split=_split) == "第一段完了"
+    assert candidate("[NO_REPLY]\n\n第二", split=_split) == ""
+    assert candidate("总的来说就这样\n\n第二", split=_split) == ""
+    assert candidate("这一段有点长\n\n第二", split=_split, max_chars=3) == ""
+
+
+def test_early_dispatcher_sends_first_segment_while_stream_continues(stub_server) -> None:
+    caller = impl.OpenAIToolCaller(api_key="sk-test", base_url=f"{stub_server}/v1", model="stub-model")
+    sent: list[tuple[str, float]] = []
+
+    async def _send(segment: str) -> bool:
+        sent.append((segment, time.monotonic()))
+        return True
+
+    async def _run() -> tuple[Any, float, Any]:
+        dispatcher = early_dispatch.EarlyReplyDispatcher(send=_send, split=_split)
+        with llm_stream.stream_text_deltas(dispatcher):
+            response = await caller.chat_with_tools([{"role": "user", "content": "hi"}], [], False)
+        finished_at = time.monotonic()
+        await dispatcher.finish()
+        return response, finished_at, dispatcher
+
+    response, finished_at, dispatcher = asyncio.run(_run())
+    assert [segment for segment, _ in sent] == ["第一段说完了。"]
+    # 第一段在服务端停顿期间就已发出，而不是等整段生成结束
+    assert finished_at - sent[0][1] >= 0.3
+    assert dispatcher.remaining_segments(_split(response.content)) == ["第二段"]
+    assert dispatcher.remaining_segments(["改写过的第一段", "第二段"]) is None
+    # 最终切分把已发段落和后文并成一段时只去掉已发的那一截
+    first = dispatcher.sent_text
+    assert dispatcher.remaining_segments([f"{first}\n补一句", "第二段"]) == ["补一句", "第二段"]
+    assert dispatcher.remaining_segments([first]) == []
+
+
+def test_early_dispatcher_resets_on_retry_and_tolerates_send_failure() -> None:
+    async def _run() -> tuple[Any, Any]:
+        calls: list[str] = []
+
+        async def _send(segment: str) -> bool:
+            calls.append(segment)
+            raise RuntimeError("offline")
+
+        dispatcher = early_dispatch.EarlyReplyDispatcher(send=_send, split=_split, screen=lambda seg: "禁" not in seg)
+        dispatcher.feed("旧的半句")
+        dispatcher.begin_attempt()
+        dispatcher.feed("新的一段\n\n后文")
+        dispatcher.feed("\n\n更多\n\n")
+        assert await dispatcher.finish() == ""
+        assert calls == ["新的一段"]
+
+        screened = early_dispatch.EarlyReplyDispatcher(send=_send, split=_split, screen=lambda seg: "禁" not in seg)
+        screened.feed("禁止提前\n\n后文")
+        await screened.finish()
+        return dispatcher, screened
+
+    dispatcher, screened = asyncio.run(_run())
+    assert isinstance(dispatcher.error, RuntimeError)
+    assert dispatcher.remaining_segments(["新的一段", "后文"]) == ["新的一段", "后文"]
+    assert not screened.started
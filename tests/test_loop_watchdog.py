@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ._loader import load_personification_module
+
+
+loop_watchdog = load_personification_module("plugin.personification.core.loop_watchdog")
+
+
+@pytest.fixture(autouse=True)
+def _reset_watchdog():
+    loop_watchdog.reset_for_testing()
+    yield
+    loop_watchdog.reset_for_testing()
+
+
+def _deliberately_block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def test_watchdog_reports_the_blocking_stack_with_counts() -> None:
+    loop_watchdog.configure_loop_watchdog(SimpleNamespace(personification_loop_block_threshold_ms=60))
+
+    async def _scenario() -> None:
+        watchdog = asyncio.create_task(loop_watchdog.run_loop_watchdog())
+        await asyncio.sleep(0.1)
+        for _ in range(2):
+            _deliberately_block_the_loop(0.3)
+            await asyncio.sleep(0.1)
+        watchdog.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await watchdog
+
+    asyncio.run(_scenario())
+
+    snapshot = loop_watchdog.blocking_snapshot()
+    assert snapshot["threshold_ms"] == 60
+    assert snapshot["stalls"] >= 2
+    top = snapshot["offenders"][0]
+    assert "_deliberately_block_the_loop" in top["culprit"]
+    assert any("_scenario" in line for line in top["stack"])
+    assert top["count"] == 2
+    assert 400 <= top["total_ms"] <= 2000
+    assert top["max_ms"] >= 200
+
+
+def test_watchdog_disabled_threshold_records_nothing() -> None:
+    loop_watchdog.configure_loop_watchdog(SimpleNamespace(personification_loop_block_threshold_ms=0))
+
+    async def _scenario() -> None:
+        watchdog = asyncio.create_task(loop_watchdog.run_loop_watchdog())
+        await asyncio.sleep(0)
+        _deliberately_block_the_loop(0.1)
+        await asyncio.sleep(0)
+        watchdog.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await watchdog
+
+    asyncio.run(_scenario())
+
+    snapshot = loop_watchdog.blocking_snapshot()
+    assert snapshot["stalls"] == 0
+    assert snapshot["offenders"] == []
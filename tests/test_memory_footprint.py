@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from ._loader import load_personification_module
+from .test_webui_smoke import _build_client, _login_as_admin, _runtime_context  # noqa: F401
+
+
+memory_footprint = load_personification_module("plugin.personification.core.memory_footprint")
+runtime_performance = load_personification_module("plugin.personification.core.runtime_performance")
+
+
+@pytest.fixture(autouse=True)
+def _reset_memory_footprint():
+    memory_footprint.reset_for_testing()
+    yield
+    memory_footprint.reset_for_testing()
+    with runtime_performance._REPORTER_LOCK:
+        for name in [key for key in runtime_performance._CACHE_REPORTERS if key.startswith("test_")]:
+            runtime_performance._CACHE_REPORTERS.pop(name, None)
+
+
+def test_deep_size_estimate_extrapolates_from_samples() -> None:
+    small = {f"k{index}": f"{index}" * 1000 for index in range(10)}
+    exact = sys.getsizeof(small) + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in small.items())
+    assert memory_footprint.estimate_deep_size(small) == exact
+
+    large = {f"key-{index:05d}": [f"{index:05d}" * 100, index] for index in range(5000)}
+    per_item = sys.getsizeof("key-00000") + sys.getsizeof(["", 0]) + sys.getsizeof("0" * 500)
+    estimate = memory_footprint.estimate_deep_size(large)
+    expected = sys.getsizeof(large) + per_item * 5000
+    assert expected * 0.8 <= estimate <= expected * 1.3
+
+
+def test_budget_alert_fires_once_per_crossing_and_reports_growth() -> None:
+    warnings: list[str] = []
+    cache: dict[str, str] = {}
+    memory_footprint.configure_memory_footprint(
+        SimpleNamespace(personification_cache_memory_budget_mb=32.0),
+        logger=SimpleNamespace(warning=warnings.append),
+    )
+    runtime_performance.register_cache_reporter("test_cache", footprint=lambda: cache, footprint_budget_bytes=50_000)
+    runtime_performance.register_cache_reporter("test_broken", footprint=lambda: 1 / 0)
+
+    memory_footprint.sample_footprints()
+    for index in range(200):
+        cache[str(index)] = str(index) * 1000
+    memory_footprint.sample_footprints()
+    memory_footprint.sample_footprints()
+
+    snapshot = memory_footprint.footprint_snapshot()
+    rows = {row["name"]: row for row in snapshot["items"]}
+    assert rows["test_cache"]["entries"] == 200
+    assert rows["test_cache"]["over_budget"] is True
+    assert rows["test_cache"]["growth_bytes"] == 0
+    assert rows["test_broken"]["error"] == "ZeroDivisionError"
+    assert rows["test_broken"]["budget_bytes"] == 32 * 1024 * 1024
+    assert [alert["name"] for alert in snapshot["alerts"]] == ["test_cache"]
+    assert len(warnings) == 1 and "test_cache" in warnings[0]
+
+    cache.clear()
+    memory_footprint.sample_footprints()
+    for index in range(200):
+        cache[str(index)] = str(index) * 1000
+    memory_footprint.sample_footprints()
+    assert len(memory_footprint.footprint_snapshot()["alerts"]) == 2
+
+
+def test_tracemalloc_diff_reports_new_allocations() -> None:
+    with pytest.raises(RuntimeError):
+        memory_footprint.tracemalloc_diff()
+    status = memory_footprint.start_tracemalloc(frames=1)
+    assert status["tracing"] is True
+    hoard = [bytearray(4096) for _ in range(200)]
+    diff = memory_footprint.tracemalloc_diff(limit=5)
+    assert diff["total_diff_bytes"] >= 4096 * 200
+    assert any("test_memory_footprint.py" in item["location"] for item in diff["top"])
+    del hoard
+    assert memory_footprint.stop_tracemalloc()["tracing"] is False
+
+
+def test_memory_routes_require_admin_and_guard_tracemalloc(_runtime_context) -> None:
+    client = _build_client(_runtime_context)
+    assert client.get("/personification/api/performance/memory").status_code in {401, 403}
+    _login_as_admin(client, _runtime_context)
+
+    payload = client.get("/personification/api/performance/memory", params={"refresh": "true"}).json()
+    assert payload["sampled_at"] is not None
+    assert any(row["name"] == "runtime_metrics_timings" for row in payload["items"])
+    assert "memory" in client.get("/personification/api/performance/runtime").json()
+
+    base = "/personification/api/performance/memory/tracemalloc"
+    assert client.post(f"{base}/diff", json={}).status_code == 409
+    assert client.post(f"{base}/start", json={"frames": 99}).status_code == 422
+    assert client.post(f"{base}/start", json={"frames": 1}).json()["tracing"] is True
+    assert "top" in client.post(f"{base}/diff", json={"limit": 3}).json()
+    assert client.post(f"{base}/stop", json={}).json()["tracing"] is False
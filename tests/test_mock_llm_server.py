@@ -0,0 +1,194 @@
+"""mock_llm_server 与 bench_reply_pipeline 脚本的 smoke 测试。
+
+- 三套线协议经插件真实 caller 往返（非流式 / 流式 / 工具调用）
+- 默认回复按 seed 确定、内置规则返回合法判别 JSON、延迟档位生效
+- 基准脚本的语料还原与分位数汇总
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from ._loader import load_personification_module
+
+_SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "nonebot_plugin_personification" / "scripts"
+_CORPUS_DIR = Path(__file__).parent / "replay_corpus"
+
+impl = load_personification_module("plugin.personification.skills.skillpacks.tool_caller.scripts.impl")
+llm_stream = load_personification_module("plugin.personification.core.llm_stream")
+
+_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "weather",
+            "description": "查询天气",
+            "parameters": {"type": "object", "properties": {"city": {"type": "string"}}},
+        },
+    }
+]
+
+
+def _load_script(name: str):
+    module_name = f"personification_{name}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, _SCRIPTS_DIR / f"{name}.py")
+    if spec is None or spec.loader is None:
+        raise ImportError(f"cannot load {name} script")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+mock = _load_script("mock_llm_server")
+bench = _load_script("bench_reply_pipeline")
+
+
+class _Sink:
+    def __init__(self) -> None:
+        self.parts: list[str] = []
+
+    def begin_attempt(self) -> None:
+        self.parts.clear()
+
+    def feed(self, text: str) -> None:
+        self.parts.append(text)
+
+
+def _caller(protocol: str, base_url: str):
+    if protocol == "openai":
+        return impl.OpenAIToolCaller(api_key="mock", base_url=f"{base_url}/v1", model="mock-openai")
+    if protocol == "anthropic":
+        return impl.AnthropicToolCaller(api_key="mock", base_url=base_url, model="mock-anthropic")
+    return impl.GeminiToolCaller(api_key="mock", base_url=f"{base_url}/v1beta", model="mock-gemini")
+
+
+@pytest.mark.parametrize("protocol", ["openai", "anthropic", "gemini"])
+def test_wire_protocols_round_trip_through_plugin_callers(protocol: str) -> None:
+    rule = mock.ScriptRule(
+        name="weather",
+        scope="user",
+        match="天气",
+        tool_calls=[{"name": "weather", "arguments": {"city": "上海"}}],
+    )
+
+    async def _main():
+        async with mock.MockLLMServer(rules=[rule]) as server:
+            caller = _caller(protocol, server.base_url)
+            plain = await caller.chat_with_tools(
+                [{"role": "system", "content": "你是群友"}, {"role": "user", "content": "在吗"}], [], False
+            )
+            tool = await caller.chat_with_tools([{"role": "user", "content": "上海天气怎么样"}], _TOOLS, False)
+            sink = _Sink()
+            with llm_stream.stream_text_deltas(sink):
+                streamed = await caller.chat_with_tools(
+                    [{"role": "system", "content": "你是群友"}, {"role": "user", "content": "在吗"}], [], False
+                )
+            return plain, tool, streamed, sink.parts, dict(server.stats)
+
+    plain, tool, streamed, parts, stats = asyncio.run(_main())
+
+    assert plain.content in mock._DEFAULT_REPLIES
+    assert [(call.name, call.arguments) for call in tool.tool_calls] == [("weather", {"city": "上海"})]
+    # 同一请求不论流式与否都拿到同一条确定性回复
+    assert streamed.content == plain.content
+    assert len(parts) > 1 and "".join(parts) == plain.content
+    assert stats["requests"] == 3
+    assert stats["stream_requests"] == 1
+    assert stats["by_protocol"] == {protocol: 3}
+
+
+def test_replies_are_seeded_and_rules_respect_tool_results_and_limits() -> None:
+    def _request(user_text: str, *, system: str = "", after_tool: bool = False):
+        return mock.MockRequest(
+            protocol="openai",
+            model="m",
+            stream=False,
+            system_text=system,
+            user_text=user_text,
+            tool_names=["weather"],
+            after_tool_result=after_tool,
+            prompt_chars=10,
+        )
+
+    first = mock.MockLLMServer(seed=3)
+    again = mock.MockLLMServer(seed=3)
+    replies = [first.decide(_request(f"消息{i}")).content for i in range(8)]
+    assert replies == [again.decide(_request(f"消息{i}")).content for i in range(8)]
+    assert len(set(replies)) > 1
+
+    frame = first.decide(_request("在吗", system='输出 JSON {"chat_intent":"banter|explanation|lookup"}'))
+    assert frame.rule == "semantic_frame"
+    assert json.loads(frame.content)["chat_intent"] == "banter"
+
+    server = mock.MockLLMServer(
+        rules=[
+            mock.ScriptRule.from_dict(
+                {"name": "once", "match": "天气", "scope": "user", "content": "晴", "times": 1}
+            ),
+            mock.ScriptRule.from_dict(
+                {"name": "tool", "match": "下雨", "tool_calls": [{"name": "weather", "arguments": {}}]}
+            ),
+        ],
+        builtin_rules=False,
+    )
+    assert server.decide(_request("天气")).content == "晴"
+    assert server.decide(_request("天气")).rule == "default"
+    assert server.decide(_request("下雨吗")).rule == "tool"
+    # 工具结果已经回来时不再重复发起调用，Agent 循环能正常收尾
+    assert server.decide(_request("下雨吗", after_tool=True)).rule == "default"
+
+
+def test_latency_profile_delays_first_token() -> None:
+    async def _main():
+        profile = mock.LatencyProfile(first_token_ms=80.0, tokens_per_second=0.0)
+        async with mock.MockLLMServer(profile=profile) as server:
+            caller = _caller("openai", server.base_url)
+            started = time.perf_counter()
+            await caller.chat_with_tools([{"role": "user", "content": "在吗"}], [], False)
+            return time.perf_counter() - started
+
+    assert asyncio.run(_main()) >= 0.07
+    assert set(mock.LATENCY_PROFILES) >= {"instant", "fast", "typical", "slow"}
+
+
+def test_bench_turns_are_restored_from_replay_corpus() -> None:
+    assert bench.extract_current_message(
+        [{"role": "system", "content": "群聊\n# 当前需要回应的最新消息\nfriend_a: 今晚去打粥吗"}]
+    ) == ("friend_a", "今晚去打粥吗")
+    assert bench.extract_current_message([{"role": "user", "content": "没有标记"}]) == ("", "")
+
+    turns, skipped = bench.load_turns([str(_CORPUS_DIR / "*.jsonl")])
+
+    assert turns and {turn.scene for turn in turns} <= {"group", "private"}
+    assert all(turn.text for turn in turns)
+    qzone_records = sum(1 for line in (_CORPUS_DIR / "sample_qzone.jsonl").read_text(encoding="utf-8").splitlines() if line.strip())
+    assert skipped >= qzone_records
+
+
+def test_bench_summary_reports_percentiles_and_per_turn_costs() -> None:
+    samples = [
+        bench.TurnSample(scene="group" if i % 2 else "private", latency_ms=float(i), llm_calls=i % 3, db_writes=2, replied=True)
+        for i in range(1, 101)
+    ]
+
+    summary = bench.summarize(samples)
+
+    overall = summary["overall"]
+    assert (overall["p50_ms"], overall["p95_ms"], overall["p99_ms"]) == (50.0, 95.0, 99.0)
+    assert overall["db_writes_per_turn"] == 2.0
+    assert set(summary["by_scene"]) == {"group", "private"}
+    report = bench.render_report(summary, {"profile": "instant"})
+    assert "| 全部 | 100 | 100 | 0 | 50 | 95 | 99 | 100 |" in report
+    assert bench.parse_overrides(["personification_turn_preflight_enabled=true", "x=abc"]) == {
+        "personification_turn_preflight_enabled": True,
+        "x": "abc",
+    }
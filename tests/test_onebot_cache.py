@@ -281,3 +281,52 @@ def test_group_member_proof_uses_call_api_fallback_and_deduplicates_inflight() -
     results = asyncio.run(_run())
     assert all(item == {"group_id": 20001, "user_id": 10001} for item in results)
     assert bot.calls == 1
+
+
+def test_get_onebot_message_deduplicates_inflight_and_caches() -> None:
+    class _MsgBot:
+        self_id = "90001"
+
+        def __init__(self) -> None:
+            self.calls: list[dict] = []
+
+        async def get_msg(self, **kwargs) -> dict:
+            self.calls.append(dict(kwargs))
+            await asyncio.sleep(0.01)
+            return {"data": {"message_id": 42, "message": [{"type": "text", "data": {"text": "原文"}}]}}
+
+    bot = _MsgBot()
+
+    async def _run() -> list[dict | None]:
+        return await asyncio.gather(*(onebot_cache.get_onebot_message(bot, "42") for _index in range(6)))
+
+    results = asyncio.run(_run())
+    again = asyncio.run(onebot_cache.get_onebot_message(bot, 42))
+
+    assert bot.calls == [{"message_id": 42}]
+    assert all(item == {"message_id": 42, "message": [{"type": "text", "data": {"text": "原文"}}]} for item in results)
+    assert again == results[0]
+
+
+def test_get_onebot_message_timeout_does_not_cancel_shared_request() -> None:
+    class _SlowBot:
+        self_id = "90001"
+        calls = 0
+
+        async def get_msg(self, **kwargs) -> dict:
+            _SlowBot.calls += 1
+            await asyncio.sleep(1.2)
+            return {"message_id": kwargs["message_id"], "message": []}
+
+    bot = _SlowBot()
+
+    async def _run() -> tuple[dict | None, dict | None]:
+        impatient = asyncio.create_task(onebot_cache.get_onebot_message(bot, "7", timeout_seconds=1.0))
+        patient = asyncio.create_task(onebot_cache.get_onebot_message(bot, "7", timeout_seconds=5.0))
+        return await impatient, await patient
+
+    impatient, patient = asyncio.run(_run())
+
+    assert impatient is None
+    assert patient == {"message_id": 7, "message": []}
+    assert _SlowBot.calls == 1
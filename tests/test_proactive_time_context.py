@@ -32,14 +32,13 @@ def test_proactive_messages_include_shared_time_context() -> None:
         now=now,
     )
 
-    assert messages[0]["role"] == "system"
-    assert "[personification:current_time_context]" in messages[0]["content"]
-    assert "2026-06-24 21:35:00" in messages[0]["content"]
-    assert "晚上" in messages[0]["content"]
-    assert messages[1:] == [
-        {"role": "system", "content": "角色设定"},
-        {"role": "user", "content": "主动私聊决策"},
-    ]
+    # 静态人设在前，时间块紧随其后，前缀缓存只看得到不变的部分
+    assert messages[0] == {"role": "system", "content": "角色设定"}
+    assert messages[1]["role"] == "system"
+    assert "[personification:current_time_context]" in messages[1]["content"]
+    assert "2026-06-24 21:35:00" in messages[1]["content"]
+    assert "晚上" in messages[1]["content"]
+    assert messages[2] == {"role": "user", "content": "主动私聊决策"}
 
 
 def test_proactive_time_context_injection_is_idempotent() -> None:
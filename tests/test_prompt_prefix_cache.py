@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from datetime import datetime
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+from ._loader import load_personification_module
+
+
+pipeline_context = load_personification_module("plugin.personification.handlers.reply_pipeline.pipeline_context")
+context_policy = load_personification_module("plugin.personification.core.context_policy")
+time_ctx = load_personification_module("plugin.personification.core.time_ctx")
+impl = load_personification_module("plugin.personification.skills.skillpacks.tool_caller.scripts.impl")
+responder = load_personification_module("plugin.personification.agent.runtime.responder")
+
+
+def _parts(**overrides):
+    kwargs = dict(
+        base_prompt="你是群友小白，说话短。",
+        user_name="阿明",
+        level_name="熟人",
+        combined_attitude="随意",
+        emotion_block="## 当前情绪\n- 有点困",
+        is_private_session=False,
+        prelude_chunks=["[召回记忆] 阿明昨天在加班"],
+        context_chunks=["[最近消息] 阿明：好累"],
+        postlude_chunks=[],
+        plugin_summary="天气插件",
+    )
+    kwargs.update(overrides)
+    return pipeline_context.build_base_system_prompt_parts(**kwargs)
+
+
+def test_stable_prefix_is_byte_identical_across_volatile_turn_state() -> None:
+    stable, volatile = _parts()
+    other_stable, other_volatile = _parts(
+        user_name="小红",
+        level_name="陌生人",
+        emotion_block="",
+        prelude_chunks=[],
+        context_chunks=["[最近消息] 小红：在吗"],
+        has_visual_context=True,
+        photo_like=True,
+    )
+
+    assert stable == other_stable
+    assert stable.startswith("你是群友小白")
+    assert stable.count(context_policy.PROMPT_INJECTION_GUARD_MARKER) == 1
+    for volatile_text in ("阿明", "有点困", "召回记忆", "好累"):
+        assert volatile_text not in stable and volatile_text in volatile
+    assert "真实照片" in other_volatile
+    assert _parts(is_private_session=True)[0] != stable
+
+    joined = pipeline_context.build_base_system_prompt(
+        base_prompt="你是群友小白，说话短。",
+        user_name="阿明",
+        level_name="熟人",
+        combined_attitude="随意",
+        emotion_block="",
+        is_private_session=False,
+        prelude_chunks=[],
+        context_chunks=[],
+        postlude_chunks=[],
+    )
+    assert joined.startswith(_parts(plugin_summary="")[0])
+    assert joined.count(context_policy.PROMPT_INJECTION_GUARD_MARKER) == 1
+
+
+def test_time_block_and_cache_breakpoints_follow_the_static_prefix() -> None:
+    now = datetime(2026, 6, 24, 21, 35, tzinfo=ZoneInfo("Asia/Shanghai"))
+    messages = time_ctx.inject_current_time_context(
+        [
+            {"role": "system", "content": "静态人设"},
+            {"role": "system", "content": "本轮提示"},
+            {"role": "user", "content": "你好"},
+        ],
+        now=now,
+    )
+    assert [message["content"] for message in messages[:2]] == ["静态人设", "本轮提示"]
+    assert "2026-06-24 21:35:00" in messages[2]["content"]
+
+    blocks = impl._anthropic_system_blocks(messages)
+    assert [block["text"] for block in blocks[:2]] == ["静态人设", "本轮提示"]
+    assert blocks[0]["cache_control"] == {"type": "ephemeral"}
+    assert all("cache_control" not in block for block in blocks[1:])
+
+    later = time_ctx.inject_current_time_context(
+        [{"role": "system", "content": "静态人设"}, {"role": "user", "content": "在吗"}],
+        now=datetime(2026, 6, 25, 8, 0, tzinfo=ZoneInfo("Asia/Shanghai")),
+    )
+    assert impl._stable_prefix_cache_key(later) == impl._stable_prefix_cache_key(messages)
+    assert impl._stable_prefix_cache_key([{"role": "user", "content": "hi"}]) == ""
+
+
+def test_persona_responder_instruction_leaves_static_prefix_and_cache_key_untouched() -> None:
+    stable, volatile = _parts()
+    frame = SimpleNamespace(output_mode="chat_short", session_goal="接一句")
+    for messages in (
+        [{"role": "system", "content": stable}, {"role": "system", "content": volatile}, {"role": "user", "content": "好累"}],
+        [{"role": "system", "content": stable}, {"role": "user", "content": "好累"}],
+    ):
+        with_instruction = responder.with_persona_responder_instruction(
+            messages, semantic_frame=frame, is_direct_mention=True
+        )
+        assert with_instruction[0]["content"].encode("utf-8") == stable.encode("utf-8")
+        assert impl._stable_prefix_cache_key(with_instruction) == impl._stable_prefix_cache_key(messages)
+        assert impl._anthropic_system_blocks(with_instruction)[0] == impl._anthropic_system_blocks(messages)[0]
+        assert "PersonaResponder JSON 输出要求" in with_instruction[-2]["content"]
+        assert with_instruction[-1] == messages[-1]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from plugin.personification.core import provider_concurrency, runtime_performance
+
+
+@pytest.fixture(autouse=True)
+def _reset_limits():
+    provider_concurrency.reset_for_testing()
+    yield
+    provider_concurrency.reset_for_testing()
+
+
+def _config(max_limit: int) -> SimpleNamespace:
+    return SimpleNamespace(personification_provider_concurrency_max=max_limit)
+
+
+def _row(name: str) -> dict:
+    return next(item for item in provider_concurrency.concurrency_snapshot() if item["provider"] == name)
+
+
+def test_purpose_priority_puts_replies_ahead_of_background_jobs() -> None:
+    assert provider_concurrency.purpose_priority("reply") == provider_concurrency.PRIORITY_INTERACTIVE
+    assert provider_concurrency.purpose_priority("") == provider_concurrency.PRIORITY_INTERACTIVE
+    assert provider_concurrency.purpose_priority("proactive_private") == provider_concurrency.PRIORITY_PROACTIVE
+    for purpose in ("memory_summarizer_daily", "inner_state_diary", "group_knowledge", "persona_template_repair"):
+        assert provider_concurrency.purpose_priority(purpose) == provider_concurrency.PRIORITY_BACKGROUND
+
+
+def test_queued_waiters_are_released_by_priority_then_arrival() -> None:
+    order: list[str] = []
+
+    async def _main() -> None:
+        config = _config(2)
+        holder = await provider_concurrency.acquire("p", config, purpose="reply")
+
+        async def _wait(label: str, purpose: str) -> None:
+            lease = await provider_concurrency.acquire("p", config, purpose=purpose)
+            order.append(label)
+            await asyncio.sleep(0)
+            lease.release(success=True)
+
+        tasks = []
+        for label, purpose in (
+            ("diary", "inner_state_diary"),
+            ("proactive", "proactive_group_idle"),
+            ("reply-1", "reply"),
+            ("reply-2", "reply"),
+        ):
+            tasks.append(asyncio.create_task(_wait(label, purpose)))
+            await asyncio.sleep(0)
+        row = _row("p")
+        assert (row["limit"], row["in_flight"], row["queued"]) == (1.0, 1, 4)
+        assert row["queued_by_priority"] == {"interactive": 2, "proactive": 1, "background": 1}
+        holder.release(success=False, error_kind="5xx")
+        await asyncio.gather(*tasks)
+
+    asyncio.run(_main())
+
+    assert order == ["reply-1", "reply-2", "proactive", "diary"]
+    row = _row("p")
+    assert (row["in_flight"], row["queued"], row["acquired"], row["queued_total"]) == (0, 0, 5, 4)
+    assert row["max_wait_ms"] >= row["avg_wait_ms"] >= 0
+
+
+def test_limit_grows_additively_when_saturated_and_halves_on_backoff(monkeypatch) -> None:
+    clock = [100.0]
+    monkeypatch.setattr(provider_concurrency.time, "monotonic", lambda: clock[0])
+
+    async def _main() -> None:
+        config = _config(8)
+        leases = [await provider_concurrency.acquire("p", config) for _ in range(4)]
+        assert _row("p")["limit"] == 4.0
+        for lease in leases[:3]:
+            lease.release(success=True)
+        assert _row("p")["limit"] == 4.0
+        leases[3].release(success=True)
+        assert _row("p")["limit"] == 4.25
+
+        first = await provider_concurrency.acquire("p", config)
+        second = await provider_concurrency.acquire("p", config)
+        first.release(success=False, error_kind="rate_limit")
+        second.release(success=False, error_kind="timeout")
+        assert _row("p")["limit"] == 2.12
+        clock[0] += 5
+        lease = await provider_concurrency.acquire("p", config)
+        lease.release(success=False, error_kind="rate_limit")
+        lease.release(success=False, error_kind="rate_limit")
+        assert (_row("p")["limit"], _row("p")["decreases"], _row("p")["in_flight"]) == (1.06, 2, 0)
+
+        lease = await provider_concurrency.acquire("p", config)
+        lease.release(success=False, error_kind="timeout")
+        clock[0] += 5
+        lease = await provider_concurrency.acquire("p", config)
+        lease.release(success=False, error_kind="timeout")
+        assert _row("p")["limit"] == 1.0
+
+    asyncio.run(_main())
+
+
+def test_cancelled_waiter_does_not_leak_slot_and_zero_disables() -> None:
+    async def _main() -> None:
+        config = _config(1)
+        holder = await provider_concurrency.acquire("p", config)
+        waiter = asyncio.create_task(provider_concurrency.acquire("p", config))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        holder.release(success=True)
+        assert _row("p")["in_flight"] == 0
+        assert (await asyncio.wait_for(provider_concurrency.acquire("p", config), 1)).wait_ms == 0
+
+        unlimited = [await provider_concurrency.acquire("free", _config(0)) for _ in range(50)]
+        for lease in unlimited:
+            lease.release(success=True)
+
+    asyncio.run(_main())
+
+    assert [row["provider"] for row in runtime_performance.snapshot()["provider_concurrency"]] == ["p"]
@@ -206,9 +206,135 @@ def test_record_failure_increments_failure_count(tmp_path, monkeypatch) -> None:
     assert stats["last_error_kind"] == "timeout"
 
 
+def test_latency_quantile_uses_recent_successes_only(tmp_path, monkeypatch) -> None:
+    _stub_db_with_table(monkeypatch, tmp_path)
+    for latency in (100, 200, 300, 400):
+        ph.record_request_result(provider_name="pq", latency_ms=latency, success=True)
+    ph.record_request_result(provider_name="pq", latency_ms=90000, success=False, error_kind="timeout")
+    assert ph.latency_quantile("pq", 0.9) is None
+    ph.record_request_result(provider_name="pq", latency_ms=5000, success=True)
+    assert ph.latency_quantile("pq", 0.5) == 300
+    assert ph.latency_quantile("pq", 0.9) == 5000
+    assert ph.latency_quantile("missing", 0.9) is None
+
+
 def test_reset_stats_removes_row(tmp_path, monkeypatch) -> None:
     _stub_db_with_table(monkeypatch, tmp_path)
     ph.record_request_result(provider_name="px", latency_ms=100, success=True)
     assert ph.get_stats("px") is not None
     assert ph.reset_stats("px") is True
     assert ph.get_stats("px") is None
+
+
+def test_record_and_read_stay_in_memory_until_flush(tmp_path, monkeypatch) -> None:
+    _stub_db_with_table(monkeypatch, tmp_path)
+    ph.load_persisted_stats()
+    stub = ph.connect_sync
+
+    def _no_db(_path=None):
+        raise AssertionError("hot path should not touch SQLite")
+
+    monkeypatch.setattr(ph, "connect_sync", _no_db)
+    ph.record_request_result(provider_name="pm", latency_ms=400, success=True)
+    ph.record_request_result(provider_name="pm", latency_ms=800, success=False, error_kind="5xx")
+    assert ph.get_stats("pm")["sample_count"] == 2
+    assert "pm" in ph.get_all_stats()
+
+    monkeypatch.setattr(ph, "connect_sync", stub)
+    assert ph.flush_provider_health() >= 1
+    assert ph.flush_provider_health() == 0
+    with stub() as conn:
+        row = conn.execute(
+            "SELECT sample_count, failure_count, last_error_kind FROM provider_health_stats WHERE provider_name='pm'"
+        ).fetchone()
+    assert tuple(row) == (2, 1, "5xx")
+
+    # 重启后从表里恢复，继续在原有样本上累计
+    assert ph.load_persisted_stats() >= 1
+    ph.record_request_result(provider_name="pm", latency_ms=400, success=True)
+    stats = ph.get_stats("pm")
+    assert (stats["sample_count"], stats["success_count"]) == (3, 2)
+
+
+def test_concurrent_records_are_not_lost(tmp_path, monkeypatch) -> None:
+    import threading
+
+    _stub_db_with_table(monkeypatch, tmp_path)
+
+    def _worker() -> None:
+        for _ in range(200):
+            ph.record_request_result(provider_name="pc", latency_ms=100, success=True)
+
+    threads = [threading.Thread(target=_worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = ph.get_stats("pc")
+    assert stats["sample_count"] == stats["success_count"] == 1600
+    assert stats["avg_latency_ms"] == 100.0
+
+
+def _path_db(monkeypatch, current):
+    """按路径各开一个库的 connect_sync；current[0] 是当前 get_db_path。"""
+    import sqlite3
+
+    def _connect(path=None):
+        conn = sqlite3.connect(str(path or current[0]), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS provider_health_stats (provider_name TEXT PRIMARY KEY, "
+            "sample_count INTEGER NOT NULL DEFAULT 0, success_count INTEGER NOT NULL DEFAULT 0, "
+            "failure_count INTEGER NOT NULL DEFAULT 0, avg_latency_ms REAL NOT NULL DEFAULT 0, "
+            "last_request_at REAL, last_success_at REAL, last_failure_at REAL, "
+            "last_error_kind TEXT NOT NULL DEFAULT '', last_seen_at REAL NOT NULL DEFAULT 0)"
+        )
+        return conn
+
+    monkeypatch.setattr(ph, "_STATES", {})
+    monkeypatch.setattr(ph, "_LOADED_PATH", None)
+    monkeypatch.setattr(ph, "connect_sync", _connect)
+    monkeypatch.setattr(ph, "get_db_path", lambda: current[0])
+    return _connect
+
+
+def test_hot_path_never_loads_from_sqlite_before_startup_load(tmp_path, monkeypatch) -> None:
+    _path_db(monkeypatch, [tmp_path / "a.db"])
+
+    def _no_db(_path=None):
+        raise AssertionError("hot path should not touch SQLite")
+
+    monkeypatch.setattr(ph, "connect_sync", _no_db)
+    ph.record_request_result(provider_name="cold", latency_ms=100, success=True)
+    assert ph.get_stats("cold")["sample_count"] == 1
+    assert ph.latency_quantile("cold", 0.5, min_samples=1) == 100
+    assert set(ph.get_all_stats()) == {"cold"}
+
+
+def test_switching_db_path_flushes_old_state_instead_of_dropping_it(tmp_path, monkeypatch) -> None:
+    current = [tmp_path / "a.db"]
+    connect = _path_db(monkeypatch, current)
+    with connect(tmp_path / "b.db") as conn:
+        conn.execute(
+            "INSERT INTO provider_health_stats(provider_name, sample_count, success_count, last_seen_at) "
+            "VALUES ('pb', 7, 7, 1)"
+        )
+        conn.commit()
+
+    assert ph.load_persisted_stats() == 0
+    ph.record_request_result(provider_name="pa", latency_ms=200, success=True)
+    current[0] = tmp_path / "b.db"
+    # 切库后的第一次落盘把旧库的变更写回旧库，再换成新库的状态
+    assert ph.flush_provider_health() == 1
+    with connect(tmp_path / "a.db") as conn:
+        assert conn.execute("SELECT sample_count FROM provider_health_stats WHERE provider_name='pa'").fetchone()[0] == 1
+    assert set(ph.get_all_stats()) == {"pb"}
+    assert ph.get_stats("pb")["sample_count"] == 7
+
+    ph.record_request_result(provider_name="pa", latency_ms=200, success=True)
+    current[0] = tmp_path / "a.db"
+    assert ph.load_persisted_stats() == 1
+    # 切换前新记的样本写回了 b 库，没有被丢掉
+    with connect(tmp_path / "b.db") as conn:
+        assert conn.execute("SELECT sample_count FROM provider_health_stats WHERE provider_name='pa'").fetchone()[0] == 1
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from plugin.personification.core import provider_health, provider_hedge, provider_router, token_ledger
+from plugin.personification.core.llm_context import reset_llm_context, set_llm_context
+from plugin.personification.core.llm_stream import emit_text_delta, stream_text_deltas
+from plugin.personification.skills.skillpacks.tool_caller.scripts.impl import ToolCallerResponse
+
+
+class _Logger:
+    def __init__(self) -> None:
+        self.infos: list[str] = []
+
+    def info(self, message, *_args, **_kwargs) -> None:  # noqa: ANN001
+        self.infos.append(str(message))
+
+    def warning(self, *_args, **_kwargs) -> None:
+        return None
+
+    def error(self, *_args, **_kwargs) -> None:
+        return None
+
+
+class _Sink:
+    def __init__(self) -> None:
+        self.texts: list[str] = []
+
+    def begin_attempt(self) -> None:
+        return None
+
+    def feed(self, text: str) -> None:
+        self.texts.append(text)
+
+
+def _provider(name: str) -> dict:
+    return {"name": name, "api_type": "openai", "model": f"{name}-model", "max_retries": 1}
+
+
+def _config(purposes: str = "reply", ratio: float = 0.1) -> SimpleNamespace:
+    return SimpleNamespace(personification_hedge_purposes=purposes, personification_hedge_budget_ratio=ratio)
+
+
+@pytest.fixture(autouse=True)
+def _reset_hedge():
+    provider_hedge.reset_for_testing(tokens=1.0)
+    yield
+    provider_hedge.reset_for_testing(tokens=1.0)
+
+
+def _install_providers(monkeypatch, delays: dict[str, float], *, stream_first: bool = False) -> list[str]:
+    cancelled: list[str] = []
+
+    async def _fake_call(provider, _messages, **_kwargs):  # noqa: ANN001
+        name = provider["name"]
+        try:
+            if stream_first:
+                emit_text_delta(f"{name}-delta")
+            await asyncio.sleep(delays[name])
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+        return ToolCallerResponse("stop", f"from {name}", [], {})
+
+    monkeypatch.setattr(provider_router, "_call_provider_once", _fake_call)
+    monkeypatch.setattr(provider_hedge, "hedge_delay_seconds", lambda _name: 0.05)
+    return cancelled
+
+
+async def _hedged_chain(config: SimpleNamespace, logger: _Logger, *, purpose: str = "reply"):
+    token = set_llm_context(purpose=purpose)
+    try:
+        return await provider_router._try_provider_chain_hedged(
+            [_provider("primary"), _provider("backup")],
+            messages=[{"role": "user", "content": "hi"}],
+            plugin_config=config,
+            logger=logger,
+        )
+    finally:
+        reset_llm_context(token)
+
+
+def test_hedge_delay_uses_recent_p90_with_clamps(monkeypatch) -> None:
+    quantiles = {"cold": None, "slow": 5000.0, "fast": 10.0, "stuck": 90000.0}
+    monkeypatch.setattr(
+        provider_health,
+        "latency_quantile",
+        lambda name, quantile, *, min_samples: quantiles[name] if quantile == 0.9 and min_samples == 5 else None,
+    )
+
+    assert provider_hedge.hedge_delay_seconds("cold") == 8.0
+    assert provider_hedge.hedge_delay_seconds("slow") == 5.0
+    assert provider_hedge.hedge_delay_seconds("fast") == 1.5
+    assert provider_hedge.hedge_delay_seconds("stuck") == 30.0
+
+
+def test_hedge_budget_limits_extra_requests_to_ratio() -> None:
+    provider_hedge.reset_for_testing(tokens=0.0)
+    config = _config(ratio=0.25)
+    granted = 0
+    for _ in range(40):
+        provider_hedge.note_hedgeable_request(config)
+        granted += provider_hedge.try_acquire_hedge()
+
+    assert granted == 10
+    snapshot = provider_hedge.hedge_snapshot()
+    assert (snapshot["eligible"], snapshot["hedged"], snapshot["budget_denied"]) == (40, 10, 30)
+    assert provider_hedge.hedging_enabled_for(_config("reply, proactive"), "proactive")
+    assert provider_hedge.hedging_enabled_for(_config("*"), "anything")
+    assert not provider_hedge.hedging_enabled_for(_config(""), "reply")
+
+
+def test_slow_primary_is_hedged_and_cancelled(monkeypatch) -> None:
+    cancelled = _install_providers(monkeypatch, {"primary": 5.0, "backup": 0.01})
+    hedges: list[dict] = []
+    monkeypatch.setattr(token_ledger, "record_llm_hedge", lambda **kwargs: hedges.append(kwargs))
+    logger = _Logger()
+
+    response, errors, _attempts, _vision = asyncio.run(_hedged_chain(_config(), logger))
+
+    assert response.content == "from backup"
+    assert errors == []
+    assert cancelled == ["primary"]
+    assert hedges == [{"model": "primary-model", "hedge_won": True, "purpose": "reply"}]
+    assert any("hedging slow provider=primary" in line for line in logger.infos)
+    assert provider_hedge.hedge_snapshot()["hedge_wins"] == 1
+
+
+def test_hedging_stays_sequential_when_disabled_or_out_of_budget(monkeypatch) -> None:
+    cancelled = _install_providers(monkeypatch, {"primary": 0.15, "backup": 0.01})
+    monkeypatch.setattr(token_ledger, "record_llm_hedge", lambda **_kwargs: pytest.fail("unexpected hedge"))
+
+    response = asyncio.run(_hedged_chain(_config(), _Logger(), purpose="summary"))[0]
+    assert response.content == "from primary"
+
+    provider_hedge.reset_for_testing(tokens=0.0)
+    response = asyncio.run(_hedged_chain(_config(ratio=0.0), _Logger()))[0]
+    assert response.content == "from primary"
+    assert provider_hedge.hedge_snapshot()["budget_denied"] == 1
+    assert cancelled == []
+
+
+def test_first_stream_delta_counts_as_primary_response(monkeypatch) -> None:
+    cancelled = _install_providers(monkeypatch, {"primary": 0.15, "backup": 0.01}, stream_first=True)
+    sink = _Sink()
+
+    async def _main():
+        with stream_text_deltas(sink):
+            return await _hedged_chain(_config(), _Logger())
+
+    response = asyncio.run(_main())[0]
+
+    assert response.content == "from primary"
+    assert sink.texts == ["primary-delta"]
+    assert cancelled == []
+    assert provider_hedge.hedge_snapshot()["hedged"] == 0
@@ -50,8 +50,12 @@ def test_reply_paths_commit_ordered_history_before_releasing_delivery_gate() ->
     normal = (root / "handlers" / "reply_pipeline" / "processor.py").read_text(encoding="utf-8")
     yaml = (root / "handlers" / "yaml_pipeline" / "processor.py").read_text(encoding="utf-8")
 
+    normal_helper = normal.index("def _append_assistant_reply_history(")
+    assert normal.index("session.append_session_message(", normal_helper) < normal.index(
+        "async def _close_early_sent_turn(", normal_helper
+    )
     normal_delivery = normal.index("mark_reply_phase(state, \"delivery_history_commit\")")
-    normal_history = normal.index("session.append_session_message(", normal_delivery)
+    normal_history = normal.index("_append_assistant_reply_history(", normal_delivery)
     normal_release = normal.index("release_reply_commit(state)", normal_history)
     normal_emotion = normal.index("await persist_reply_emotion_state(", normal_release)
     assert normal_delivery < normal_history < normal_release < normal_emotion
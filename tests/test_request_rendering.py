@@ -0,0 +1,99 @@
+"""Agent 多步请求增量渲染：跨步 / 浅拷贝命中、原地修改失效、预序列化请求体与整段序列化逐字节一致。"""
+from __future__ import annotations
+
+import copy
+import json
+
+from ._loader import load_personification_module
+
+rendering = load_personification_module("plugin.personification.core.request_rendering")
+impl = load_personification_module("plugin.personification.skills.skillpacks.tool_caller.scripts.impl")
+
+_IMAGE = "data:image/png;base64," + "iVBORw0KGgo" * 2000
+
+
+def _turn() -> list[dict]:
+    return [
+        {"role": "system", "content": "你是群里的老朋友"},
+        {"role": "user", "content": "昨天那家店叫什么来着"},
+        {"role": "assistant", "content": "好像是巷子口那家"},
+        {"role": "user", "content": [{"type": "text", "text": "这张图里的"}, {"type": "image_url", "image_url": {"url": _IMAGE}}]},
+    ]
+
+
+def _tool_step(index: int) -> list[dict]:
+    call_id = f"call_{index}"
+    return [
+        {
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [{"id": call_id, "type": "function", "function": {"name": "web_search", "arguments": '{"q":"店名"}'}}],
+        },
+        {"role": "tool", "tool_call_id": call_id, "content": f"第 {index} 次搜索结果"},
+    ]
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def setup_function() -> None:
+    rendering.reset_for_testing()
+
+
+def test_agent_steps_only_render_new_messages_and_body_matches_plain_json() -> None:
+    messages = _turn()
+    for step in range(3):
+        messages.extend(_tool_step(step))
+        # chat_with_tools 会先浅拷贝整份消息，值对象不变
+        copied = [dict(message) for message in messages]
+        _system, contents = impl._convert_messages_to_gemini(copied)
+        expected = [item for message in messages[1:] for item in impl._gemini_contents_from_message(message)]
+        payload = {"contents": contents, "generationConfig": {"temperature": 0.5}}
+
+        assert contents == expected
+        assert rendering.encode_json_body(payload) == _dumps({**payload, "contents": expected})
+
+    gemini = rendering.request_render_cache_snapshot()["protocols"]["gemini"]
+    # 5 条起步，之后每步只新渲染 2 条
+    assert (gemini["hits"], gemini["misses"]) == (5 + 7, 5 + 2 + 2)
+
+    impl._convert_messages_to_anthropic(messages)
+    impl._convert_messages_to_anthropic(messages + _tool_step(9))
+    anthropic = rendering.request_render_cache_snapshot()["protocols"]["anthropic"]
+    assert (anthropic["hits"], anthropic["misses"]) == (9, 11)
+
+
+def test_in_place_edits_miss_and_edited_lists_fall_back_to_plain_json() -> None:
+    messages = _turn() + _tool_step(0)
+    _instructions, first = impl._openai_responses_input(messages)
+
+    messages[-1]["content"] = "结果被压缩过了"
+    messages[3]["content"].append({"type": "text", "text": "补一句"})
+    _instructions, second = impl._openai_responses_input(messages)
+
+    assert second[-1]["output"] == "结果被压缩过了"
+    assert second[2]["content"][-1] == {"type": "input_text", "text": "补一句"}
+    assert first[-1]["output"] == "第 0 次搜索结果"
+
+    second.append({"type": "function_call_output", "call_id": "extra", "output": "调用方追加"})
+    body = rendering.encode_json_body({"input": second})
+    assert json.loads(body)["input"][-1]["call_id"] == "extra"
+    assert body == _dumps({"input": list(second)})
+    assert copy.deepcopy(second) == second
+
+
+def test_character_budget_evicts_oldest_segments(monkeypatch) -> None:
+    monkeypatch.setattr(rendering, "_CACHE_MAX_CHARS", len(_IMAGE) * 3)
+    first = [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": _IMAGE}}]}]
+    second = [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": _IMAGE + "QQ"}}]}]
+
+    impl._convert_messages_to_anthropic(first)
+    impl._convert_messages_to_anthropic(second)
+    impl._convert_messages_to_anthropic(first)
+
+    snapshot = rendering.request_render_cache_snapshot()
+    assert snapshot["entries"] == 1
+    assert snapshot["evictions"] == 2
+    assert snapshot["hits"] == 0
+    assert snapshot["cached_chars"] <= len(_IMAGE) * 3
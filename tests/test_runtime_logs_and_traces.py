@@ -460,3 +460,82 @@ def test_process_view_uses_explicit_stage_elapsed_without_changing_visible_detai
     assert view["items"][0]["detail"] == "实际可见回复"
     assert view["items"][0]["duration_ms"] == 0
     assert view["items"][1]["duration_ms"] == 2500
+
+
+def test_reply_turn_stages_are_queued_rows_visible_before_flush(_db_tmp, monkeypatch) -> None:
+    import threading
+
+    traces = load_personification_module("plugin.personification.core.reply_turn_trace")
+    db = load_personification_module("plugin.personification.core.db")
+    traces.flush_pending()
+    gate = threading.Event()
+    original = traces._write_stage_batch
+
+    def _gated(db_path, entries):
+        gate.wait(5)
+        return original(db_path, entries)
+
+    monkeypatch.setattr(traces, "_write_stage_batch", _gated)
+    trace_id = traces.start_trace(session_type="private", user_id="9")
+    for index in range(85):
+        traces.record_stage(trace_id=trace_id, key=f"s{index}", label="阶段", elapsed_ms=index)
+
+    pending_view = traces.get_trace(trace_id)
+    assert [stage["key"] for stage in pending_view["stages"]][:2] == ["s5", "s6"]
+    assert len(pending_view["stages"]) == 80
+
+    gate.set()
+    assert traces.flush_pending()
+    with db.connect_sync() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM reply_turn_stages WHERE trace_id=?", (trace_id,)).fetchone()[0]
+        legacy = conn.execute("SELECT stages FROM reply_turn_traces WHERE trace_id=?", (trace_id,)).fetchone()[0]
+        plan = " ".join(
+            str(row["detail"])
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM reply_turn_stages WHERE trace_id IN (?) ORDER BY trace_id, seq",
+                (trace_id,),
+            ).fetchall()
+        )
+    assert count == 85
+    assert legacy == "[]"
+    assert "idx_reply_turn_stages_trace" in plan
+    flushed = traces.get_trace(trace_id)
+    assert flushed["stages"] == pending_view["stages"]
+    assert flushed["stages"][-1]["elapsed_ms"] == 84
+    assert traces.writer_status()["pending"] == 0
+
+
+def test_reply_turn_trace_reads_legacy_json_stages_and_prunes_in_batches(_db_tmp, monkeypatch) -> None:
+    import json
+    import time
+
+    traces = load_personification_module("plugin.personification.core.reply_turn_trace")
+    db = load_personification_module("plugin.personification.core.db")
+    traces.flush_pending()
+    old_ts = time.time() - 30 * 86400
+    with db.connect_sync() as conn:
+        conn.execute(
+            "INSERT INTO reply_turn_traces(trace_id, ts, stages) VALUES ('legacy', ?, ?)",
+            (time.time(), json.dumps([{"ts": 1.0, "key": "ingress", "label": "进入"}])),
+        )
+        conn.executemany(
+            "INSERT INTO reply_turn_traces(trace_id, ts) VALUES (?, ?)",
+            [(f"old{index}", old_ts) for index in range(7)],
+        )
+        conn.executemany(
+            "INSERT INTO reply_turn_stages(trace_id, seq, ts) VALUES (?, ?, ?)",
+            [(f"old{index % 7}", index, old_ts) for index in range(23)],
+        )
+        conn.commit()
+
+    assert traces.get_trace("legacy")["stages"][0]["key"] == "ingress"
+
+    monkeypatch.setattr(traces, "_PRUNE_BATCH_SIZE", 5)
+    deleted = traces.prune_old_entries(retention_days=7)
+
+    assert deleted == 7 + 23
+    with db.connect_sync() as conn:
+        remaining = conn.execute("SELECT trace_id FROM reply_turn_traces").fetchall()
+        stage_count = conn.execute("SELECT COUNT(*) FROM reply_turn_stages").fetchone()[0]
+    assert [row["trace_id"] for row in remaining] == ["legacy"]
+    assert stage_count == 0
@@ -26,7 +26,7 @@ def _reset_runtime_metrics():
     runtime_performance.reset_for_testing()
 
 
-def test_metrics_are_bounded_and_keep_recent_percentiles() -> None:
+def test_metrics_are_bounded_and_percentiles_cover_all_samples() -> None:
     for value in range(200):
         metrics.record_timing("reply", float(value), session=str(value))
     for value in range(200):
@@ -34,16 +34,61 @@ def test_metrics_are_bounded_and_keep_recent_percentiles() -> None:
     snapshot = metrics.snapshot_metrics()
     assert snapshot["series"]["used"] <= 256
     assert snapshot["series"]["overflow_total"] > 0
+    assert snapshot["series"]["dropped"]["tool"] > 0
 
     metrics.reset_metrics()
     for value in range(200):
         metrics.record_timing("reply", float(value))
     timing = metrics.snapshot_metrics()["timings"][0]
     assert timing["count"] == 200
-    assert timing["recent_count"] == 128
-    assert timing["recent_max_ms"] == 199.0
-    assert timing["p50_ms"] == 135.0
-    assert timing["p95_ms"] == 193.0
+    assert timing["max_ms"] == 199.0
+    # 直方图覆盖全部样本，而不是只看最近 128 个
+    assert timing["p50_ms"] == pytest.approx(100.0, abs=5.0)
+    assert timing["p95_ms"] == pytest.approx(190.0, abs=5.0)
+
+
+def test_histograms_merge_and_export_openmetrics() -> None:
+    left, right = metrics.Histogram(), metrics.Histogram()
+    for value in (0.5, 12.0, 900.0):
+        left.observe(value)
+    for value in (12.0, 40_000.0, 2_000_000.0):
+        right.observe(value)
+    left.merge(right)
+    assert (left.count, left.max) == (6, 2_000_000.0)
+    assert left.counts[-1] == 1
+    assert sum(left.counts) == 6
+
+    metrics.record_counter("reply_sent", scene='gr"oup')
+    metrics.set_gauge("reply_waiting", 3)
+    metrics.record_timing("reply.latency", 250.0, stage="llm")
+    text = metrics.render_openmetrics()
+
+    assert text.endswith("# EOF\n")
+    assert "# TYPE personification_reply_sent counter" in text
+    assert 'personification_reply_sent_total{scene="gr\\"oup"} 1' in text
+    assert "personification_reply_waiting 3" in text
+    assert "# TYPE personification_reply_latency_seconds histogram" in text
+    assert 'personification_reply_latency_seconds_bucket{stage="llm",le="0.2"} 0' in text
+    assert 'personification_reply_latency_seconds_bucket{stage="llm",le="0.3"} 1' in text
+    assert 'personification_reply_latency_seconds_bucket{stage="llm",le="+Inf"} 1' in text
+    assert 'personification_reply_latency_seconds_sum{stage="llm"} 0.25' in text
+
+
+def test_openmetrics_counter_suffix_and_type_families_do_not_collide() -> None:
+    metrics.record_counter("reply_admission_timeout_total")
+    metrics.record_counter("reply_sent", 2)
+    metrics.set_gauge("reply_sent", 5)
+    text = metrics.render_openmetrics()
+
+    assert "# TYPE personification_reply_admission_timeout counter" in text
+    assert "personification_reply_admission_timeout_total 1" in text
+    assert "_total_total" not in text
+    assert "# TYPE personification_reply_sent counter" in text
+    assert "personification_reply_sent_total 2" in text
+    # 同名 gauge 单独成族，不混进 counter 的 TYPE 下
+    assert "# TYPE personification_reply_sent_gauge gauge" in text
+    assert "personification_reply_sent_gauge 5" in text
+    assert "\npersonification_reply_sent 5" not in text
 
 
 def test_task_supervisor_deduplicates_reports_failure_and_shuts_down() -> None:
@@ -118,11 +163,65 @@ def test_event_loop_sampler_and_runtime_snapshot_are_bounded() -> None:
         "limit": 10,
         "evictions": 1,
     }
+    runtime_performance.register_cache_reporter(
+        "test_hit_cache", lambda: {"entries": 1, "limit": 4, "evictions": 0, "hits": 3, "misses": 1}
+    )
+    hit_item = next(item for item in runtime_performance.snapshot()["caches"] if item["name"] == "test_hit_cache")
+    assert (hit_item["hits"], hit_item["lookups"], hit_item["hit_rate"]) == (3, 4, 0.75)
     rendered = json.dumps(snapshot, ensure_ascii=False).lower()
     assert "cookie" not in rendered
     assert "ignored" not in rendered
 
 
+def test_one_cache_registration_feeds_cache_table_and_memory_ledger() -> None:
+    memory_footprint = load_personification_module("plugin.personification.core.memory_footprint")
+    store = {"a": "x" * 100, "b": "y" * 100}
+    runtime_performance.register_cache_reporter(
+        "test_store", lambda: {"entries": 2, "limit": 8, "evictions": 0}, footprint=lambda: store
+    )
+    runtime_performance.register_cache_reporter("test_plain_dict", footprint=lambda: {"k": 1, "v": 2, "w": 3})
+    with pytest.raises(ValueError):
+        runtime_performance.register_cache_reporter("test_nothing")
+
+    caches = {item["name"]: item for item in runtime_performance.snapshot()["caches"]}
+    assert caches["test_store"]["limit"] == 8
+    # 只登记了根容器的缓存按容器长度报条目数
+    assert caches["test_plain_dict"]["entries"] == 3
+
+    roots = [name for name, _source, _budget in runtime_performance.cache_footprint_roots()]
+    assert {"test_store", "test_plain_dict", "runtime_metrics_timings"} <= set(roots)
+    try:
+        rows = {row["name"]: row for row in memory_footprint.sample_footprints()}
+        assert rows["test_store"]["entries"] == 2
+        assert rows["test_store"]["approx_bytes"] > 200
+        assert memory_footprint.footprint_snapshot()["registered"] == len(roots)
+    finally:
+        memory_footprint.reset_for_testing()
+
+    runtime_performance.reset_for_testing()
+    assert [name for name, _source, _budget in runtime_performance.cache_footprint_roots()] == [
+        "runtime_metrics_timings"
+    ]
+
+
+def test_openmetrics_endpoint_is_opt_in_and_honours_token(_runtime_context) -> None:
+    client = _build_client(_runtime_context)
+    config = _runtime_context.app_module.get_runtime_context().plugin_config
+    assert client.get("/personification/metrics").status_code == 404
+
+    config.personification_metrics_endpoint_enabled = True
+    metrics.record_counter("scrape_probe")
+    response = client.get("/personification/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/openmetrics-text")
+    assert "personification_scrape_probe_total 1" in response.text
+
+    config.personification_metrics_endpoint_token = "s3cret"
+    assert client.get("/personification/metrics").status_code == 401
+    authorized = client.get("/personification/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert authorized.status_code == 200
+
+
 def test_performance_runtime_route_requires_admin(_runtime_context) -> None:
     client = _build_client(_runtime_context)
     assert client.get("/personification/api/performance/runtime").status_code in {401, 403}
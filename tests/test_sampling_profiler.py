@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from ._loader import load_personification_module
+from .test_webui_smoke import _build_client, _login_as_admin, _runtime_context  # noqa: F401
+
+
+sampling_profiler = load_personification_module("plugin.personification.core.sampling_profiler")
+
+
+def _personification_hot_loop(stop: threading.Event) -> None:
+    total = 0
+    while not stop.is_set():
+        for index in range(2000):
+            total += index * index
+
+
+def test_profile_finds_busy_thread_and_emits_collapsed_stacks() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=_personification_hot_loop, args=(stop,), name="hot worker", daemon=True)
+    worker.start()
+    try:
+        result = sampling_profiler.profile(duration_seconds=0.2, rate_hz=500)
+    finally:
+        stop.set()
+        worker.join(timeout=2)
+
+    # 参数被夹到安全范围
+    assert result["rate_hz"] == sampling_profiler.MAX_RATE_HZ
+    assert result["duration_seconds"] >= sampling_profiler.MIN_DURATION_SECONDS
+    assert result["samples"] > 0
+    hot = [item for item in result["top_functions"] if item["function"].startswith("_personification_hot_loop")]
+    assert hot and hot[0]["total_samples"] > 0
+    line = next(row for row in result["collapsed"].splitlines() if "_personification_hot_loop" in row)
+    stack, count = line.rsplit(" ", 1)
+    assert stack.startswith("hot_worker-")
+    assert int(count) > 0
+    # 采样线程自身不应出现在结果里
+    assert "_run (core/sampling_profiler.py" not in result["collapsed"]
+
+
+def test_profile_rejects_concurrent_sessions() -> None:
+    assert sampling_profiler._SESSION_LOCK.acquire(blocking=False)
+    try:
+        assert sampling_profiler.is_running()
+        with pytest.raises(sampling_profiler.ProfilerBusyError):
+            sampling_profiler.profile(duration_seconds=1)
+    finally:
+        sampling_profiler._SESSION_LOCK.release()
+    assert not sampling_profiler.is_running()
+
+
+def test_profile_route_guardrails(_runtime_context) -> None:
+    client = _build_client(_runtime_context)
+    url = "/personification/api/performance/profile"
+    assert client.post(url, json={"duration_seconds": 1}).status_code in {401, 403}
+    _login_as_admin(client, _runtime_context)
+
+    assert client.post(url, json={"duration_seconds": 120}).status_code == 422
+    assert client.post(url, json={"duration_seconds": 1, "rate_hz": 1000}).status_code == 422
+
+    assert sampling_profiler._SESSION_LOCK.acquire(blocking=False)
+    try:
+        assert client.post(url, json={"duration_seconds": 1}).status_code == 409
+    finally:
+        sampling_profiler._SESSION_LOCK.release()
+
+    started = time.monotonic()
+    response = client.post(url, json={"duration_seconds": 1, "rate_hz": 50})
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 0.9
+    payload = response.json()
+    assert payload["rate_hz"] == 50
+    assert payload["ticks"] > 0
+    assert isinstance(payload["top_functions"], list)
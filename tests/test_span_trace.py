@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from ._loader import load_personification_module
+from .test_webui_smoke import _build_client, _login_as_admin, _runtime_context  # noqa: F401
+
+
+span_trace = load_personification_module("plugin.personification.core.span_trace")
+
+
+@pytest.fixture(autouse=True)
+def _reset_span_trace():
+    span_trace.reset_for_testing()
+    yield
+    span_trace.reset_for_testing()
+
+
+def _names_by_parent(detail: dict) -> dict[str, str]:
+    by_id = {row["span_id"]: row["name"] for row in detail["spans"]}
+    return {row["name"]: by_id.get(row["parent_id"], "") for row in detail["spans"]}
+
+
+def test_spans_nest_across_create_task_and_to_thread() -> None:
+    def _blocking_recall() -> None:
+        with span_trace.span("memory.sqlite"):
+            pass
+
+    @span_trace.traced("agent.tool", attr_keys=("tool_name",))
+    async def _tool(*, tool_name: str) -> str:
+        await asyncio.sleep(0)
+        return tool_name
+
+    async def _turn() -> None:
+        with span_trace.turn_span("t1", sample_rate=1.0, session="group"):
+            with span_trace.span("memory.recall"):
+                await asyncio.to_thread(_blocking_recall)
+            await asyncio.gather(
+                asyncio.create_task(_tool(tool_name="web_search")),
+                asyncio.create_task(_tool(tool_name="weather")),
+            )
+            with pytest.raises(RuntimeError):
+                with span_trace.span("onebot.send"):
+                    raise RuntimeError("boom")
+
+    asyncio.run(_turn())
+
+    detail = span_trace.get_turn("t1")
+    assert detail is not None
+    parents = _names_by_parent(detail)
+    assert parents["memory.recall"] == "reply.turn"
+    assert parents["memory.sqlite"] == "memory.recall"
+    assert parents["agent.tool"] == "reply.turn"
+    tools = [row for row in detail["spans"] if row["name"] == "agent.tool"]
+    assert sorted(row["attrs"]["tool_name"] for row in tools) == ["weather", "web_search"]
+    assert len({row["lane"] for row in tools}) == 2
+    sqlite_row = next(row for row in detail["spans"] if row["name"] == "memory.sqlite")
+    assert sqlite_row["lane"].startswith("thread:")
+    assert sqlite_row["depth"] == 2
+    send_row = next(row for row in detail["spans"] if row["name"] == "onebot.send")
+    assert send_row["attrs"]["error"] == "RuntimeError"
+    assert all(not row["open"] for row in detail["spans"])
+    assert detail["duration_ms"] >= max(row["offset_ms"] for row in detail["spans"])
+
+
+def test_unsampled_turns_and_outside_spans_are_noops() -> None:
+    with span_trace.span("orphan"):
+        pass
+    with span_trace.turn_span("skip", sample_rate=0.0):
+        with span_trace.span("inner"):
+            pass
+
+    assert span_trace.recent_turns() == []
+    assert span_trace.get_turn("skip") is None
+    assert span_trace.snapshot()["skipped"] == 1
+
+
+def test_ring_buffer_keeps_latest_turns_and_caps_spans() -> None:
+    for index in range(70):
+        with span_trace.turn_span(f"t{index}", sample_rate=1.0):
+            pass
+    with span_trace.turn_span("big", sample_rate=1.0):
+        for _ in range(600):
+            with span_trace.span("tiny"):
+                pass
+
+    recent = span_trace.recent_turns(limit=64)
+    assert len(recent) == 64
+    assert recent[0]["trace_id"] == "big"
+    assert span_trace.get_turn("t0") is None
+    assert recent[0]["span_count"] == 512
+    assert recent[0]["dropped_spans"] == 600 + 1 - 512
+    assert span_trace.snapshot()["evictions"] == 7
+
+
+def test_chrome_trace_export_shape() -> None:
+    async def _turn() -> None:
+        with span_trace.turn_span("chrome", sample_rate=1.0):
+            with span_trace.span("llm.provider", provider="p1", model="m1"):
+                await asyncio.sleep(0)
+
+    asyncio.run(_turn())
+
+    payload = span_trace.export_chrome_trace("chrome")
+    json.dumps(payload)
+    complete = [event for event in payload["traceEvents"] if event["ph"] == "X"]
+    assert [event["name"] for event in complete] == ["reply.turn", "llm.provider"]
+    assert complete[1]["args"]["provider"] == "p1"
+    assert complete[1]["cat"] == "llm"
+    assert complete[1]["ts"] >= complete[0]["ts"]
+    assert complete[1]["ts"] + complete[1]["dur"] <= complete[0]["ts"] + complete[0]["dur"] + 1
+    assert any(event["ph"] == "M" and event["name"] == "thread_name" for event in payload["traceEvents"])
+    assert payload["displayTimeUnit"] == "ms"
+    assert span_trace.export_chrome_trace("missing") is None
+
+
+def test_trace_routes_require_admin_and_export_attachment(_runtime_context) -> None:
+    with span_trace.turn_span("route-trace", sample_rate=1.0):
+        with span_trace.span("memory.recall"):
+            pass
+    client = _build_client(_runtime_context)
+    assert client.get("/personification/api/performance/traces").status_code in {401, 403}
+    _login_as_admin(client, _runtime_context)
+
+    listing = client.get("/personification/api/performance/traces").json()
+    assert listing["items"][0]["trace_id"] == "route-trace"
+    detail = client.get("/personification/api/performance/traces/route-trace").json()
+    assert [row["name"] for row in detail["spans"]] == ["reply.turn", "memory.recall"]
+    exported = client.get("/personification/api/performance/traces/route-trace/chrome")
+    assert exported.status_code == 200
+    assert "attachment" in exported.headers["content-disposition"]
+    assert exported.json()["traceEvents"]
+    assert client.get("/personification/api/performance/traces/nope").status_code == 404
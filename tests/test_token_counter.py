@@ -0,0 +1,187 @@
+"""上下文 token 计数：近似分段规则、内容哈希缓存、二分截断、计数器切换与回退。"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from ._loader import load_personification_module
+
+token_counter = load_personification_module("plugin.personification.core.token_counter")
+context_policy = load_personification_module("plugin.personification.core.context_policy")
+
+# (文本, tiktoken o200k_base 的真实 token 数)；计数用 tiktoken 0.12 离线算出后写成字面量，
+# 环境里没有 tiktoken / 词表时也能校验近似计数的偏差
+_O200K_FIXTURES = [
+    ("今晚 8 点开黑，有人来吗？", 11),
+    ("The quick brown fox jumps over the lazy dog.", 10),
+    ("刚看完《葬送的芙莉莲》第 28 集，Frieren 和 Himmel 那段回忆太好哭了", 29),
+    ("def handler(event):\n    return await bot.send(event, 'ok')\n", 14),
+    ("订单号 20240101123456，金额 ¥128.50，请在 https://example.com/pay 完成支付", 24),
+    ("哈哈哈哈哈哈笑死我了，你这也太离谱了吧😂😂", 17),
+    ("[群聊] 小明: 明天几点集合？\n[群聊] 小红: 九点半地铁站见\n[群聊] 阿杰: 收到", 36),
+    ("for i in range(10):\n    if i % 2 == 0:\n        print(f\"even {i}\")\n", 25),
+    ("import asyncio\nfrom typing import Any\n\nasync def main() -> None:\n    await asyncio.sleep(1)\n", 22),
+    ("I think the implementation is fine, but we should double-check the configuration before deploying.", 17),
+    ('{"role": "user", "content": "你好", "metadata": {"group_id": 123456}}', 23),
+    ("こんにちは、今日はいい天気ですね。", 8),
+    ("Error: ConnectionResetError(104, 'Connection reset by peer') at line 42", 18),
+    ("请帮我总结一下这篇文章的主要观点，并给出三条建议。", 18),
+    ("GPT-4o 和 Claude 3.5 Sonnet 哪个写代码更好？我觉得各有千秋吧", 26),
+    ('    self.memory_store.save_group_context(group_id=gid, key=str(key or ""), value=entry)\n', 21),
+    ("안녕하세요 반갑습니다. 오늘 회의는 세 시에 시작합니다.", 16),
+]
+_MIXED_SAMPLES = [text for text, _count in _O200K_FIXTURES[:5]]
+
+
+def setup_function() -> None:
+    token_counter.reset_for_testing()
+
+
+def teardown_function() -> None:
+    token_counter.reset_for_testing()
+
+
+def test_heuristic_counts_follow_bpe_like_pieces() -> None:
+    count = token_counter.heuristic_token_count
+
+    assert count("你好，今天天气怎么样？") == 9
+    assert count("hello world") == 2
+    assert count("internationalization") == 3
+    assert count("12345678") == 3
+    assert count("a -> b") == 3
+    assert count("😀") == 1
+    assert count("こんにちは") == 2
+    # 汉字不再按 1.5 倍高估，英文词不再按 4 字符一个低估
+    assert count("今天" * 50) == 70
+    assert count("ok " * 50) == 50
+
+
+def test_heuristic_stays_close_to_recorded_o200k_counts() -> None:
+    total_real = total_estimate = 0
+    for text, real in _O200K_FIXTURES:
+        estimate = token_counter.heuristic_token_count(text)
+        assert abs(estimate - real) <= max(4, real * 0.35), (text, real, estimate)
+        total_real += real
+        total_estimate += estimate
+    # 整体偏差在 10% 以内，长历史累加后不会系统性偏高 / 偏低
+    assert abs(total_estimate - total_real) <= total_real * 0.1
+
+
+def test_counts_are_cached_by_content_and_short_texts_bypass_the_cache() -> None:
+    history = [f"friend_{i % 7}: 第 {i} 条消息，聊聊周末去哪玩比较好 maybe hiking" for i in range(300)]
+
+    first = token_counter.count_chunks_tokens(history)
+    second = token_counter.count_chunks_tokens(list(history))
+    token_counter.count_tokens("短消息")
+
+    snapshot = token_counter.token_counter_snapshot()
+    assert first == second > 0
+    assert (snapshot["misses"], snapshot["hits"]) == (300, 300)
+    assert snapshot["entries"] == 300
+    assert context_policy._estimate_chunks_tokens(history) == first
+
+
+def test_truncation_keeps_the_longest_prefix_within_budget() -> None:
+    text = "".join(_MIXED_SAMPLES) * 3
+
+    for budget in (1, 17, 64, 150):
+        truncated = token_counter.truncate_to_token_budget(text, budget)
+        assert token_counter.count_tokens(truncated) <= budget
+        end = len(truncated)
+        while text[end].isspace():
+            end += 1
+        # 再多留一个字符就会超预算
+        assert token_counter.heuristic_token_count(text[: end + 1]) > budget
+    assert token_counter.truncate_to_token_budget(text, 0) == ""
+    assert context_policy._truncate_text_to_token_budget("  短句  ", 50) == "短句"
+
+
+def test_registered_tokenizer_is_used_and_broken_ones_fall_back(monkeypatch) -> None:
+    monkeypatch.setattr(token_counter, "_FACTORIES", dict(token_counter._FACTORIES))
+    token_counter.register_tokenizer("chars", lambda: len)
+
+    def _broken():
+        raise OSError("vocabulary missing")
+
+    token_counter.register_tokenizer("broken", _broken)
+
+    assert token_counter.configure_token_counter(SimpleNamespace(personification_context_tokenizer="chars")) == "chars"
+    assert token_counter.count_tokens("abc 你好") == 6
+    # 外部分词器走二分截断
+    assert token_counter.truncate_to_token_budget("abcdefgh", 5) == "abcde"
+    assert token_counter.use_tokenizer("broken") == "heuristic"
+    assert token_counter.token_counter_snapshot()["tokenizer"] == "heuristic"
+
+
+def test_auto_only_uses_a_locally_cached_vocabulary(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+    calls: list[str] = []
+    monkeypatch.setattr(token_counter, "_FACTORIES", dict(token_counter._FACTORIES))
+    token_counter.register_tokenizer("tiktoken", lambda: calls.append("load") or len)
+    monkeypatch.setattr(token_counter.importlib.util, "find_spec", lambda _name: object())
+
+    # 词表不在本地缓存：auto 不去下载，直接用近似计数
+    assert token_counter._tiktoken_vocab_cached() is False
+    assert token_counter.use_tokenizer("auto") == "heuristic"
+    assert calls == []
+
+    (tmp_path / token_counter.hashlib.sha1(token_counter._TIKTOKEN_BLOB_URL.encode()).hexdigest()).write_bytes(b"")
+    assert token_counter.use_tokenizer("auto") == "tiktoken"
+    assert calls == ["load"]
+
+
+def test_startup_load_runs_off_loop_and_times_out_to_heuristic(monkeypatch) -> None:
+    monkeypatch.setattr(token_counter, "_FACTORIES", dict(token_counter._FACTORIES))
+    release = threading.Event()
+    loader_threads: list[int] = []
+
+    def _slow():
+        loader_threads.append(threading.get_ident())
+        release.wait(5)
+        return len
+
+    token_counter.register_tokenizer("slow", _slow)
+    warnings: list[str] = []
+    logger = SimpleNamespace(warning=warnings.append)
+    config = SimpleNamespace(personification_context_tokenizer="slow")
+
+    async def _run() -> tuple[str, bool]:
+        ticks = 0
+
+        async def _ticker() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker = asyncio.create_task(_ticker())
+        try:
+            resolved = await token_counter.load_token_counter(config, timeout=0.1, logger=logger)
+        finally:
+            release.set()
+            ticker.cancel()
+        # 加载期间事件循环仍在跑
+        return resolved, ticks > 3
+
+    resolved, loop_alive = asyncio.run(_run())
+    assert (resolved, loop_alive) == ("heuristic", True)
+    assert loader_threads and loader_threads[0] != threading.get_ident()
+    assert len(warnings) == 1 and "slow" in warnings[0]
+    assert token_counter.active_tokenizer() == "heuristic"
+
+    token_counter.register_tokenizer("chars", lambda: len)
+    chars = SimpleNamespace(personification_context_tokenizer="chars")
+    assert asyncio.run(token_counter.load_token_counter(chars, logger=logger)) == "chars"
+    assert token_counter.count_tokens("abc") == 3
+
+
+@pytest.mark.skipif(importlib.util.find_spec("tiktoken") is None, reason="tiktoken 未安装")
+def test_recorded_fixture_counts_match_real_bpe() -> None:
+    if token_counter.use_tokenizer("tiktoken") != "tiktoken":
+        pytest.skip("tiktoken 词表不可用")
+    for text, real in _O200K_FIXTURES:
+        assert token_counter.count_tokens(text) == real, text
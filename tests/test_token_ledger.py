@@ -112,3 +112,225 @@ def test_day_summary_uses_full_24_hour_buckets(_ledger) -> None:
         first_hour.strftime("%Y-%m-%d %H:00"),
         current_hour.strftime("%Y-%m-%d %H:00"),
     }
+
+
+def _stored_calls(ledger) -> int:
+    db = load_personification_module("plugin.personification.core.db")
+    with db.connect_sync() as conn:
+        row = conn.execute("SELECT COALESCE(SUM(call_count), 0) AS cc FROM token_usage_ledger").fetchone()
+    return int(row["cc"])
+
+
+def test_calls_are_buffered_and_flushed_in_one_batch(_ledger, monkeypatch) -> None:
+    ledger = _ledger
+    monkeypatch.setattr(ledger, "_MAX_UNFLUSHED_CALLS", 100)
+    ledger.discard_pending_token_usage()
+    generation = ledger.ledger_generation()
+    for _ in range(5):
+        ledger.record_llm_call(model="gpt-x", prompt_tokens=10, completion_tokens=5, group_id="g1", purpose="chat")
+    ledger.record_llm_call(model="gpt-y", prompt_tokens=1, completion_tokens=1, group_id="g2", purpose="chat")
+
+    assert _stored_calls(ledger) == 0
+    assert ledger.pending_token_usage_calls() == 6
+    assert ledger.ledger_generation() == generation + 6
+
+    assert ledger.flush_pending_token_usage() == 2
+    assert _stored_calls(ledger) == 6
+    assert ledger.pending_token_usage_calls() == 0
+
+
+def test_queries_include_unflushed_calls(_ledger, monkeypatch) -> None:
+    ledger = _ledger
+    monkeypatch.setattr(ledger, "_MAX_UNFLUSHED_CALLS", 100)
+    ledger.discard_pending_token_usage()
+    ledger.record_llm_call(model="gpt-x", prompt_tokens=100, completion_tokens=50, group_id="g1")
+
+    assert ledger.query_summary("day")["total"]["total_tokens"] == 150
+    ledger.record_llm_call(model="gpt-x", prompt_tokens=10, completion_tokens=0, group_id="g1")
+    assert ledger.query_summary("month")["total"]["call_count"] == 2
+    assert ledger.query_group_detail("g1", "week")["rows"][0]["total_tokens"] == 160
+
+
+def test_unflushed_call_cap_bounds_loss_and_zero_writes_through(_ledger, monkeypatch) -> None:
+    ledger = _ledger
+    ledger.discard_pending_token_usage()
+    monkeypatch.setattr(ledger, "_MAX_UNFLUSHED_CALLS", 3)
+    for _ in range(3):
+        ledger.record_llm_call(model="gpt-x", prompt_tokens=1, completion_tokens=1)
+    assert _stored_calls(ledger) == 3
+    assert ledger.pending_token_usage_calls() == 0
+
+    ledger.configure_token_ledger(SimpleNamespace(personification_token_ledger_max_unflushed_calls=0))
+    ledger.record_llm_call(model="gpt-x", prompt_tokens=1, completion_tokens=1)
+    assert _stored_calls(ledger) == 4
+
+
+def test_failed_flush_keeps_deltas_for_retry(_ledger, monkeypatch) -> None:
+    ledger = _ledger
+    monkeypatch.setattr(ledger, "_MAX_UNFLUSHED_CALLS", 100)
+    ledger.discard_pending_token_usage()
+    ledger.record_llm_call(model="gpt-x", prompt_tokens=7, completion_tokens=3)
+
+    def _broken(*_args, **_kwargs):
+        raise RuntimeError("database is locked")
+
+    original = ledger.connect_sync
+    monkeypatch.setattr(ledger, "connect_sync", _broken)
+    with pytest.raises(RuntimeError):
+        ledger.flush_pending_token_usage()
+    assert ledger.pending_token_usage_calls() == 1
+
+    monkeypatch.setattr(ledger, "connect_sync", original)
+    assert ledger.query_summary("month")["total"]["total_tokens"] == 10
+
+
+def test_rollups_collapse_groups_and_carry_latency_histogram(_ledger, monkeypatch) -> None:
+    ledger = _ledger
+    monkeypatch.setattr(ledger, "_MAX_UNFLUSHED_CALLS", 1000)
+    ledger.discard_pending_token_usage()
+    for index in range(20):
+        ledger.record_llm_call(
+            model="gpt-x", prompt_tokens=10, completion_tokens=5,
+            group_id=f"g{index}", user_id=f"u{index}", purpose="chat",
+        )
+    ledger.record_llm_outcome(model="gpt-x", latency_ms=800, success=True, purpose="chat")
+    ledger.record_llm_outcome(model="gpt-x", latency_ms=5000, success=True, purpose="chat")
+    ledger.record_llm_outcome(model="gpt-x", latency_ms=45000, success=False, purpose="chat|provider=openai")
+    ledger.flush_pending_token_usage()
+
+    with ledger.connect_sync() as conn:
+        raw_rows = conn.execute("SELECT COUNT(*) FROM token_usage_ledger").fetchone()[0]
+        rollup = conn.execute("SELECT * FROM llm_usage_rollup_daily").fetchall()
+    assert raw_rows == 20
+    assert len(rollup) == 1
+    assert (rollup[0]["provider"], rollup[0]["purpose"], rollup[0]["call_count"]) == ("openai", "chat", 20)
+
+    summary = ledger.query_summary("month")
+    assert summary["total"] == {"prompt_tokens": 200, "completion_tokens": 100, "total_tokens": 300, "call_count": 20}
+    assert summary["by_purpose"] == [{"purpose": "chat", "prompt_tokens": 200, "completion_tokens": 100, "total_tokens": 300, "call_count": 20}]
+    assert len(summary["by_group"]) == 20
+
+    provider = ledger.query_provider_summary("day")["providers"][0]
+    assert (provider["request_count"], provider["error_count"]) == (3, 1)
+    assert provider["avg_latency_ms"] == pytest.approx(50800 / 3, abs=0.1)
+    assert provider["latency_buckets"] == {"le_1s": 1, "le_3s": 0, "le_10s": 1, "le_30s": 0, "gt_30s": 1}
+
+
+def test_compaction_prunes_raw_rows_but_keeps_totals(_ledger, monkeypatch) -> None:
+    ledger = _ledger
+    monkeypatch.setattr(ledger, "_MAX_UNFLUSHED_CALLS", 1000)
+    ledger.discard_pending_token_usage()
+    old = datetime.now() - timedelta(days=40)
+    ledger.record_llm_call(
+        model="gpt-x", prompt_tokens=100, completion_tokens=0, group_id="g1",
+        bucket_hour=old.strftime("%Y-%m-%d %H:00"),
+    )
+    ledger.record_llm_call(model="gpt-x", prompt_tokens=10, completion_tokens=0, group_id="g1")
+
+    deleted = ledger.compact_token_ledger(raw_retention_days=30, hourly_retention_days=7)
+
+    assert deleted == {"hourly": 1, "raw": 1, "rollup_hourly": 1}
+    consumption = ledger.query_total_consumption()
+    assert consumption["total"]["total_tokens"] == 110
+    assert consumption["by_group"][0]["total_tokens"] == 10
+    assert [row["bucket"] for row in consumption["series"]][0] == old.strftime("%Y-%m-%d")
+
+
+def test_backfill_builds_rollups_from_legacy_ledger(_ledger) -> None:
+    ledger = _ledger
+    ledger.discard_pending_token_usage()
+    db = load_personification_module("plugin.personification.core.db")
+    today = datetime.now().strftime("%Y-%m-%d")
+    with ledger.connect_sync() as conn:
+        conn.execute("DELETE FROM llm_usage_rollup_daily")
+        conn.execute("DELETE FROM llm_usage_rollup_hourly")
+        for group_id in ("g1", "g2"):
+            conn.execute(
+                "INSERT INTO token_usage_ledger(bucket_day, group_id, user_id, model, purpose, prompt_tokens,"
+                " completion_tokens, total_tokens, call_count, updated_at) VALUES (?, ?, '', 'claude-x', 'chat', 5, 5, 10, 1, 0)",
+                (today, group_id),
+            )
+        conn.commit()
+
+    db.init_db_sync(db.get_db_path().parent)
+    db.init_db_sync(db.get_db_path().parent)
+
+    provider = ledger.query_provider_summary("week")["providers"]
+    assert [(row["provider"], row["total_tokens"], row["call_count"]) for row in provider] == [("anthropic", 20, 2)]
+
+
+def test_prefix_cache_hits_roll_up_into_provider_hit_rate(_ledger, monkeypatch) -> None:
+    ledger = _ledger
+    monkeypatch.setattr(ledger, "_MAX_UNFLUSHED_CALLS", 1000)
+    ledger.discard_pending_token_usage()
+    ledger.record_llm_call(model="claude-x", prompt_tokens=1000, completion_tokens=10, group_id="g1", cached_tokens=800)
+    ledger.record_llm_call(model="claude-x", prompt_tokens=1000, completion_tokens=10, group_id="g2")
+    ledger.record_llm_call(model="claude-x", prompt_tokens=100, completion_tokens=10, cached_tokens=5000)
+    ledger.flush_pending_token_usage()
+
+    provider = ledger.query_provider_summary("day")["providers"][0]
+    assert provider["cached_prompt_tokens"] == 900
+    assert provider["prefix_cache_hit_rate"] == pytest.approx(900 / 2100, abs=1e-4)
+    with ledger.connect_sync() as conn:
+        assert conn.execute("SELECT SUM(cached_prompt_tokens) FROM llm_usage_rollup_daily").fetchone()[0] == 900
+
+
+def test_rollup_schema_migration_adds_cached_column(_ledger) -> None:
+    ledger = _ledger
+    db = load_personification_module("plugin.personification.core.db")
+    with ledger.connect_sync() as conn:
+        for table in ("llm_usage_rollup_hourly", "llm_usage_rollup_daily"):
+            conn.execute(f"ALTER TABLE {table} DROP COLUMN cached_prompt_tokens")
+        conn.commit()
+
+    db.init_db_sync(db.get_db_path().parent)
+
+    ledger.record_llm_call(model="gpt-x", prompt_tokens=100, completion_tokens=1, cached_tokens=64)
+    assert ledger.query_provider_summary("month")["providers"][0]["cached_prompt_tokens"] == 64
+
+
+def test_hedge_counts_roll_up_per_provider(_ledger, monkeypatch) -> None:
+    ledger = _ledger
+    monkeypatch.setattr(ledger, "_MAX_UNFLUSHED_CALLS", 1000)
+    ledger.discard_pending_token_usage()
+    ledger.record_llm_outcome(model="gpt-x", latency_ms=900, success=True, purpose="reply")
+    ledger.record_llm_hedge(model="gpt-x", hedge_won=True, purpose="reply")
+    ledger.record_llm_hedge(model="gpt-x", hedge_won=False, purpose="reply")
+    ledger.flush_pending_token_usage()
+    ledger.record_llm_hedge(model="gpt-x", hedge_won=True, purpose="reply")
+    ledger.flush_pending_token_usage()
+
+    provider = ledger.query_provider_summary("day")["providers"][0]
+    assert (provider["request_count"], provider["hedge_count"], provider["hedge_wins"]) == (1, 3, 2)
+
+
+def test_provider_call_outcome_and_tokens_share_one_rollup_row(_ledger, monkeypatch) -> None:
+    import asyncio
+
+    ledger = _ledger
+    provider_router = load_personification_module("plugin.personification.core.provider_router")
+    provider_health = load_personification_module("plugin.personification.core.provider_health")
+    monkeypatch.setattr(provider_health, "record_request_result", lambda **_kwargs: None)
+    ledger.discard_pending_token_usage()
+
+    class _Caller:
+        async def chat_with_tools(self, **_kwargs):  # noqa: ANN003
+            # provider 把请求的别名映射成了带日期的具体模型
+            return SimpleNamespace(
+                finish_reason="stop", content="ok", raw=None, model_used="gpt-x-2026-01-01",
+                usage={"prompt_tokens": 30, "completion_tokens": 6},
+            )
+
+    monkeypatch.setattr(provider_router, "_build_provider_caller", lambda *_a, **_k: _Caller())
+    provider = {"name": "p", "api_type": "openai", "api_key": "k", "api_url": "https://example.invalid", "model": "gpt-x"}
+    asyncio.run(provider_router._call_provider_once(provider, [], plugin_config=object()))
+    ledger.flush_pending_token_usage()
+
+    with ledger.connect_sync() as conn:
+        rollup = conn.execute("SELECT * FROM llm_usage_rollup_daily").fetchall()
+    assert len(rollup) == 1
+    row = dict(rollup[0])
+    assert (row["model"], row["purpose"], row["call_count"], row["prompt_tokens"]) == (
+        "gpt-x-2026-01-01", "ai_route", 1, 30,
+    )
+    assert row["request_count"] == 1
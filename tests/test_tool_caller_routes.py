@@ -125,11 +125,11 @@ def test_custom_gemini_endpoint_uses_google_header_and_v1beta(monkeypatch) -> No
         async def __aexit__(self, *_args) -> None:
             return None
 
-        async def post(self, url, headers=None, params=None, json=None):  # noqa: ANN001, ANN201
+        async def post(self, url, headers=None, params=None, content=None):  # noqa: ANN001, ANN201
             captured["url"] = url
             captured["headers"] = headers or {}
             captured["params"] = params or {}
-            captured["json"] = json or {}
+            captured["json"] = json.loads(content or b"{}")
             return _Response()
 
     monkeypatch.setattr(caller_impl.httpx, "AsyncClient", _Client)
@@ -173,8 +173,8 @@ def test_gemini_function_schema_uses_compatibility_subset(monkeypatch) -> None:
         async def __aexit__(self, *_args) -> None:
             return None
 
-        async def post(self, _url, headers=None, params=None, json=None):  # noqa: ANN001, ANN201
-            captured["json"] = json or {}
+        async def post(self, _url, headers=None, params=None, content=None):  # noqa: ANN001, ANN201
+            captured["json"] = json.loads(content or b"{}")
             return _Response()
 
     monkeypatch.setattr(caller_impl.httpx, "AsyncClient", _Client)
@@ -433,6 +433,33 @@ def test_single_provider_caller_receives_gemini_auth_mode_and_timeout() -> None:
     assert caller.timeout == 37
 
 
+def test_provider_router_reuses_caller_instances_until_config_changes() -> None:
+    provider_router.clear_provider_caller_cache()
+    provider = {
+        "api_type": "openai",
+        "api_url": "https://gateway.example/v1",
+        "api_key": "secret",
+        "model": "gpt-test",
+        "timeout": 30,
+    }
+    before = provider_router.provider_caller_cache_snapshot()
+
+    first = provider_router._build_provider_caller(dict(provider), _DummyConfig())
+    first._supports_reasoning = False
+    second = provider_router._build_provider_caller(dict(provider), _DummyConfig())
+    changed = provider_router._build_provider_caller({**provider, "timeout": 31}, _DummyConfig())
+    thinking_config = _DummyConfig()
+    thinking_config.personification_thinking_mode = "high"
+    rethought = provider_router._build_provider_caller(dict(provider), thinking_config)
+
+    assert second is first and second._supports_reasoning is False
+    assert changed is not first and changed.timeout == 31
+    assert rethought is not first
+    after = provider_router.provider_caller_cache_snapshot()
+    assert after["entries"] == 3
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (1, 3)
+
+
 def test_provider_router_caller_receives_gemini_auth_mode_and_timeout() -> None:
     caller = provider_router._build_provider_caller(
         {
@@ -531,8 +558,8 @@ def test_google_gemini_rest_call_uses_configured_timeout(monkeypatch) -> None:
         async def __aexit__(self, *_args) -> None:
             return None
 
-        async def post(self, url, headers=None, params=None, json=None):  # noqa: ANN001, ANN201
-            captured.update(url=url, headers=headers or {}, params=params or {}, json=json or {})
+        async def post(self, url, headers=None, params=None, content=None):  # noqa: ANN001, ANN201
+            captured.update(url=url, headers=headers or {}, params=params or {}, json=json.loads(content or b"{}"))
             return _Response()
 
     monkeypatch.setattr(caller_impl.httpx, "AsyncClient", _Client)
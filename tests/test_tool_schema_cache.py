@@ -0,0 +1,69 @@
+"""工具 schema 转换缓存：按单个工具命中、改一个工具只重算一个、结果与直接转换一致且调用方改顶层不污染缓存。"""
+from __future__ import annotations
+
+import copy
+import json
+
+from ._loader import load_personification_module
+
+cache = load_personification_module("plugin.personification.core.tool_schema_cache")
+impl = load_personification_module("plugin.personification.skills.skillpacks.tool_caller.scripts.impl")
+
+
+def _tool(name: str, parameters: dict) -> dict:
+    return {"type": "function", "function": {"name": name, "description": f"{name} 工具", "parameters": parameters}}
+
+
+_WEATHER = {"type": "object", "properties": {"city": {"type": ["string", "null"]}}, "required": ["city"]}
+_SEARCH = {"type": "object", "properties": {"query": {"type": "string", "maxLength": 200}}}
+
+
+def setup_function() -> None:
+    cache.reset_for_testing()
+
+
+def test_gemini_conversion_is_memoized_per_tool() -> None:
+    calls: list[str] = []
+
+    def _convert(tool: dict) -> dict | None:
+        calls.append(tool["function"]["name"])
+        return impl._convert_openai_tool_to_gemini(tool)
+
+    tools = [_tool("weather", _WEATHER), _tool("search", _SEARCH), "not-a-tool", _tool("bad name!", _SEARCH)]
+    first = cache.convert_tool_schemas("gemini", tools, _convert)
+    # 外层 dict 每次重建、键顺序不同也算同一个工具
+    rebuilt = [{"function": dict(reversed(list(tool["function"].items()))), "type": "function"} for tool in tools[:2]]
+    second = cache.convert_tool_schemas("gemini", rebuilt + [tools[3]], _convert)
+    changed = cache.convert_tool_schemas(
+        "gemini", [_tool("weather", {**_WEATHER, "required": []}), _tool("search", _SEARCH)], _convert
+    )
+
+    assert calls == ["weather", "search", "bad name!", "weather"]
+    assert [item["name"] for item in first] == ["weather", "search"]
+    assert json.dumps(second, ensure_ascii=False) == json.dumps(first, ensure_ascii=False)
+    assert "required" not in changed[0]["parameters"]
+    snapshot = cache.tool_schema_cache_snapshot()
+    assert (snapshot["hits"], snapshot["misses"]) == (4, 4)
+    assert snapshot["providers"]["gemini"]["calls"] == 3
+
+
+def test_cached_result_matches_direct_conversion_and_is_isolated_at_top_level() -> None:
+    tools = [_tool("weather", copy.deepcopy(_WEATHER)), _tool("search", copy.deepcopy(_SEARCH))]
+    direct = [impl._convert_openai_tool_to_gemini(tool) for tool in tools]
+
+    first = impl._convert_openai_tools_to_gemini(tools)
+    first[0]["description"] = "调用方改写"
+    again = impl._convert_openai_tools_to_gemini(tools)
+
+    assert again == direct
+    assert again[0]["parameters"]["properties"]["city"] == {"type": "STRING", "nullable": True}
+
+
+def test_digest_is_structural_and_reuses_parameter_identity() -> None:
+    parameters = {"type": "object", "properties": {"q": {"type": "string"}}}
+    digest = cache.tool_schema_digest(_tool("lookup", parameters))
+
+    assert cache.tool_schema_digest(_tool("lookup", parameters)) == digest
+    assert cache.tool_schema_digest(_tool("lookup", copy.deepcopy(parameters))) == digest
+    assert cache.tool_schema_digest(_tool("lookup", {**parameters, "required": ["q"]})) != digest
+    assert cache.tool_schema_digest({**_tool("lookup", parameters), "type": "other"}) != digest
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from ._loader import load_personification_module
+
+pipeline_emotion = load_personification_module("plugin.personification.handlers.reply_pipeline.pipeline_emotion")
+preflight = load_personification_module("plugin.personification.agent.runtime.preflight")
+llm_singleflight = load_personification_module("plugin.personification.core.llm_singleflight")
+
+_FRAME = {
+    "chat_intent": "lookup",
+    "plugin_question_intent": "capability",
+    "ambiguity_level": "medium",
+    "recommend_silence": False,
+    "domain_focus": "realtime",
+    "confidence": 0.82,
+    "reason": "需要查证",
+}
+_PLAN = {
+    "reply_action": "reply",
+    "speech_act": "source_summary",
+    "memory_need": "light",
+    "research_need": "medium",
+    "output_mode": "source_summary",
+    "tool_intent": ["lookup_web"],
+    "message_target": "bot",
+    "confidence": 0.8,
+    "reason": "先查再答",
+}
+
+
+@pytest.fixture(autouse=True)
+def _reset_singleflight():
+    llm_singleflight.reset_for_testing()
+    yield
+    llm_singleflight.reset_for_testing()
+
+
+class _ScriptedCaller:
+    def __init__(self, *contents: str, delay: float = 0.0) -> None:
+        self.contents = list(contents)
+        self.delay = delay
+        self.prompts: list[str] = []
+
+    async def chat_with_tools(self, messages, tools, use_builtin_search):  # noqa: ANN001
+        del tools, use_builtin_search
+        self.prompts.append(messages[0]["content"])
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(content=self.contents.pop(0) if self.contents else "{}")
+
+
+def _run_preflight(caller: _ScriptedCaller, *, timeout: float = 1.0):
+    config = SimpleNamespace(personification_semantic_frame_timeout=timeout)
+    return asyncio.run(
+        pipeline_emotion.preflight_turn_with_timeout(
+            "这个现在是什么情况",
+            plugin_config=config,
+            is_group=True,
+            is_direct_mention=True,
+            message_target="bot",
+            tool_caller=caller,
+            metric_scene="test",
+            metric_mode="test",
+        )
+    )
+
+
+def test_combined_payload_is_split_into_frame_and_plan_slices() -> None:
+    messages = preflight.build_turn_preflight_messages("这个现在是什么情况", is_group=True, message_target="bot")
+    assert '{"semantic_frame":{...},"turn_plan":{...}}' in messages[0]["content"]
+    assert "语义帧场景 fallback：" in messages[1]["content"]
+
+    parsed = preflight.parse_turn_preflight_payload(
+        {"semantic_frame": dict(_FRAME, confidence=0.2), "turn_plan": _PLAN},
+        is_group=True,
+        is_random_chat=True,
+        message_target="someone_else",
+    )
+    assert parsed.complete
+    assert parsed.semantic_frame.chat_intent == "lookup"
+    # 低置信度群聊帧与单独调用一样收敛为静默
+    assert (parsed.semantic_frame.ambiguity_level, parsed.semantic_frame.recommend_silence) == ("high", True)
+    assert parsed.turn_plan.tool_intent == ["lookup_web"]
+
+    partial = preflight.parse_turn_preflight_payload({"semantic_frame": _FRAME, "turn_plan": {"reply_action": "?"}})
+    assert partial.semantic_frame is not None and partial.turn_plan is None
+    assert not preflight.parse_turn_preflight_payload(None).complete
+
+
+def test_one_round_trip_serves_both_slices() -> None:
+    caller = _ScriptedCaller(json.dumps({"semantic_frame": _FRAME, "turn_plan": _PLAN}, ensure_ascii=False))
+
+    (frame, _, frame_reason, _, frame_source), (plan, _, plan_reason, _, plan_source) = _run_preflight(caller)
+
+    assert len(caller.prompts) == 1
+    assert (frame.chat_intent, frame_reason, frame_source) == ("lookup", "", "preflight_primary")
+    assert (plan.speech_act, plan_reason, plan_source) == ("source_summary", "", "preflight_primary")
+    assert getattr(plan, "llm_source", "") == "preflight_primary"
+
+
+def test_unparseable_slice_falls_back_to_its_individual_call() -> None:
+    caller = _ScriptedCaller(
+        json.dumps({"semantic_frame": _FRAME, "turn_plan": "oops"}, ensure_ascii=False),
+        json.dumps(_PLAN, ensure_ascii=False),
+    )
+
+    (frame, *_), (plan, _, plan_reason, _, plan_source) = _run_preflight(caller)
+
+    assert len(caller.prompts) == 2
+    assert caller.prompts[1].startswith("你是群聊/私聊的回合规划器")
+    assert frame.chat_intent == "lookup"
+    assert (plan.speech_act, plan_reason, plan_source) == ("source_summary", "", "primary")
+
+
+def test_timeout_uses_metadata_for_both_slices_without_extra_calls() -> None:
+    caller = _ScriptedCaller(delay=10)
+
+    (frame, _, frame_reason, _, frame_source), (plan, _, plan_reason, _, plan_source) = _run_preflight(
+        caller, timeout=0.01
+    )
+
+    assert len(caller.prompts) == 1
+    assert (frame_reason, plan_reason) == ("turn_preflight_timeout", "turn_preflight_timeout")
+    assert (frame_source, plan_source) == ("metadata", "metadata")
+    assert frame.reason == "metadata_fallback"
+    assert plan.reply_action == "reply"
+
+
+def test_prepare_reply_semantics_uses_preflight_for_shadow_plan(monkeypatch) -> None:  # noqa: ANN001
+    caller = _ScriptedCaller(json.dumps({"semantic_frame": _FRAME, "turn_plan": _PLAN}, ensure_ascii=False))
+
+    async def _load_states(*_args, **_kwargs):  # noqa: ANN001
+        return {"mood": "calm"}, {}
+
+    monkeypatch.setattr(pipeline_emotion, "load_reply_states_with_timeout", _load_states)
+    monkeypatch.setattr(pipeline_emotion, "get_personification_data_dir", lambda _config: None)
+    runtime = SimpleNamespace(
+        plugin_config=SimpleNamespace(
+            personification_turn_planner_enabled=False,
+            personification_turn_planner_shadow_enabled=True,
+            personification_turn_preflight_enabled=True,
+            personification_semantic_frame_timeout=1.0,
+            personification_group_knowledge_enabled=False,
+        ),
+        logger=SimpleNamespace(debug=lambda *_args, **_kwargs: None),
+        lite_tool_caller=caller,
+        agent_tool_caller=None,
+        tool_registry=None,
+        profile_service=None,
+        memory_store=None,
+    )
+
+    prepared = asyncio.run(
+        pipeline_emotion.prepare_reply_semantics(
+            runtime=runtime,
+            recent_window=[],
+            group_id="1",
+            user_id="u1",
+            is_private_session=False,
+            is_random_chat=False,
+            is_direct_mention=True,
+            raw_message_text="这个现在是什么情况",
+            current_agent_message_content="这个现在是什么情况",
+            recent_context_hint="",
+            relationship_hint="",
+            repeat_clusters=[],
+            message_target="bot",
+            solo_speaker_follow=False,
+        )
+    )
+
+    assert len(caller.prompts) == 1
+    assert prepared.message_intent == "lookup"